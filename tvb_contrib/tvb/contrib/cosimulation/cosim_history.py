@@ -70,11 +70,26 @@ class CosimHistory(BaseHistory):
            with the whole TVB state for a specific time step."""
         self.buffer[step % self.n_time] = new_state
 
+    def update_excluding_proxies(self, step, new_state, proxy_inds):
+        """This method will update the CosimHistory state buffer
+           with the whole TVB state for a specific time step, in place,
+           setting the proxy nodes to NaN until they get updated from the other co-simulator.
+           It returns the updated state."""
+        state = self.buffer[step % self.n_time]
+        state[:] = new_state
+        state[:, proxy_inds] = numpy.NAN
+        return state
+
     def query(self, step):
         """This method returns the whole TVB current_state
            by querying the CosimHistory state buffer for a time step."""
         return self.buffer[step % self.n_time]
 
+    def query_block(self, steps):
+        """This method returns the whole TVB state for several time steps at once,
+           as a copy of the CosimHistory state buffer."""
+        return self.buffer[steps % self.n_time]
+
     @classmethod
     def from_simulator(cls, sim):
         inst = cls(sim.synchronization_n_step,
@@ -175,22 +175,21 @@ class CoSimulator(Simulator):
     def _loop_update_cosim_history(self, step, state):
         """
         update the history :
-            - copy the state and put the state in the cosim_history and the history
+            - put the state in the cosim_history and the history
             - copy the delayed state and pass it to the monitor
         :param step: the actual step
         :param state: the current state
         :return:
         """
-        state_copy = numpy.copy(state)
         if self._cosimulation_flag:
-            state_copy[:, self.proxy_inds] = numpy.NAN
+            # The delayed state has to be copied before its place in the cosim_history is taken by the current state
             state_output = numpy.copy(self.cosim_history.query(step - self.synchronization_n_step))
             # Update the cosimulation history for the delayed monitor and the next update of history
-            self.cosim_history.update(step, state_copy)
+            state = self.cosim_history.update_excluding_proxies(step, state, self.proxy_inds)
         else:
             state_output = state
         # Update TVB history to allow for all types of coupling
-        super(CoSimulator,self)._loop_update_history(step, state_copy)
+        super(CoSimulator,self)._loop_update_history(step, state)
         return state_output
 
     def _update_cosim_history(self, current_steps, cosim_updates):
@@ -202,13 +201,11 @@ class CoSimulator(Simulator):
         """
         # Update the proxy nodes in the cosimulation history for synchronization_n_step past steps
         self.cosim_history.update_state_from_cosim(current_steps, cosim_updates, self.voi, self.proxy_inds)
-        # Update TVB history with the proxy nodes values
-        # TODO optimize step : update all the steps in one
-        for step in current_steps:
-            state = numpy.copy(self.cosim_history.query(step))
-            if numpy.any(numpy.isnan(state[self.model.cvar,:,:])):
-                raise NumericalInstability("There are missing values for continue the simulation")
-            super(CoSimulator,self)._loop_update_history(step, state)
+        # Update TVB history with the proxy nodes values, for all the steps at once
+        states = self.cosim_history.query_block(current_steps)
+        if numpy.any(numpy.isnan(states[:, self.model.cvar])):
+            raise NumericalInstability("There are missing values for continue the simulation")
+        self._loop_update_history_block(current_steps, states)
 
     def __call__(self, simulation_length=None, random_state=None, n_steps=None,
                  cosim_updates=None, recompute_requirements=False):
@@ -273,6 +270,7 @@ class CoSimulator(Simulator):
             self._compute_requirements = False
         self.integrator.set_random_state(random_state)
 
+        self._prepare_surface_engine()
         local_coupling = self._prepare_local_coupling()
         stimulus = self._prepare_stimulus()
         state = self.current_state
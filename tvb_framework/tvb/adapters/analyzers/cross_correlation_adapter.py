@@ -35,7 +35,7 @@ Adapter that uses the traits module to generate interfaces for ... Analyzer.
 
 import uuid
 import numpy
-from scipy.signal import correlate
+from scipy import fft
 from tvb.adapters.datatypes.db.graph import CorrelationCoefficientsIndex
 from tvb.adapters.datatypes.db.temporal_correlations import CrossCorrelationIndex
 from tvb.adapters.datatypes.db.time_series import TimeSeriesIndex, TimeSeriesEEGIndex, TimeSeriesMEGIndex, \
@@ -53,6 +53,8 @@ from tvb.datatypes.graph import CorrelationCoefficients
 from tvb.datatypes.temporal_correlations import CrossCorrelation
 from tvb.datatypes.time_series import TimeSeries
 
+# Bytes of cross correlation sequences computed and written at once
+CROSS_CORRELATION_BLOCK_SIZE = 256 * 1024 * 1024
 
 class CrossCorrelateAdapterModel(ViewModel):
     time_series = DataTypeGidAttr(
@@ -62,6 +64,13 @@ class CrossCorrelateAdapterModel(ViewModel):
         doc="""The time-series for which the cross correlation sequences are calculated."""
     )
 
+    max_lag = Float(
+        label="Maximum lag (ms)",
+        default=None,
+        required=False,
+        doc="""Cross correlation sequences are computed for temporal offsets between -max_lag and max_lag.
+        When empty, all the offsets up to half the length of the time-series are computed.""")
+
 
 class CrossCorrelateAdapterForm(ABCAdapterForm):
 
@@ -69,6 +78,7 @@ class CrossCorrelateAdapterForm(ABCAdapterForm):
         super(CrossCorrelateAdapterForm, self).__init__()
         self.time_series = TraitDataTypeSelectField(CrossCorrelateAdapterModel.time_series, name=self.get_input_name(),
                                                     conditions=self.get_filters(), has_all_option=True)
+        self.max_lag = FloatField(CrossCorrelateAdapterModel.max_lag)
 
     @staticmethod
     def get_view_model():
@@ -109,25 +119,24 @@ class CrossCorrelateAdapter(ABCAdapter):
                             self.input_time_series_index.data_length_2d,
                             self.input_time_series_index.data_length_3d,
                             self.input_time_series_index.data_length_4d)
+        self.lags = self._lags(self.input_shape[0], self.input_time_series_index.sample_period, view_model.max_lag)
 
     def get_required_memory_size(self, view_model):
         # type: (CrossCorrelateAdapterModel) -> int
         """
         Returns the required memory to be able to run the adapter.
         """
-        # Not all the data is loaded into memory at one time here.
-        used_shape = (self.input_shape[0], 1, self.input_shape[2], self.input_shape[3])
-        input_size = numpy.prod(used_shape) * 8.0
-        output_size = self._result_size(used_shape)
-        return input_size + output_size
+        # The input is kept as spectra, while the result is computed and written in blocks of nodes.
+        nfft = self._fft_length(self.input_shape[0], self.lags)
+        spectra_size = (nfft // 2 + 1) * numpy.prod(self.input_shape[1:]) * 16.0
+        return spectra_size + self._block_size(self.input_shape, nfft) * self._node_block_bytes(self.input_shape, nfft)
 
     def get_required_disk_size(self, view_model):
         # type: (CrossCorrelateAdapterModel) -> int
         """
         Returns the required disk size to be able to run the adapter (in kB).
         """
-        used_shape = (self.input_shape[0], 1, self.input_shape[2], self.input_shape[3])
-        return self.array_size2kb(self._result_size(used_shape))
+        return self.array_size2kb(self._result_size(self.input_shape, len(self.lags)))
 
     def launch(self, view_model):
         # type: (CrossCorrelateAdapterModel) -> [CrossCorrelationIndex]
@@ -138,7 +147,8 @@ class CrossCorrelateAdapter(ABCAdapter):
         Return a CrossCorrelationIndex. Create a CrossCorrelationH5 that contains the cross-correlation
         sequences for all possible combinations of the nodes.
 
-        See: http://www.scipy.org/doc/api_docs/SciPy.signal.signaltools.html#correlate
+        The sequences are those of scipy.signal.correlate(mode="same") on each pair of (mean subtracted) nodes,
+        computed for all pairs at once from the Fourier transform of each node, and written in blocks of nodes.
 
         :param view_model: the ViewModel keeping the algorithm inputs
         :return: the cross correlation index for the given time series
@@ -149,19 +159,27 @@ class CrossCorrelateAdapter(ABCAdapter):
         cross_corr_h5_path = self.path_for(CrossCorrelationH5, cross_corr_index.gid)
         cross_corr_h5 = CrossCorrelationH5(cross_corr_h5_path)
 
-        node_slice = [slice(self.input_shape[0]), None, slice(self.input_shape[2]), slice(self.input_shape[3])]
-        # ---------- Iterate over slices and compose final result ------------##
         small_ts = TimeSeries()
+        nfft = self._fft_length(self.input_shape[0], self.lags)
 
         with h5.h5_file_for_index(self.input_time_series_index) as ts_h5:
             small_ts.sample_period = ts_h5.sample_period.load()
             small_ts.sample_period_unit = ts_h5.sample_period_unit.load()
-            partial_cross_corr = None
+            # (frequencies, state-variables, nodes, modes)
+            spectra = numpy.empty((nfft // 2 + 1,) + self.input_shape[1:], dtype=numpy.complex128)
             for var in range(self.input_shape[1]):
-                node_slice[1] = slice(var, var + 1)
-                small_ts.data = ts_h5.read_data_slice(tuple(node_slice))
-                partial_cross_corr = self._compute_cross_correlation(small_ts, ts_h5)
-                cross_corr_h5.write_data_slice(partial_cross_corr)
+                data = ts_h5.data[:, var, :, :]
+                spectra[:, var] = fft.rfft(data - data.mean(axis=0), n=nfft, axis=0)
+
+        # ---------- Iterate over blocks of nodes and compose final result ------------##
+        nr_nodes = self.input_shape[2]
+        block_size = self._block_size(self.input_shape, nfft)
+        partial_cross_corr = None
+        for start in range(0, nr_nodes, block_size):
+            nodes = slice(start, min(start + block_size, nr_nodes))
+            partial_cross_corr = CrossCorrelation(source=small_ts, time=self.lags * small_ts.sample_period,
+                                                  array_data=self._cross_correlate(spectra, nodes, self.lags, nfft))
+            cross_corr_h5.write_data_slice(partial_cross_corr)
 
         partial_cross_corr.source.gid = view_model.time_series
         partial_cross_corr.gid = uuid.UUID(cross_corr_index.gid)
@@ -174,49 +192,57 @@ class CrossCorrelateAdapter(ABCAdapter):
 
         return cross_corr_index
 
-    def _compute_cross_correlation(self, small_ts, input_ts_h5):
+    @staticmethod
+    def _cross_correlate(spectra, nodes, lags, nfft):
         """
-        Cross-correlate two one-dimensional arrays. Return a CrossCorrelation datatype with result.
+        Cross-correlate the nodes in the given slice with all nodes, for each state-variable & mode,
+        from their spectra (frequencies, state-variables, nodes, modes) of length nfft.
+        The cross-spectra of all these pairs are formed as one product, and transformed back to the given lags:
+        result[l, n1, n2, var, mode] = sum_t data[t + lags[l], n1, var, mode] * data[t, n2, var, mode]
         """
-        # (tpts, nodes, nodes, state-variables, modes)
-        result_shape = self._result_shape(small_ts.data.shape)
-        self.log.info("result shape will be: %s" % str(result_shape))
+        # (frequencies, n1, n2, state-variables, modes)
+        cross_spectra = (spectra[:, :, nodes, numpy.newaxis, :] *
+                         spectra[:, :, numpy.newaxis, :, :].conj()).transpose((0, 2, 3, 1, 4))
+        return fft.irfft(cross_spectra, n=nfft, axis=0)[lags % nfft]
 
-        result = numpy.zeros(result_shape)
-
-        # TODO: For region level, 4s, 2000Hz, this takes ~3hours...(which makes node_coherence seem positively speedy
-        # Probably best to add a keyword for offsets, so we just compute +- some "small" range...
-        # One inter-node correlation, across offsets, for each state-var & mode.
-        for mode in range(result_shape[4]):
-            for var in range(result_shape[3]):
-                data = input_ts_h5.data[:, var, :, mode]
-                data = data - data.mean(axis=0)[numpy.newaxis, :]
-                # TODO: Work out a way around the 4 level loop:
-                for n1 in range(result_shape[1]):
-                    for n2 in range(result_shape[2]):
-                        result[:, n1, n2, var, mode] = correlate(data[:, n1], data[:, n2], mode="same")
-
-        self.log.debug("result")
-        self.log.debug(narray_describe(result))
+    @staticmethod
+    def _fft_length(nr_time_points, lags):
+        """Length of the Fourier transforms, padded such that no lag wraps around."""
+        return fft.next_fast_len(nr_time_points + int(numpy.abs(lags).max()), real=True)
 
-        offset = (small_ts.sample_period *
-                  numpy.arange(-numpy.floor(result_shape[0] / 2.0), numpy.ceil(result_shape[0] / 2.0)))
+    @staticmethod
+    def _node_block_bytes(input_shape, nfft):
+        """Bytes of the cross-spectra and their inverse transform, for one node against all others."""
+        return nfft * input_shape[2] * input_shape[1] * input_shape[3] * 16.0
 
-        cross_corr = CrossCorrelation(source=small_ts, array_data=result, time=offset)
+    def _block_size(self, input_shape, nfft):
+        """Number of nodes cross-correlated with all others at once."""
+        block_size = int(CROSS_CORRELATION_BLOCK_SIZE // self._node_block_bytes(input_shape, nfft))
+        return min(max(block_size, 1), input_shape[2])
 
-        return cross_corr
+    @staticmethod
+    def _lags(nr_time_points, sample_period, max_lag=None):
+        """
+        Temporal offsets (in samples) of the cross correlation sequences: all those of a correlation
+        with mode="same", or only the ones up to max_lag (ms).
+        """
+        lo, hi = -(nr_time_points // 2), (nr_time_points + 1) // 2
+        if max_lag is not None:
+            max_lag = int(max_lag / sample_period)
+            lo, hi = max(lo, -max_lag), min(hi, max_lag + 1)
+        return numpy.arange(lo, hi)
 
     @staticmethod
-    def _result_shape(input_shape):
+    def _result_shape(input_shape, nr_lags):
         """Returns the shape of the main result of ...."""
-        result_shape = (input_shape[0], input_shape[2], input_shape[2], input_shape[1], input_shape[3])
+        result_shape = (nr_lags, input_shape[2], input_shape[2], input_shape[1], input_shape[3])
         return result_shape
 
-    def _result_size(self, input_shape):
+    def _result_size(self, input_shape, nr_lags):
         """
         Returns the storage size in Bytes of the main result of .
         """
-        result_size = numpy.sum(list(map(numpy.prod, self._result_shape(input_shape)))) * 8.0  # Bytes
+        result_size = numpy.prod(self._result_shape(input_shape, nr_lags)) * 8.0  # Bytes
         return result_size
 
 
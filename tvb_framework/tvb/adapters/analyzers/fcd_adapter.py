@@ -35,6 +35,7 @@ import json
 import uuid
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy import linalg
 from scipy.spatial.distance import pdist
 from sklearn.cluster import DBSCAN
@@ -55,6 +56,9 @@ from tvb.datatypes.fcd import Fcd
 from tvb.datatypes.graph import ConnectivityMeasure
 from tvb.datatypes.time_series import TimeSeriesRegion
 
+# Bytes of intermediate results (windowed data, FCD rows) computed at once
+FC_CHUNK_SIZE = 64 * 1024 * 1024
+
 
 class FCDAdapterModel(ViewModel):
     time_series = DataTypeGidAttr(
@@ -246,34 +250,23 @@ class FunctionalConnectivityDynamicsAdapter(ABCAdapter):
         return result
 
     def _compute_fcd_matrix(self, ts_h5):
+        ts_data = ts_h5.data[:]
         self.log.debug("timeseries_h5.data")
-        self.log.debug(narray_describe(ts_h5.data[:]))
+        self.log.debug(narray_describe(ts_data))
 
-        input_shape = ts_h5.data.shape
+        input_shape = ts_data.shape
         result_shape = self._result_shape(input_shape)
 
+        # sliding windows start every actual_sp points and span actual_sw points, both of which may be fractional
+        window_starts = np.cumsum(np.r_[-self.actual_sp, np.full(result_shape[0], self.actual_sp)])[1:]
+        window_ends = (window_starts + self.actual_sw).astype(int) + 1
+        window_starts = window_starts.astype(int)
+
         fcd = np.zeros(result_shape)
-        fc_stream = {}  # dict where the fc calculated over the sliding window will be stored
         for mode in range(result_shape[3]):
             for var in range(result_shape[2]):
-                start = -self.actual_sp  # in order to well initialize the first starting point of the FC stream
-                for nfcd in range(result_shape[0]):
-                    start += self.actual_sp
-                    current_slice = tuple([slice(int(start), int(start + self.actual_sw) + 1), slice(var, var + 1),
-                                           slice(input_shape[2]), slice(mode, mode + 1)])
-                    data = ts_h5.read_data_slice(current_slice).squeeze()
-                    fc = np.corrcoef(data.T)
-                    # the triangular part of the fc is organized as a vector, excluding the diagonal (always ones)
-                    triangular = np.triu_indices(len(fc), 1)
-                    fc_stream[nfcd] = fc[triangular]
-                for i in range(result_shape[0]):
-                    j = i
-                    while j < result_shape[0]:
-                        fci = fc_stream[i]
-                        fcj = fc_stream[j]
-                        fcd[i, j, var, mode] = np.corrcoef(fci, fcj)[0, 1]
-                        fcd[j, i, var, mode] = fcd[i, j, var, mode]
-                        j += 1
+                fc_stream = self._compute_fc_stream(ts_data[:, var, :, mode], window_starts, window_ends)
+                fcd[:, :, var, mode] = self._compute_fcd(fc_stream)
 
         self.log.debug("FCD")
         self.log.debug(narray_describe(fcd))
@@ -308,7 +301,7 @@ class FunctionalConnectivityDynamicsAdapter(ABCAdapter):
                     eigval_dict[mode][var][ep] = []
                     current_slice = tuple([slice(int(epochs_extremes[ep][0]), int(epochs_extremes[ep][1]) + 1),
                                            slice(var, var + 1), slice(input_shape[2]), slice(mode, mode + 1)])
-                    data = ts_h5.read_data_slice(current_slice).squeeze()
+                    data = ts_data[current_slice].squeeze()
                     fc = np.corrcoef(data.T)  # calculate fc over the epoch of stability
                     eigval_matrix, eigvect_matrix = linalg.eig(fc)
                     eigval_matrix = np.real(eigval_matrix)
@@ -323,6 +316,47 @@ class FunctionalConnectivityDynamicsAdapter(ABCAdapter):
 
         return [fcd, fcd_segmented, eigvect_dict, eigval_dict]
 
+    @staticmethod
+    def _compute_fc_stream(data, window_starts, window_ends, max_chunk_size=FC_CHUNK_SIZE):
+        """
+        Compute the FC (Pearson correlation between nodes) over each sliding window of data, given as (time, nodes).
+        The upper triangular part of each FC, without the diagonal (always ones), is organized as a vector.
+        Windows are taken as strided views of data, and correlated in chunks of at most max_chunk_size bytes.
+        """
+        nr_nodes = data.shape[1]
+        triangular = np.triu_indices(nr_nodes, 1)
+        fc_stream = np.empty((len(window_starts), len(triangular[0])))
+        window_lengths = np.minimum(window_ends, data.shape[0]) - window_starts
+        # windows can differ by one point in length, when actual_sp or actual_sw are fractional
+        for window_length in np.unique(window_lengths):
+            windows = sliding_window_view(data, window_length, axis=0)
+            window_indices = np.flatnonzero(window_lengths == window_length)
+            chunk = max(max_chunk_size // (8 * nr_nodes * window_length), 1)
+            for chunk_start in range(0, len(window_indices), chunk):
+                indices = window_indices[chunk_start:chunk_start + chunk]
+                centered = windows[window_starts[indices]]
+                centered = centered - centered.mean(axis=2, keepdims=True)
+                cov = np.matmul(centered, centered.transpose(0, 2, 1))
+                std = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+                fc = cov / std[:, :, np.newaxis] / std[:, np.newaxis, :]
+                fc_stream[indices] = np.clip(fc[:, triangular[0], triangular[1]], -1, 1)
+        return fc_stream
+
+    @staticmethod
+    def _compute_fcd(fc_stream, max_chunk_size=FC_CHUNK_SIZE):
+        """
+        Compute the FCD, as the Pearson correlation between the FC vectors of each pair of sliding windows.
+        With the FC vectors z-scored, this is their matrix product, computed in blocks of rows.
+        """
+        z_scores = fc_stream - fc_stream.mean(axis=1, keepdims=True)
+        z_scores /= np.sqrt(np.sum(z_scores ** 2, axis=1, keepdims=True))
+        nr_windows = z_scores.shape[0]
+        fcd = np.empty((nr_windows, nr_windows))
+        chunk = max(max_chunk_size // (8 * nr_windows), 1)
+        for chunk_start in range(0, nr_windows, chunk):
+            np.matmul(z_scores[chunk_start:chunk_start + chunk], z_scores.T, out=fcd[chunk_start:chunk_start + chunk])
+        return np.clip(fcd, -1, 1, out=fcd)
+
     def _result_shape(self, input_shape):
         """Returns the shape of the fcd"""
         fcd_points = int((input_shape[0] - self.actual_sw) / self.actual_sp)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Adapter computing a suite of Brain Connectivity Toolbox measures for a Connectivity in a single operation.
+
+Intermediates needed by several measures (binarized, scaled and length matrices, shortest paths, community
+structure) are computed once, and the measures are then evaluated in parallel. Many Connectivities are analyzed
+as one operation group, with one operation per Connectivity (see :func:`launch_graph_metrics_suite`).
+"""
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
+import bct
+import numpy
+from tvb.adapters.analyzers.bct_adapters import BaseBCT, BaseBCTForm
+from tvb.adapters.datatypes.db.graph import ConnectivityMeasureIndex
+from tvb.adapters.datatypes.db.mapped_value import ValueWrapperIndex
+from tvb.analyzers import graph
+from tvb.basic.neotraits.api import List
+from tvb.core.neotraits.forms import TraitDataTypeSelectField, MultiSelectField
+from tvb.core.neotraits.view_model import ViewModel, DataTypeGidAttr
+from tvb.core.services.operation_service import OperationService
+from tvb.datatypes.connectivity import Connectivity
+
+KIND_NODE = "node"
+KIND_GLOBAL = "global"
+KIND_MATRIX = "matrix"
+
+# Below this number of regions, measures are evaluated faster in-process than shared out between processes
+PARALLEL_MEASURES_MIN_REGIONS = 256
+
+
+class GraphIntermediates(object):
+    """
+    Matrices shared between measures, each computed on first use only.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    @cached_property
+    def undirected(self):
+        return numpy.allclose(self.weights, self.weights.T)
+
+    @cached_property
+    def binarized(self):
+        return bct.binarize(self.weights, copy=True)
+
+    @cached_property
+    def scaled(self):
+        """ Weights normalized to [0, 1], as expected by the weighted clustering measures """
+        max_weight = numpy.abs(self.weights).max()
+        return self.weights / max_weight if max_weight > 0 else self.weights.copy()
+
+    @cached_property
+    def lengths(self):
+        return bct.weight_conversion(self.weights, 'lengths')
+
+    @cached_property
+    def distance_bin(self):
+        return bct.distance_bin(self.binarized)
+
+    @cached_property
+    def distance_wei(self):
+        return bct.distance_wei(self.lengths)[0]
+
+    @cached_property
+    def charpath(self):
+        return bct.charpath(self.distance_wei, include_infinite=False)
+
+    @cached_property
+    def communities(self):
+        return bct.community_louvain(self.weights, B='modularity' if self.undirected else 'directed', seed=0)
+
+
+def _degree(g):
+    return bct.degrees_und(g.binarized) if g.undirected else bct.degrees_dir(g.binarized)[2]
+
+
+def _strength(g):
+    return bct.strengths_und(g.weights) if g.undirected else bct.strengths_dir(g.weights)
+
+
+def _clustering_binary(g):
+    return bct.clustering_coef_bu(g.binarized) if g.undirected else bct.clustering_coef_bd(g.binarized)
+
+
+def _clustering_weighted(g):
+    return bct.clustering_coef_wu(g.scaled) if g.undirected else bct.clustering_coef_wd(g.scaled)
+
+
+def _participation_coefficient(g):
+    return bct.participation_coef(g.weights, g.communities[0], 'undirected' if g.undirected else 'in')
+
+
+# Measure name -> (kind of result, function of the GraphIntermediates, intermediates the function reads)
+GRAPH_MEASURES = OrderedDict([
+    ("degree", (KIND_NODE, _degree, ("binarized",))),
+    ("strength", (KIND_NODE, _strength, ())),
+    ("clustering_binary", (KIND_NODE, _clustering_binary, ("binarized",))),
+    ("clustering_weighted", (KIND_NODE, _clustering_weighted, ("scaled",))),
+    ("betweenness_binary", (KIND_NODE, lambda g: bct.betweenness_bin(g.binarized), ("binarized",))),
+    ("betweenness_weighted", (KIND_NODE, lambda g: bct.betweenness_wei(g.lengths), ("lengths",))),
+    ("eigenvector_centrality", (KIND_NODE, lambda g: bct.eigenvector_centrality_und(g.weights), ())),
+    ("local_efficiency", (KIND_NODE, lambda g: graph.efficiency_bin(g.binarized, True)[:, 0], ("binarized",))),
+    ("eccentricity", (KIND_NODE, lambda g: g.charpath[2], ("charpath",))),
+    ("community", (KIND_NODE, lambda g: g.communities[0], ("communities",))),
+    ("participation_coefficient", (KIND_NODE, _participation_coefficient, ("communities",))),
+    ("density", (KIND_GLOBAL, lambda g: (bct.density_und if g.undirected else bct.density_dir)(g.weights)[0], ())),
+    ("transitivity", (KIND_GLOBAL, lambda g: bct.transitivity_bu(g.binarized), ("binarized",))),
+    ("characteristic_path_length", (KIND_GLOBAL, lambda g: g.charpath[0], ("charpath",))),
+    ("global_efficiency", (KIND_GLOBAL, lambda g: g.charpath[1], ("charpath",))),
+    ("radius", (KIND_GLOBAL, lambda g: g.charpath[3], ("charpath",))),
+    ("diameter", (KIND_GLOBAL, lambda g: g.charpath[4], ("charpath",))),
+    ("modularity", (KIND_GLOBAL, lambda g: g.communities[1], ("communities",))),
+    ("distance_binary", (KIND_MATRIX, lambda g: g.distance_bin, ("distance_bin",))),
+    ("distance_weighted", (KIND_MATRIX, lambda g: g.distance_wei, ("distance_wei",))),
+])
+
+
+def _evaluate_measure(intermediates, name):
+    return numpy.asarray(GRAPH_MEASURES[name][1](intermediates), dtype=float)
+
+
+def compute_graph_measures(weights, measures, workers=1):
+    """
+    Evaluate the given measures over one weights matrix, sharing intermediates between them.
+
+    :param workers: number of processes between which the measures are shared out, once the intermediates
+                    they read are computed
+    :returns: OrderedDict from measure name to its value, in the order of `measures`
+    """
+    intermediates = GraphIntermediates(numpy.asarray(weights, dtype=float))
+    # Computed here once, as each process gets a copy of the intermediates filled so far
+    for intermediate in ("undirected",) + sum((GRAPH_MEASURES[name][2] for name in measures), ()):
+        getattr(intermediates, intermediate)
+
+    if workers > 1 and len(measures) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(measures))) as executor:
+            values = list(executor.map(_evaluate_measure, [intermediates] * len(measures), measures))
+    else:
+        values = [_evaluate_measure(intermediates, name) for name in measures]
+    return OrderedDict(zip(measures, values))
+
+
+class GraphMetricsSuiteModel(ViewModel):
+    connectivity = DataTypeGidAttr(
+        linked_datatype=Connectivity,
+        label='Connectivity'
+    )
+
+    measures = List(
+        of=str,
+        choices=tuple(GRAPH_MEASURES),
+        label='Selected graph measures',
+        doc='The selected measures are all computed for the Connectivity. When none is selected, all are computed.'
+    )
+
+
+class GraphMetricsSuiteForm(BaseBCTForm):
+
+    def __init__(self):
+        super(GraphMetricsSuiteForm, self).__init__()
+        self.connectivity = TraitDataTypeSelectField(GraphMetricsSuiteModel.connectivity, name="connectivity")
+        self.measures = MultiSelectField(GraphMetricsSuiteModel.measures, name="measures")
+
+    @staticmethod
+    def get_view_model():
+        return GraphMetricsSuiteModel
+
+
+class GraphMetricsSuiteAdapter(BaseBCT):
+    """
+    Compute several graph measures over a Connectivity, in a single operation.
+    """
+    _ui_name = "Graph Metrics Suite"
+    _ui_description = "Compute a set of Brain Connectivity Toolbox measures for a Connectivity."
+    _ui_subsection = "graphmetrics"
+
+    def get_form_class(self):
+        return GraphMetricsSuiteForm
+
+    def launch(self, view_model):
+        # type: (GraphMetricsSuiteModel) -> [ConnectivityMeasureIndex, ValueWrapperIndex]
+        """
+        Compute the selected measures and store each one as the BCT adapters do: node-wise and matrix measures
+        as a ConnectivityMeasure, global measures as a ValueWrapper.
+        """
+        measures = view_model.measures
+        if measures is None or len(measures) == 0:
+            measures = list(GRAPH_MEASURES)
+
+        connectivity = self.get_connectivity(view_model)
+        workers = 1
+        if connectivity.number_of_regions >= PARALLEL_MEASURES_MIN_REGIONS:
+            workers = os.cpu_count() or 1
+
+        self.log.debug("Computing %d graph measures with %d processes" % (len(measures), workers))
+        results = compute_graph_measures(connectivity.weights, measures, workers)
+
+        result_indexes = []
+        for name, value in results.items():
+            if GRAPH_MEASURES[name][0] == KIND_GLOBAL:
+                result_indexes.append(self.build_float_value_wrapper(value, title=name))
+            else:
+                result_indexes.append(self.build_connectivity_measure(value, connectivity, name))
+        return result_indexes
+
+
+def launch_graph_metrics_suite(current_user, project_id, connectivity_gids, measures=None):
+    """
+    Analyze many Connectivities as one operation group, with one operation per Connectivity, so that each
+    Connectivity is recorded as the input of its operation.
+
+    :returns: the launched operations
+    """
+    view_models = []
+    for connectivity_gid in connectivity_gids:
+        view_model = GraphMetricsSuiteModel()
+        view_model.connectivity = connectivity_gid
+        view_model.measures = measures
+        view_models.append(view_model)
+    return OperationService().fire_operation_group(GraphMetricsSuiteAdapter(), current_user, project_id,
+                                                   view_models, 'connectivity')
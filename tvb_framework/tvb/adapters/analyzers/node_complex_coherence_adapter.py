@@ -32,12 +32,17 @@ Adapter that uses the traits module to generate interfaces for FFT Analyzer.
 
 """
 
+import tempfile
+import uuid
+
 import numpy
 from tvb.adapters.datatypes.db.spectral import ComplexCoherenceSpectrumIndex
 from tvb.adapters.datatypes.db.time_series import TimeSeriesIndex
 from tvb.adapters.datatypes.h5.spectral_h5 import ComplexCoherenceSpectrumH5
-from tvb.analyzers.node_complex_coherence import calculate_complex_cross_coherence, complex_coherence_result_shape
+from tvb.analyzers.node_complex_coherence import calculate_complex_cross_coherence, complex_coherence_result_shape, \
+    calculate_segment_spectra, segment_spectra_layout
 from tvb.basic.neotraits.api import Attr, Int, Float
+from tvb.basic.profile import TvbProfile
 from tvb.core.adapters.abcadapter import ABCAdapterForm, ABCAdapter
 from tvb.core.entities.filters.chain import FilterChain
 from tvb.core.neocom import h5
@@ -45,6 +50,9 @@ from tvb.core.neotraits.forms import TraitDataTypeSelectField
 from tvb.core.neotraits.view_model import ViewModel, DataTypeGidAttr
 from tvb.datatypes.time_series import TimeSeries
 
+# Upper bound (in bytes) of the cross spectrum and coherence rows kept in memory before being written to the result
+COMPLEX_COHERENCE_BLOCK_SIZE = 256 * 2 ** 20
+
 
 class NodeComplexCoherenceModel(ViewModel):
     time_series = DataTypeGidAttr(
@@ -176,8 +184,10 @@ class NodeComplexCoherenceAdapter(ABCAdapter):
                                        view_model.max_freq, view_model.epoch_length, view_model.segment_length,
                                        view_model.segment_shift, self.input_time_series_index.sample_period,
                                        view_model.zeropad, view_model.average_segments)
+        # only a block of rows of the cross spectrum and of the coherence is in memory at once
+        block_size = 2 * output_size * self._nodes_per_block(view_model) / self.input_shape[2]
 
-        return input_size + output_size
+        return input_size + block_size
 
     def get_required_disk_size(self, view_model):
         # type: (NodeComplexCoherenceModel) -> int
@@ -209,31 +219,73 @@ class NodeComplexCoherenceAdapter(ABCAdapter):
         :param view_model: the ViewModel keeping the algorithm inputs
         :return: the complex coherence for the specified time series
         """
-        # TODO ---------- Iterate over slices and compose final result ------------##
         time_series = h5.load_from_index(self.input_time_series_index)
-        ht_result = calculate_complex_cross_coherence(time_series, view_model.epoch_length,
-                                                      view_model.segment_length,
-                                                      view_model.segment_shift,
-                                                      view_model.window_function,
-                                                      view_model.average_segments,
-                                                      view_model.subtract_epoch_average,
-                                                      view_model.zeropad, view_model.detrend_ts,
-                                                      view_model.max_freq, view_model.npat)
+        nr_nodes = self.input_shape[2]
+        nodes_per_block = self._nodes_per_block(view_model)
+
+        complex_coherence_index = ComplexCoherenceSpectrumIndex()
+        result_path = self.path_for(ComplexCoherenceSpectrumH5, complex_coherence_index.gid)
+        result_h5 = ComplexCoherenceSpectrumH5(path=result_path)
+
+        with tempfile.TemporaryFile(dir=TvbProfile.current.TVB_TEMP_FOLDER) as spectra_file:
+            segment_spectra, out = None, None
+            if nodes_per_block < nr_nodes:
+                # Every block of rows needs the spectra of all segments: compute them once, on disk when large
+                shape, dtype = segment_spectra_layout(self.input_shape, time_series.data.dtype,
+                                                      time_series.sample_period, view_model.epoch_length,
+                                                      view_model.segment_length, view_model.segment_shift,
+                                                      view_model.zeropad, view_model.max_freq)
+                if numpy.prod(shape) * numpy.dtype(dtype).itemsize > COMPLEX_COHERENCE_BLOCK_SIZE:
+                    out = numpy.memmap(spectra_file, dtype=dtype, mode='w+', shape=shape)
+                segment_spectra = calculate_segment_spectra(time_series, view_model.epoch_length,
+                                                            view_model.segment_length, view_model.segment_shift,
+                                                            view_model.window_function, view_model.zeropad,
+                                                            view_model.detrend_ts, view_model.max_freq, out=out)
+
+            # ---------- Iterate over blocks of rows and compose final result ------------##
+            for node in range(0, nr_nodes, nodes_per_block):
+                partial_result = calculate_complex_cross_coherence(time_series, view_model.epoch_length,
+                                                                   view_model.segment_length,
+                                                                   view_model.segment_shift,
+                                                                   view_model.window_function,
+                                                                   view_model.average_segments,
+                                                                   view_model.subtract_epoch_average,
+                                                                   view_model.zeropad, view_model.detrend_ts,
+                                                                   view_model.max_freq, view_model.npat,
+                                                                   nodes=slice(node, node + nodes_per_block),
+                                                                   segment_spectra=segment_spectra)
+                result_h5.write_data_slice(partial_result)
+            # the memory map has to be released before its file is closed
+            del segment_spectra, out
+
         self.log.debug("got ComplexCoherenceSpectrum result")
-        self.log.debug("ComplexCoherenceSpectrum segment_length is %s" % (str(ht_result.segment_length)))
-        self.log.debug("ComplexCoherenceSpectrum epoch_length is %s" % (str(ht_result.epoch_length)))
-        self.log.debug("ComplexCoherenceSpectrum windowing_function is %s" % (str(ht_result.windowing_function)))
+        self.log.debug("ComplexCoherenceSpectrum segment_length is %s" % (str(partial_result.segment_length)))
+        self.log.debug("ComplexCoherenceSpectrum epoch_length is %s" % (str(partial_result.epoch_length)))
+        self.log.debug("ComplexCoherenceSpectrum windowing_function is %s" % (str(partial_result.windowing_function)))
 
-        complex_coherence_index = self.store_complete(ht_result)
+        partial_result.source.gid = view_model.time_series
+        partial_result.gid = uuid.UUID(complex_coherence_index.gid)
 
-        result_path = self.path_for(ComplexCoherenceSpectrumH5, complex_coherence_index.gid)
-        ica_h5 = ComplexCoherenceSpectrumH5(path=result_path)
+        complex_coherence_index.fill_from_has_traits(partial_result)
+        self.fill_index_from_h5(complex_coherence_index, result_h5)
 
-        self.fill_index_from_h5(complex_coherence_index, ica_h5)
-        ica_h5.close()
+        result_h5.store(partial_result, scalars_only=True)
+        result_h5.close()
 
         return complex_coherence_index
 
+    def _nodes_per_block(self, view_model):
+        """
+        How many rows of the nodes x nodes result are computed together, keeping both the cross spectrum
+        and the complex coherence within COMPLEX_COHERENCE_BLOCK_SIZE.
+        """
+        result_size = self.result_size(self.input_shape, view_model.max_freq, view_model.epoch_length,
+                                       view_model.segment_length, view_model.segment_shift,
+                                       self.input_time_series_index.sample_period, view_model.zeropad,
+                                       view_model.average_segments)
+        row_size = 2 * result_size / self.input_shape[2]
+        return int(max(1, min(self.input_shape[2], COMPLEX_COHERENCE_BLOCK_SIZE // max(row_size, 1))))
+
     @staticmethod
     def result_size(input_shape, max_freq, epoch_length, segment_length,
                     segment_shift, sample_period, zeropad, average_segments):
@@ -49,6 +49,9 @@ from tvb.core.neotraits.forms import FormField, Form, TraitDataTypeSelectField,
 from tvb.core.neotraits.view_model import ViewModel, DataTypeGidAttr
 from tvb.datatypes.time_series import TimeSeries
 
+# Upper bound (in bytes) of the wavelet coefficients kept in memory before being appended to the result file
+WAVELET_NODE_BLOCK_SIZE = 256 * 2 ** 20
+
 
 class WaveletAdapterModel(ViewModel):
     time_series = DataTypeGidAttr(
@@ -180,7 +183,7 @@ class ContinuousWaveletTransformAdapter(ABCAdapter):
         """
         used_shape = (self.input_shape[0],
                       self.input_shape[1],
-                      1,
+                      self._nodes_per_block(view_model),
                       self.input_shape[3])
         input_size = numpy.prod(used_shape) * 8.0
         output_size = self.result_size(view_model.frequencies, view_model.sample_period,
@@ -220,12 +223,13 @@ class ContinuousWaveletTransformAdapter(ABCAdapter):
         # ------------- NOTE: Assumes 4D, Simulator timeSeries. --------------##
         node_slice = [slice(self.input_shape[0]), slice(self.input_shape[1]), None, slice(self.input_shape[3])]
 
-        # ---------- Iterate over slices and compose final result ------------##
+        # ------ Iterate over blocks of nodes, streaming them to the result ------##
+        nodes_per_block = self._nodes_per_block(view_model)
         small_ts = TimeSeries()
         small_ts.sample_period = time_series_h5.sample_period.load()
         small_ts.sample_period_unit = time_series_h5.sample_period_unit.load()
-        for node in range(self.input_shape[2]):
-            node_slice[2] = slice(node, node + 1)
+        for node in range(0, self.input_shape[2], nodes_per_block):
+            node_slice[2] = slice(node, min(node + nodes_per_block, self.input_shape[2]))
             small_ts.data = time_series_h5.read_data_slice(tuple(node_slice))
             partial_wavelet = compute_continuous_wavelet_transform(small_ts, view_model.frequencies,
                                                                    view_model.sample_period,
@@ -247,6 +251,15 @@ class ContinuousWaveletTransformAdapter(ABCAdapter):
 
         return wavelet_index
 
+    def _nodes_per_block(self, view_model):
+        """
+        How many nodes are transformed together, keeping their coefficients within WAVELET_NODE_BLOCK_SIZE.
+        """
+        node_shape = (self.input_shape[0], self.input_shape[1], 1, self.input_shape[3])
+        node_size = self.result_size(view_model.frequencies, view_model.sample_period,
+                                     node_shape, self.input_time_series_index.sample_period)
+        return int(max(1, min(self.input_shape[2], WAVELET_NODE_BLOCK_SIZE // max(node_size, 1))))
+
     @staticmethod
     def result_shape(frequencies, sample_period, input_shape, input_sample_period):
         """
@@ -29,10 +29,13 @@
 .. moduleauthor:: Ionel Ortelecan <ionel.ortelecan@codemart.ro>
 """
 
+import os
+
 from tvb.adapters.datatypes.db.local_connectivity import LocalConnectivityIndex
 from tvb.adapters.datatypes.db.surface import SurfaceIndex
 from tvb.adapters.forms.equation_forms import GaussianEquationForm, get_form_for_equation, SpatialEquationsEnum
 from tvb.basic.neotraits.api import Attr, EnumAttr
+from tvb.basic.profile import TvbProfile
 from tvb.core.adapters.abcadapter import ABCAdapterForm, ABCAdapter
 from tvb.core.entities.filters.chain import FilterChain
 from tvb.core.neocom import h5
@@ -170,7 +173,8 @@ class LocalConnectivityCreator(ABCAdapter):
         surface = h5.load_from_index(self.surface_index)
         local_connectivity.surface = surface
         local_connectivity.equation = view_model.equation
-        local_connectivity.compute_sparse_matrix()
+        # geodesic distances are cached per surface, so trying another cutoff or equation is cheap
+        local_connectivity.compute_sparse_matrix(cache_dir=os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "gdist"))
         self.generic_attributes.user_tag_1 = view_model.display_name
 
         return self.store_complete(local_connectivity)
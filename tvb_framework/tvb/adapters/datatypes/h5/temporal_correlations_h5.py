@@ -32,7 +32,7 @@ class CrossCorrelationH5(DataTypeMatrixH5):
 
     def __init__(self, path):
         super(CrossCorrelationH5, self).__init__(path)
-        self.array_data = DataSet(CrossCorrelation.array_data, self, expand_dimension=3)
+        self.array_data = DataSet(CrossCorrelation.array_data, self, expand_dimension=1)
         self.source = Reference(CrossCorrelation.source, self)
         self.time = DataSet(CrossCorrelation.time, self)
         self.labels_ordering = Json(CrossCorrelation.labels_ordering, self)
@@ -33,25 +33,40 @@ import json
 
 from tvb.basic.neotraits.api import Int
 from tvb.core.adapters.arguments_serialisation import *
-from tvb.core.neotraits.h5 import H5File, Scalar, DataSet, Reference, Json
+from tvb.core.neotraits.h5 import H5File, Scalar, DataSet, DataSetLayout, Reference, Json
 from tvb.core.utils import prepare_time_slice
 from tvb.datatypes.time_series import *
+from tvb.storage.h5.file.exceptions import MissingDataSetException
 
 NO_OF_DEFAULT_SELECTED_CHANNELS = 20
 
+# Chunks span all state variables and modes, and split the rest of their budget evenly between time and space, as
+# data is read either as a time window for all nodes or as the whole time for a few nodes.
+# Compression is opt-in, through the COMPRESS_H5_DATA setting.
+TIME_SERIES_LAYOUT = DataSetLayout(time_dimension=0, space_dimensions=(2,), compressible=True)
+TIME_SERIES_VOLUME_LAYOUT = DataSetLayout(time_dimension=0, space_dimensions=(1, 2, 3), compressible=True)
+TIME_LAYOUT = DataSetLayout(time_dimension=0, compressible=True)
+
+# Each level of the min/max decimation pyramid is LOD_FACTOR times shorter in time than the one below it.
+# Levels are added until one is no longer than LOD_MIN_LENGTH samples.
+LOD_FACTOR = 4
+LOD_MIN_LENGTH = 1024
+# Bytes of data read at once while building the pyramid
+LOD_BLOCK_SIZE = 64 * 2 ** 20
+
 
 class TimeSeriesH5(H5File):
     def __init__(self, path):
         super(TimeSeriesH5, self).__init__(path)
         self.title = Scalar(TimeSeries.title, self)
-        self.data = DataSet(TimeSeries.data, self, expand_dimension=0)
+        self.data = DataSet(TimeSeries.data, self, expand_dimension=0, layout=TIME_SERIES_LAYOUT)
         self.nr_dimensions = Scalar(Int(), self, name="nr_dimensions")
 
         # omitted length_nd , these are indexing props, to be removed from datatype too
         self.labels_ordering = Json(TimeSeries.labels_ordering, self)
         self.labels_dimensions = Json(TimeSeries.labels_dimensions, self)
 
-        self.time = DataSet(TimeSeries.time, self, expand_dimension=0)
+        self.time = DataSet(TimeSeries.time, self, expand_dimension=0, layout=TIME_LAYOUT)
         self.start_time = Scalar(TimeSeries.start_time, self)
         self.sample_period = Scalar(TimeSeries.sample_period, self)
         self.sample_period_unit = Scalar(TimeSeries.sample_period_unit, self)
@@ -130,21 +145,13 @@ class TimeSeriesH5(H5File):
         else:
             return data_page[:, channel_slice]
 
-    def read_data_page(self, from_idx, to_idx, step=None, specific_slices=None):
+    @staticmethod
+    def _page_slices(overall_shape, from_idx, to_idx, step, specific_slices):
         """
-        Retrieve one page of data (paging done based on time).
+        Slices for one page of data: a time window, every node of the main (space)
+        dimension and a single index along the others.
         """
-        from_idx, to_idx = int(from_idx), int(to_idx)
-
-        if isinstance(specific_slices, str):
-            specific_slices = json.loads(specific_slices)
-        if step is None:
-            step = 1
-        else:
-            step = int(step)
-
         slices = []
-        overall_shape = self.data.shape
         for i in range(len(overall_shape)):
             if i == 0:
                 # Time slice
@@ -159,8 +166,10 @@ class TimeSeriesH5(H5File):
                 slices.append(slice(0, 1))
             else:
                 slices.append(slice(specific_slices[i], min(specific_slices[i] + 1, overall_shape[i]), 1))
+        return tuple(slices)
 
-        data = self.data[tuple(slices)]
+    @staticmethod
+    def _squeeze_page(data):
         data = data.squeeze()
 
         if len(data.shape) == 1:
@@ -170,6 +179,139 @@ class TimeSeriesH5(H5File):
 
         return data
 
+    def read_data_page(self, from_idx, to_idx, step=None, specific_slices=None):
+        """
+        Retrieve one page of data (paging done based on time).
+        """
+        from_idx, to_idx = int(from_idx), int(to_idx)
+
+        if isinstance(specific_slices, str):
+            specific_slices = json.loads(specific_slices)
+        if step is None:
+            step = 1
+        else:
+            step = int(step)
+
+        data = self.data[self._page_slices(self.data.shape, from_idx, to_idx, step, specific_slices)]
+        return self._squeeze_page(data)
+
+    @staticmethod
+    def _lod_dataset_names(level):
+        return 'data_lod_%d_min' % level, 'data_lod_%d_max' % level
+
+    def _stored_lod_levels(self):
+        """
+        Number of min/max pyramid levels stored for the current data.
+        A pyramid built before the data grew is stale and counts as missing.
+        """
+        expected_length = self.data.shape[0]
+        level = 0
+        while True:
+            try:
+                length = self.storage_manager.get_data_shape(self._lod_dataset_names(level + 1)[0])[0]
+            except MissingDataSetException:
+                return level
+            expected_length = -(-expected_length // LOD_FACTOR)
+            if length != expected_length:
+                return 0
+            level += 1
+
+    def store_lod_pyramid(self):
+        """
+        Store next to ``data`` a pyramid of min/max decimations along time, such that
+        a viewer can request just the resolution matching its width in pixels.
+        Level k holds, for every block of LOD_FACTOR ** k samples, the min and max of the data.
+        Data is streamed in blocks; an up to date pyramid is left untouched.
+        """
+        data_length = self.data.shape[0]
+        levels = 0
+        length = data_length
+        while length > LOD_MIN_LENGTH:
+            length = -(-length // LOD_FACTOR)
+            levels += 1
+        if levels == 0 or self._stored_lod_levels() == levels:
+            return
+
+        # drop a stale pyramid, left by data which was appended to afterwards
+        level = 1
+        while True:
+            try:
+                self.storage_manager.get_data_shape(self._lod_dataset_names(level)[0])
+            except MissingDataSetException:
+                break
+            for name in self._lod_dataset_names(level):
+                self.storage_manager.remove_data(name)
+            level += 1
+
+        for level in range(1, levels + 1):
+            if level == 1:
+                source_min = source_max = self.data.field_name
+            else:
+                source_min, source_max = self._lod_dataset_names(level - 1)
+            self._store_lod_level(source_min, source_max, self._lod_dataset_names(level))
+        self.storage_manager.close_file()
+
+    def store_derived_data(self):
+        # Built once the data is complete, while nobody can open the file yet
+        self.store_lod_pyramid()
+
+    def _store_lod_level(self, source_min, source_max, target_names):
+        shape = self.storage_manager.get_data_shape(source_min)
+        row_size = int(numpy.prod(shape[1:])) * 8
+        block = max(LOD_BLOCK_SIZE // (2 * row_size) // LOD_FACTOR, 1) * LOD_FACTOR
+        for start in range(0, shape[0], block):
+            stop = min(start + block, shape[0])
+            bins = numpy.arange(0, stop - start, LOD_FACTOR)
+            reduced_min = numpy.minimum.reduceat(
+                self.storage_manager.get_data(source_min, data_slice=slice(start, stop)), bins, axis=0)
+            reduced_max = numpy.maximum.reduceat(
+                self.storage_manager.get_data(source_max, data_slice=slice(start, stop)), bins, axis=0)
+            for name, reduced in zip(target_names, (reduced_min, reduced_max)):
+                reduced = reduced.astype(numpy.float32)
+                layout = TIME_SERIES_LAYOUT.to_storage(reduced.shape, reduced.dtype, 0) if start == 0 else None
+                self.storage_manager.append_data(reduced, name, grow_dimension=0, close_file=False, layout=layout)
+
+    def read_channels_page_lod(self, from_idx, to_idx, level=0, specific_slices=None, channels_list=None):
+        """
+        Read a page of data for the specified channels, at a level of the min/max decimation pyramid,
+        as little endian float32 meant for binary transport.
+
+        :param from_idx: the starting time idx, in samples of the full resolution data
+        :param to_idx: the end time idx, in samples of the full resolution data
+        :param level: 0 for the data itself, k for the min and max over blocks of LOD_FACTOR ** k samples,
+            with the blocks aligned to multiples of their size
+        :param specific_slices: optional, as for read_data_page
+        :param channels_list: the list of channels for which we want data
+        :returns: an array of shape (1, time, channels) with the samples for level 0,
+            or (2, time, channels) with the min and max over each block
+        """
+        from_idx, to_idx, level = int(from_idx), int(to_idx), int(level)
+        if isinstance(specific_slices, str):
+            specific_slices = json.loads(specific_slices)
+        if isinstance(channels_list, str):
+            channels_list = json.loads(channels_list)
+        channel_slice = [int(c) for c in channels_list] if channels_list else slice(None)
+
+        factor = LOD_FACTOR ** level
+        if level == 0:
+            pages = [self.data[self._page_slices(self.data.shape, from_idx, to_idx, 1, specific_slices)]]
+        elif self._stored_lod_levels() >= level:
+            pages = []
+            for name in self._lod_dataset_names(level):
+                shape = self.storage_manager.get_data_shape(name)
+                slices = self._page_slices(shape, from_idx // factor, -(-to_idx // factor), 1, specific_slices)
+                pages.append(self.storage_manager.get_data(name, data_slice=slices))
+        else:
+            # no pyramid stored, decimate the full resolution page
+            page = self.data[self._page_slices(self.data.shape, from_idx // factor * factor,
+                                               -(-to_idx // factor) * factor, 1, specific_slices)]
+            bins = numpy.arange(0, page.shape[0], factor)
+            pages = [numpy.minimum.reduceat(page, bins, axis=0), numpy.maximum.reduceat(page, bins, axis=0)]
+
+        # Unlike read_data_page, keep the time dimension first even for a single channel
+        return numpy.stack([page.reshape((page.shape[0], -1))[:, channel_slice]
+                            for page in pages]).astype('<f4')
+
     def write_time_slice(self, partial_result):
         """
         Append a new value to the ``time`` attribute.
@@ -281,12 +423,17 @@ class TimeSeriesSurfaceH5(TimeSeriesH5):
 class TimeSeriesVolumeH5(TimeSeriesH5):
     def __init__(self, path):
         super(TimeSeriesVolumeH5, self).__init__(path)
+        self.data = DataSet(TimeSeriesVolume.data, self, expand_dimension=0, layout=TIME_SERIES_VOLUME_LAYOUT)
         self.volume = Reference(TimeSeriesVolume.volume, self)
         self.labels_ordering = Json(TimeSeriesVolume.labels_ordering, self)
 
     def store_references(self, ts):
         self.volume.store(ts.volume.gid)
 
+    def store_derived_data(self):
+        # Volumes are not shown by the paged time series viewer, and their pyramid would take much disk space
+        pass
+
     def get_volume_view(self, from_idx, to_idx, x_plane, y_plane, z_plane, **kwargs):
         """
         Retrieve 3 slices through the Volume TS, at the given X, y and Z coordinates, and in time [from_idx .. to_idx].
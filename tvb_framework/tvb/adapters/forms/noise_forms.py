@@ -29,7 +29,7 @@ from tvb.basic.neotraits.api import EnumAttr, Range
 from tvb.core.entities.file.simulator.view_model import NoiseViewModel, AdditiveNoiseViewModel, \
     MultiplicativeNoiseViewModel
 from tvb.core.entities.transient.range_parameter import RangeParameter
-from tvb.core.neotraits.forms import ArrayField, SelectField, FloatField, IntField
+from tvb.core.neotraits.forms import ArrayField, SelectField, FloatField, IntField, BoolField
 
 
 def get_form_for_noise(noise_class):
@@ -51,6 +51,8 @@ class NoiseForm(FormWithRanges):
         super(NoiseForm, self).__init__()
         self.ntau = FloatField(NoiseViewModel.ntau)
         self.noise_seed = IntField(NoiseViewModel.noise_seed)
+        self.noise_stream = SelectField(NoiseViewModel.noise_stream)
+        self.noise_float32 = BoolField(NoiseViewModel.noise_float32)
 
 
 class AdditiveNoiseForm(NoiseForm):
@@ -35,6 +35,7 @@ The purpose of this entities is to be used in Jinja2 UI, or for populating visua
 
 import json
 import math
+import threading
 import numpy
 from tvb.adapters.datatypes.db.mapped_value import DatatypeMeasureIndex
 from tvb.basic.config.utils import EnhancedDictionary
@@ -44,11 +45,30 @@ KEY_GID = "Gid"
 KEY_TOOLTIP = "tooltip"
 LINE_SEPARATOR = "<br/>"
 
+# Number of DataTypeGroups for which the loaded PSE grid is kept in memory
+PSE_GRID_CACHE_SIZE = 16
+
+
+def _is_float(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
 
 class PSEModel(object):
-    def __init__(self, operation):
+    def __init__(self, operation, datatype_measure=None, source_datatype=None, range_labels=None):
+        """
+        :param operation: Operation from the PSE group
+        :param datatype_measure: DatatypeMeasureIndex with the metrics for the operation result, when available
+        :param source_datatype: DataType for which datatype_measure was computed
+        :param range_labels: dictionary {gid: display name} for the ranges over DataTypes
+        """
         self.operation = operation
-        self.datatype_measure = self.determine_operation_result()
+        self.datatype_measure = datatype_measure
+        self.source_datatype = source_datatype
+        self.range_labels = range_labels or dict()
         self.metrics = dict()
         if self.datatype_measure:
             self.metrics = json.loads(self.datatype_measure.metrics)
@@ -68,28 +88,21 @@ class PSEModel(object):
             self.range2_key = range_keys[1]
             self.range2_value = ranges[self.range2_key]
 
-    def __is_float(self, value):
-        is_float = True
-        try:
-            float(value)
-        except ValueError:
-            is_float = False
-        return is_float
-
     def is_range1_float(self):
-        return self.__is_float(self.range1_value)
+        return _is_float(self.range1_value)
 
     def is_range2_float(self):
         if not self.range2_key:
             return False
-        return self.__is_float(self.range2_value)
+        return _is_float(self.range2_value)
 
     def _determine_type_and_label(self, value):
-        if self.__is_float(value):
+        if _is_float(value):
             return value
 
-        label = dao.get_datatype_by_gid(value).display_name
-        return label
+        if value in self.range_labels:
+            return self.range_labels[value]
+        return dao.get_datatype_by_gid(value).display_name
 
     def get_range1_label(self):
         return self._determine_type_and_label(self.range1_value)
@@ -108,8 +121,8 @@ class PSEModel(object):
 
         node_info = dict()
 
-        if self.operation.has_finished and self.datatype_measure is not None:
-            ts = dao.get_datatype_by_gid(self.datatype_measure.fk_source_gid)
+        if self.operation.has_finished and self.source_datatype is not None:
+            ts = self.source_datatype
             node_info[KEY_GID] = ts.gid
             node_info[KEY_NODE_TYPE] = ts.type
             node_info[KEY_OPERATION_ID] = ts.fk_from_operation
@@ -131,21 +144,95 @@ class PSEModel(object):
                    "Datatype subject: " + str(ts.subject) + LINE_SEPARATOR +
                    "Datatype invalid: " + str(ts.invalid))
 
-    def determine_operation_result(self):
-        datatype_measure = None
-        if self.operation.has_finished:
-            datatypes = dao.get_results_for_operation(self.operation.id)
-            if len(datatypes) > 0:
-                datatype = datatypes[0]
-                if datatype.type == "DatatypeMeasureIndex":
-                    # Load proper entity class from DB.
-                    measures = dao.get_generic_entity(DatatypeMeasureIndex, datatype.gid, 'gid')
-                else:
-                    measures = dao.get_generic_entity(DatatypeMeasureIndex, datatype.gid, 'fk_source_gid')
-                if len(measures) > 0:
-                    datatype_measure = measures[0]
 
-        return datatype_measure
+class PSEGrid(object):
+    """
+    In memory content of a PSE: one PSEModel for each operation in the group, with the range values and
+    metrics also available as columns. It is loaded with a fixed number of DB queries, independent of the
+    number of operations, and it is cached for each DataTypeGroup until an operation in the group changes status
+    or its measures change. The cache is shared by the web server threads.
+    """
+    _cache = dict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, operation_group_id):
+        self.operations = dao.get_operations_in_group(operation_group_id) or []
+
+        first_results = dict()
+        for datatype in dao.get_results_for_operation_group(operation_group_id) or []:
+            first_results.setdefault(datatype.fk_from_operation, datatype)
+        # The measures are either the results of the operations in the group, or computed for those results
+        measures_by_gid = dict()
+        measures_by_source = dict()
+        for measure, source in dao.get_measures_for_operation_group(DatatypeMeasureIndex, operation_group_id) or []:
+            measures_by_gid.setdefault(measure.gid, (measure, source))
+            measures_by_source.setdefault(measure.fk_source_gid, (measure, source))
+
+        operation_measures = []
+        range_gids = set()
+        for operation in self.operations:
+            measure = (None, None)
+            result = first_results.get(operation.id)
+            if operation.has_finished and result is not None:
+                if result.type == DatatypeMeasureIndex.__name__:
+                    measure = measures_by_gid.get(result.gid, measure)
+                else:
+                    measure = measures_by_source.get(result.gid, measure)
+            operation_measures.append(measure)
+            range_gids.update(value for value in json.loads(operation.range_values).values()
+                              if not _is_float(value))
+
+        range_labels = dict()
+        if range_gids:
+            range_labels = {gid: datatype.display_name
+                            for gid, datatype in dao.get_datatypes_by_gids(range_gids).items()}
+
+        self.pse_models = [PSEModel(operation, measure, source, range_labels)
+                           for operation, (measure, source) in zip(self.operations, operation_measures)]
+        self.range1_column = [pse_model.range1_value for pse_model in self.pse_models]
+        self.range2_column = [pse_model.range2_value for pse_model in self.pse_models]
+        self._metric_columns = dict()
+
+    def get_metric_column(self, metric_key):
+        """
+        :returns: array with the metric value for each operation, NaN where it is missing or not numeric
+        """
+        if metric_key not in self._metric_columns:
+            column = numpy.full(len(self.pse_models), numpy.nan)
+            for idx, pse_model in enumerate(self.pse_models):
+                try:
+                    column[idx] = float(pse_model.metrics[metric_key])
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self._metric_columns[metric_key] = column
+        return self._metric_columns[metric_key]
+
+    @classmethod
+    def for_datatype_group(cls, datatype_group):
+        """
+        Get the grid for a DataTypeGroup, from cache unless the status of an operation in the group changed since,
+        or measures were stored or removed for its results.
+        Operations finish in other processes, thus the group is checked with two queries on every call.
+        """
+        operations_stamp = dao.get_operation_group_stamp(datatype_group.fk_operation_group)
+        measures_stamp = dao.get_measures_stamp_for_operation_group(DatatypeMeasureIndex,
+                                                                    datatype_group.fk_operation_group)
+        stamp = None
+        if operations_stamp is not None and measures_stamp is not None:
+            stamp = (operations_stamp, measures_stamp)
+        with cls._cache_lock:
+            cached = cls._cache.get(datatype_group.gid)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        grid = PSEGrid(datatype_group.fk_operation_group)
+        with cls._cache_lock:
+            cls._cache.pop(datatype_group.gid, None)
+            if stamp is not None:
+                while len(cls._cache) >= PSE_GRID_CACHE_SIZE:
+                    del cls._cache[next(iter(cls._cache))]
+                cls._cache[datatype_group.gid] = (stamp, grid)
+        return grid
 
 
 class PSEGroupModel(object):
@@ -157,7 +244,8 @@ class PSEGroupModel(object):
                             "It might have been remove or the specified id is not the correct one.")
 
         self.operation_group = dao.get_operationgroup_by_id(self.datatype_group.fk_operation_group)
-        self.operations = dao.get_operations_in_group(self.operation_group.id)
+        self.grid = PSEGrid.for_datatype_group(self.datatype_group)
+        self.operations = self.grid.operations
         self.pse_model_list = self.parse_pse_data_for_display()
         self.all_metrics = dict()
         self._prepare_ranges_data()
@@ -175,11 +263,7 @@ class PSEGroupModel(object):
         return list(range(len(self.range2_orig_values)))
 
     def parse_pse_data_for_display(self):
-        pse_model_list = []
-        for operation in self.operations:
-            pse_model = PSEModel(operation)
-            pse_model_list.append(pse_model)
-        return pse_model_list
+        return list(self.grid.pse_models)
 
     def get_range1_key(self):
         return self.pse_model_list[0].range1_key
@@ -203,12 +287,22 @@ class PSEGroupModel(object):
         self.range2_orig_values = list(value_to_label2.keys())
         self.range2_labels = list(value_to_label2.values())
 
+    def get_range_indices(self):
+        """
+        :returns: two lists with the position of each PSE node along the first and second range
+        """
+        positions1 = {value: idx for idx, value in enumerate(self.range1_orig_values)}
+        positions2 = {value: idx for idx, value in enumerate(self.range2_orig_values)}
+        return ([positions1[pse_model.range1_value] for pse_model in self.pse_model_list],
+                [positions2[pse_model.range2_value] for pse_model in self.pse_model_list])
+
     def get_all_node_info(self):
         all_node_info = dict()
-        for pse_model in self.pse_model_list:
+        range1_values, range2_values = self.range1_values, self.range2_values
+        for pse_model, idx1, idx2 in zip(self.pse_model_list, *self.get_range_indices()):
             node_info = pse_model.prepare_node_info()
-            range1_val = self.range1_values[self.range1_orig_values.index(pse_model.range1_value)]
-            range2_val = self.range2_values[self.range2_orig_values.index(pse_model.range2_value)]
+            range1_val = range1_values[idx1]
+            range2_val = range2_values[idx2]
             if not range1_val in all_node_info:
                 all_node_info[range1_val] = {}
             all_node_info[range1_val][range2_val] = node_info
@@ -218,8 +312,7 @@ class PSEGroupModel(object):
         if len(self.all_metrics) == 0:
             for pse_model in self.pse_model_list:
                 if pse_model.datatype_measure:
-                    ts = dao.get_datatype_by_gid(pse_model.datatype_measure.fk_source_gid)
-                    self.all_metrics.update({ts.gid: pse_model.metrics})
+                    self.all_metrics.update({pse_model.datatype_measure.fk_source_gid: pse_model.metrics})
         return self.all_metrics
 
     def get_available_metric_keys(self):
@@ -32,7 +32,7 @@
 import json
 
 import numpy
-from tvb.adapters.visualizers.pse import PSEGroupModel, PSEModel, KEY_GID
+from tvb.adapters.visualizers.pse import PSEGroupModel
 from tvb.core.adapters.abcadapter import ABCAdapterForm
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.adapters.exceptions import LaunchException
@@ -52,36 +52,27 @@ class PSEIsoGroupModel(PSEGroupModel):
         self._fill_apriori_data()
 
     def parse_pse_data_for_display(self):
-        pse_model_list = []
         op_has_results = True
-        for operation in self.operations:
-            if not operation.has_finished:
+        for pse_model in self.grid.pse_models:
+            if not pse_model.operation.has_finished:
                 raise LaunchException("Not all operations from this range are complete. Cannot view until then.")
-            pse_model = PSEModel(operation)
-            pse_model_list.append(pse_model)
-
             if not pse_model.datatype_measure:
                 op_has_results = False
 
         if not op_has_results:
             raise LaunchException("No datatypes were generated due to simulation errors. Nothing to display.")
 
-        return pse_model_list
+        return list(self.grid.pse_models)
 
     def _prepare_sorted_metrics(self, metric_key):
-        coords_to_node_info = super(PSEIsoGroupModel, self).get_all_node_info()
-        metric_values = numpy.zeros((len(self.apriori_x), len(self.apriori_y)))
-        self.datatypes_gids = numpy.zeros((len(self.apriori_x), len(self.apriori_y)), object)
-
-        for idx1, val1 in enumerate(self.apriori_x):
-            for idx2, val2 in enumerate(self.apriori_y):
-                try:
-                    dt_gid = coords_to_node_info[val1][val2][KEY_GID]
-                    metric_values[idx1][idx2] = self.get_all_metrics()[dt_gid][metric_key]
-                except KeyError:
-                    dt_gid = None
-                    metric_values[idx1][idx2] = numpy.NaN
-                self.datatypes_gids[idx1][idx2] = dt_gid
+        idx1, idx2 = self.get_range_indices()
+        metric_values = numpy.full((len(self.apriori_x), len(self.apriori_y)), numpy.nan)
+        metric_values[idx1, idx2] = self.grid.get_metric_column(metric_key)
+
+        self.datatypes_gids = numpy.full((len(self.apriori_x), len(self.apriori_y)), None, object)
+        for pse_model, pos1, pos2 in zip(self.pse_model_list, idx1, idx2):
+            if pse_model.source_datatype is not None:
+                self.datatypes_gids[pos1][pos2] = pse_model.source_datatype.gid
         return metric_values
 
     def _fill_apriori_data(self):
@@ -35,7 +35,7 @@ import json
 from abc import ABCMeta
 from six import add_metaclass
 
-from tvb.adapters.datatypes.h5.time_series_h5 import TimeSeriesRegionH5, TimeSeriesSensorsH5, TimeSeriesH5
+from tvb.adapters.datatypes.h5.time_series_h5 import TimeSeriesRegionH5, TimeSeriesSensorsH5, TimeSeriesH5, LOD_FACTOR
 from tvb.core.entities.filters.chain import FilterChain
 from tvb.core.adapters.abcadapter import ABCAdapterForm
 from tvb.core.adapters.abcdisplayer import ABCDisplayer, URLGenerator
@@ -171,6 +171,13 @@ class TimeSeriesDisplay(ABCSpaceDisplayer):
         if preview and shape[0] > self.MAX_PREVIEW_DATA_LENGTH:
             shape[0] = self.MAX_PREVIEW_DATA_LENGTH
 
+        # The full viewer reads binary pages, at the level of detail matching its width. The pyramid is stored
+        # when the TimeSeries is written, older ones get their pages decimated on the fly
+        binary_url = ''
+        if not preview:
+            binary_url = URLGenerator.build_binary_datatype_attribute_url(time_series_index.gid,
+                                                                          'read_channels_page_lod')
+
         # when surface-result, the labels will be empty, so fill some of them,
         # but not all, otherwise the viewer will take ages to load.
         if shape[2] > 0 and len(labels) == 0:
@@ -178,6 +185,7 @@ class TimeSeriesDisplay(ABCSpaceDisplayer):
                 labels.append("Node-" + str(n))
 
         pars = {'baseURL': URLGenerator.build_base_h5_url(time_series_index.gid),
+                'binaryURL': binary_url, 'lodFactor': LOD_FACTOR,
                 'labels': labels, 'labels_json': json.dumps(labels, cls=TVBJSONEncoder),
                 'ts_title': time_series_index.title, 'preview': preview, 'figsize': figsize,
                 'shape': repr(shape), 't0': ts[0],
@@ -107,7 +107,9 @@ class TimeSeriesVolumeVisualiser(_MappedArrayVolumeBase):
     def launch(self, view_model):
         # type: (TimeSeriesVolumeVisualiserModel) -> dict
 
-        url_volume_data = URLGenerator.build_url(MappedArrayVolumeVisualizer.stored_adapter.id, 'get_volume_view', view_model.time_series, '')
+        volume_algorithm = dao.get_algorithm_by_module(MappedArrayVolumeVisualizer.__module__,
+                                                       MappedArrayVolumeVisualizer.__name__)
+        url_volume_data = URLGenerator.build_url(volume_algorithm.id, 'get_volume_view', view_model.time_series, '')
         url_timeseries_data = URLGenerator.build_url(self.stored_adapter.id, 'get_voxel_time_series',
                                                      view_model.time_series, '')
 
@@ -54,6 +54,8 @@ MEASURE_METRICS_MODEL_CLASS = 'TimeseriesMetricsAdapterModel'
 
 DEFAULT_PROJECT_GID = '2cc58a73-25c1-11e5-a7af-14109fe3bf71'
 
+# Stored Algorithm of each adapter, by the full class name of its view model (module.ClassName), as the
+# introspection manifest fills it without importing the adapters
 VIEW_MODEL2ADAPTER = {}
 
 DATATYPE_MEASURE_INDEX_MODULE = 'tvb.adapters.datatypes.db.mapped_value'
@@ -28,6 +28,9 @@
 .. moduleauthor:: Lia Domide <lia.domide@codemart.ro>
 """
 from datetime import datetime
+from importlib import import_module
+import json
+import os
 import shutil
 import threading
 from tvb.adapters.datatypes.db import DATATYPE_REMOVERS
@@ -125,19 +128,88 @@ def initialize(skip_import=False, skip_updates=False):
 
 
 class Introspector(object):
+    MANIFEST_FILE_NAME = "introspection_manifest.json"
+    ALGORITHM_FIELDS = ['module', 'classname', 'group_name', 'group_description', 'displayname', 'description',
+                        'subsection_name', 'required_datatype', 'datatype_filter', 'parameter_name', 'outputlist']
 
     def __init__(self):
         self.introspection_registry = IntrospectionRegistry()
         self.logger = get_logger(self.__class__.__module__)
+        self.manifest_path = os.path.join(TvbProfile.current.TVB_STORAGE, self.MANIFEST_FILE_NAME)
+        self.introspection_failed = False
 
     def introspect(self):
         self._ensure_datatype_tables_are_created()
         populate_datatypes_registry()
-        for algo_category_class in IntrospectionRegistry.ADAPTERS:
-            algo_category_id = self._populate_algorithm_categories(algo_category_class)
-            self._populate_algorithms(algo_category_class, algo_category_id)
+
+        fingerprint = self.introspection_registry.adapters_fingerprint()
+        manifest = None
+        if not self.introspection_registry.adapters_imported():
+            manifest = self._read_manifest(fingerprint)
+
+        if manifest is not None:
+            # Adapter sources did not change since the manifest was written: skip importing them,
+            # they get imported when first used
+            algorithms = []
+            for algo_category_class in self.introspection_registry.ADAPTER_MODULES:
+                algo_category_id = self._populate_algorithm_categories(algo_category_class)
+                algorithms.extend((algo_category_id, algorithm)
+                                  for algorithm in manifest[algo_category_class.category_name])
+            stored_adapters = self._store_algorithms(algorithms)
+            for (_, algorithm), stored_adapter in zip(algorithms, stored_adapters):
+                VIEW_MODEL2ADAPTER[algorithm['view_model']] = stored_adapter
+        else:
+            manifest = {}
+            for algo_category_class in self.introspection_registry.ADAPTERS:
+                algo_category_id = self._populate_algorithm_categories(algo_category_class)
+                manifest[algo_category_class.category_name] = self._populate_algorithms(algo_category_class,
+                                                                                        algo_category_id)
+            if not self.introspection_failed:
+                self._write_manifest(fingerprint, manifest)
         removers_factory.update_dictionary(DATATYPE_REMOVERS)
 
+    def _read_manifest(self, fingerprint):
+        """
+        :returns: the introspected algorithms by category name, or None when the manifest is missing or outdated
+        """
+        try:
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get('fingerprint') != fingerprint:
+            self.logger.info("Adapters changed since the last introspection, we will introspect them again")
+            return None
+        algorithms = manifest.get('algorithms', {})
+        for algo_category_class in self.introspection_registry.ADAPTER_MODULES:
+            if algo_category_class.category_name not in algorithms:
+                return None
+            if any('view_model' not in algorithm for algorithm in algorithms[algo_category_class.category_name]):
+                return None
+
+        # Modules which failed to import (e.g. an optional dependency was missing) are tried again
+        for module_name in manifest.get('failed_adapter_files', []):
+            try:
+                import_module(module_name)
+            except Exception:
+                continue
+            self.logger.info("%s can be imported now, we will introspect adapters again" % module_name)
+            return None
+        return algorithms
+
+    def _write_manifest(self, fingerprint, algorithms):
+        manifest = {'fingerprint': fingerprint, 'algorithms': algorithms,
+                    'failed_adapter_files': self.introspection_registry.FAILED_ADAPTER_FILES}
+        # Written under a temporary name first, as several TVB processes might start at the same time
+        temporary_path = "%s.%d" % (self.manifest_path, os.getpid())
+        try:
+            with open(temporary_path, 'w') as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(temporary_path, self.manifest_path)
+        except OSError:
+            self.logger.exception("Could not write the introspection manifest at " + self.manifest_path)
+
     @staticmethod
     def _ensure_datatype_tables_are_created():
         session = SA_SESSIONMAKER()
@@ -163,9 +235,15 @@ class Introspector(object):
 
         return algo_category_instance.id
 
-    @transactional
     def _populate_algorithms(self, algo_category_class, algo_category_id):
-        # type: (type, int) -> None
+        # type: (type, int) -> list
+        """
+        Import and instantiate the adapters in a category, for describing them in DB.
+
+        :returns: the stored fields and the view model class name of each adapter, as kept in the manifest
+        """
+        algorithms = []
+        introspected_classes = []
         for adapter_class in self.introspection_registry.ADAPTERS[algo_category_class]:
             try:
                 if not adapter_class.can_be_active():
@@ -174,7 +252,7 @@ class Introspector(object):
                 stored_adapter = Algorithm(adapter_class.__module__, adapter_class.__name__, algo_category_id,
                                            adapter_class.get_group_name(), adapter_class.get_group_description(),
                                            adapter_class.get_ui_name(), adapter_class.get_ui_description(),
-                                           adapter_class.get_ui_subsection(), datetime.now())
+                                           adapter_class.get_ui_subsection())
                 adapter_inst = adapter_class()
 
                 adapter_form = adapter_inst.get_form()
@@ -190,15 +268,43 @@ class Introspector(object):
                 stored_adapter.parameter_name = adapter_form.get_input_name()
                 stored_adapter.outputlist = str(adapter_inst.get_output())
 
-                inst_from_db = dao.get_algorithm_by_module(adapter_class.__module__, adapter_class.__name__)
-                if inst_from_db is not None:
-                    stored_adapter.id = inst_from_db.id
-
-                stored_adapter = dao.store_entity(stored_adapter, inst_from_db is not None)
-
                 view_model_class = adapter_form.get_view_model()
-                VIEW_MODEL2ADAPTER[view_model_class] = stored_adapter
-
-                adapter_class.stored_adapter = stored_adapter
+                algorithm = {field: getattr(stored_adapter, field) for field in self.ALGORITHM_FIELDS}
+                algorithm['view_model'] = "%s.%s" % (view_model_class.__module__, view_model_class.__name__)
+                algorithms.append(algorithm)
+                introspected_classes.append(adapter_class)
             except Exception:
+                self.introspection_failed = True
                 self.logger.exception("Could not introspect Adapters file:" + adapter_class.__module__)
+
+        stored_adapters = self._store_algorithms([(algo_category_id, algorithm) for algorithm in algorithms])
+        for adapter_class, algorithm, stored_adapter in zip(introspected_classes, algorithms, stored_adapters):
+            VIEW_MODEL2ADAPTER[algorithm['view_model']] = stored_adapter
+            adapter_class.stored_adapter = stored_adapter
+        return algorithms
+
+    @transactional
+    def _store_algorithms(self, algorithms):
+        # type: (list) -> list
+        """
+        Insert or update the DB rows of the given algorithms, with one query for the already stored ones
+        and a single commit.
+
+        :param algorithms: list of (category id, dictionary with the stored fields of one adapter) tuples
+        :returns: the stored Algorithm entities, in the same order
+        """
+        stored_algorithms = {(algorithm.module, algorithm.classname): algorithm
+                             for algorithm in dao.get_all_algorithms() or []}
+        introspection_time = datetime.now()
+        to_store = []
+        for algo_category_id, fields in algorithms:
+            algorithm = stored_algorithms.get((fields['module'], fields['classname']))
+            if algorithm is None:
+                algorithm = Algorithm(fields['module'], fields['classname'], algo_category_id)
+            for field in self.ALGORITHM_FIELDS:
+                setattr(algorithm, field, fields[field])
+            algorithm.fk_category = algo_category_id
+            algorithm.last_introspection_check = introspection_time
+            algorithm.removed = False
+            to_store.append(algorithm)
+        return dao.store_algorithms(to_store)
@@ -24,8 +24,11 @@
 #
 #
 
+import hashlib
 import inspect
+import os
 from importlib import import_module
+from importlib.util import find_spec
 import tvb.adapters.uploaders
 import tvb.adapters.visualizers
 import tvb.adapters.datatypes.db
@@ -37,22 +40,20 @@ from tvb.adapters.visualizers import ALL_VISUALIZERS
 from tvb.adapters.datatypes.db import ALL_DATATYPES
 from tvb.config.algorithm_categories import *
 from tvb.basic.logger.builder import get_logger
+from tvb.basic.profile import TvbProfile
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.entities.model.model_datatype import DataType
-from tvb.adapters.analyzers.metrics_group_timeseries import TimeseriesMetricsAdapter
-from tvb.adapters.simulator.simulator_adapter import SimulatorAdapter
-from tvb.adapters.visualizers.connectivity import ConnectivityViewer
-from tvb.adapters.visualizers.pse_discrete import DiscretePSEAdapter
-from tvb.adapters.visualizers.pse_isocline import IsoclinePSEAdapter
 
 LOGGER = get_logger(__name__)
 
 
-def import_adapters(adapters_top_module, all_adapter_files):
+def import_adapters(adapters_top_module, all_adapter_files, failed_adapter_files=None):
     """
     @:param adapters_top_module: top module under which the ABCAdapter instances are searched for
     @:param all_adapter_files: list of strings representing python submodules. We will import these,
     relative to 'adapters_top_module' and introspect ass concrete subclasses of ABCAdapter defined inside
+    @:param failed_adapter_files: optional list, to which the full name of the submodules that could not be imported
+    gets appended
     @:returns: list of ABCAdapter subclasses
     """
     result = []
@@ -70,6 +71,8 @@ def import_adapters(adapters_top_module, all_adapter_files):
 
         except Exception:
             LOGGER.exception("Could not introspect Adapters file:" + adapters_file)
+            if failed_adapter_files is not None:
+                failed_adapter_files.append(adapters_top_module.__name__ + "." + adapters_file)
     return result
 
 
@@ -94,6 +97,28 @@ def import_dt_index(dt_top_module, all_dt_files):
     return result
 
 
+class _ImportedOnFirstAccess(object):
+    """
+    Class attribute whose value is computed, by importing all the modules it needs, only when first read.
+    """
+
+    def __init__(self, import_function):
+        self.import_function = import_function
+        self.value = None
+
+    def __get__(self, instance, owner):
+        if self.value is None:
+            self.value = self.import_function()
+        return self.value
+
+
+def _import_all_adapters():
+    return {algo_category: import_adapters(adapters_top_module, all_adapter_files,
+                                           IntrospectionRegistry.FAILED_ADAPTER_FILES)
+            for algo_category, (adapters_top_module, all_adapter_files)
+            in IntrospectionRegistry.ADAPTER_MODULES.items()}
+
+
 class IntrospectionRegistry(object):
     """
     This registry gathers classes that have a role in generating DB tables and rows.
@@ -105,22 +130,26 @@ class IntrospectionRegistry(object):
     All classes that subclass AlgorithmCategoryConfig, ABCAdapter, ABCRemover, HasTraitsIndex should be imported here
     and added to the proper dictionary/list.
     e.g. Each new class of type HasTraitsIndex should be imported here and added to the DATATYPES list.
+    Adapter and datatype modules are only imported when ADAPTERS or DATATYPES are first read.
     """
-    ADAPTERS = {
-        AnalyzeAlgorithmCategoryConfig: import_adapters(tvb.adapters.analyzers, ALL_ANALYZERS),
-        SimulateAlgorithmCategoryConfig: import_adapters(tvb.adapters.simulator, ALL_SIMULATORS),
-        UploadAlgorithmCategoryConfig: import_adapters(tvb.adapters.uploaders, ALL_UPLOADERS),
-        ViewAlgorithmCategoryConfig: import_adapters(tvb.adapters.visualizers, ALL_VISUALIZERS),
-        CreateAlgorithmCategoryConfig: import_adapters(tvb.adapters.creators, ALL_CREATORS),
+    ADAPTER_MODULES = {
+        AnalyzeAlgorithmCategoryConfig: (tvb.adapters.analyzers, ALL_ANALYZERS),
+        SimulateAlgorithmCategoryConfig: (tvb.adapters.simulator, ALL_SIMULATORS),
+        UploadAlgorithmCategoryConfig: (tvb.adapters.uploaders, ALL_UPLOADERS),
+        ViewAlgorithmCategoryConfig: (tvb.adapters.visualizers, ALL_VISUALIZERS),
+        CreateAlgorithmCategoryConfig: (tvb.adapters.creators, ALL_CREATORS),
     }
+    FAILED_ADAPTER_FILES = []
+
+    ADAPTERS = _ImportedOnFirstAccess(_import_all_adapters)
 
-    DATATYPES = import_dt_index(tvb.adapters.datatypes.db, ALL_DATATYPES)
+    DATATYPES = _ImportedOnFirstAccess(lambda: import_dt_index(tvb.adapters.datatypes.db, ALL_DATATYPES))
 
-    SIMULATOR_MODULE = SimulatorAdapter.__module__
-    SIMULATOR_CLASS = SimulatorAdapter.__name__
+    SIMULATOR_MODULE = "tvb.adapters.simulator.simulator_adapter"
+    SIMULATOR_CLASS = "SimulatorAdapter"
 
-    CONNECTIVITY_MODULE = ConnectivityViewer.__module__
-    CONNECTIVITY_CLASS = ConnectivityViewer.__name__
+    CONNECTIVITY_MODULE = "tvb.adapters.visualizers.connectivity"
+    CONNECTIVITY_CLASS = "ConnectivityViewer"
 
     ALLEN_CREATOR_MODULE = "tvb.adapters.creators.allen_creator"
     ALLEN_CREATOR_CLASS = "AllenConnectomeBuilder"
@@ -128,14 +157,49 @@ class IntrospectionRegistry(object):
     SIIBRA_CREATOR_MODULE = "tvb.adapters.creators.siibra_creator"
     SIIBRA_CREATOR_CLASS = "SiibraCreator"
 
-    MEASURE_METRICS_MODULE = TimeseriesMetricsAdapter.__module__
-    MEASURE_METRICS_CLASS = TimeseriesMetricsAdapter.__name__
-
-    DISCRETE_PSE_ADAPTER_MODULE = DiscretePSEAdapter.__module__
-    DISCRETE_PSE_ADAPTER_CLASS = DiscretePSEAdapter.__name__
-
-    ISOCLINE_PSE_ADAPTER_MODULE = IsoclinePSEAdapter.__module__
-    ISOCLINE_PSE_ADAPTER_CLASS = IsoclinePSEAdapter.__name__
-
-
-
+    MEASURE_METRICS_MODULE = "tvb.adapters.analyzers.metrics_group_timeseries"
+    MEASURE_METRICS_CLASS = "TimeseriesMetricsAdapter"
+
+    DISCRETE_PSE_ADAPTER_MODULE = "tvb.adapters.visualizers.pse_discrete"
+    DISCRETE_PSE_ADAPTER_CLASS = "DiscretePSEAdapter"
+
+    ISOCLINE_PSE_ADAPTER_MODULE = "tvb.adapters.visualizers.pse_isocline"
+    ISOCLINE_PSE_ADAPTER_CLASS = "IsoclinePSEAdapter"
+
+    # Packages holding the adapters and what their forms and view models are built from
+    FINGERPRINT_PACKAGES = ['tvb.adapters', 'tvb.core', 'tvb.datatypes', 'tvb.simulator', 'tvb.analyzers']
+
+    @classmethod
+    def adapters_imported(cls):
+        """
+        :returns: True when ADAPTERS was already read, thus all adapter modules are imported
+        """
+        return cls.__dict__['ADAPTERS'].value is not None
+
+    @classmethod
+    def adapters_fingerprint(cls):
+        """
+        Hash the TVB version and the adapter files of each category together with the content of all modules
+        the adapters, their forms and their view models are defined in, without importing them.
+        Adapters need to be introspected again only when this changes.
+        """
+        digest = hashlib.sha256(TvbProfile.current.version.CURRENT_VERSION.encode())
+        for algo_category, (adapters_top_module, all_adapter_files) in cls.ADAPTER_MODULES.items():
+            digest.update(algo_category.category_name.encode())
+            for adapters_file in all_adapter_files:
+                digest.update(adapters_file.encode())
+        for package_name in cls.FINGERPRINT_PACKAGES:
+            package_spec = find_spec(package_name)
+            if package_spec is None or package_spec.submodule_search_locations is None:
+                continue
+            for package_folder in package_spec.submodule_search_locations:
+                for root, dirs, files in os.walk(package_folder):
+                    dirs.sort()
+                    for file_name in sorted(files):
+                        if not file_name.endswith('.py'):
+                            continue
+                        file_path = os.path.join(root, file_name)
+                        digest.update(os.path.relpath(file_path, package_folder).encode())
+                        with open(file_path, 'rb') as module_file:
+                            digest.update(module_file.read())
+        return digest.hexdigest()
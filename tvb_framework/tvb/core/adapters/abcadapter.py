@@ -381,9 +381,10 @@ class ABCAdapter(object):
 
             associated_file = h5.path_for_stored_index(res)
             if os.path.exists(associated_file):
-                if not res.fixed_generic_attributes:
-                    with H5File.from_file(associated_file) as f:
+                with H5File.from_file(associated_file) as f:
+                    if not res.fixed_generic_attributes:
                         f.store_generic_attributes(self.generic_attributes)
+                    f.store_derived_data()
                 # Compute size-on disk, in case file-storage is used
                 res.disk_size = self.storage_interface.compute_size_on_disk(associated_file)
 
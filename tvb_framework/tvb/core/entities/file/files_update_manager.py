@@ -33,12 +33,18 @@ Manager for the file storage version updates.
 .. moduleauthor:: Robert Vincze <robert.vincze@codemart.ro>
 """
 
-from datetime import datetime
+import multiprocessing
 import os
+import socket
+import time
+import psutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
 from sqlalchemy import text
 
 import tvb.core.entities.file.file_update_scripts as file_update_scripts
 from tvb.core.entities.storage import SA_SESSIONMAKER
+from tvb.core.entities.storage.session_maker import build_db_engine
 from tvb.basic.config import stored
 from tvb.basic.profile import TvbProfile
 from tvb.core.code_versions.base_classes import UpdateManager
@@ -51,6 +57,12 @@ from tvb.storage.storage_interface import StorageInterface
 FILE_STORAGE_VALID = 'valid'
 FILE_STORAGE_INVALID = 'invalid'
 
+# Marker created next to an H5 file while one process upgrades it, and the copy kept for restoring it
+UPGRADE_LOCK_SUFFIX = '.upgrading'
+UPGRADE_BACKUP_SUFFIX = '.upgrading.bak'
+# Seconds after which a lock is considered abandoned, when its owner can not be checked (other host, unreadable)
+UPGRADE_LOCK_TIMEOUT = 24 * 3600
+
 
 class FilesUpdateManager(UpdateManager):
     """
@@ -62,6 +74,11 @@ class FilesUpdateManager(UpdateManager):
     DATA_TYPES_PAGE_SIZE = 500
     STATUS = True
     MESSAGE = "Done"
+    UPGRADE_WAIT_INTERVAL = 0.5
+    # Files found up to date when opened while a lazy upgrade is pending, so that each is checked once per process
+    LAZY_UPGRADED_PATHS = set()
+    # Shared by the files upgraded when opened, as a bulk upgrade shares it between the files of a project
+    LAZY_BURST_MATCH_DICT = {}
 
     def __init__(self):
         super(FilesUpdateManager, self).__init__(file_update_scripts,
@@ -97,31 +114,67 @@ class FilesUpdateManager(UpdateManager):
             return True
         return False
 
+    @staticmethod
+    def is_lazy_upgrade_pending():
+        """
+        True while stored files might still need an upgrade when opened: the upgrade runs in background and the
+        storage is not yet marked as upgraded in the configuration file, which every TVB process reads.
+        """
+        version = TvbProfile.current.version
+        return version.LAZY_FILE_UPGRADE and version.DATA_CHECKED_TO_VERSION < version.DATA_VERSION
+
+    @classmethod
+    def upgrade_file_on_access(cls, input_file_name):
+        """
+        Upgrade a file about to be opened, when the background upgrade might not have reached it yet.
+        Files already upgraded, or found up to date, by this process are not opened again.
+        """
+        if not cls.is_lazy_upgrade_pending() or input_file_name in cls.LAZY_UPGRADED_PATHS:
+            return
+        if not os.path.exists(input_file_name):
+            return
+        if cls().upgrade_file(input_file_name, burst_match_dict=cls.LAZY_BURST_MATCH_DICT):
+            cls.LAZY_UPGRADED_PATHS.add(input_file_name)
+
     def upgrade_file(self, input_file_name, datatype=None, burst_match_dict=None):
         """
         Upgrades the given file to the latest data version. The file will be upgraded
-        sequentially, up until the current version from tvb.basic.config.settings.VersionSettings.DB_STRUCTURE_VERSION
+        sequentially, up until the current version from tvb.basic.config.settings.VersionSettings.DB_STRUCTURE_VERSION.
+        A backup is kept next to the file until all update scripts passed, so a failed or interrupted
+        upgrade leaves the file as it was. When another process is upgrading the same file, we wait for it,
+        or restore the file and take over when that process died.
 
         :param input_file_name the path to the file which needs to be upgraded
         :return True when update was successful and False when it resulted in an error.
         """
-        if self.is_file_up_to_date(input_file_name):
+        # A locked file might be half migrated, so it is only read once the lock is ours
+        if not os.path.exists(input_file_name + UPGRADE_LOCK_SUFFIX) and self.is_file_up_to_date(input_file_name):
             # Avoid running the DB update of size, when H5 is not being changed, to speed-up
             return True
 
-        file_version = self.get_file_data_version(input_file_name)
-        self.log.info("Updating from version %s , file: %s " % (file_version, input_file_name))
-        for script_name in self.get_update_scripts(file_version):
-            temp_file_path = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER,
-                                          os.path.basename(input_file_name) + '.tmp')
-            self.storage_interface.copy_file(input_file_name, temp_file_path)
-            try:
+        while not self._claim_file(input_file_name):
+            self._wait_for_release(input_file_name)
+            if not os.path.exists(input_file_name) or self.is_file_up_to_date(input_file_name):
+                return True
+
+        success = False
+        try:
+            if self.is_file_up_to_date(input_file_name):
+                # Upgraded by another process, between the first check and our claim
+                success = True
+                return True
+
+            self._backup_file(input_file_name)
+            file_version = self.get_file_data_version(input_file_name)
+            self.log.info("Updating from version %s , file: %s " % (file_version, input_file_name))
+            for script_name in self.get_update_scripts(file_version):
                 self.run_update_script(script_name, input_file=input_file_name, burst_match_dict=burst_match_dict)
-            except FileMigrationException as excep:
-                self.storage_interface.copy_file(temp_file_path, input_file_name)
-                os.remove(temp_file_path)
-                self.log.error(excep)
-                return False
+            success = True
+        except FileMigrationException as excep:
+            self.log.error(excep)
+            return False
+        finally:
+            self._release_file(input_file_name, restore=not success)
 
         if datatype:
             # Compute and update the disk_size attribute of the DataType in DB:
@@ -130,6 +183,118 @@ class FilesUpdateManager(UpdateManager):
 
         return True
 
+    @staticmethod
+    def _claim_file(input_file_name):
+        """
+        Atomically mark the file as being upgraded by the current process.
+        The lock holds the host, PID and start time of its owner, so that others can tell when it died.
+
+        :returns: False when another process already holds the claim
+        """
+        try:
+            lock_fd = os.open(input_file_name + UPGRADE_LOCK_SUFFIX, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(lock_fd, 'w') as lock_file:
+            lock_file.write(FilesUpdateManager._current_lock_owner())
+        return True
+
+    @staticmethod
+    def _current_lock_owner():
+        return "%s %d %r" % (socket.gethostname(), os.getpid(), psutil.Process().create_time())
+
+    @staticmethod
+    def _read_lock_owner(lock_path):
+        try:
+            with open(lock_path, 'r') as lock_file:
+                return lock_file.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _is_lock_owner_dead(lock_path, lock_owner):
+        """
+        A lock is abandoned when its owner ran on this host and is no longer alive (a PID reused by another process
+        has a different start time), or when it can not be checked and the lock is older than UPGRADE_LOCK_TIMEOUT.
+        """
+        try:
+            host, pid, create_time = lock_owner.split()
+            pid, create_time = int(pid), float(create_time)
+        except (AttributeError, ValueError):
+            host = pid = create_time = None
+        if host is not None and host == socket.gethostname():
+            try:
+                return psutil.Process(pid).create_time() != create_time
+            except psutil.NoSuchProcess:
+                return True
+        try:
+            return time.time() - os.path.getmtime(lock_path) > UPGRADE_LOCK_TIMEOUT
+        except FileNotFoundError:
+            return False
+
+    def _break_stale_lock(self, input_file_name):
+        """
+        Restore the original of a file whose upgrade was abandoned by a dead process, and remove its lock.
+
+        :returns: True when the lock was abandoned, and is now gone
+        """
+        lock_path = input_file_name + UPGRADE_LOCK_SUFFIX
+        lock_owner = self._read_lock_owner(lock_path)
+        if not self._is_lock_owner_dead(lock_path, lock_owner):
+            return False
+        # Take the lock over with an atomic rename, so only one of the processes waiting for it restores the file
+        taken_lock_path = "%s.%d" % (lock_path, os.getpid())
+        try:
+            os.rename(lock_path, taken_lock_path)
+        except FileNotFoundError:
+            return True
+        if self._read_lock_owner(taken_lock_path) != lock_owner:
+            # Somebody else broke the lock, and a new owner claimed the file meanwhile: give it back its lock
+            try:
+                os.link(taken_lock_path, lock_path)
+            except FileExistsError:
+                pass
+            os.remove(taken_lock_path)
+            return False
+        self.log.warning("Restoring %s after an interrupted upgrade by %s" % (input_file_name, lock_owner))
+        self._release_file(input_file_name, restore=True, lock_path=taken_lock_path)
+        return True
+
+    def _backup_file(self, input_file_name):
+        # The backup only gets its final name once complete, so a crash while copying can not leave a partial one
+        partial_backup_path = input_file_name + UPGRADE_BACKUP_SUFFIX + '.tmp'
+        self.storage_interface.copy_file(input_file_name, partial_backup_path)
+        os.replace(partial_backup_path, input_file_name + UPGRADE_BACKUP_SUFFIX)
+
+    @staticmethod
+    def _release_file(input_file_name, restore=False, lock_path=None):
+        backup_path = input_file_name + UPGRADE_BACKUP_SUFFIX
+        if os.path.exists(backup_path):
+            if restore:
+                os.replace(backup_path, input_file_name)
+            else:
+                os.remove(backup_path)
+        if os.path.exists(backup_path + '.tmp'):
+            os.remove(backup_path + '.tmp')
+        os.remove(lock_path or input_file_name + UPGRADE_LOCK_SUFFIX)
+
+    def _wait_for_release(self, input_file_name):
+        self.log.info("Waiting for another process to finish upgrading %s" % input_file_name)
+        while (os.path.exists(input_file_name + UPGRADE_LOCK_SUFFIX)
+               and not self._break_stale_lock(input_file_name)):
+            time.sleep(self.UPGRADE_WAIT_INTERVAL)
+
+    def _restore_interrupted_upgrades(self, project_paths):
+        """
+        Bring back the original of any file whose upgrade was interrupted by a previous crash or shutdown.
+        Files still being upgraded by a live process are left alone.
+        """
+        for project_path in project_paths:
+            for op_folder_path in self._get_operation_folders(project_path):
+                for file_name in os.listdir(op_folder_path):
+                    if file_name.endswith(UPGRADE_LOCK_SUFFIX):
+                        self._break_stale_lock(os.path.join(op_folder_path, file_name[:-len(UPGRADE_LOCK_SUFFIX)]))
+
     def __upgrade_h5_list(self, h5_files):
         """
         Upgrade a list of DataTypes to the current version.
@@ -152,6 +317,56 @@ class FilesUpdateManager(UpdateManager):
 
         return nr_of_dts_upgraded_fine, nr_of_dts_failed
 
+    def upgrade_project_files(self, project_path):
+        """
+        Upgrade all H5 files of one project, in the order of their creation,
+        as update scripts can link a file to the ones created before it.
+
+        :returns: (nr_of_dts_upgraded_fine, nr_of_dts_failed)
+        """
+        h5_files = self._sort_by_create_date(self._get_project_h5_paths(project_path))
+        return self.__upgrade_h5_list(h5_files)
+
+    def __upgrade_projects(self, project_paths):
+        """
+        Upgrade the files of all projects. Projects are independent of each other, so when the DB
+        allows concurrent writers, they are spread over a pool of processes.
+
+        :returns: (nr_of_dts_upgraded_fine, nr_of_dts_failed)
+        """
+        nr_of_processes = self._get_nr_of_upgrade_processes(len(project_paths))
+        if nr_of_processes <= 1:
+            return self.__collect_project_results(map(self.upgrade_project_files, project_paths), len(project_paths))
+
+        self.log.info("Upgrading H5 files of %d projects with %d processes" % (len(project_paths), nr_of_processes))
+        # Spawn rather than fork, as this runs in a thread of the web server, while other threads might hold locks
+        with ProcessPoolExecutor(nr_of_processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_upgrade_process,
+                                 initargs=(TvbProfile.CURRENT_PROFILE_NAME,)) as executor:
+            futures = [executor.submit(_upgrade_project_files, project_path) for project_path in project_paths]
+            results = (future.result() for future in as_completed(futures))
+            return self.__collect_project_results(results, len(project_paths))
+
+    def __collect_project_results(self, results, nr_of_projects):
+        nr_of_dts_upgraded_fine = 0
+        nr_of_dts_failed = 0
+        for nr_of_projects_done, (project_fine, project_failed) in enumerate(results, 1):
+            nr_of_dts_upgraded_fine += project_fine
+            nr_of_dts_failed += project_failed
+            FilesUpdateManager.MESSAGE = ("Upgraded H5 files for %d out of %d projects [fine:%d, failed:%d]"
+                                          % (nr_of_projects_done, nr_of_projects, nr_of_dts_upgraded_fine,
+                                             nr_of_dts_failed))
+            self.log.info(FilesUpdateManager.MESSAGE)
+        return nr_of_dts_upgraded_fine, nr_of_dts_failed
+
+    @staticmethod
+    def _get_nr_of_upgrade_processes(nr_of_projects):
+        if TvbProfile.current.db.SELECTED_DB != 'postgres':
+            # SQLite allows a single writer at a time
+            return 1
+        nr_of_processes = TvbProfile.current.version.FILE_UPGRADE_PROCESSES or os.cpu_count() or 1
+        return min(nr_of_processes, nr_of_projects)
+
     # TO DO: We should migrate the older scripts to Python 3 if we want to support migration for versions < 4
     def run_all_updates(self):
         """
@@ -164,9 +379,14 @@ class FilesUpdateManager(UpdateManager):
         if TvbProfile.current.version.DATA_CHECKED_TO_VERSION < TvbProfile.current.version.DATA_VERSION:
             start_time = datetime.now()
 
-            file_paths = self.get_all_h5_paths()
-            total_count = len(file_paths)
-            no_ok, no_error = self.__upgrade_h5_list(file_paths)
+            project_paths = self._get_project_paths(self.storage_interface.get_projects_folder())
+            self._restore_interrupted_upgrades(project_paths)
+
+            if self.is_lazy_upgrade_pending():
+                FilesUpdateManager.MESSAGE = ("Your stored data is being upgraded in the background. "
+                                              "Files opened meanwhile are upgraded on the spot.")
+            no_ok, no_error = self.__upgrade_projects(project_paths)
+            total_count = no_ok + no_error
 
             self.log.info("Updated H5 files in total: %d [fine:%d, failed:%d in: %s min]" % (
                 total_count, no_ok, no_error, int((datetime.now() - start_time).seconds / 60)))
@@ -203,35 +423,50 @@ class FilesUpdateManager(UpdateManager):
         h5_files = []
         projects_folder = StorageInterface().get_projects_folder()
 
-        for project_path in os.listdir(projects_folder):
-            # Getting operation folders inside the current project
-            project_full_path = os.path.join(projects_folder, project_path)
+        for project_path in FilesUpdateManager._get_project_paths(projects_folder):
+            h5_files.extend(FilesUpdateManager._get_project_h5_paths(project_path))
+
+        return FilesUpdateManager._sort_by_create_date(h5_files)
+
+    @staticmethod
+    def _get_project_paths(projects_folder):
+        project_paths = [os.path.join(projects_folder, project_folder) for project_folder in os.listdir(projects_folder)]
+        return [project_path for project_path in project_paths if os.path.isdir(project_path)]
+
+    @staticmethod
+    def _get_operation_folders(project_path):
+        op_folder_paths = []
+        for op_folder in os.listdir(project_path):
             try:
-                project_operations = os.listdir(project_full_path)
-            except NotADirectoryError:
+                int(op_folder)
+            except ValueError:
                 continue
-            project_operations_base_names = [os.path.basename(op) for op in project_operations]
-
-            for op_folder in project_operations_base_names:
-                try:
-                    int(op_folder)
-                    op_folder_path = os.path.join(project_full_path, op_folder)
-                    for file in os.listdir(op_folder_path):
-                        if StorageInterface().ends_with_tvb_storage_file_extension(file):
-                            h5_file = os.path.join(op_folder_path, file)
-                            try:
-                                if FilesUpdateManager._is_empty_file(h5_file):
-                                    continue
-                                h5_files.append(h5_file)
-                            except FileStructureException:
-                                continue
-                except ValueError:
-                    pass
+            op_folder_path = os.path.join(project_path, op_folder)
+            if os.path.isdir(op_folder_path):
+                op_folder_paths.append(op_folder_path)
+        return op_folder_paths
 
+    @staticmethod
+    def _get_project_h5_paths(project_path):
+        h5_files = []
+        storage_interface = StorageInterface()
+        for op_folder_path in FilesUpdateManager._get_operation_folders(project_path):
+            for file in os.listdir(op_folder_path):
+                if storage_interface.ends_with_tvb_storage_file_extension(file):
+                    h5_file = os.path.join(op_folder_path, file)
+                    try:
+                        if FilesUpdateManager._is_empty_file(h5_file):
+                            continue
+                        h5_files.append(h5_file)
+                    except FileStructureException:
+                        continue
+        return h5_files
+
+    @staticmethod
+    def _sort_by_create_date(h5_files):
         # Sort all h5 files based on their creation date stored in the files themselves
-        sorted_h5_files = sorted(h5_files, key=lambda h5_path: FilesUpdateManager._get_create_date_for_sorting(
+        return sorted(h5_files, key=lambda h5_path: FilesUpdateManager._get_create_date_for_sorting(
             h5_path) or datetime.now())
-        return sorted_h5_files
 
     @staticmethod
     def _is_empty_file(h5_file):
@@ -259,3 +494,13 @@ class FilesUpdateManager(UpdateManager):
                 self.log.exception(excep)
         finally:
             session.close()
+
+
+def _init_upgrade_process(profile_name):
+    # A spawned process starts from scratch: load the same profile, and bind the DB sessions to it
+    TvbProfile.set_profile(profile_name, in_operation=True)
+    SA_SESSIONMAKER.configure(bind=build_db_engine())
+
+
+def _upgrade_project_files(project_path):
+    return FilesUpdateManager().upgrade_project_files(project_path)
@@ -27,6 +27,7 @@
 from tvb.basic.neotraits.api import HasTraits, NArray, Int, List, Attr, Float
 from tvb.core.neotraits.h5 import H5File, DataSet, Scalar, Json
 from tvb.simulator.integrators import IntegratorStochastic
+from tvb.simulator.monitors import TemporalAverage
 
 
 class SimulationHistory(HasTraits):
@@ -65,6 +66,8 @@ class SimulationHistory(HasTraits):
     integrator_noise_rng_state_pos = Int(required=False)
     integrator_noise_rng_state_has_gauss = Int(required=False)
     integrator_noise_rng_state_cached_gauss = Float(required=False)
+    # Or the step the block noise stream is at, when the noise is drawn from one
+    integrator_noise_stream_step = Int(required=False)
 
     def __init__(self, **kwargs):
         """
@@ -94,6 +97,7 @@ class SimulationHistory(HasTraits):
             self.integrator_noise_rng_state_pos = rng_state[2]
             self.integrator_noise_rng_state_has_gauss = rng_state[3]
             self.integrator_noise_rng_state_cached_gauss = rng_state[4]
+            self.integrator_noise_stream_step = simulator_algorithm.integrator.noise.block_stream_step
 
     def fill_into(self, simulator_algorithm):
         """
@@ -104,7 +108,11 @@ class SimulationHistory(HasTraits):
         simulator_algorithm.current_state = self.current_state
 
         for i, monitor in enumerate(simulator_algorithm.monitors):
-            monitor._stock = getattr(self, "monitor_stock_" + str(i + 1))
+            stock = getattr(self, "monitor_stock_" + str(i + 1))
+            if isinstance(monitor, TemporalAverage) and stock is not None and stock.ndim == 4:
+                # Older histories keep one TemporalAverage slot per step, instead of the running sum of the period
+                stock = stock[:self.current_step % monitor.istep].sum(axis=0)
+            monitor._stock = stock
 
         if self.integrator_noise_rng_state_algo is not None:
             rng_state = (
@@ -116,6 +124,9 @@ class SimulationHistory(HasTraits):
             )
             simulator_algorithm.integrator.noise.random_stream.set_state(rng_state)
 
+        if self.integrator_noise_stream_step is not None:
+            simulator_algorithm.integrator.noise.seek(self.integrator_noise_stream_step)
+
 
 class SimulationHistoryH5(H5File):
 
@@ -136,3 +147,4 @@ class SimulationHistoryH5(H5File):
         self.integrator_noise_rng_state_has_gauss = Scalar(SimulationHistory.integrator_noise_rng_state_has_gauss, self)
         self.integrator_noise_rng_state_cached_gauss = Scalar(SimulationHistory.integrator_noise_rng_state_cached_gauss,
                                                               self)
+        self.integrator_noise_stream_step = Scalar(SimulationHistory.integrator_noise_stream_step, self)
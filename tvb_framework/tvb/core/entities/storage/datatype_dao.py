@@ -201,6 +201,76 @@ class DatatypeDAO(RootDAO):
             return None
 
 
+    def _get_operation_group_results(self, operation_group_id):
+        """ Query of the GIDs of the DataTypes resulted from the operations in a group. """
+        result_dt = aliased(DataType)
+        return self.session.query(result_dt.gid
+                                  ).join(Operation, result_dt.fk_from_operation == Operation.id
+                                  ).filter(Operation.fk_operation_group == operation_group_id)
+
+    def get_measures_for_operation_group(self, measure_class, operation_group_id):
+        """
+        Retrieve with a single query the measures (entities of measure_class) resulted from the operations in
+        a group, or computed for the results of those operations.
+
+        :returns: list of tuples (measure, DataType for which the measure was computed)
+        """
+        try:
+            source_dt = aliased(DataType)
+            group_results = self._get_operation_group_results(operation_group_id)
+            result = self.session.query(measure_class, source_dt
+                                        ).join(source_dt, source_dt.gid == measure_class.fk_source_gid
+                                        ).filter(or_(measure_class.gid.in_(group_results),
+                                                     measure_class.fk_source_gid.in_(group_results))
+                                        ).order_by(measure_class.id).all()
+            # Same as for get_generic_entity, do not let the session see these entities as dirty
+            self.session.expunge_all()
+            return result
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+            return None
+
+
+    def get_measures_stamp_for_operation_group(self, measure_class, operation_group_id):
+        """
+        Summary of the measures returned by get_measures_for_operation_group: their number and largest id.
+        It changes whenever such a measure is stored or removed, e.g. by the metric operations of a burst,
+        which finish after the operations in the group.
+        """
+        try:
+            group_results = self._get_operation_group_results(operation_group_id)
+            stats = self.session.query(func.count(measure_class.id), func.max(measure_class.id)
+                                       ).filter(or_(measure_class.gid.in_(group_results),
+                                                    measure_class.fk_source_gid.in_(group_results))).one()
+            return tuple(stats)
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+            return None
+
+
+    def get_datatypes_by_gids(self, gids):
+        """
+        Retrieve the DataTypes with the given GIDs, each loaded as its specific (sub)class,
+        with one query for each distinct class.
+
+        :returns: dictionary {gid: DataType}
+        """
+        result = dict()
+        try:
+            classes = self.session.query(DataType.module, DataType.type).filter(DataType.gid.in_(list(gids))
+                                                                                ).distinct().all()
+            for module, classname in classes:
+                data_type = getattr(importlib.import_module(module), classname)
+                for datatype in self.session.query(data_type).filter(data_type.gid.in_(list(gids))).all():
+                    # load lazy fields needed for display
+                    datatype.display_name
+                    result[datatype.gid] = datatype
+            self.session.expunge_all()
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+        return result
+
+
     def set_datatype_visibility(self, datatype_gid, is_visible):
         """
         Sets the dataType visibility. If the given dataType is a dataTypeGroup or it is part of a
@@ -34,9 +34,11 @@ DAO operations related to Algorithms and User Operations are defined here.
 from sqlalchemy import and_
 from sqlalchemy import func as func
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased, joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql.expression import case as case_, desc
-from tvb.core.entities.model.model_datatype import DataType
+from tvb.core.entities.model.model_burst import BurstConfiguration
+from tvb.core.entities.model.model_datatype import DataType, DataTypeGroup
 from tvb.core.entities.model.model_operation import *
 from tvb.core.entities.model.model_operation import STATUS_ERROR
 from tvb.core.entities.storage.root_dao import RootDAO, DEFAULT_PAGE_SIZE
@@ -215,6 +217,21 @@ class OperationDAO(RootDAO):
         return result
 
 
+    def get_operation_group_stamp(self, operation_group_id):
+        """
+        Summary of the operations in a group: how many are in each status, and when the last one completed.
+        It changes whenever an operation of the group changes status.
+        """
+        try:
+            stats = self.session.query(Operation.status, func.count(Operation.id), func.max(Operation.completion_date)
+                                       ).filter_by(fk_operation_group=operation_group_id
+                                       ).group_by(Operation.status).order_by(Operation.status).all()
+            return tuple(tuple(row) for row in stats)
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+            return None
+
+
     def compute_disk_size_for_started_ops(self, user_id):
         """ Get all the disk space that should be reserved for the started operations of this user. """
         try:
@@ -293,6 +310,74 @@ class OperationDAO(RootDAO):
             return None
 
 
+    def get_operations_details(self, operation_ids):
+        """
+        Retrieve with a constant number of queries what the operations page displays for the given operations:
+        each Operation comes with its algorithm (and category), launching user and operation group eagerly loaded.
+
+        :returns: tuple of dictionaries (operations, datatype_groups, bursts, results) from operation id to
+            Operation, from operation group id to DataTypeGroup, from operation id to BurstConfiguration and from
+            operation id to the list of resulted DataTypes (excluding groups, as get_results_for_operation)
+        """
+        operations, datatype_groups, bursts, results = dict(), dict(), dict(), dict()
+        operation_ids = list(operation_ids)
+        if not operation_ids:
+            return operations, datatype_groups, bursts, results
+        try:
+            query = self.session.query(Operation).options(
+                joinedload(Operation.algorithm).joinedload(Algorithm.algorithm_category),
+                joinedload(Operation.user), joinedload(Operation.operation_group)
+            ).filter(Operation.id.in_(operation_ids))
+            for operation in query.all():
+                operations[operation.id] = operation
+
+            group_ids = {op.fk_operation_group for op in operations.values() if op.fk_operation_group}
+            if group_ids:
+                for datatype_group in self.session.query(DataTypeGroup).filter(
+                        DataTypeGroup.fk_operation_group.in_(group_ids)).all():
+                    datatype_groups[datatype_group.fk_operation_group] = datatype_group
+
+            # A burst is linked either directly to the simulation, or through the resulted DataTypes
+            for burst in self.session.query(BurstConfiguration).filter(
+                    BurstConfiguration.fk_simulation.in_(operation_ids)).order_by(BurstConfiguration.id).all():
+                bursts.setdefault(burst.fk_simulation, burst)
+            indirect_ids = [op_id for op_id in operation_ids if op_id not in bursts]
+            if indirect_ids:
+                burst_alias = aliased(BurstConfiguration, flat=True)
+                for op_id, burst in self.session.query(DataType.fk_from_operation, burst_alias
+                                                       ).join(burst_alias, DataType.fk_parent_burst == burst_alias.gid
+                                                       ).filter(DataType.fk_from_operation.in_(indirect_ids)
+                                                       ).order_by(DataType.id).all():
+                    bursts.setdefault(op_id, burst)
+
+            query = self.session.query(DataType
+                                       ).filter(DataType.fk_from_operation.in_(operation_ids)
+                                       ).filter(and_(DataType.type != self.EXCEPTION_DATATYPE_GROUP,
+                                                     DataType.type != self.EXCEPTION_DATATYPE_SIMULATION))
+            for datatype in query.order_by(DataType.id).all():
+                datatype.display_name
+                results.setdefault(datatype.fk_from_operation, []).append(datatype)
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+        return operations, datatype_groups, bursts, results
+
+
+    def get_results_for_operation_group(self, operation_group_id):
+        """
+        Retrieve with a single query the DataTypes resulted after executing all the operations in a group.
+        """
+        try:
+            query = self.session.query(DataType
+                                       ).join(Operation, DataType.fk_from_operation == Operation.id
+                                       ).filter(Operation.fk_operation_group == operation_group_id
+                                       ).filter(and_(DataType.type != self.EXCEPTION_DATATYPE_GROUP,
+                                                     DataType.type != self.EXCEPTION_DATATYPE_SIMULATION))
+            return query.order_by(DataType.id).all()
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+            return None
+
+
     def set_operation_and_group_visibility(self, entity_gid, is_visible, is_operation_group=False):
         """
         Sets the operation visibility.
@@ -458,6 +543,14 @@ class OperationDAO(RootDAO):
         except SQLAlchemyError:
             return None
 
+    def store_algorithms(self, algorithms):
+        """
+        Insert the new and update the already stored algorithms, all within a single commit.
+        """
+        stored_algorithms = [self.session.merge(algorithm) for algorithm in algorithms]
+        self.session.commit()
+        return stored_algorithms
+
 
     def get_applicable_adapters(self, compatible_class_names, launch_categ):
         """
@@ -30,6 +30,7 @@ from datetime import datetime
 
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.neotraits.api import HasTraits
+from tvb.core.entities.file.files_update_manager import FilesUpdateManager
 from tvb.core.entities.generic_attributes import GenericAttributes
 from tvb.core.entities.model.model_datatype import DataType
 from tvb.core.entities.storage import dao
@@ -208,8 +209,10 @@ class TVBLoader(object):
         gid = uuid.UUID(dt_index_instance.gid)
         h5_file_class = self.registry.get_h5file_for_index(dt_index_instance.__class__)
         fname = self.storage_interface.get_filename(h5_file_class.file_name_base(), gid)
+        h5_path = os.path.join(operation_folder, fname)
 
-        return os.path.join(operation_folder, fname)
+        FilesUpdateManager.upgrade_file_on_access(h5_path)
+        return h5_path
 
     def path_for(self, op_id, h5_file_class, gid, project_name, dt_class):
         return self.storage_interface.path_for(op_id, h5_file_class, gid, project_name, dt_class)
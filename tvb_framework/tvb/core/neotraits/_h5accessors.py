@@ -26,12 +26,14 @@
 
 import abc
 import json
+import math
 import typing
 import uuid
 import numpy
 import scipy.sparse
 
 from tvb.basic.neotraits.api import HasTraits, Attr, NArray, Range, TVBEnum
+from tvb.basic.profile import TvbProfile
 from tvb.datatypes import equations
 from tvb.storage.h5.file.exceptions import MissingDataSetException
 
@@ -171,13 +173,86 @@ class DataSetMetaData(object):
         self.has_complex = self.has_complex or other.has_complex
 
 
+class DataSetLayout(object):
+    """
+    How a dataset is chunked and compressed in its h5 file.
+
+    Chunks cover the full extent of the dimensions that are neither time nor space. The rest of the
+    chunk budget is split evenly between time and space, such that reading a time window for all nodes
+    and reading the whole time for a few nodes both touch a small number of chunks.
+    """
+    CHUNK_SIZE = 512 * 1024
+    # Compression of compressible layouts, when the COMPRESS_H5_DATA setting is on
+    SETTING_COMPRESSION = {'compression': 'gzip', 'compression_opts': 1, 'shuffle': True}
+
+    def __init__(self, time_dimension=0, space_dimensions=(), compression=None, compression_opts=None,
+                 shuffle=False, chunk_size=CHUNK_SIZE, compressible=False):
+        """
+        :param time_dimension: The dimension of the array that holds time
+        :param space_dimensions: The dimensions of the array that hold nodes, vertices or voxels
+        :param compression: None, 'gzip', 'lzf' or 'blosc' (the latter needs the hdf5plugin package)
+        :param compression_opts: Compression level for 'gzip' and 'blosc'
+        :param shuffle: Apply the byte shuffle filter before compression
+        :param chunk_size: The size in bytes targeted for one chunk
+        :param compressible: Without an explicit compression, compress as SETTING_COMPRESSION when the
+                             COMPRESS_H5_DATA setting is on
+        """
+        self.time_dimension = time_dimension
+        self.space_dimensions = space_dimensions
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
+        self.chunk_size = chunk_size
+        self.compressible = compressible
+
+    def chunks(self, shape, itemsize, grow_dimension=None):
+        # type: (typing.Tuple[int], int, int) -> typing.Tuple[int]
+        """
+        Chunk shape for an array of the given shape. The grow dimension is not bounded by the current shape.
+        """
+        ndim = len(shape)
+        time_dim = self.time_dimension % ndim
+        space_dims = [dim % ndim for dim in self.space_dimensions if -ndim <= dim < ndim and dim % ndim != time_dim]
+        chunks = [max(size, 1) for size in shape]
+        for dim in [time_dim] + space_dims:
+            chunks[dim] = 1
+        budget = max(self.chunk_size // (itemsize * int(numpy.prod(chunks))), 1)
+
+        if space_dims:
+            space_size = int(numpy.prod([max(shape[dim], 1) for dim in space_dims]))
+            space_ratio = min(math.sqrt(budget) / space_size, 1.0) ** (1.0 / len(space_dims))
+            for dim in space_dims:
+                chunks[dim] = max(int(max(shape[dim], 1) * space_ratio), 1)
+            budget = max(budget // int(numpy.prod([chunks[dim] for dim in space_dims])), 1)
+        chunks[time_dim] = budget
+
+        if grow_dimension is not None:
+            grow_dimension %= ndim
+        return tuple(chunk if dim == grow_dimension else min(chunk, max(shape[dim], 1))
+                     for dim, chunk in enumerate(chunks))
+
+    def to_storage(self, shape, dtype, grow_dimension=None):
+        # type: (typing.Tuple[int], numpy.dtype, int) -> dict
+        """
+        The layout of an array with this shape and dtype, in the form expected by the storage manager.
+        Scalars and empty arrays are not chunked, so they get no layout.
+        """
+        if not len(shape) or 0 in shape:
+            return None
+        storage = {'chunks': self.chunks(shape, numpy.dtype(dtype).itemsize, grow_dimension),
+                   'compression': self.compression, 'compression_opts': self.compression_opts, 'shuffle': self.shuffle}
+        if self.compression is None and self.compressible and TvbProfile.current.COMPRESS_H5_DATA:
+            storage.update(self.SETTING_COMPRESSION)
+        return storage
+
+
 class DataSet(Accessor):
     """
     A dataset in a h5 file that corresponds to a traited NArray.
     """
 
-    def __init__(self, trait_attribute, h5file, name=None, expand_dimension=-1):
-        # type: (NArray, H5File, str, int) -> None
+    def __init__(self, trait_attribute, h5file, name=None, expand_dimension=-1, layout=None):
+        # type: (NArray, H5File, str, int, DataSetLayout) -> None
         """
         :param trait_attribute: A traited attribute
         :param h5file: The parent H5file that contains this Accessor
@@ -186,9 +261,12 @@ class DataSet(Accessor):
                      If the traited attribute is not a member of a HasTraits then
                      it has no name and you have to provide this parameter
         :param expand_dimension: An int designating a dimension of the array that may grow.
+        :param layout: How the dataset is chunked and compressed when created.
+                       If missing, h5py decides the chunking of expandable datasets.
         """
         super(DataSet, self).__init__(trait_attribute, h5file, name)
         self.expand_dimension = expand_dimension
+        self.layout = layout
         # Cache metadata for expandable DataSets to avoid multiple reads/writes at append time
         self.meta = None
 
@@ -200,14 +278,19 @@ class DataSet(Accessor):
         """
         if not grow_dimension:
             grow_dimension = self.expand_dimension
+        data = numpy.asarray(data)
+        layout = None
+        if self.layout is not None and self.meta is None:
+            layout = self.layout.to_storage(data.shape, data.dtype, grow_dimension)
         self.owner.storage_manager.append_data(
             data,
             self.field_name,
             grow_dimension=grow_dimension,
-            close_file=close_file
+            close_file=close_file,
+            layout=layout
         )
         # update the cached array min max metadata values
-        new_meta = DataSetMetaData.from_array(numpy.array(data))
+        new_meta = DataSetMetaData.from_array(data)
         if self.meta:
             self.meta.merge(new_meta)
         else:
@@ -222,7 +305,10 @@ class DataSet(Accessor):
         if data is None:
             return
 
-        self.owner.storage_manager.store_data(data, self.field_name)
+        layout = None
+        if self.layout is not None:
+            layout = self.layout.to_storage(data.shape, data.dtype)
+        self.owner.storage_manager.store_data(data, self.field_name, layout=layout)
         # cache some array information
         self.owner.storage_manager.set_metadata(
             DataSetMetaData.from_array(data).to_dict(),
@@ -109,6 +109,37 @@ class H5File(object):
             if isinstance(dataset, DataSet):
                 yield dataset
 
+    def rewrite_layout(self):
+        # type: () -> bool
+        """
+        Rewrite the file such that its datasets follow the layouts declared on their DataSet accessors.
+        Meant for files written before those layouts were declared.
+        :returns: True if the file has datasets with a declared layout, and was thus rewritten
+        """
+        layouts = {}
+        for dataset in self.iter_datasets():
+            if dataset.layout is None:
+                continue
+            try:
+                shape = dataset.shape
+            except MissingDataSetException:
+                continue
+            if not len(shape) or 0 in shape:
+                continue
+            dtype = dataset[tuple(slice(0, 1) for _ in shape)].dtype
+            layouts[dataset.field_name] = dataset.layout.to_storage(shape, dtype, dataset.expand_dimension)
+
+        if not layouts:
+            return False
+        self.storage_manager.rewrite_data_layout(layouts)
+        return True
+
+    def store_derived_data(self):
+        """
+        Called once an operation finished writing the datatype, before it becomes visible to other processes.
+        Subclasses can store here data derived from their datasets, e.g. to speed up displaying them.
+        """
+
     def __enter__(self):
         return self
 
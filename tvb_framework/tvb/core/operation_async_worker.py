@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Long-lived counterpart of operation_async_launcher, started by the stand-alone backend client:
+Example: python -m tvb.core.operation_async_worker user_name_label
+It imports TVB once, then reads operation ids (one per line) from its standard input, launches each
+operation and reports it back as "DONE <operation_id>" on the original standard output.
+Anything printed while an operation runs goes to standard error, to keep the report channel clean.
+"""
+
+import os
+import sys
+from tvb.basic.profile import TvbProfile
+
+if __name__ == '__main__':
+    TvbProfile.set_profile(sys.argv[1], True)
+
+from tvb.basic.logger.builder import get_logger
+
+# Modules which most operations will need, imported before the first operation id is received.
+# This module itself stays light, as the stand-alone client imports it for DONE_MESSAGE.
+WARM_MODULES = ['tvb.core.operation_async_launcher', 'tvb.adapters.simulator.simulator_adapter',
+                'tvb.adapters.analyzers.fourier_adapter']
+
+DONE_MESSAGE = "DONE"
+
+
+def warm_up():
+    log = get_logger('tvb.core.operation_async_worker')
+    for module_name in WARM_MODULES:
+        try:
+            __import__(module_name)
+        except Exception as excep:
+            log.warning("Could not pre-import %s: %s" % (module_name, excep))
+
+
+def serve_operations(input_channel, output_channel):
+    """
+    Launch the operations with the ids read from input_channel, until it gets closed.
+    """
+    from tvb.core.operation_async_launcher import do_operation_launch
+
+    for line in input_channel:
+        operation_id = line.strip()
+        if not operation_id:
+            continue
+        do_operation_launch(operation_id)
+        output_channel.write("%s %s\n" % (DONE_MESSAGE, operation_id))
+        output_channel.flush()
+
+
+if __name__ == '__main__':
+    from tvb.storage.storage_interface import StorageInterface
+
+    # Keep a private handle on the standard output for reporting, and send all prints to the standard error
+    report_channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    storage_interface = StorageInterface()
+    if storage_interface.app_encryption_handler():
+        storage_interface.start()
+
+    warm_up()
+    serve_operations(sys.stdin, report_channel)
+
+    if storage_interface.app_encryption_handler():
+        storage_interface.mark_stop()
+        storage_interface.join()
@@ -284,7 +284,11 @@ class AlgorithmService(object):
         datatype_instance = dao.get_datatype_by_gid(datatype_gid)
         return self.get_launchable_algorithms_for_datatype(datatype_instance, categories)
 
-    def get_launchable_algorithms_for_datatype(self, datatype, categories):
+    def get_launchable_algorithms_for_datatype(self, datatype, categories, adapters_cache=None):
+        """
+        :param adapters_cache: optional dictionary, to be reused between calls with the same categories,
+            where the applicable adapters are kept for each DataType class
+        """
         data_class = datatype.__class__
         all_compatible_classes = [data_class.__name__]
         for one_class in getmro(data_class):
@@ -295,7 +299,12 @@ class AlgorithmService(object):
 
         self.logger.debug("Searching in categories: " + str(categories) + " for classes " + str(all_compatible_classes))
         categories_ids = [categ.id for categ in categories]
-        launchable_adapters = dao.get_applicable_adapters(all_compatible_classes, categories_ids)
+        if adapters_cache is None:
+            launchable_adapters = dao.get_applicable_adapters(all_compatible_classes, categories_ids)
+        else:
+            if data_class not in adapters_cache:
+                adapters_cache[data_class] = dao.get_applicable_adapters(all_compatible_classes, categories_ids)
+            launchable_adapters = adapters_cache[data_class]
 
         filtered_adapters = []
         has_operations_warning = False
@@ -30,12 +30,14 @@
 .. moduleauthor:: Yann Gordon <yann@invalid.tvb>
 """
 
+import atexit
 import os
 import queue
 import signal
 import sys
+from collections import deque
 from subprocess import Popen, PIPE
-from threading import Thread, Event
+from threading import Thread, Event, Lock
 
 from tvb.basic.exceptions import TVBException
 from tvb.basic.logger.builder import get_logger
@@ -43,6 +45,7 @@ from tvb.basic.profile import TvbProfile
 from tvb.core.adapters.abcadapter import AdapterLaunchModeEnum, ABCAdapter
 from tvb.core.entities.model.model_operation import OperationProcessIdentifier, STATUS_ERROR, STATUS_CANCELED, Operation
 from tvb.core.entities.storage import dao
+from tvb.core.operation_async_worker import DONE_MESSAGE
 from tvb.core.services.backend_clients.backend_client import BackendClient
 from tvb.core.services.burst_service import BurstService
 from tvb.storage.kube.kube_notifier import KubeNotifier
@@ -57,6 +60,122 @@ for i in range(TvbProfile.current.MAX_THREADS_NUMBER):
     LOCKS_QUEUE.put(1)
 
 
+# A worker is restarted after this many operations, to give back memory held by the ones finished
+WORKER_MAX_OPERATIONS = 50
+# Last lines of the worker's standard error, logged when the worker dies unexpectedly
+WORKER_ERROR_LINES = 100
+
+
+class OperationWorker(object):
+    """
+    Interpreter with TVB already imported (see tvb.core.operation_async_worker), launching operations one by one.
+    """
+
+    def __init__(self):
+        run_params = [TvbProfile.current.PYTHON_INTERPRETER_PATH, '-m', 'tvb.core.operation_async_worker',
+                      TvbProfile.CURRENT_PROFILE_NAME]
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        # anything that was already in $PYTHONPATH should have been reproduced in sys.path
+
+        self.process = Popen(run_params, stdin=PIPE, stdout=PIPE, stderr=PIPE, env=env,
+                             universal_newlines=True, bufsize=1)
+        self.nr_operations = 0
+        self._error_lines = deque(maxlen=WORKER_ERROR_LINES)
+        Thread(target=self._read_errors, daemon=True).start()
+        LOGGER.debug("Started operation worker pid=%s" % self.pid)
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def _read_errors(self):
+        # Keep the pipe drained, otherwise the worker blocks once the pipe buffer is full
+        for line in self.process.stderr:
+            self._error_lines.append(line)
+
+    def get_errors(self):
+        return ''.join(self._error_lines)
+
+    def launch(self, operation_id):
+        """
+        Send an operation to the worker and wait for it to be finished.
+        :returns: None when the operation finished, or the exit code of the worker, when it died meanwhile.
+        """
+        self.nr_operations += 1
+        try:
+            self.process.stdin.write("%s\n" % operation_id)
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if line.split() == [DONE_MESSAGE, str(operation_id)]:
+                    return None
+        except OSError:
+            # The worker was stopped before reading its operation
+            pass
+        return self.process.wait()
+
+    def close(self):
+        """ The worker exits on its own once its input is closed"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+
+class OperationWorkerPool(object):
+    """
+    Keeps idle OperationWorker instances, such that operations do not wait for a new interpreter to import TVB.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle_workers = []
+        self._lock = Lock()
+        self._closed = False
+
+    def start(self):
+        """ Start all workers in advance, such that the first operations do not wait for them either"""
+        with self._lock:
+            while not self._closed and len(self._idle_workers) < self.size:
+                self._idle_workers.append(OperationWorker())
+
+    def acquire(self):
+        with self._lock:
+            while len(self._idle_workers) > 0:
+                worker = self._idle_workers.pop()
+                if worker.is_alive():
+                    return worker
+        return OperationWorker()
+
+    def release(self, worker):
+        """
+        Give back a worker after its operation. A stopped, crashed or worn out worker is replaced with a new one.
+        """
+        reusable = worker.is_alive() and worker.nr_operations < WORKER_MAX_OPERATIONS
+        if not reusable:
+            worker.close()
+        with self._lock:
+            if self._closed or len(self._idle_workers) >= self.size:
+                if reusable:
+                    worker.close()
+                return
+            self._idle_workers.append(worker if reusable else OperationWorker())
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for worker in self._idle_workers:
+                worker.close()
+            self._idle_workers = []
+
+
+WORKER_POOL = OperationWorkerPool(TvbProfile.current.MAX_THREADS_NUMBER)
+atexit.register(WORKER_POOL.close)
+
+
 class OperationExecutor(Thread):
     """
     Thread in charge for starting an operation, used both on cluster and with stand-alone installations.
@@ -66,14 +185,14 @@ class OperationExecutor(Thread):
         Thread.__init__(self)
         self.operation_id = op_id
         self._stop_ev = Event()
+        self._worker = None
+        self._worker_lock = Lock()
 
     def run(self):
         """
         Get the required data from the operation queue and launch the operation.
         """
         operation_id = self.operation_id
-        run_params = [TvbProfile.current.PYTHON_INTERPRETER_PATH, '-m', 'tvb.core.operation_async_launcher',
-                      str(operation_id), TvbProfile.CURRENT_PROFILE_NAME]
 
         current_operation = dao.get_operation_by_id(operation_id)
         storage_interface = StorageInterface()
@@ -86,39 +205,38 @@ class OperationExecutor(Thread):
         # We should no longer launch the operation.
         if self.stopped() is False:
 
-            env = os.environ.copy()
-            env['PYTHONPATH'] = os.pathsep.join(sys.path)
-            # anything that was already in $PYTHONPATH should have been reproduced in sys.path
+            worker = WORKER_POOL.acquire()
+            with self._worker_lock:
+                self._worker = worker
 
-            launched_process = Popen(run_params, stdout=PIPE, stderr=PIPE, env=env)
-
-            LOGGER.debug("Storing pid=%s for operation id=%s launched on local machine." % (operation_id,
-                                                                                            launched_process.pid))
-            op_ident = OperationProcessIdentifier(operation_id, pid=launched_process.pid)
+            LOGGER.debug("Storing pid=%s for operation id=%s launched on local machine." % (worker.pid,
+                                                                                            operation_id))
+            op_ident = OperationProcessIdentifier(operation_id, pid=worker.pid)
             dao.store_entity(op_ident)
 
             if self.stopped():
                 # In the exceptional case where the user pressed stop while the Thread startup is done.
                 # and stop_operation is concurrently asking about OperationProcessIdentity.
-                self.stop_pid(launched_process.pid)
+                self.stop_pid(worker.pid)
 
-            subprocess_result = launched_process.communicate()
+            returned = worker.launch(operation_id)
             LOGGER.info("Finished with launch of operation %s" % operation_id)
-            returned = launched_process.wait()
+            # From now on, the worker can run other operations, and should no longer be stopped for this one
+            with self._worker_lock:
+                self._worker = None
+            WORKER_POOL.release(worker)
 
             LOGGER.info("Return code: {}. Stopped: {}".format(returned, self.stopped()))
             LOGGER.info("Thread: {}".format(self))
-            if returned != 0 and not self.stopped():
+            if returned is not None and not self.stopped():
                 # Process did not end as expected. (e.g. Segmentation fault)
                 burst_service = BurstService()
                 operation = dao.get_operation_by_id(self.operation_id)
                 LOGGER.error("Operation suffered fatal failure! Exit code: %s Exit message: %s" % (returned,
-                                                                                                   subprocess_result))
+                                                                                                   worker.get_errors()))
                 burst_service.persist_operation_state(operation, STATUS_ERROR,
                                                       "Operation failed unexpectedly! Please check the log files.")
 
-            del launched_process
-
         storage_interface.check_and_delete(project_folder)
 
         # Give back empty spot now that you finished your operation
@@ -133,6 +251,16 @@ class OperationExecutor(Thread):
         """Check if current thread was marked for stop."""
         return self._stop_ev.isSet()
 
+    def stop_process(self, pid):
+        """
+        Stop the worker process running this operation, unless it already finished with it.
+        :returns: True when the process was stopped in here.
+        """
+        with self._worker_lock:
+            if self._worker is None or self._worker.pid != int(pid):
+                return False
+            return self.stop_pid(pid)
+
     @staticmethod
     def stop_pid(pid):
         """
@@ -262,7 +390,9 @@ class StandAloneClient(BackendClient):
                 operation_process = dao.get_operation_process_for_operation(operation_id)
                 if operation_process is not None:
                     # Now try to kill the operation if it exists
-                    stopped = OperationExecutor.stop_pid(operation_process.pid)
+                    stopped = False
+                    for thread in operation_threads:
+                        stopped = thread.stop_process(operation_process.pid) or stopped
                     if not stopped:
                         LOGGER.debug("Operation %d was probably killed from it's specific thread." % operation_id)
                     else:
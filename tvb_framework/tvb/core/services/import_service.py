@@ -295,12 +295,16 @@ class ImportService(object):
             try:
                 adapter = ABCAdapter.build_adapter(algo)
                 view_model_class = adapter.get_view_model_class()
-                view_model2adapter[view_model_class] = algo
+                view_model2adapter[self._view_model_key(view_model_class)] = algo
             except IntrospectionException:
                 self.logger.exception("Could not load %s" % algo)
 
         return view_model2adapter
 
+    @staticmethod
+    def _view_model_key(view_model_class):
+        return "%s.%s" % (view_model_class.__module__, view_model_class.__name__)
+
     def _retrieve_operations_in_order(self, project, import_path, importer_operation_id=None):
         # type: (Project, str, int) -> list[Operation2ImportData]
         retrieved_operations = []
@@ -329,7 +333,7 @@ class ImportService(object):
                                 all_view_model_files.append(h5_file)
                                 if not main_view_model:
                                     view_model = h5.load_view_model_from_file(h5_file)
-                                    if type(view_model) in self.view_model2adapter.keys():
+                                    if self._view_model_key(type(view_model)) in self.view_model2adapter:
                                         main_view_model = view_model
                             else:
                                 file_update_manager = FilesUpdateManager()
@@ -339,7 +343,7 @@ class ImportService(object):
                             self.logger.warning("Unreadable H5 file will be ignored: %s" % h5_file)
 
                 if main_view_model is not None:
-                    alg = self.view_model2adapter[type(main_view_model)]
+                    alg = self.view_model2adapter[self._view_model_key(type(main_view_model))]
                     op_group_id = None
                     if main_view_model.operation_group_gid:
                         op_group = dao.get_operationgroup_by_gid(main_view_model.operation_group_gid.hex)
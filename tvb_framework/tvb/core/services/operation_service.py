@@ -41,6 +41,7 @@ import zipfile
 from inspect import isclass
 
 from tvb.basic.exceptions import TVBException
+from tvb.basic.neotraits.api import HasTraits
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.profile import TvbProfile
 from tvb.config import MEASURE_METRICS_MODULE, MEASURE_METRICS_CLASS, MEASURE_METRICS_MODEL_CLASS, ALGORITHMS
@@ -51,7 +52,8 @@ from tvb.core.entities.load import get_class_by_name
 from tvb.core.entities.model.model_burst import PARAM_RANGE_PREFIX, RANGE_PARAMETER_1, RANGE_PARAMETER_2, \
     BurstConfiguration
 from tvb.core.entities.model.model_datatype import DataTypeGroup
-from tvb.core.entities.model.model_operation import STATUS_FINISHED, STATUS_ERROR, Operation
+from tvb.core.entities.model.model_operation import STATUS_FINISHED, STATUS_ERROR, Operation, OperationGroup
+from tvb.core.entities.transient.range_parameter import RangeParameter
 from tvb.core.entities.storage import dao, transactional
 from tvb.core.neocom import h5
 from tvb.core.neotraits.h5 import ViewModelH5
@@ -369,6 +371,56 @@ class OperationService:
             self.logger.exception("Could not launch operation " + operation_name + " with the given set of input data!")
             raise OperationException(str(excep))
 
+    def fire_operation_group(self, adapter_instance, current_user, project_id, view_models, range_name,
+                             visible=True):
+        """
+        Launch one operation per view model, for current_user and project with project_id. The operations are
+        gathered in one OperationGroup, thus their results form a DataTypeGroup, as for a PSE.
+
+        :param view_models: view models which differ only by the field called range_name (e.g. the input DataType)
+        :returns: the list of launched operations
+        """
+        operation_name = str(adapter_instance.__class__.__name__)
+        try:
+            self.logger.info("Starting operation group " + operation_name)
+            project = dao.get_project_by_id(project_id)
+            algorithm = adapter_instance.stored_adapter
+            algo_category = dao.get_category_by_id(algorithm.fk_category)
+
+            operation_group = OperationGroup(project.id, ranges=[RangeParameter(range_name, HasTraits).to_json()])
+            operation_group = dao.store_entity(operation_group)
+
+            operations = []
+            for view_model in view_models:
+                range_value = getattr(view_model, range_name)
+                ranges = json.dumps({range_name: range_value.hex if isinstance(range_value, uuid.UUID)
+                                     else range_value})
+                view_model.operation_group_gid = uuid.UUID(operation_group.gid)
+                view_model.ranges = json.dumps(operation_group.range_references)
+                view_model.range_values = ranges
+                operation = self.prepare_operation(current_user.id, project, algorithm, visible, view_model,
+                                                   ranges=ranges, op_group_id=operation_group.id)
+                if not operations:
+                    datatype_group = DataTypeGroup(operation_group, operation_id=operation.id,
+                                                   state=algo_category.defaultdatastate)
+                    dao.store_entity(datatype_group)
+                operations.append(operation)
+
+            send_to_cluster = adapter_instance.launch_mode != AdapterLaunchModeEnum.SYNC_SAME_MEM
+            for operation in operations:
+                self.launch_operation(operation.id, send_to_cluster)
+            self.logger.info("Finished operation group launch:" + operation_name)
+            return operations
+
+        except TVBException as excep:
+            self.logger.exception("Could not launch operation group " + operation_name +
+                                  " with the given set of input data, because: " + excep.message)
+            raise OperationException(excep.message, excep)
+        except Exception as excep:
+            self.logger.exception("Could not launch operation group " + operation_name +
+                                  " with the given set of input data!")
+            raise OperationException(str(excep))
+
     @staticmethod
     def load_operation(operation_id):
         """ Retrieve previously stored Operation from DB, and load operation.burst attribute"""
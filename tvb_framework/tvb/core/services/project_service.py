@@ -199,6 +199,15 @@ class ProjectService:
         if current_ops is None:
             return selected_project, 0, [], 0
 
+        operations_by_id, datatype_groups, bursts, results = dao.get_operations_details(
+            one_op[0] for one_op in current_ops)
+        # Per request caches, as the same algorithms, users and visualizers repeat on most rows
+        algorithms = {op.fk_from_algo: op.algorithm for op in operations_by_id.values()}
+        users = {op.fk_launched_by: op.user for op in operations_by_id.values()}
+        algorithm_service = AlgorithmService()
+        visualizer_categories = None
+        visualizers_cache = dict()
+
         operations = []
         for one_op in current_ops:
             try:
@@ -207,18 +216,18 @@ class ProjectService:
                     result["id"] = str(one_op[0]) + "-" + str(one_op[1])
                 else:
                     result["id"] = str(one_op[0])
-                burst = dao.get_burst_for_operation_id(one_op[0])
+                burst = bursts.get(one_op[0])
                 result["burst_name"] = burst.name if burst else '-'
                 result["count"] = one_op[2]
                 result["gid"] = one_op[13]
                 operation_group_id = one_op[3]
                 if operation_group_id is not None and operation_group_id:
                     try:
-                        operation_group = dao.get_generic_entity(OperationGroup, operation_group_id)[0]
+                        operation_group = operations_by_id[one_op[0]].operation_group
                         result["group"] = operation_group.name
                         result["group"] = result["group"].replace("_", " ")
                         result["operation_group_id"] = operation_group.id
-                        datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
+                        datatype_group = datatype_groups.get(operation_group_id)
                         result["datatype_group_gid"] = datatype_group.gid if datatype_group is not None else None
                         result["gid"] = operation_group.gid
                         # Filter only viewers for current DataTypeGroup entity:
@@ -226,7 +235,10 @@ class ProjectService:
                         if datatype_group is None:
                             view_groups = None
                         else:
-                            view_groups = AlgorithmService().get_visualizers_for_group(datatype_group.gid)
+                            if visualizer_categories is None:
+                                visualizer_categories = dao.get_visualisers_categories()
+                            view_groups = algorithm_service.get_launchable_algorithms_for_datatype(
+                                datatype_group, visualizer_categories, visualizers_cache)[1]
                         result["view_groups"] = view_groups
                     except Exception:
                         self.logger.exception("We will ignore group on entity:" + str(one_op))
@@ -234,8 +246,12 @@ class ProjectService:
                 else:
                     result['group'] = None
                     result['datatype_group_gid'] = None
-                result["algorithm"] = dao.get_algorithm_by_id(one_op[4])
-                result["user"] = dao.get_user_by_id(one_op[5])
+                if one_op[4] not in algorithms:
+                    algorithms[one_op[4]] = dao.get_algorithm_by_id(one_op[4])
+                result["algorithm"] = algorithms[one_op[4]]
+                if one_op[5] not in users:
+                    users[one_op[5]] = dao.get_user_by_id(one_op[5])
+                result["user"] = users[one_op[5]]
                 if type(one_op[6]) is str:
                     result["create"] = string2date(str(one_op[6]))
                 else:
@@ -256,7 +272,7 @@ class ProjectService:
                 result["visible"] = True if one_op[11] > 0 else False
                 result['operation_tag'] = one_op[12]
                 if not result['group']:
-                    result['results'] = dao.get_results_for_operation(result['id'])
+                    result['results'] = results.get(one_op[0], [])
                 else:
                     result['results'] = None
                 operations.append(result)
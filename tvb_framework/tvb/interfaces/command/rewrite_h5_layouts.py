@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+"""
+Rewrite the H5 files of TVB projects into the chunking and compression layouts declared on their DataSet accessors.
+Files written before those layouts were declared keep the default h5py chunking and no compression, until rewritten.
+Compressible layouts (e.g. of TimeSeries data) are compressed only when the COMPRESS_H5_DATA setting is on.
+
+Usage: python -m tvb.interfaces.command.rewrite_h5_layouts [h5_path ...]
+Without arguments, all the H5 files of all projects in the TVB storage get rewritten.
+"""
+
+import sys
+
+from tvb.basic.logger.builder import get_logger
+from tvb.config.init.initializer import command_initializer
+from tvb.core.entities.file.files_update_manager import FilesUpdateManager
+from tvb.core.entities.storage import dao
+from tvb.core.neotraits.h5 import H5File, ViewModelH5
+from tvb.storage.storage_interface import StorageInterface
+
+LOG = get_logger(__name__)
+
+
+def rewrite_h5_layouts(h5_paths):
+    """
+    Rewrite the given H5 files and update the disk size of their DataTypes.
+    Files of H5 classes which do not declare any layout are left untouched.
+
+    :returns: the number of files rewritten
+    """
+    nr_rewritten = 0
+    for path in h5_paths:
+        h5_class = H5File.h5_class_from_file(path)
+        if not isinstance(h5_class, type) or issubclass(h5_class, ViewModelH5):
+            continue
+        with h5_class(path) as h5_file:
+            if not h5_file.rewrite_layout():
+                continue
+            gid = h5_file.gid.load()
+        nr_rewritten += 1
+        LOG.info("Rewrote %s" % path)
+
+        datatype = dao.get_datatype_by_gid(gid.hex)
+        if datatype is not None:
+            datatype.disk_size = StorageInterface.compute_size_on_disk(path)
+            dao.store_entity(datatype)
+    return nr_rewritten
+
+
+def main():
+    """
+    Rewrites the H5 files given as arguments, or all H5 files in the TVB projects folder.
+    """
+    command_initializer()
+    h5_paths = sys.argv[1:] or FilesUpdateManager.get_all_h5_paths()
+    nr_rewritten = rewrite_h5_layouts(h5_paths)
+    LOG.info("Rewrote %d out of %d H5 files" % (nr_rewritten, len(h5_paths)))
+
+
+if __name__ == "__main__":
+    main()
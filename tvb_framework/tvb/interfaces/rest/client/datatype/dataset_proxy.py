@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+
+import numpy
+
+
+class DatasetProxy(object):
+    """
+    Read-only, array-like access to one dataset of a DataType stored on the TVB server.
+    Nothing is downloaded until the proxy is indexed, and then only the selected hyperslab is transferred.
+    Integers, slices with a positive step and Ellipsis are supported as indices, e.g. proxy[::10, 0, ..., 0].
+    """
+
+    def __init__(self, datatype_api, datatype_gid, dataset_name):
+        self.datatype_api = datatype_api
+        self.datatype_gid = datatype_gid
+        self.dataset_name = dataset_name
+        self.shape, self.dtype = datatype_api.get_dataset_info(datatype_gid, dataset_name)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(numpy.prod(self.shape))
+
+    def __len__(self):
+        if not self.shape:
+            raise TypeError("len() of a scalar dataset")
+        return self.shape[0]
+
+    def __repr__(self):
+        return "DatasetProxy(%s, %s, shape=%s, dtype=%s)" % (self.datatype_gid, self.dataset_name,
+                                                             self.shape, self.dtype)
+
+    def __array__(self, dtype=None):
+        data = self[...]
+        return data if dtype is None else data.astype(dtype)
+
+    def _expand_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if sum(1 for item in key if item is Ellipsis) > 1:
+            raise IndexError("An index can only have a single ellipsis")
+        if Ellipsis in key:
+            position = key.index(Ellipsis)
+            missing = self.ndim - len(key) + 1
+            key = key[:position] + (slice(None),) * missing + key[position + 1:]
+        if len(key) > self.ndim:
+            raise IndexError("Too many indices for a dataset of shape %s" % (self.shape,))
+        return key + (slice(None),) * (self.ndim - len(key))
+
+    def __getitem__(self, key):
+        slices = []
+        squeezed = []
+        for dim, (item, length) in enumerate(zip(self._expand_key(key), self.shape)):
+            if isinstance(item, slice):
+                start, stop, step = item.indices(length)
+                if step < 0:
+                    raise IndexError("Negative steps are not supported when slicing a remote dataset")
+                slices.append(slice(start, max(start, stop), step))
+            elif isinstance(item, (int, numpy.integer)):
+                index = int(item) + length if item < 0 else int(item)
+                if not 0 <= index < length:
+                    raise IndexError("Index %s is out of bounds for axis %d with size %d" % (item, dim, length))
+                slices.append(slice(index, index + 1, 1))
+                squeezed.append(dim)
+            else:
+                raise TypeError("Only integers, slices and Ellipsis are valid indices, not %s" % type(item))
+
+        data = self.datatype_api.retrieve_dataset_slice(self.datatype_gid, self.dataset_name, slices)
+        data = numpy.squeeze(data, axis=tuple(squeezed))
+        return data[()] if data.ndim == 0 else data
@@ -27,18 +27,27 @@
 import cgi
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy
 from tvb.basic.neotraits.api import HasTraits
 from tvb.core.neocom import h5
 from tvb.core.neocom.h5 import REGISTRY, TVBLoader
+from tvb.core.neotraits.h5 import H5File
 from tvb.interfaces.rest.client.client_decorators import handle_response
 from tvb.interfaces.rest.client.main_api import MainApi
 from tvb.interfaces.rest.commons.dtos import AlgorithmDto
 from tvb.interfaces.rest.commons.exceptions import ClientException
 from tvb.interfaces.rest.commons.files_helper import save_file
-from tvb.interfaces.rest.commons.strings import RestLink, LinkPlaceholder
+from tvb.interfaces.rest.commons.hyperslab import hyperslab_to_string
+from tvb.interfaces.rest.commons.strings import RestLink, LinkPlaceholder, Strings, DataFormat
 from tvb.storage.storage_interface import StorageInterface
 
+# Number of referenced H5 files downloaded at the same time
+REFERENCE_DOWNLOAD_WORKERS = 4
+# Bytes read at once from the network when receiving a dataset slice
+DATASET_CHUNK_SIZE = 2 ** 20
+
 
 class DataTypeApi(MainApi):
 
@@ -79,6 +88,51 @@ class DataTypeApi(MainApi):
         error_response = json.loads(response.content.decode('utf-8'))
         raise ClientException(error_response['message'], error_response['code'])
 
+    def _dataset_url(self, datatype_gid, dataset_name):
+        return self.build_request_url(RestLink.DATATYPE_DATASET.compute_url(True, {
+            LinkPlaceholder.DATATYPE_GID.value: datatype_gid,
+            LinkPlaceholder.DATASET_NAME.value: dataset_name
+        }))
+
+    def get_dataset_info(self, datatype_gid, dataset_name):
+        """
+        :returns: shape and dtype of one dataset in the H5 file of a DataType, without downloading any data
+        """
+        response = self.secured_request().head(self._dataset_url(datatype_gid, dataset_name))
+        if not response.ok:
+            raise ClientException("Could not access dataset %s of DataType %s" % (dataset_name, datatype_gid),
+                                  response.status_code)
+        shape = tuple(json.loads(response.headers[Strings.DATASET_SHAPE_HEADER.value]))
+        return shape, numpy.dtype(response.headers[Strings.ARRAY_TYPE_HEADER.value])
+
+    def retrieve_dataset_slice(self, datatype_gid, dataset_name, slices):
+        """
+        Download only a hyperslab of one dataset in the H5 file of a DataType.
+        :param slices: sequence of slice objects, one for each of the first dimensions of the dataset
+        :returns: numpy array holding the selection, with one dimension for every dimension of the dataset
+        """
+        response = self.secured_request().get(self._dataset_url(datatype_gid, dataset_name), stream=True, params={
+            Strings.HYPERSLAB.value: hyperslab_to_string(slices),
+            Strings.DATA_FORMAT.value: DataFormat.RAW.value
+        })
+
+        if not response.ok:
+            error_response = json.loads(response.content.decode('utf-8'))
+            raise ClientException(error_response['message'], error_response['code'])
+
+        shape = tuple(json.loads(response.headers[Strings.ARRAY_SHAPE_HEADER.value]))
+        data = numpy.empty(shape, dtype=numpy.dtype(response.headers[Strings.ARRAY_TYPE_HEADER.value]))
+        # Fill the result while the chunks arrive, instead of buffering the whole body first
+        buffer = data.reshape(-1).view(numpy.uint8)
+        received = 0
+        for chunk in response.iter_content(DATASET_CHUNK_SIZE):
+            buffer[received:received + len(chunk)] = numpy.frombuffer(chunk, dtype=numpy.uint8)
+            received += len(chunk)
+        if received != buffer.size:
+            raise ClientException("Incomplete dataset slice received, %d bytes out of %d" % (received, buffer.size),
+                                  500)
+        return data
+
     @handle_response
     def get_operations_for_datatype(self, datatype_gid):
         response = self.secured_request().get(
@@ -102,9 +156,23 @@ class DataTypeApi(MainApi):
 
     def _load_with_full_references(self, file_path, download_folder, is_data_encrypted):
         # type: (str, str, bool) -> HasTraits
+        with H5File.from_file(file_path) as f:
+            references = f.gather_references()
+        sub_gids = []
+        for _, sub_gid in references:
+            if isinstance(sub_gid, list):
+                sub_gid = sub_gid[0] if sub_gid else None
+            if sub_gid is not None and sub_gid.hex not in sub_gids:
+                sub_gids.append(sub_gid.hex)
+
+        # With encryption, every download writes the same key pair in download_folder, so they can not overlap
+        workers = 1 if is_data_encrypted else REFERENCE_DOWNLOAD_WORKERS
+        with ThreadPoolExecutor(max_workers=max(min(workers, len(sub_gids)), 1)) as executor:
+            paths = executor.map(lambda gid: self.retrieve_datatype(gid, download_folder, is_data_encrypted), sub_gids)
+            ref_ht_paths = dict(zip(sub_gids, paths))
+
         def load_ht_function(sub_gid, traited_attr):
-            ref_ht_path = self.retrieve_datatype(sub_gid.hex, download_folder, is_data_encrypted)
-            ref_ht, _ = h5.load_with_links(ref_ht_path)
+            ref_ht, _ = h5.load_with_links(ref_ht_paths[sub_gid.hex])
             return ref_ht
 
         loader = TVBLoader(REGISTRY)
@@ -30,6 +30,7 @@ import webbrowser
 from tvb.basic.neotraits.api import HasTraits
 from tvb.config.init.datatypes_registry import populate_datatypes_registry
 from tvb.interfaces.rest.client.datatype.datatype_api import DataTypeApi
+from tvb.interfaces.rest.client.datatype.dataset_proxy import DatasetProxy
 from tvb.interfaces.rest.client.operation.operation_api import OperationApi
 from tvb.interfaces.rest.client.project.project_api import ProjectApi
 from tvb.interfaces.rest.client.simulator.simulation_api import SimulationApi
@@ -196,6 +197,15 @@ class TVBClient:
         """
         return self.datatype_api.load_datatype_with_links(datatype_gid, download_folder, self.is_data_encrypted)
 
+    def get_dataset(self, datatype_gid, dataset_name):
+        # type: (str, str) -> DatasetProxy
+        """
+        Given a datatype GID and the name of one of its datasets (e.g. 'data' for a TimeSeries), return a lazy array
+        which downloads from the server only the parts being indexed, e.g. get_dataset(gid, 'data')[1000:2000, 0].
+        Not available when encryption is enabled on the server.
+        """
+        return DatasetProxy(self.datatype_api, datatype_gid, dataset_name)
+
     def get_operations_for_datatype(self, datatype_gid):
         """
         Given a guid, this function will return the available operations for that datatype, as a list of AlgorithmDTO instances
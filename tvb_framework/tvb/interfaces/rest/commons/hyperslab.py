@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Text form of a hyperslab (a start:stop:step selection on each dimension of a dataset), as passed to the REST API.
+Dimensions are separated by commas, and each of them uses the Python slice syntax, e.g. "0:1000:2,:,5:7".
+A single index selects one element, but keeps the dimension. Dimensions missing at the end are selected fully.
+"""
+
+from tvb.interfaces.rest.commons.exceptions import BadRequestException
+
+DIMENSION_SEPARATOR = ","
+BOUND_SEPARATOR = ":"
+
+
+def hyperslab_to_string(slices):
+    """
+    :param slices: sequence of slice objects, one for each of the first dimensions of a dataset
+    """
+    dimensions = []
+    for one_slice in slices:
+        bounds = [one_slice.start, one_slice.stop, one_slice.step]
+        dimensions.append(BOUND_SEPARATOR.join('' if bound is None else str(int(bound)) for bound in bounds))
+    return DIMENSION_SEPARATOR.join(dimensions)
+
+
+def parse_hyperslab(hyperslab, shape):
+    """
+    :param hyperslab: string as built by hyperslab_to_string, or None for the whole dataset
+    :param shape: shape of the dataset to select from
+    :returns: tuple with a slice of non-negative start, stop and positive step for every dimension of the dataset
+    """
+    dimensions = hyperslab.split(DIMENSION_SEPARATOR) if hyperslab else []
+    if len(dimensions) > len(shape):
+        raise BadRequestException("Hyperslab %s has more dimensions than the dataset %s" % (hyperslab, shape))
+
+    slices = []
+    for idx, length in enumerate(shape):
+        bounds = dimensions[idx].split(BOUND_SEPARATOR) if idx < len(dimensions) else []
+        if len(bounds) > 3:
+            raise BadRequestException("Invalid hyperslab dimension %s" % dimensions[idx])
+        try:
+            bounds = [int(bound) if bound.strip() else None for bound in bounds] + [None] * (3 - len(bounds))
+        except ValueError:
+            raise BadRequestException("Invalid hyperslab dimension %s" % dimensions[idx])
+        if len(bounds) == 3 and bounds[0] is not None and idx < len(dimensions) \
+                and BOUND_SEPARATOR not in dimensions[idx]:
+            # a single index, keeping the dimension
+            start = bounds[0] + length if bounds[0] < 0 else bounds[0]
+            bounds = [start, start + 1, None]
+        if bounds[2] is not None and bounds[2] <= 0:
+            raise BadRequestException("Only positive steps are supported in a hyperslab, not %s" % bounds[2])
+        slices.append(slice(*slice(*bounds).indices(length)))
+    return tuple(slices)
+
+
+def selection_shape(slices):
+    """
+    :returns: shape of the data selected by slices as returned from parse_hyperslab
+    """
+    return tuple(len(range(one_slice.start, one_slice.stop, one_slice.step)) for one_slice in slices)
@@ -34,6 +34,16 @@ class Strings(Enum):
     AUTH_HEADER = "Authorization"
     AUTH_URL = "auth_url"
     ACCOUNT_URL = "account_url"
+    HYPERSLAB = "hyperslab"
+    DATA_FORMAT = "format"
+    ARRAY_SHAPE_HEADER = "X-Array-Shape"
+    ARRAY_TYPE_HEADER = "X-Array-Type"
+    DATASET_SHAPE_HEADER = "X-Dataset-Shape"
+
+
+class DataFormat(Enum):
+    NPY = "npy"
+    RAW = "raw"
 
 
 class RequestFileKey(Enum):
@@ -63,6 +73,7 @@ class LinkPlaceholder(Enum):
     USERNAME = "username"
     PROJECT_GID = "project_gid"
     DATATYPE_GID = "datatype_gid"
+    DATASET_NAME = "dataset_name"
     OPERATION_GID = "operation_gid"
     ALG_MODULE = "algorithm_module"
     ALG_CLASSNAME = "algorithm_classname"
@@ -83,6 +94,7 @@ class RestLink(Enum):
     GET_DATATYPE = "/{" + LinkPlaceholder.DATATYPE_GID.value + "}"
     DATATYPE_OPERATIONS = "/{" + LinkPlaceholder.DATATYPE_GID.value + "}/operations"
     DATATYPE_EXTRA_INFO = "/{" + LinkPlaceholder.DATATYPE_GID.value + "}/extra_info"
+    DATATYPE_DATASET = "/{" + LinkPlaceholder.DATATYPE_GID.value + "}/datasets/{" + LinkPlaceholder.DATASET_NAME.value + "}"
     IS_DATA_ENCRYPTED = "/is_data_encrypted"
 
     # OPERATIONS
@@ -110,7 +122,7 @@ _namespace_url_dict = {
     RestNamespace.USERS: [RestLink.LOGIN, RestLink.PROJECTS, RestLink.USEFUL_URLS],
     RestNamespace.PROJECTS: [RestLink.DATA_IN_PROJECT, RestLink.OPERATIONS_IN_PROJECT, RestLink.PROJECT_MEMBERS],
     RestNamespace.DATATYPES: [RestLink.IS_DATA_ENCRYPTED, RestLink.GET_DATATYPE, RestLink.DATATYPE_OPERATIONS,
-                              RestLink.DATATYPE_EXTRA_INFO],
+                              RestLink.DATATYPE_EXTRA_INFO, RestLink.DATATYPE_DATASET],
     RestNamespace.OPERATIONS: [RestLink.LAUNCH_OPERATION, RestLink.OPERATION_STATUS, RestLink.OPERATION_RESULTS],
     RestNamespace.SIMULATION: [RestLink.FIRE_SIMULATION]
 }
@@ -24,18 +24,28 @@
 #
 #
 
+import io
 import os
 
+import numpy
 from tvb.basic.profile import TvbProfile
 from tvb.core.entities.load import load_entity_by_gid
 from tvb.core.entities.storage import dao
 from tvb.core.neocom.h5 import h5_file_for_index
 from tvb.core.services.algorithm_service import AlgorithmService
 from tvb.interfaces.rest.commons.dtos import AlgorithmDto
-from tvb.interfaces.rest.commons.exceptions import ServiceException
+from tvb.interfaces.rest.commons.exceptions import ServiceException, BadRequestException, \
+    InvalidIdentifierException
+from tvb.interfaces.rest.commons.hyperslab import parse_hyperslab, selection_shape
+from tvb.interfaces.rest.commons.strings import DataFormat
+from tvb.storage.h5.file.exceptions import MissingDataSetException
 from tvb.storage.storage_interface import StorageInterface
 
 
+# Bytes of data read from the H5 file for each chunk streamed
+DATASET_STREAM_BLOCK_SIZE = 16 * 2 ** 20
+
+
 class DatatypeFacade:
     def __init__(self):
         self.algorithm_service = AlgorithmService()
@@ -82,3 +92,65 @@ class DatatypeFacade:
             return None
 
         return extra_info
+
+    @staticmethod
+    def get_dataset_stream(datatype_gid, dataset_name, hyperslab=None, data_format=DataFormat.RAW.value):
+        """
+        Prepare the streaming of a hyperslab from one dataset of a DataType H5 file, in C order and little endian.
+        Only the blocks being sent are held in memory.
+
+        :param hyperslab: string as described in tvb.interfaces.rest.commons.hyperslab
+        :param data_format: 'raw' for the bare values, or 'npy' for the numpy file format
+        :returns: tuple (full shape of the dataset, shape of the selection, dtype, generator of bytes chunks)
+        """
+        if StorageInterface.encryption_enabled():
+            raise BadRequestException('Sliced access is not available when encryption is enabled on the server '
+                                      'side, please download the full DataType!')
+        if data_format not in [data_format.value for data_format in DataFormat]:
+            raise BadRequestException('Unknown data format %s' % data_format)
+
+        index = load_entity_by_gid(datatype_gid)
+        if index is None:
+            raise InvalidIdentifierException()
+        with h5_file_for_index(index) as h5_file:
+            h5_path = h5_file.path
+            try:
+                storage_manager = h5_file.storage_manager
+                dataset_shape = storage_manager.get_data_shape(dataset_name)
+                # an empty selection is enough to learn the data type
+                dtype = numpy.asarray(storage_manager.get_data(
+                    dataset_name, data_slice=tuple(slice(0, 0) for _ in dataset_shape) or None)).dtype
+            except MissingDataSetException:
+                raise InvalidIdentifierException("DataType %s has no dataset %s" % (datatype_gid, dataset_name))
+        dtype = dtype.newbyteorder('<')
+        if dtype.kind not in 'biufc':
+            raise BadRequestException('Only numeric datasets can be sliced, %s is of type %s' % (dataset_name, dtype))
+
+        slices = parse_hyperslab(hyperslab, dataset_shape)
+        shape = selection_shape(slices)
+        return dataset_shape, shape, dtype, DatatypeFacade._stream_dataset(h5_path, dataset_name, slices, shape,
+                                                                           dtype, data_format)
+
+    @staticmethod
+    def _stream_dataset(h5_path, dataset_name, slices, shape, dtype, data_format):
+        if data_format == DataFormat.NPY.value:
+            header = io.BytesIO()
+            numpy.lib.format.write_array_header_1_0(header, {'descr': numpy.lib.format.dtype_to_descr(dtype),
+                                                             'fortran_order': False, 'shape': shape})
+            yield header.getvalue()
+        if not shape or 0 in shape:
+            return
+
+        first_dimension = range(slices[0].start, slices[0].stop, slices[0].step)
+        row_size = max(int(numpy.prod(shape[1:])) * dtype.itemsize, 1)
+        block = max(DATASET_STREAM_BLOCK_SIZE // row_size, 1)
+        # Open the file only when the stream starts to be consumed
+        storage_manager = StorageInterface.get_storage_manager(h5_path)
+        try:
+            for start in range(0, len(first_dimension), block):
+                rows = first_dimension[start:start + block]
+                block_slices = (slice(rows.start, rows.stop, rows.step),) + slices[1:]
+                data = storage_manager.get_data(dataset_name, data_slice=block_slices, close_file=False)
+                yield numpy.ascontiguousarray(data, dtype=dtype).tobytes()
+        finally:
+            storage_manager.close_file()
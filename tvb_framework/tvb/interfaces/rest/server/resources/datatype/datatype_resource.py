@@ -28,6 +28,7 @@ import flask
 
 from tvb.interfaces.rest.commons.exceptions import BadRequestException
 from tvb.interfaces.rest.commons.files_helper import save_temporary_file
+from tvb.interfaces.rest.commons.strings import Strings, DataFormat
 from tvb.interfaces.rest.server.access_permissions.permissions import DataTypeAccessPermission
 from tvb.interfaces.rest.server.decorators.rest_decorators import check_permission
 from tvb.interfaces.rest.server.facades.datatype_facade import DatatypeFacade
@@ -63,6 +64,25 @@ class RetrieveDatatypeResource(SecuredResource):
         return flask.send_file(h5_file_path, as_attachment=True, attachment_filename=file_name)
 
 
+class RetrieveDatatypeDatasetResource(SecuredResource):
+
+    @check_permission(DataTypeAccessPermission, 'datatype_gid')
+    def get(self, datatype_gid, dataset_name):
+        """
+        :given a guid and a dataset name, this function will stream the requested hyperslab of that dataset as
+        chunked binary data (raw little endian values, or a npy file), together with its shape and type headers
+        """
+        hyperslab = flask.request.args.get(Strings.HYPERSLAB.value)
+        data_format = flask.request.args.get(Strings.DATA_FORMAT.value, DataFormat.RAW.value)
+
+        dataset_shape, shape, dtype, chunks = DatatypeFacade.get_dataset_stream(datatype_gid, dataset_name,
+                                                                                 hyperslab, data_format)
+        headers = {Strings.DATASET_SHAPE_HEADER.value: str(list(dataset_shape)),
+                   Strings.ARRAY_SHAPE_HEADER.value: str(list(shape)),
+                   Strings.ARRAY_TYPE_HEADER.value: dtype.str}
+        return flask.Response(chunks, mimetype='application/octet-stream', headers=headers)
+
+
 class GetExtraInfoForDatatypeResource(RestResource):
 
     def __init__(self, *args, **kwargs):
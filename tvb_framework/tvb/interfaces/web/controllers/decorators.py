@@ -118,13 +118,14 @@ def ndarray_to_http_binary(func):
         if x.dtype not in [numpy.float32, numpy.float64, numpy.int32]:
             raise ValueError('Datatype not supported by binary transport %s' % x.dtype)
 
-        x = numpy.ascontiguousarray(x)
+        # javascript typed arrays read the bytes in the (little endian) platform order
+        x = numpy.ascontiguousarray(x, dtype=x.dtype.newbyteorder('<'))
         cherrypy.response.headers["Content-Type"] = "application/x.ndarray"
         cherrypy.response.headers["Content-Length"] = x.nbytes
         cherrypy.response.headers["X-Array-Shape"] = str(x.shape)
         cherrypy.response.headers["X-Array-Type"] = str(x.dtype)
 
-        return x.tostring()
+        return x.tobytes()
 
     return deco
 
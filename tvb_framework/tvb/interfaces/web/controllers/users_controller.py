@@ -374,7 +374,8 @@ class UserController(BaseController):
         """
         Check if all storage updates are done
         """
-        while TvbProfile.current.version.DATA_CHECKED_TO_VERSION < TvbProfile.current.version.DATA_VERSION:
+        while (TvbProfile.current.version.DATA_CHECKED_TO_VERSION < TvbProfile.current.version.DATA_VERSION
+               and not TvbProfile.current.version.LAZY_FILE_UPGRADE):
             time.sleep(2)
 
         return dict(message=FilesUpdateManager.MESSAGE, status=FilesUpdateManager.STATUS)
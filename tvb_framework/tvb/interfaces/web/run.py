@@ -49,7 +49,7 @@ from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.decorators import user_environment_execution
 from tvb.core.services.exceptions import InvalidSettingsException
 from tvb.core.services.hpc_operation_service import HPCOperationService
-from tvb.core.services.backend_clients.standalone_client import StandAloneClient
+from tvb.core.services.backend_clients.standalone_client import StandAloneClient, WORKER_POOL
 from tvb.interfaces.web.controllers.base_controller import BaseController
 from tvb.interfaces.web.controllers.burst.dynamic_model_controller import DynamicModelController
 from tvb.interfaces.web.controllers.burst.exploration_controller import ParameterExplorationController
@@ -184,6 +184,9 @@ def init_cherrypy(arguments=None):
             TvbProfile.current.OPERATIONS_BACKGROUND_JOB_INTERVAL, StandAloneClient.process_queued_operations,
             bus=cherrypy.engine)
         operations_job.start()
+        if not TvbProfile.current.cluster.IS_DEPLOY:
+            # Have the operation workers import TVB while the web server starts
+            WORKER_POOL.start()
 
     # HTTP Server is fired now #
     cherrypy.engine.start()
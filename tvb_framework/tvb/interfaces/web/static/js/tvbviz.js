@@ -90,6 +90,27 @@ tv.util = {
         //NOTE: If we need to add slices for the other dimensions pass them as the 'specific_slices' parameter.
         //      Method called is from time_series.py.
         $.getJSON(readDataURL, callback);
+    },
+
+    /**
+     * Binary counterpart of get_array_slice. Picks the coarsest level of the server side min/max pyramid
+     * which still gives at least pointLimit blocks over the slice, and calls back with the NdArr of shape
+     * (1, time, channels) for the raw data or (2, blocks, channels) with the min and max of each block.
+     */
+    get_array_slice_lod: function (binaryURL, slices, lodFactor, pointLimit, callback, channels, currentMode,
+                                   currentStateVar) {
+        var sl = slices[0], level = 0, blockSize = 1;
+        while ((sl.hi - sl.lo) / (blockSize * lodFactor) >= pointLimit) {
+            blockSize *= lodFactor;
+            level++;
+        }
+        var param_list = setStateModeStep(currentStateVar, currentMode, 1);
+        var readDataURL = binaryURL + "?from_idx=" + sl.lo + ";to_idx=" + sl.hi + ";level=" + level +
+            ";specific_slices=[null," + param_list[0] + ",null," + param_list[1] + "]" +
+            ";channels_list=" + JSON.stringify(channels);
+        HLPR_fetchNdArray(readDataURL, function (ndarr) {
+            callback(ndarr, blockSize);
+        });
     }
 };
 
@@ -565,10 +586,35 @@ tv.plot = {
         f.render = function () {
             f.status_line.text("waiting for data from server...");
             //console.log(f.baseURL(), f.current_slice())
-            tv.util.get_array_slice(f.baseURL(), f.current_slice(), f.render_callback, f.channels(), f.mode(), f.state_var());
+            if (f.binaryURL()) {
+                tv.util.get_array_slice_lod(f.binaryURL(), f.current_slice(), f.lod_factor(), f.point_limit(),
+                    f.render_lod_callback, f.channels(), f.mode(), f.state_var());
+            } else {
+                tv.util.get_array_slice(f.baseURL(), f.current_slice(), f.render_callback, f.channels(), f.mode(), f.state_var());
+            }
         };
 
-        f.render_callback = function (data) {
+        /* interleave the min and max of each block, placed at the block start and half a block later */
+        f.render_lod_callback = function (ndarr, blockSize) {
+            var sl = f.current_slice()[0]
+                , n_rows = ndarr.shape[0]
+                , n_time = ndarr.shape[1]
+                , n_chan = ndarr.shape[2]
+                , start = blockSize === 1 ? sl.lo : Math.floor(sl.lo / blockSize) * blockSize
+                , t_step = blockSize / n_rows
+                , data = [], ts = [];
+
+            for (var i = 0; i < n_time; i++) {
+                for (var r = 0; r < n_rows; r++) {
+                    data.push(Array.prototype.slice.call(ndarr.buffer, (r * n_time + i) * n_chan,
+                        (r * n_time + i + 1) * n_chan));
+                    ts.push(f.t0() + f.dt() * (start + i * blockSize + r * t_step));
+                }
+            }
+            f.render_callback(data, ts, t_step);
+        };
+
+        f.render_callback = function (data, times, samples_di) {
 
             var kwd = kwd || {};
 
@@ -577,7 +623,7 @@ tv.plot = {
             /* reformat data into normal ndar style */
             var flat = []
                 , sl = f.current_slice()[0]
-                , shape = [(sl.hi - sl.lo) / sl.di, f.shape()[2]]
+                , shape = [times ? times.length : (sl.hi - sl.lo) / sl.di, f.shape()[2]]
                 , strides = [f.shape()[2], 1];
 
             for (var i = 0; i < shape[0]; i++) {
@@ -586,11 +632,14 @@ tv.plot = {
                 }
             }
 
-            var ts = [], t0 = f.t0(), dt = f.dt();
+            var ts = times || [], t0 = f.t0(), dt = f.dt();
 
-            for (var ii = 0; ii < shape[0]; ii++) {
-                ts.push(t0 + dt * sl.lo + ii * dt * sl.di);
+            if (!times) {
+                for (var ii = 0; ii < shape[0]; ii++) {
+                    ts.push(t0 + dt * sl.lo + ii * dt * sl.di);
+                }
             }
+            f.samples_di = samples_di || sl.di;
 
             f.ts(tv.ndar.ndfrom({data: ts, shape: [shape[0]], strides: [1]}));
             f.ys(tv.ndar.ndfrom({data: flat, shape: shape, strides: strides}));
@@ -831,7 +880,7 @@ tv.plot = {
             }
 
             f.da_lines = da_lines;
-            f.da_x_dt = f.dt() * f.current_slice()[0].di;
+            f.da_x_dt = f.dt() * (f.samples_di || f.current_slice()[0].di);
             f.da_x = da_x;
             f.da_xs = [0, da_xs[da_xs.length - 1]].concat(da_xs, [0]); // filled area needs start == end
             f.da_y = da_y;
@@ -1033,7 +1082,7 @@ tv.plot = {
             f.gp_br_ctx_x.append("g").classed("brush", true).call(f.br_ctx_x).selectAll("rect").attr("height", f.sz_ctx_x.y);
         };
 
-        f.parameters = ["w", "h", "p", "baseURL", "preview", "labels", "shape",
+        f.parameters = ["w", "h", "p", "baseURL", "binaryURL", "lod_factor", "preview", "labels", "shape",
             "t0", "dt", "ts", "ys", "point_limit", "channels", "mode", "state_var"];
         f.parameters.map(function (name) {
             f[name] = tv.util.gen_access(f, name);
@@ -78,6 +78,7 @@ class WebStructure(object):
     SUB_SECTION_ANALYZE_16 = "bctdensity"
     SUB_SECTION_ANALYZE_17 = "bctdistance"
     SUB_SECTION_ANALYZE_18 = "fcd_calculator"
+    SUB_SECTION_ANALYZE_19 = "graphmetrics"
 
     ### Subsections for STIMULUS section.
     SUB_SECTION_STIMULUS_MENU = "stimulus"
@@ -267,4 +268,5 @@ class WebStructure(object):
         SUB_SECTION_ANALYZE_16: "brain-connectivity-toolbox-analyzers",
         SUB_SECTION_ANALYZE_17: "brain-connectivity-toolbox-analyzers",
         SUB_SECTION_ANALYZE_18: "functional-connectivity-dynamics-metric",
+        SUB_SECTION_ANALYZE_19: "brain-connectivity-toolbox-analyzers",
     }
@@ -99,13 +99,15 @@ function _updateScalingFromSlider(value){
  * Do any required initializations in order to start the viewer.
  *
  * @param baseURL: the base URL from tvb in order to call datatype methods
+ * @param binaryURL: URL for the binary, level of detail data pages; empty to read JSON pages from baseURL
+ * @param lodFactor: length ratio between consecutive levels of detail
  * @param isPreview: boolean that tell if we are in burst page preview mode or full viewer
  * @param dataShape: the shape of the input timeseries
  * @param t0: starting time
  * @param dt: time increment
  * @param channelLabels: a list with the labels for all the channels
  */
-function initTimeseriesViewer(baseURL, isPreview, dataShape, t0, dt, channelLabels, filterGid) {
+function initTimeseriesViewer(baseURL, binaryURL, lodFactor, isPreview, dataShape, t0, dt, channelLabels, filterGid) {
 
     // Store the list with all the labels since we need it on channel selection refresh
     allChannelLabels = channelLabels;
@@ -125,7 +127,7 @@ function initTimeseriesViewer(baseURL, isPreview, dataShape, t0, dt, channelLabe
     dataShape[2] = TS_SVG_selectedChannels.length;
 
     // configure data
-    ts.baseURL(baseURL).preview(isPreview).mode(0).state_var(0);
+    ts.baseURL(baseURL).binaryURL(binaryURL).lod_factor(+lodFactor).preview(isPreview).mode(0).state_var(0);
     ts.shape(dataShape).t0(t0).dt(dt);
     ts.labels(_compute_labels_for_current_selection());
     ts.channels(TS_SVG_selectedChannels);
@@ -184,7 +186,8 @@ function refreshChannels() {
     var new_ts = tv.plot.time_series();
 
     // configure data
-    new_ts.baseURL(tsView.baseURL()).preview(tsView.preview()).mode(tsView.mode()).state_var(tsView.state_var());
+    new_ts.baseURL(tsView.baseURL()).binaryURL(tsView.binaryURL()).lod_factor(tsView.lod_factor())
+        .preview(tsView.preview()).mode(tsView.mode()).state_var(tsView.state_var());
     new_ts.shape(shape).t0(tsView.t0()).dt(tsView.dt());
     new_ts.labels(selectedLabels);
     // Usually the svg component shows the channels stored in TS_SVG_selectedChannels
@@ -25,6 +25,11 @@
 #
 
 import os
+from types import SimpleNamespace
+
+import numpy
+import scipy.fft
+from scipy.signal import convolve, correlate
 from tvb.adapters.analyzers.cross_correlation_adapter import CrossCorrelateAdapter, PearsonCorrelationCoefficientAdapter
 from tvb.adapters.analyzers.fcd_adapter import FunctionalConnectivityDynamicsAdapter
 from tvb.adapters.analyzers.fmri_balloon_adapter import BalloonModelAdapter
@@ -42,6 +47,9 @@ from tvb.adapters.datatypes.h5.spectral_h5 import WaveletCoefficientsH5, Coheren
     ComplexCoherenceSpectrumH5
 from tvb.adapters.datatypes.h5.temporal_correlations_h5 import CrossCorrelationH5
 from tvb.adapters.datatypes.h5.time_series_h5 import TimeSeriesRegionH5
+from tvb.analyzers.node_complex_coherence import calculate_complex_cross_coherence
+from tvb.analyzers.wavelet import _morlet_kernel, _wavelet_transform_blocks
+from tvb.datatypes.time_series import TimeSeries
 from tvb.core.entities.file.simulator.datatype_measure_h5 import DatatypeMeasureH5
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 
@@ -66,6 +74,43 @@ class TestAdapters(TransactionalTestCase):
         result_h5 = wavelet_adapter.path_for(WaveletCoefficientsH5, wavelet_idx.gid)
         assert os.path.exists(result_h5)
 
+    def test_wavelet_adapter_node_blocks(self, time_series_index_factory, operation_from_existing_op_factory,
+                                         monkeypatch):
+        ts_index = time_series_index_factory()
+        wavelet_op, project_id = operation_from_existing_op_factory(ts_index.fk_from_operation)
+
+        wavelet_adapter = ContinuousWaveletTransformAdapter()
+        view_model = wavelet_adapter.get_view_model_class()()
+        view_model.time_series = ts_index.gid
+        view_model.sample_period = ts_index.sample_period
+        wavelet_adapter.configure(view_model)
+        wavelet_adapter.extract_operation_data(wavelet_op)
+
+        node_size = wavelet_adapter.result_size(view_model.frequencies, view_model.sample_period,
+                                                wavelet_adapter.input_shape[:2] + (1,) + wavelet_adapter.input_shape[3:],
+                                                ts_index.sample_period)
+        monkeypatch.setattr("tvb.adapters.analyzers.wavelet_adapter.WAVELET_NODE_BLOCK_SIZE", 2 * node_size)
+        assert wavelet_adapter._nodes_per_block(view_model) == 2
+        wavelet_idx = wavelet_adapter.launch(view_model)
+
+        with WaveletCoefficientsH5(wavelet_adapter.path_for(WaveletCoefficientsH5, wavelet_idx.gid)) as wavelet_h5:
+            shape = wavelet_h5.array_data.shape
+        # (frequencies, time, state variables, nodes, modes), nodes appended block after block
+        assert shape[1:] == wavelet_adapter.input_shape
+
+    def test_wavelet_blocks_against_convolve(self):
+        data = numpy.random.randn(301, 4)
+        kernels = [_morlet_kernel(f0, 1.0 / (2 * numpy.pi * f0 / 5.0), 1.0, 2.0) for f0 in (0.1, 0.25, 0.4)]
+        for temporal_step in (1, 3):
+            blocks = list(_wavelet_transform_blocks(data, kernels, temporal_step, workers=2))
+            for scales, block in blocks:
+                assert block.shape == (scales.stop - scales.start, int(numpy.ceil(301 / temporal_step)), 4)
+                for row, wvlt in enumerate(kernels[scales]):
+                    full_kernel = numpy.hstack((numpy.conjugate(wvlt[:0:-1]), wvlt))
+                    for channel in range(4):
+                        expected = convolve(data[:, channel], full_kernel, 'same')[::temporal_step]
+                        numpy.testing.assert_allclose(block[row, :, channel], expected, atol=1e-10)
+
     def test_pca_adapter(self, time_series_index_factory, operation_from_existing_op_factory):
         ts_index = time_series_index_factory()
 
@@ -142,6 +187,23 @@ class TestAdapters(TransactionalTestCase):
         result_h5 = cross_correlation_adapter.path_for(CrossCorrelationH5, cross_correlation_idx.gid)
         assert os.path.exists(result_h5)
 
+    def test_cross_correlation_against_correlate(self):
+        data = numpy.random.randn(101, 2, 5, 1)
+        # offsets of correlate(mode="same") for 101 points are -50..50; keep only -6..6
+        lags = CrossCorrelateAdapter._lags(data.shape[0], 0.5, max_lag=3.0)
+        assert numpy.array_equal(lags, numpy.arange(-6, 7))
+
+        nfft = CrossCorrelateAdapter._fft_length(data.shape[0], lags)
+        spectra = numpy.fft.rfft(data - data.mean(axis=0), n=nfft, axis=0)
+        result = CrossCorrelateAdapter._cross_correlate(spectra, slice(1, 3), lags, nfft)
+        assert result.shape == (len(lags), 2, 5, 2, 1)
+        for var in range(2):
+            centered = data[:, var, :, 0] - data[:, var, :, 0].mean(axis=0)
+            for n1 in range(1, 3):
+                for n2 in range(5):
+                    expected = correlate(centered[:, n1], centered[:, n2], mode="same")[lags + 50]
+                    numpy.testing.assert_allclose(result[:, n1 - 1, n2, var, 0], expected, atol=1e-10)
+
     def test_pearson_correlation_coefficient_adapter(self, time_series_index_factory,
                                                      operation_from_existing_op_factory):
         # To be fixed once we have the migrated importers
@@ -204,6 +266,69 @@ class TestAdapters(TransactionalTestCase):
                                                             complex_coherence_spectrum_idx.gid)
         assert os.path.exists(result_h5)
 
+    def test_node_complex_coherence_adapter_node_blocks(self, time_series_index_factory,
+                                                        operation_from_existing_op_factory, monkeypatch):
+        ts = TimeSeries(data=numpy.random.randn(4000, 1, 3, 1), sample_period=1.0)
+        ts_index = time_series_index_factory(ts=ts)
+        complex_coherence_op, project_id = operation_from_existing_op_factory(ts_index.fk_from_operation)
+
+        node_complex_coherence_adapter = NodeComplexCoherenceAdapter()
+        view_model = node_complex_coherence_adapter.get_view_model_class()()
+        view_model.time_series = ts_index.gid
+        node_complex_coherence_adapter.configure(view_model)
+        node_complex_coherence_adapter.extract_operation_data(complex_coherence_op)
+
+        monkeypatch.setattr("tvb.adapters.analyzers.node_complex_coherence_adapter.COMPLEX_COHERENCE_BLOCK_SIZE", 1)
+        rfft_calls = []
+
+        def counting_rfft(*args, **kwargs):
+            rfft_calls.append(args[0].shape)
+            return scipy.fft.rfft(*args, **kwargs)
+
+        monkeypatch.setattr("tvb.analyzers.node_complex_coherence.fft", SimpleNamespace(rfft=counting_rfft))
+        complex_coherence_spectrum_idx = node_complex_coherence_adapter.launch(view_model)
+        monkeypatch.undo()
+        # the segment spectra are computed once, not again for each of the 3 blocks of rows
+        assert len(rfft_calls) == 1
+
+        expected = calculate_complex_cross_coherence(ts, view_model.epoch_length, view_model.segment_length,
+                                                     view_model.segment_shift, view_model.window_function,
+                                                     view_model.average_segments, view_model.subtract_epoch_average,
+                                                     view_model.zeropad, view_model.detrend_ts, view_model.max_freq,
+                                                     view_model.npat)
+        result_path = node_complex_coherence_adapter.path_for(ComplexCoherenceSpectrumH5,
+                                                              complex_coherence_spectrum_idx.gid)
+        with ComplexCoherenceSpectrumH5(result_path) as result_h5:
+            numpy.testing.assert_allclose(result_h5.array_data.load(), expected.array_data)
+            numpy.testing.assert_allclose(result_h5.cross_spectrum.load(), expected.cross_spectrum)
+
+    def test_complex_coherence_against_loops(self):
+        data = numpy.random.randn(3000, 4).astype(numpy.float32)
+        ts = TimeSeries(data=data, sample_period=1.0)
+        nepochs, nseg, seg_tpts, nfreq = 3, 3, 500, 64
+        for average_segments in (True, False):
+            result = calculate_complex_cross_coherence(ts, 1000.0, 500.0, 250.0, 'hanning', average_segments,
+                                                       True, 0, False, nfreq, 1.0, nodes=slice(1, 3))
+            cs = numpy.zeros((4, 4, nfreq, nseg), dtype=numpy.complex128)
+            av = numpy.zeros((4, nfreq, nseg), dtype=numpy.complex128)
+            for j in range(nepochs):
+                for i in range(nseg):
+                    start = j * 1000 + i * 250
+                    spectra = numpy.fft.fft(data[start:start + seg_tpts] * numpy.hanning(seg_tpts)[:, None], axis=0)
+                    for f in range(nfreq):
+                        cs[:, :, f, i] += numpy.outer(spectra[f], spectra[f].conj())
+                        av[:, f, i] += spectra[f]
+            if average_segments:
+                cs, av = cs.sum(axis=-1) / nseg, av.sum(axis=-1) / nseg
+            cs, av = cs / nepochs, av / nepochs
+            cs -= av[:, None] * av[None].conj()
+            power = numpy.einsum('aa...->a...', cs).real
+            coh = cs / numpy.sqrt(power[:, None] * power[None])
+
+            assert result.cross_spectrum.shape == cs[1:3].shape
+            numpy.testing.assert_allclose(result.cross_spectrum, cs[1:3], rtol=1e-4, atol=1e-2)
+            numpy.testing.assert_allclose(result.array_data, coh[1:3], rtol=1e-4, atol=1e-4)
+
     def test_fcd_adapter(self, time_series_region_index_factory, connectivity_index_factory,
                          connectivity_factory, region_mapping_factory, surface_factory,
                          operation_from_existing_op_factory):
@@ -231,6 +356,22 @@ class TestAdapters(TransactionalTestCase):
         result_h5 = fcd_adapter.path_for(FcdH5, fcd_idx[0].gid)
         assert os.path.exists(result_h5)
 
+    def test_fcd_matrix_against_corrcoef(self):
+        data = numpy.random.randn(300, 6).cumsum(axis=0)
+        # fractional spanning, such that windows differ in length
+        window_starts = numpy.cumsum(numpy.r_[-2.5, numpy.full(20, 2.5)])[1:]
+        window_ends = (window_starts + 40.5).astype(int) + 1
+        window_starts = window_starts.astype(int)
+
+        fc_stream = [numpy.corrcoef(data[start:end].T)[numpy.triu_indices(6, 1)]
+                     for start, end in zip(window_starts, window_ends)]
+        expected_fcd = numpy.corrcoef(fc_stream)
+
+        # small chunks, such that several of them are computed
+        fc_stream = FunctionalConnectivityDynamicsAdapter._compute_fc_stream(data, window_starts, window_ends, 5000)
+        fcd = FunctionalConnectivityDynamicsAdapter._compute_fcd(fc_stream, 500)
+        numpy.testing.assert_allclose(fcd, expected_fcd, atol=1e-12)
+
     def test_fmri_balloon_adapter(self, time_series_region_index_factory,
                                   connectivity_factory, region_mapping_factory, surface_factory,
                                   operation_from_existing_op_factory):
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+
+import json
+import numpy
+from tvb.adapters.analyzers.graph_metrics_suite_adapter import GraphMetricsSuiteAdapter, GraphMetricsSuiteModel, \
+    GRAPH_MEASURES, KIND_GLOBAL, KIND_MATRIX, KIND_NODE, compute_graph_measures
+from tvb.adapters.datatypes.db.graph import ConnectivityMeasureIndex
+from tvb.adapters.datatypes.db.mapped_value import ValueWrapperIndex
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+
+
+def _random_weights(nr_regions, seed):
+    rng = numpy.random.default_rng(seed)
+    weights = rng.random((nr_regions, nr_regions)) * (rng.random((nr_regions, nr_regions)) < 0.4)
+    weights = weights + weights.T
+    numpy.fill_diagonal(weights, 0)
+    return weights
+
+
+class TestGraphMetricsSuite(TransactionalTestCase):
+    """
+    Test the adapter computing several graph measures for several connectivities in one operation.
+    """
+
+    def test_compute_graph_measures(self):
+        weights = _random_weights(12, seed=3)
+        results = compute_graph_measures(weights, list(GRAPH_MEASURES))
+
+        assert list(results) == list(GRAPH_MEASURES)
+        assert numpy.allclose(results["degree"], (weights > 0).sum(axis=0))
+        assert numpy.allclose(results["strength"], weights.sum(axis=0))
+        for name, (kind, _, _) in GRAPH_MEASURES.items():
+            expected_shape = {KIND_NODE: (12,), KIND_GLOBAL: (), KIND_MATRIX: (12, 12)}[kind]
+            assert results[name].shape == expected_shape, name
+
+    def test_compute_graph_measures_in_processes(self):
+        weights = _random_weights(12, seed=5)
+        measures = ["degree", "betweenness_weighted", "characteristic_path_length", "distance_weighted"]
+        serial = compute_graph_measures(weights, measures)
+        parallel = compute_graph_measures(weights, measures, workers=2)
+
+        assert list(serial) == list(parallel)
+        for name in serial:
+            assert numpy.allclose(serial[name], parallel[name])
+
+    def test_launch(self, connectivity_factory, connectivity_index_factory, operation_factory):
+        """
+        Node-wise measures are each stored as a region-length ConnectivityMeasure, global ones as ValueWrappers.
+        """
+        operation = operation_factory()
+        connectivity = connectivity_factory(10)
+        connectivity.weights = _random_weights(10, seed=0)
+        connectivity_index = connectivity_index_factory(conn=connectivity, op=operation)
+
+        view_model = GraphMetricsSuiteModel()
+        view_model.connectivity = connectivity_index.gid
+        view_model.measures = ["degree", "local_efficiency", "global_efficiency", "modularity"]
+
+        adapter = GraphMetricsSuiteAdapter()
+        adapter.extract_operation_data(operation)
+        results = adapter.launch(view_model)
+
+        assert len(results) == 4
+        for result, name in zip(results[:2], ["degree", "local_efficiency"]):
+            assert isinstance(result, ConnectivityMeasureIndex)
+            assert result.fk_connectivity_gid == connectivity_index.gid
+            assert json.loads(result.shape) == [10]
+            assert result.title == name
+        for result, name in zip(results[2:], ["global_efficiency", "modularity"]):
+            assert isinstance(result, ValueWrapperIndex)
+            assert result.data_name == name
+            assert result.data_type == 'float'
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+"""
+Benchmark for how fast monitor samples are appended into H5 files during a simulation.
+With a Raw monitor sampling every 0.1 ms, writes dominate the wall time of SimulatorAdapter.launch.
+"""
+
+import pytest
+from tvb.adapters.datatypes.h5.time_series_h5 import TimeSeriesRegionH5
+from tvb.datatypes.connectivity import Connectivity
+from tvb.simulator.integrators import HeunDeterministic
+from tvb.simulator.monitors import Raw
+from tvb.simulator.simulator import Simulator
+
+
+@pytest.fixture(scope='module')
+def raw_results():
+    conn = Connectivity.from_file()
+    sim = Simulator(connectivity=conn, integrator=HeunDeterministic(dt=0.1), monitors=[Raw()],
+                    simulation_length=1000.0).configure()
+    return [result for result in sim()]
+
+
+def _write_time_series(path, results):
+    ts_h5 = TimeSeriesRegionH5(path)
+    # same sequence of calls as SimulatorAdapter.launch, for each monitor sample
+    for result in results:
+        if result[0] is not None:
+            ts_h5.write_time_slice([result[0][0]])
+            ts_h5.write_data_slice([result[0][1]])
+    data_shape = ts_h5.read_data_shape()
+    ts_h5.close()
+    return data_shape
+
+
+def test_raw_monitor_writes(benchmark, tmph5factory, raw_results):
+    data_shape = benchmark(lambda: _write_time_series(tmph5factory(), raw_results))
+    assert data_shape == (len(raw_results),) + raw_results[0][0][1].shape
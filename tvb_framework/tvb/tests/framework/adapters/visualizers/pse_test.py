@@ -32,8 +32,11 @@
 import json
 import numpy
 
+from tvb.adapters.datatypes.db.mapped_value import DatatypeMeasureIndex
+from tvb.core.entities.model.model_operation import STATUS_STARTED
 from tvb.core.entities.storage import dao
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.adapters.visualizers.pse import PSEGrid
 from tvb.adapters.visualizers.pse_discrete import DiscretePSEAdapter
 from tvb.adapters.visualizers.pse_isocline import IsoclinePSEAdapter
 
@@ -141,3 +144,48 @@ class TestPSE(TransactionalTestCase):
         assert matrix_data[0][1] == 4
         # We replace NaN with vmin-1, which is 2 in this case:
         assert matrix_data[1][1] == 2
+
+    def test_grid_bulk_load_and_cache(self, datatype_group_factory):
+        """
+        Check the columns of the PSE grid, and that it is reloaded only after an operation changes status
+        or its measures change.
+        """
+        dt_group, _ = datatype_group_factory()
+
+        grid = PSEGrid.for_datatype_group(dt_group)
+        assert 6 == len(grid.pse_models)
+        assert sorted(set(grid.range1_column)) == [1, 3, 5]
+        assert sorted(set(grid.range2_column)) == [0.1, 0.4]
+        assert all(pse_model.source_datatype is not None for pse_model in grid.pse_models)
+        assert not numpy.isnan(grid.get_metric_column('v')).any()
+        assert numpy.isnan(grid.get_metric_column('missing')).all()
+        assert grid is PSEGrid.for_datatype_group(dt_group)
+
+        # measures are computed by separate operations, which can finish after the ones in the group
+        measure = grid.pse_models[-1].datatype_measure
+        dao.remove_entity(DatatypeMeasureIndex, measure.id)
+        grid = PSEGrid.for_datatype_group(dt_group)
+        assert numpy.isnan(grid.get_metric_column('v')[-1])
+        assert grid is PSEGrid.for_datatype_group(dt_group)
+
+        operation = grid.operations[0]
+        operation.status = STATUS_STARTED
+        dao.store_entity(operation)
+        reloaded_grid = PSEGrid.for_datatype_group(dt_group)
+        assert reloaded_grid is not grid
+        assert reloaded_grid.pse_models[0].source_datatype is None
+        assert 'No result available' in reloaded_grid.pse_models[0].prepare_node_info()['tooltip']
+
+    def test_grid_without_results_on_query_error(self, datatype_group_factory, monkeypatch):
+        """
+        Check that the PSE grid still lists the operations, without results, when those can not be read from DB.
+        """
+        dt_group, _ = datatype_group_factory()
+        monkeypatch.setattr(dao, 'get_results_for_operation_group', lambda operation_group_id: None)
+        monkeypatch.setattr(dao, 'get_measures_for_operation_group',
+                            lambda measure_class, operation_group_id: None)
+
+        grid = PSEGrid(dt_group.fk_operation_group)
+        assert 6 == len(grid.pse_models)
+        assert all(pse_model.source_datatype is None for pse_model in grid.pse_models)
+        assert numpy.isnan(grid.get_metric_column('v')).all()
@@ -29,12 +29,16 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import os
 import tvb.tests.framework.adapters
 from tvb.config.algorithm_categories import AlgorithmCategoryConfig
+from tvb.config.init import initializer
 from tvb.config.init.initializer import Introspector
-from tvb.config.init.introspector_registry import import_adapters
+from tvb.config.init.introspector_registry import import_adapters, IntrospectionRegistry
+from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.entities.model.model_operation import Algorithm, AlgorithmCategory
 from tvb.core.entities.storage import dao
+from tvb.tests.framework.adapters.dummy_adapter1 import DummyAdapter1
 from tvb.tests.framework.core.base_testcase import BaseTestCase
 
 
@@ -83,10 +87,62 @@ class TestIntrospector(BaseTestCase):
 
         assert nr_adapters_mod3 == 3
 
+    def test_introspect_from_manifest(self, tmpdir, monkeypatch):
+        """
+        Test that when adapter modules did not change, algorithms are stored from the manifest without importing them.
+        """
+        monkeypatch.setattr(IntrospectionRegistry, 'ADAPTER_MODULES',
+                            {TestCategory: (tvb.tests.framework.adapters, ALL_TEST_ADAPTERS)})
+        monkeypatch.setattr(IntrospectionRegistry, 'FAILED_ADAPTER_FILES', [])
+        introspector = Introspector()
+        introspector.manifest_path = os.path.join(str(tmpdir), Introspector.MANIFEST_FILE_NAME)
+
+        algorithm = dict.fromkeys(Introspector.ALGORITHM_FIELDS)
+        algorithm.update(module='tvb.tests.framework.adapters.dummy_adapter1', classname='DummyAdapter1',
+                         displayname='From manifest', subsection_name='dummy_adapter1',
+                         view_model='tvb.tests.framework.adapters.dummy_adapter1.DummyModel')
+        fingerprint = introspector.introspection_registry.adapters_fingerprint()
+        introspector._write_manifest(fingerprint, {TestCategory.category_name: [algorithm]})
+        assert introspector._read_manifest(fingerprint + "changed") is None
+
+        def fail_on_import(*args):
+            raise AssertionError("Adapters should not be introspected again")
+
+        monkeypatch.setattr(IntrospectionRegistry, 'adapters_imported', classmethod(lambda cls: False))
+        monkeypatch.setattr(Introspector, '_populate_algorithms', fail_on_import)
+        view_model2adapter = {}
+        monkeypatch.setattr(initializer, 'VIEW_MODEL2ADAPTER', view_model2adapter)
+        introspector.introspect()
+
+        all_categories = dao.get_algorithm_categories()
+        category_ids = [cat.id for cat in all_categories if cat.displayname == TestCategory.category_name]
+        adapters = dao.get_adapters_from_categories(category_ids)
+        assert [(adapter.classname, adapter.displayname) for adapter in adapters] == [('DummyAdapter1',
+                                                                                      'From manifest')]
+        stored_adapter = view_model2adapter['tvb.tests.framework.adapters.dummy_adapter1.DummyModel']
+        assert stored_adapter.id == adapters[0].id
+
+    def test_subclassed_adapter_does_not_reuse_parent_algorithm(self, monkeypatch):
+        """
+        Test that building an adapter subclass looks up its own Algorithm, instead of the one stored on its parent.
+        """
+
+        class DummyAdapter1Child(DummyAdapter1):
+            pass
+
+        parent_algorithm = Algorithm(DummyAdapter1.__module__, DummyAdapter1.__name__, None)
+        child_algorithm = Algorithm(DummyAdapter1Child.__module__, DummyAdapter1Child.__name__, None)
+        monkeypatch.setattr(DummyAdapter1, 'stored_adapter', parent_algorithm)
+        monkeypatch.setattr(dao, 'get_algorithm_by_module',
+                            lambda module, classname: child_algorithm if classname == 'DummyAdapter1Child' else None)
+
+        assert ABCAdapter.build_adapter_from_class(DummyAdapter1Child).stored_adapter is child_algorithm
+
     def teardown_method(self):
         all_categories = dao.get_algorithm_categories()
         category_ids = [cat.id for cat in all_categories if cat.displayname == TestCategory.category_name]
         adapters = dao.get_adapters_from_categories(category_ids)
         for algorithm in adapters:
             dao.remove_entity(Algorithm, algorithm.id)
-        dao.remove_entity(AlgorithmCategory, category_ids[0])
+        for category_id in category_ids:
+            dao.remove_entity(AlgorithmCategory, category_id)
@@ -45,6 +45,9 @@ from tvb.datatypes.sensors import Sensors
 from tvb.datatypes.surfaces import Surface
 from tvb.datatypes.structural import StructuralMRI
 from tvb.datatypes.volumes import Volume
+from tvb.simulator.integrators import HeunStochastic
+from tvb.simulator.noise import Additive, NoiseStreams
+from tvb.simulator.simulator import Simulator
 
 
 def test_store_load_region_mapping(tmph5factory, region_mapping_factory):
@@ -198,6 +201,34 @@ def test_store_load_simulation_state(tmph5factory):
     assert history_retrieved.current_step == 42
 
 
+def test_store_load_simulation_state_block_noise_stream(tmph5factory, connectivity_factory):
+    def stochastic_simulator():
+        simulator = Simulator(connectivity=connectivity_factory(4), simulation_length=4.0,
+                              integrator=HeunStochastic(noise=Additive(noise_stream=NoiseStreams.PCG64)))
+        simulator.configure()
+        return simulator
+
+    simulator = stochastic_simulator()
+    simulator.run()
+    history = SimulationHistory()
+    history.populate_from(simulator)
+    assert history.integrator_noise_stream_step == simulator.integrator.noise.block_stream_step > 0
+
+    tmp_file = tmph5factory("SimulationHistory_{}.h5".format(history.gid))
+    with SimulationHistoryH5(tmp_file) as f:
+        f.store(history)
+    history_retrieved = SimulationHistory()
+    with SimulationHistoryH5(tmp_file) as f:
+        f.load_into(history_retrieved)
+
+    branched = stochastic_simulator()
+    history_retrieved.fill_into(branched)
+    assert branched.integrator.noise.block_stream_step == simulator.integrator.noise.block_stream_step
+    shape = simulator.current_state[simulator.model.state_variable_mask].shape
+    numpy.testing.assert_array_equal(branched.integrator.noise.generate(shape),
+                                     simulator.integrator.noise.generate(shape))
+
+
 def test_store_load_projection_matrix(tmph5factory, sensors_factory, surface_factory):
     sensors = sensors_factory("SEEG", 3)
     cortical_surface = surface_factory(5, cortical=True)
@@ -25,7 +25,9 @@
 #
 
 import numpy
+from tvb.adapters.datatypes.h5 import time_series_h5
 from tvb.adapters.datatypes.h5.time_series_h5 import TimeSeriesH5
+from tvb.core.neotraits.h5 import H5File
 from tvb.datatypes.time_series import TimeSeries
 
 
@@ -88,3 +90,70 @@ def test_streaming_reads(tmph5factory):
         expected = numpy.zeros((33, nsv))
         expected[:, 1] = 1.0   # the cos(0) part
         numpy.testing.assert_array_equal(data, expected)
+
+
+def _expected_lod(data, from_idx, to_idx, level, state_var, channels):
+    factor = time_series_h5.LOD_FACTOR ** level
+    page = data[from_idx // factor * factor:-(-to_idx // factor) * factor, state_var][:, channels, 0]
+    bins = numpy.arange(0, page.shape[0], factor)
+    return numpy.stack([numpy.minimum.reduceat(page, bins), numpy.maximum.reduceat(page, bins)])
+
+
+def test_lod_pyramid_reads(tmph5factory, monkeypatch):
+    monkeypatch.setattr(time_series_h5, 'LOD_MIN_LENGTH', 16)
+    monkeypatch.setattr(time_series_h5, 'LOD_BLOCK_SIZE', 2 ** 10)
+    t = make_harmonic_ts()
+    path = tmph5factory()
+    data = numpy.random.RandomState(42).randn(1000, nsv, nspace, 1)
+
+    with TimeSeriesH5(path) as f:
+        f.store(t, scalars_only=True)
+        f.write_data_slice(data)
+        # without a pyramid, pages are decimated on the fly
+        on_the_fly = f.read_channels_page_lod(10, 900, 2, '[null, 1, null, 0]', '[0, 3]')
+        f.store_lod_pyramid()
+        assert f.storage_manager.get_data_shape('data_lod_1_min') == (250, nsv, nspace, 1)
+        assert f.storage_manager.get_data_shape('data_lod_3_max') == (16, nsv, nspace, 1)
+        stored = f.read_channels_page_lod(10, 900, 2, '[null, 1, null, 0]', '[0, 3]')
+        raw = f.read_channels_page_lod(10, 900, 0, '[null, 1, null, 0]', '[2]')
+
+    expected = _expected_lod(data, 10, 900, 2, 1, [0, 3])
+    assert stored.dtype == numpy.dtype('<f4')
+    assert stored.shape == (2, 57, 2)
+    numpy.testing.assert_allclose(stored, expected, rtol=1e-6)
+    numpy.testing.assert_allclose(on_the_fly, expected, rtol=1e-6)
+    numpy.testing.assert_allclose(raw, data[numpy.newaxis, 10:900, 1, [2], 0], rtol=1e-6)
+
+
+def test_lod_pyramid_rebuilt_after_append(tmph5factory, monkeypatch):
+    monkeypatch.setattr(time_series_h5, 'LOD_MIN_LENGTH', 16)
+    t = make_harmonic_ts()
+    path = tmph5factory()
+    data = numpy.random.RandomState(42).randn(200, nsv, nspace, 1)
+
+    with TimeSeriesH5(path) as f:
+        f.store(t, scalars_only=True)
+        f.write_data_slice(data)
+        f.store_lod_pyramid()
+        assert f.storage_manager.get_data_shape('data_lod_2_min')[0] == 13
+        f.write_data_slice(data)
+        f.store_lod_pyramid()
+        assert f.storage_manager.get_data_shape('data_lod_1_min')[0] == 100
+        assert f.storage_manager.get_data_shape('data_lod_2_min')[0] == 25
+        stored = f.read_channels_page_lod(0, 400, 1, None, '[1]')
+
+    numpy.testing.assert_allclose(stored, _expected_lod(numpy.concatenate([data, data]), 0, 400, 1, 0, [1]),
+                                  rtol=1e-6)
+
+
+def test_lod_pyramid_stored_as_derived_data(tmph5factory, monkeypatch):
+    monkeypatch.setattr(time_series_h5, 'LOD_MIN_LENGTH', 16)
+    path = tmph5factory()
+    with TimeSeriesH5(path) as f:
+        f.store(make_harmonic_ts(), scalars_only=True)
+        f.write_data_slice(numpy.random.RandomState(42).randn(200, nsv, nspace, 1))
+
+    # as done by operations for each of their results
+    with H5File.from_file(path) as f:
+        f.store_derived_data()
+        assert f.storage_manager.get_data_shape('data_lod_2_max')[0] == 13
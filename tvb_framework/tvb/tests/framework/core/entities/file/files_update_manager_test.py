@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+import os
+import socket
+import pytest
+from tvb.adapters.datatypes.h5.connectivity_h5 import ConnectivityH5
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.files_update_manager import FilesUpdateManager, UPGRADE_BACKUP_SUFFIX
+from tvb.core.entities.file.files_update_manager import UPGRADE_LOCK_SUFFIX
+from tvb.storage.h5.file.exceptions import FileMigrationException
+from tvb.storage.storage_interface import StorageInterface
+
+
+@pytest.fixture()
+def outdated_h5(tmpdir, connectivity_factory):
+    op_folder = os.path.join(str(tmpdir), 'project', '1')
+    os.makedirs(op_folder)
+    h5_path = os.path.join(op_folder, 'Connectivity.h5')
+    with ConnectivityH5(h5_path) as conn_h5:
+        conn_h5.store(connectivity_factory(2))
+    StorageInterface.get_storage_manager(h5_path).set_metadata(
+        {TvbProfile.current.version.DATA_VERSION_ATTRIBUTE: TvbProfile.current.version.DATA_VERSION - 1})
+    return h5_path
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_upgrade_file_restores_original_on_failure(outdated_h5, monkeypatch):
+    original_content = _read_bytes(outdated_h5)
+
+    def failing_update(self, script_name, input_file, **kwargs):
+        with open(input_file, 'wb') as f:
+            f.write(b'half migrated')
+        raise FileMigrationException("Failed on purpose")
+
+    monkeypatch.setattr(FilesUpdateManager, 'run_update_script', failing_update)
+
+    assert not FilesUpdateManager().upgrade_file(outdated_h5)
+    assert _read_bytes(outdated_h5) == original_content
+    assert sorted(os.listdir(os.path.dirname(outdated_h5))) == ['Connectivity.h5']
+
+
+def test_upgrade_file_skips_up_to_date_files(outdated_h5, monkeypatch):
+    upgraded = []
+
+    def update(self, script_name, input_file, **kwargs):
+        upgraded.append(input_file)
+        StorageInterface.get_storage_manager(input_file).set_metadata(
+            {TvbProfile.current.version.DATA_VERSION_ATTRIBUTE: TvbProfile.current.version.DATA_VERSION})
+
+    monkeypatch.setattr(FilesUpdateManager, 'run_update_script', update)
+    files_update_manager = FilesUpdateManager()
+
+    assert files_update_manager.upgrade_file(outdated_h5)
+    assert files_update_manager.upgrade_file(outdated_h5)
+    assert len(upgraded) == len(files_update_manager.get_update_scripts(
+        TvbProfile.current.version.DATA_VERSION - 1)) > 0
+    assert files_update_manager.is_file_up_to_date(outdated_h5)
+
+
+def _interrupt_upgrade(h5_path, lock_owner):
+    # Leave the storage as a process killed in the middle of an upgrade would
+    with open(h5_path + UPGRADE_LOCK_SUFFIX, 'w') as f:
+        f.write(lock_owner)
+    StorageInterface.copy_file(h5_path, h5_path + UPGRADE_BACKUP_SUFFIX)
+    with open(h5_path, 'wb') as f:
+        f.write(b'half migrated')
+
+
+def _dead_lock_owner():
+    # Our own PID, but with another start time, as a dead process whose PID got reused
+    return "%s %d %r" % (socket.gethostname(), os.getpid(), 1.0)
+
+
+def test_restore_interrupted_upgrades(outdated_h5):
+    original_content = _read_bytes(outdated_h5)
+    _interrupt_upgrade(outdated_h5, _dead_lock_owner())
+
+    project_folder = os.path.dirname(os.path.dirname(outdated_h5))
+    FilesUpdateManager()._restore_interrupted_upgrades([project_folder])
+
+    assert _read_bytes(outdated_h5) == original_content
+    assert sorted(os.listdir(os.path.dirname(outdated_h5))) == ['Connectivity.h5']
+
+
+def test_restore_keeps_upgrades_of_live_processes(outdated_h5):
+    _interrupt_upgrade(outdated_h5, FilesUpdateManager._current_lock_owner())
+
+    project_folder = os.path.dirname(os.path.dirname(outdated_h5))
+    FilesUpdateManager()._restore_interrupted_upgrades([project_folder])
+
+    assert _read_bytes(outdated_h5) == b'half migrated'
+    assert os.path.exists(outdated_h5 + UPGRADE_LOCK_SUFFIX)
+
+
+def test_upgrade_file_takes_over_abandoned_lock(outdated_h5, monkeypatch):
+    _interrupt_upgrade(outdated_h5, _dead_lock_owner())
+
+    def update(self, script_name, input_file, **kwargs):
+        StorageInterface.get_storage_manager(input_file).set_metadata(
+            {TvbProfile.current.version.DATA_VERSION_ATTRIBUTE: TvbProfile.current.version.DATA_VERSION})
+
+    monkeypatch.setattr(FilesUpdateManager, 'run_update_script', update)
+    files_update_manager = FilesUpdateManager()
+
+    assert files_update_manager.upgrade_file(outdated_h5)
+    assert files_update_manager.is_file_up_to_date(outdated_h5)
+    assert sorted(os.listdir(os.path.dirname(outdated_h5))) == ['Connectivity.h5']
+
+
+def test_upgrade_file_on_access_checks_each_file_once(outdated_h5, monkeypatch):
+    burst_match_dicts = []
+
+    def update(self, script_name, input_file, burst_match_dict=None, **kwargs):
+        burst_match_dicts.append(burst_match_dict)
+        StorageInterface.get_storage_manager(input_file).set_metadata(
+            {TvbProfile.current.version.DATA_VERSION_ATTRIBUTE: TvbProfile.current.version.DATA_VERSION})
+
+    monkeypatch.setattr(FilesUpdateManager, 'run_update_script', update)
+    monkeypatch.setattr(FilesUpdateManager, 'is_lazy_upgrade_pending', staticmethod(lambda: True))
+    monkeypatch.setattr(FilesUpdateManager, 'LAZY_UPGRADED_PATHS', set())
+
+    FilesUpdateManager.upgrade_file_on_access(outdated_h5)
+    assert FilesUpdateManager().is_file_up_to_date(outdated_h5)
+    # update scripts look bursts up in the dict, as during the bulk upgrade
+    assert len(burst_match_dicts) > 0
+    assert all(match_dict is FilesUpdateManager.LAZY_BURST_MATCH_DICT for match_dict in burst_match_dicts)
+
+    def fail_on_open(self, file_path):
+        raise AssertionError("An upgraded file should not be opened again to check its version")
+
+    monkeypatch.setattr(FilesUpdateManager, 'get_file_data_version', fail_on_open)
+    FilesUpdateManager.upgrade_file_on_access(outdated_h5)
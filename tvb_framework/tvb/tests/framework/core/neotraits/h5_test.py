@@ -24,10 +24,12 @@
 #
 #
 
+import h5py
 import numpy
 from tvb.basic.neotraits.api import Attr, NArray
+from tvb.basic.profile import TvbProfile
 from .data import FooDatatype, BarDatatype, BazDataType, PropsDataType
-from tvb.core.neotraits.h5 import H5File, DataSet, Scalar, Reference
+from tvb.core.neotraits.h5 import H5File, DataSet, DataSetLayout, Scalar, Reference
 
 
 class BazFile(H5File):
@@ -151,6 +153,91 @@ def test_append(tmph5factory):
         assert meta.max == 3
 
 
+class SignalFile(H5File):
+    def __init__(self, path):
+        super(SignalFile, self).__init__(path)
+        self.signal = DataSet(NArray(), self, name='signal', expand_dimension=0)
+
+
+class CompressedSignalFile(H5File):
+    def __init__(self, path):
+        super(CompressedSignalFile, self).__init__(path)
+        layout = DataSetLayout(time_dimension=0, space_dimensions=(2,), compression='gzip', shuffle=True)
+        self.signal = DataSet(NArray(), self, name='signal', expand_dimension=0, layout=layout)
+
+
+def test_dataset_layout_chunks():
+    layout = DataSetLayout(time_dimension=0, space_dimensions=(2,))
+    itemsize = numpy.dtype(float).itemsize
+
+    region_chunks = layout.chunks((1, 2, 76, 1), itemsize, grow_dimension=0)
+    assert region_chunks[1:] == (2, 76, 1)
+    assert region_chunks[0] > 1
+    assert numpy.prod(region_chunks) * itemsize <= layout.chunk_size
+
+    surface_chunks = layout.chunks((1, 1, 16384, 1), itemsize, grow_dimension=0)
+    assert 1 < surface_chunks[2] < 16384
+    assert surface_chunks[0] > 1
+
+    assert layout.chunks((10, 1, 16384, 1), itemsize)[0] == 10
+
+
+def test_append_with_layout(tmph5factory):
+    pth = tmph5factory()
+    data = numpy.random.random((50, 1, 76, 1))
+
+    with CompressedSignalFile(pth) as f:
+        for i in range(data.shape[0]):
+            f.signal.append(data[i:i + 1])
+
+    with h5py.File(pth, 'r') as f:
+        assert f['signal'].compression == 'gzip'
+        assert f['signal'].shuffle
+        assert f['signal'].chunks[2] == 76
+        numpy.testing.assert_equal(f['signal'][()], data)
+
+
+def test_compressible_layout_follows_setting(tmph5factory, monkeypatch):
+    layout = DataSetLayout(time_dimension=0, space_dimensions=(2,), compressible=True)
+    data = numpy.random.random((50, 1, 76, 1))
+
+    for compress in (False, True):
+        monkeypatch.setattr(TvbProfile.current, 'COMPRESS_H5_DATA', compress)
+        pth = tmph5factory()
+        with SignalFile(pth) as f:
+            f.signal.layout = layout
+            f.signal.append(data)
+
+        with h5py.File(pth, 'r') as f:
+            assert f['signal'].compression == ('gzip' if compress else None)
+            assert f['signal'].chunks[2] == 76
+
+
+def test_rewrite_layout(tmph5factory):
+    pth = tmph5factory()
+    data = numpy.random.random((50, 1, 76, 1))
+
+    with SignalFile(pth) as f:
+        f.scalar_int = Scalar(Attr(int), f, name='scalar_int')
+        f.scalar_int.store(3)
+        f.signal.append(data)
+
+    with SignalFile(pth) as f:
+        assert not f.rewrite_layout()
+
+    with CompressedSignalFile(pth) as f:
+        assert f.rewrite_layout()
+
+    with h5py.File(pth, 'r') as f:
+        assert f['signal'].compression == 'gzip'
+        assert f['signal'].maxshape == (None, 1, 76, 1)
+
+    with CompressedSignalFile(pth) as f:
+        numpy.testing.assert_equal(f.signal.load(), data)
+        assert f.signal.get_cached_metadata().max == data.max()
+        assert f.get_metadata_param(pth, 'scalar_int') == 3
+
+
 def test_props_datatype_file(tmph5factory):
 
     datatype = PropsDataType(n_node=3)
@@ -28,6 +28,7 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import json
 import pytest
 import uuid
 
@@ -39,6 +40,7 @@ from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.services.operation_service import OperationService
 from tvb.core.services.project_service import initialize_storage, ProjectService
 from tvb.storage.storage_interface import StorageInterface
+from tvb.tests.framework.adapters.dummy_adapter1 import DummyModel as DummyModel1
 from tvb.tests.framework.adapters.dummy_adapter2 import DummyAdapter2
 from tvb.tests.framework.adapters.dummy_adapter3 import *
 from tvb.tests.framework.core.base_testcase import BaseTestCase
@@ -123,6 +125,34 @@ class TestOperationService(BaseTestCase):
         datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
         assert dt.fk_datatype_group == datatype_group.id, "DataTypeGroup is incorrect"
 
+    def test_fire_operation_group(self, test_adapter_factory):
+        """
+        Test that view models launched together run as one operation group, with their results in a DataTypeGroup.
+        """
+        test_adapter_factory()
+        adapter = TestFactory.create_adapter("tvb.tests.framework.adapters.dummy_adapter1", "DummyAdapter1")
+        view_models = []
+        for value in (3, 4):
+            view_model = DummyModel1()
+            view_model.test1_val1 = value
+            view_model.test1_val2 = 5
+            view_models.append(view_model)
+
+        operations = self.operation_service.fire_operation_group(adapter, self.test_user, self.test_project.id,
+                                                                 view_models, 'test1_val1')
+
+        assert len(operations) == 2
+        operation_group_id = operations[0].fk_operation_group
+        assert operation_group_id is not None
+        assert operations[1].fk_operation_group == operation_group_id
+        assert [json.loads(operation.range_values) for operation in operations] == [{'test1_val1': 3},
+                                                                                    {'test1_val1': 4}]
+        datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
+        resulted_datatypes = dao.get_datatype_in_group(operation_group_id=operation_group_id)
+        assert len(resulted_datatypes) == 2
+        for datatype in resulted_datatypes:
+            assert datatype.fk_datatype_group == datatype_group.id
+
     def test_initiate_operation(self, test_adapter_factory):
         """
         Test the actual operation flow by executing a test adapter.
@@ -500,6 +500,29 @@ class TestProjectService(TransactionalTestCase):
         resulted_dts = operations[0]['results']
         assert len(resulted_dts) == 3, "3 datatypes should be created."
 
+    def test_retrieve_project_full_with_groups(self, datatype_group_factory, dummy_datatype_index_factory):
+        """
+        Tests groups, algorithms, users and visualizers are filled in by `ProjectService.retrieve_project_full(...)`
+        """
+        project = TestFactory.create_project(self.test_user)
+        dt_group, _ = datatype_group_factory(project=project)
+        operation = TestFactory.create_operation(test_user=self.test_user, test_project=project)
+        dummy_datatype_index_factory(project=project, operation=operation)
+
+        _, _, operations, _ = self.project_service.retrieve_project_full(project.id)
+        group_rows = [op for op in operations if op['datatype_group_gid'] == dt_group.gid]
+        assert len(group_rows) == 1
+        assert group_rows[0]['count'] == 6
+        assert group_rows[0]['results'] is None
+        assert len(group_rows[0]['view_groups']) > 0
+        simple_row = [op for op in operations if op['id'] == str(operation.id)][0]
+        assert len(simple_row['results']) == 1
+        assert simple_row['user'].username == self.test_user.username
+        assert simple_row['algorithm'].id == operation.fk_from_algo
+        for row in operations:
+            assert row['algorithm'] is not None
+            assert row['algorithm'].algorithm_category is not None
+
     def test_get_project_structure(self, datatype_group_factory, dummy_datatype_index_factory,
                                    project_factory, user_factory):
         """
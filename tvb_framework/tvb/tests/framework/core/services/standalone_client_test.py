@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need to download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+from tvb.core.services.backend_clients.standalone_client import OperationExecutor, OperationWorkerPool
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+
+
+class TestOperationWorkerPool(BaseTestCase):
+
+    def setup_method(self):
+        self.pool = OperationWorkerPool(1)
+
+    def teardown_method(self):
+        self.pool.close()
+
+    def test_worker_reused(self):
+        self.pool.start()
+        worker = self.pool.acquire()
+        # The operation does not exist, but the worker should survive and report it as done
+        assert worker.launch(-1) is None
+        self.pool.release(worker)
+        assert worker.is_alive()
+        assert self.pool.acquire() is worker
+
+    def test_stopped_worker_replaced(self):
+        worker = self.pool.acquire()
+        assert OperationExecutor.stop_pid(worker.pid)
+        assert worker.launch(-1) is not None
+        self.pool.release(worker)
+        new_worker = self.pool.acquire()
+        assert new_worker is not worker
+        assert new_worker.is_alive()
+        new_worker.close()
@@ -24,13 +24,20 @@
 #
 #
 
+import io
+import json
 import os
 import flask
+import numpy
 import pytest
 import tvb_data
 from tvb.adapters.datatypes.db.connectivity import ConnectivityIndex
-from tvb.interfaces.rest.commons.exceptions import InvalidIdentifierException
-from tvb.interfaces.rest.server.resources.datatype.datatype_resource import RetrieveDatatypeResource
+from tvb.interfaces.rest.client.datatype.dataset_proxy import DatasetProxy
+from tvb.interfaces.rest.commons.exceptions import InvalidIdentifierException, BadRequestException
+from tvb.interfaces.rest.commons.hyperslab import hyperslab_to_string
+from tvb.interfaces.rest.commons.strings import Strings, DataFormat
+from tvb.interfaces.rest.server.resources.datatype.datatype_resource import RetrieveDatatypeResource, \
+    RetrieveDatatypeDatasetResource
 from tvb.interfaces.rest.server.resources.datatype.datatype_resource import GetOperationsForDatatypeResource
 from tvb.interfaces.rest.server.resources.project.project_resource import GetDataInProjectResource
 from tvb.tests.framework.core.factory import TestFactory
@@ -43,6 +50,7 @@ class TestDatatypeResource(RestResourceTest):
         self.test_user = TestFactory.create_user('Rest_User')
         self.test_project = TestFactory.create_project(self.test_user, 'Rest_Project', users=[self.test_user.id])
         self.retrieve_resource = RetrieveDatatypeResource()
+        self.retrieve_dataset_resource = RetrieveDatatypeDatasetResource()
         self.get_operations_resource = GetOperationsForDatatypeResource()
         self.get_data_in_project_resource = GetDataInProjectResource()
 
@@ -90,3 +98,79 @@ class TestDatatypeResource(RestResourceTest):
         result = self.get_operations_resource.get(datatype_gid=datatypes_in_project[0].gid)
         assert type(result) is list
         assert len(result) > 3
+
+    def _store_connectivity(self, connectivity_factory, connectivity_index_factory, operation_factory):
+        connectivity = connectivity_factory(6)
+        connectivity.weights = numpy.arange(36, dtype=numpy.float64).reshape((6, 6))
+        operation = operation_factory(test_user=self.test_user, test_project=self.test_project)
+        return connectivity_index_factory(op=operation, conn=connectivity), connectivity.weights
+
+    def _get_dataset(self, mocker, datatype_gid, dataset_name, args):
+        request_mock = mocker.patch.object(flask, 'request', spec={})
+        request_mock.args = args
+        response = self.retrieve_dataset_resource.get(datatype_gid=datatype_gid, dataset_name=dataset_name)
+        return response, b''.join(response.response)
+
+    def test_server_retrieve_dataset_slice(self, mocker, connectivity_factory, connectivity_index_factory,
+                                           operation_factory):
+        self._mock_user(mocker)
+        conn_index, weights = self._store_connectivity(connectivity_factory, connectivity_index_factory,
+                                                       operation_factory)
+
+        response, content = self._get_dataset(mocker, conn_index.gid, 'weights', {Strings.HYPERSLAB.value: '1:5:2,-2'})
+        assert response.headers[Strings.DATASET_SHAPE_HEADER.value] == '[6, 6]'
+        assert response.headers[Strings.ARRAY_SHAPE_HEADER.value] == '[2, 1]'
+        data = numpy.frombuffer(content, dtype=response.headers[Strings.ARRAY_TYPE_HEADER.value]).reshape((2, 1))
+        numpy.testing.assert_array_equal(data, weights[1:5:2, 4:5])
+
+        _, content = self._get_dataset(mocker, conn_index.gid, 'weights',
+                                       {Strings.DATA_FORMAT.value: DataFormat.NPY.value})
+        numpy.testing.assert_array_equal(numpy.load(io.BytesIO(content)), weights)
+
+    def test_server_retrieve_dataset_invalid(self, mocker, connectivity_factory, connectivity_index_factory,
+                                             operation_factory):
+        self._mock_user(mocker)
+        conn_index, _ = self._store_connectivity(connectivity_factory, connectivity_index_factory, operation_factory)
+
+        with pytest.raises(InvalidIdentifierException):
+            self._get_dataset(mocker, conn_index.gid, 'inexistent_dataset', {})
+        with pytest.raises(BadRequestException):
+            self._get_dataset(mocker, conn_index.gid, 'weights', {Strings.HYPERSLAB.value: '0,0,0'})
+        with pytest.raises(BadRequestException):
+            self._get_dataset(mocker, conn_index.gid, 'weights', {Strings.HYPERSLAB.value: '::-1'})
+        with pytest.raises(BadRequestException):
+            self._get_dataset(mocker, conn_index.gid, 'weights', {Strings.DATA_FORMAT.value: 'csv'})
+
+    def test_client_dataset_proxy(self, mocker, connectivity_factory, connectivity_index_factory, operation_factory):
+        self._mock_user(mocker)
+        conn_index, weights = self._store_connectivity(connectivity_factory, connectivity_index_factory,
+                                                       operation_factory)
+        test_case = self
+
+        class DataTypeApiDummy(object):
+            """ Serves the client calls directly from the REST resource """
+
+            def get_dataset_info(self, datatype_gid, dataset_name):
+                response, _ = test_case._get_dataset(mocker, datatype_gid, dataset_name, {})
+                return (tuple(json.loads(response.headers[Strings.DATASET_SHAPE_HEADER.value])),
+                        numpy.dtype(response.headers[Strings.ARRAY_TYPE_HEADER.value]))
+
+            def retrieve_dataset_slice(self, datatype_gid, dataset_name, slices):
+                response, content = test_case._get_dataset(mocker, datatype_gid, dataset_name,
+                                                           {Strings.HYPERSLAB.value: hyperslab_to_string(slices)})
+                shape = tuple(json.loads(response.headers[Strings.ARRAY_SHAPE_HEADER.value]))
+                return numpy.frombuffer(content, dtype=response.headers[Strings.ARRAY_TYPE_HEADER.value]).reshape(shape)
+
+        proxy = DatasetProxy(DataTypeApiDummy(), conn_index.gid, 'weights')
+        assert proxy.shape == (6, 6)
+        assert len(proxy) == 6
+        numpy.testing.assert_array_equal(proxy[1:4], weights[1:4])
+        numpy.testing.assert_array_equal(proxy[..., -1], weights[..., -1])
+        numpy.testing.assert_array_equal(proxy[::4, 2:100:3], weights[::4, 2:100:3])
+        numpy.testing.assert_array_equal(proxy[4:2], weights[4:2])
+        assert proxy[2, 3] == weights[2, 3]
+        numpy.testing.assert_array_equal(numpy.asarray(proxy), weights)
+        with pytest.raises(IndexError):
+            proxy[6]
+        with pytest.raises(IndexError):
+            proxy[::-1]
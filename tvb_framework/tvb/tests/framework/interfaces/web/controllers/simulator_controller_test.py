@@ -56,6 +56,7 @@ from tvb.interfaces.web.controllers.common import *
 from tvb.interfaces.web.controllers.simulator.simulator_controller import SimulatorController, FormWithRanges
 from tvb.simulator.coupling import Sigmoidal
 from tvb.simulator.monitors import DefaultMasks
+from tvb.simulator.noise import NoiseStreams
 from tvb.simulator.simulator import Simulator
 from tvb.storage.storage_interface import StorageInterface
 from tvb.tests.framework.core.factory import TestFactory
@@ -324,6 +325,8 @@ class TestSimulationController(BaseTransactionalControllerTest):
     def test_set_noise_params(self):
         self.sess_mock['ntau'] = '0.0'
         self.sess_mock['noise_seed'] = '42'
+        self.sess_mock['noise_stream'] = 'PCG64'
+        self.sess_mock['noise_float32'] = 'on'
         self.sess_mock['nsig'] = '[1.0]'
 
         self.session_stored_simulator.integrator = EulerStochasticViewModel()
@@ -335,6 +338,9 @@ class TestSimulationController(BaseTransactionalControllerTest):
         assert self.session_stored_simulator.integrator.noise.ntau == 0.0, "ntau value was not set correctly."
         assert self.session_stored_simulator.integrator.noise.noise_seed == 42, \
             "noise_seed value was not set correctly."
+        assert self.session_stored_simulator.integrator.noise.noise_stream == NoiseStreams.PCG64, \
+            "noise_stream value was not set correctly."
+        assert self.session_stored_simulator.integrator.noise.noise_float32, "noise_float32 value was not set correctly."
         assert self.session_stored_simulator.integrator.noise.nsig == [1.0], "nsig value was not set correctly."
 
     def test_set_multiplicative_noise_params(self):
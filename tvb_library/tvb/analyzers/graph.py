@@ -34,6 +34,10 @@ Useful graph analyses.
 import numpy
 import networkx
 
+# Memory for the neighbourhood matrices processed at once when computing local efficiency,
+# small enough for the stacks to stay in cache
+LOCAL_EFFICIENCY_BLOCK_SIZE = 2 ** 20
+
 
 def betweenness_bin(A):
     """
@@ -156,11 +160,23 @@ def efficiency_bin(A, compute_local_efficiency=False):
     if compute_local_efficiency:
         E = numpy.zeros((number_of_nodes,1))  
         k = G.sum(axis=1)   # degree
-        for u in range(number_of_nodes):
-            indices = (G[u, :] > 0)
-            if k[u] >= 2:   # degree must be at least two
-                e = distance_inv(G[numpy.ix_(indices,indices)])
-                E[u,:] = e.sum() / (k[u] ** 2 - k[u])     # local efficiency
+        # degree must be at least two; visit the largest neighbourhoods first
+        nodes = numpy.flatnonzero(k >= 2)
+        nodes = nodes[numpy.argsort(-k[nodes], kind='stable')]
+        start = 0
+        while start < nodes.size:
+            # Neighbourhoods are padded to the largest degree in their block, with isolated nodes which add nothing
+            # to the sum of inverse distances, and processed as stacks bounded by LOCAL_EFFICIENCY_BLOCK_SIZE
+            k_max = int(k[nodes[start]])
+            block = nodes[start:start + max(1, LOCAL_EFFICIENCY_BLOCK_SIZE // (8 * k_max ** 2))]
+            start += block.size
+            # neighbours first, as G is binary
+            neighbours = numpy.argsort(-G[block], axis=1, kind='stable')[:, :k_max]
+            is_neighbour = numpy.arange(k_max) < k[block][:, numpy.newaxis]
+            neighbourhoods = G[neighbours[:, :, numpy.newaxis], neighbours[:, numpy.newaxis, :]]
+            neighbourhoods *= is_neighbour[:, :, numpy.newaxis] & is_neighbour[:, numpy.newaxis, :]
+            e = distance_inv(neighbourhoods)
+            E[block, 0] = e.sum(axis=(1, 2)) / (k[block] ** 2 - k[block])     # local efficiency
         return E
     else:
         e = distance_inv(G)
@@ -169,33 +185,33 @@ def efficiency_bin(A, compute_local_efficiency=False):
         return E
 
 
-
 def distance_inv(G):
     """
     Compute the inverse shortest path lengths of G.
 
-    :param G: binary undirected connection matrix
-    :returns: D: matrix of inverse distances
+    :param G: binary undirected connection matrix, or a stack of such matrices along the leading axes
+    :returns: D: matrix (or stack of matrices) of inverse distances
     """
-    L = numpy.zeros(G.shape)
-    D = numpy.eye(G.shape[0])
+    identity = numpy.eye(G.shape[-1])
+    D = numpy.broadcast_to(identity, G.shape).copy()
     n = 1
+    G = (G != 0).astype(float)
     nPATH = G.copy()                     # n-path matrix
-    L[nPATH != 0] = 1.                   # shortest n-path matrix
+    L = nPATH.copy()                     # shortest n-path matrix
 
-    while L.sum() != 0:
+    while L.any():
         D += n * L
         n += 1
-        nPATH = numpy.dot(nPATH, G)
-        L = (nPATH > 0) * (D == 0)
+        # only whether an n-path exists matters, counting them would overflow on large graphs
+        nPATH = numpy.minimum(numpy.matmul(nPATH, G), 1.0)
+        L = (nPATH > 0) & (D == 0)
 
     D[D == 0] = numpy.inf
     D = 1 / D                                # invert distance
-    D = D - numpy.eye(G.shape[0])
+    D = D - identity
     return D
 
 
-
 def get_components_sizes(A):
     """
     Get connected components sizes.
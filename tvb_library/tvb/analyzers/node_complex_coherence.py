@@ -32,21 +32,26 @@ return a ComplexCoherence datatype.
 
 """
 
+from collections import namedtuple
+
 import numpy
 import tvb.datatypes.spectral as spectral
+from scipy import fft
 from scipy import signal as sp_signal
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.neotraits.info import narray_describe
 
 SUPPORTED_WINDOWING_FUNCTIONS = ("hamming", "bartlett", "blackman", "hanning")
 
+# Upper bound (in bytes) of the segment spectra computed together, for a batch of epochs
+COHERENCE_EPOCH_BLOCK_SIZE = 64 * 2 ** 20
+
 log = get_logger(__name__)
 
 # NOTE: Work only with 2D TimeSeries -- otherwise a MemoryError will raise
-# My first attempts made use of itertools on the 4D TimeSeries but they were
-# fruitless.
-# Nested `for` loops seem a 'good' solution instead of creating enormous ndarrays
-# to compute the FFT and derived complex spectra at once
+# The cross spectra are computed for batches of epochs, for all their segments and
+# frequencies at once, and only for the rows (nodes) requested by the caller.
+# The segment spectra can be computed once up front, to be reused for several blocks of rows.
 
 
 """
@@ -80,9 +85,9 @@ second 50% overlapping `segments` to which a Hanning function is applied.
 
 def calculate_complex_cross_coherence(time_series, epoch_length, segment_length, segment_shift, window_function,
                                       average_segments, subtract_epoch_average, zeropad, detrend_ts, max_freq,
-                                      npat):
+                                      npat, nodes=None, dtype=None, segment_spectra=None):
     """
-    # type: (TimeSeries, float, float, float, str, bool, bool, int, bool, float, float)  -> ComplexCoherenceSpectrum
+    # type: (TimeSeries, float, float, float, str, bool, bool, int, bool, float, float, slice, numpy.dtype, numpy.ndarray)  -> ComplexCoherenceSpectrum
     Calculate the FFT, Cross Coherence and Complex Coherence of time_series
     broken into (possibly) epochs and segments of length `epoch_length` and
     `segment_length` respectively, filtered by `window_function`.
@@ -125,141 +130,217 @@ def calculate_complex_cross_coherence(time_series, epoch_length, segment_length,
 
     max_freq : float
     Maximum frequency points (e.g. 32., 64., 128.) represented in the output. Default is segment_length / 2 + 1.
+    Only these frequency points are kept from the FFT of each segment.
 
     npat : float
     This attribute appears to be related to an input projection matrix... Which is not yet implemented.
+
+    nodes : slice
+    The rows (nodes) of the cross spectrum to compute, against all the nodes. Default is all of them.
+    This allows computing the result block by block, when it does not fit in memory.
+
+    dtype : numpy.dtype
+    The complex type of the computation, complex64 or complex128. Defaults to complex64 for
+    float32 time series and complex128 otherwise.
+
+    segment_spectra : numpy.ndarray
+    The spectra of all segments, as returned by `calculate_segment_spectra` for the same parameters.
+    When computing the result block by block, this avoids computing them again for every block.
     """
     # self.time_series.trait["data"].log_debug(owner=cls_attr_name)
-    tpts = time_series.data.shape[0]
-    time_series_length = tpts * time_series.sample_period
+    if npat != 1:
+        raise NotImplementedError("Only npat = 1 is supported, projection of the input is not implemented.")
 
-    if len(time_series.data.shape) > 2:
-        time_series_data = numpy.squeeze((time_series.data.mean(axis=-1)).mean(axis=1))
+    layout = _segment_layout(time_series.data.shape[0], time_series.sample_period, epoch_length, segment_length,
+                             segment_shift, zeropad, max_freq)
+    epoch_length, segment_length, nepochs, _, nseg, _, _, nfreq = layout
+
+    if segment_spectra is None:
+        time_series_data, dtype = _time_series_data(time_series, dtype)
+        nchan = time_series_data.shape[1]
+        spectra_blocks = _iter_segment_spectra(time_series_data, layout, window_function, detrend_ts, dtype)
+    else:
+        dtype = segment_spectra.dtype
+        nchan = segment_spectra.shape[-1]
+        epochs_per_block = _epochs_per_block(layout, nchan, dtype)
+        spectra_blocks = (numpy.asarray(segment_spectra[first:first + epochs_per_block])
+                          for first in range(0, nepochs, epochs_per_block))
+    real_dtype = numpy.float32 if numpy.dtype(dtype) == numpy.complex64 else numpy.float64
+
+    rows = numpy.arange(nchan)[nodes if nodes is not None else slice(None)]
+    # Accumulators are laid out (segment,) frequency, row, column; segments are summed over when averaged
+    acc_shape = (nfreq,) if average_segments else (nseg, nfreq)
+    cs = numpy.zeros(acc_shape + (len(rows), nchan), dtype=dtype)
+    av = numpy.zeros(acc_shape + (nchan,), dtype=dtype)
+    power = numpy.zeros(acc_shape + (nchan,), dtype=real_dtype)
+
+    for datalocfft in spectra_blocks:
+        # cs[..., f, a, b] += x_a(f) * conj(x_b(f)), summed over epochs (and segments) as a batch of matmuls;
+        # operands are made contiguous, otherwise matmul does not reach BLAS
+        if average_segments:
+            datalocfft = datalocfft.reshape((-1, nfreq, nchan))
+            cs += numpy.matmul(numpy.ascontiguousarray(datalocfft[:, :, rows].transpose((1, 2, 0))),
+                               numpy.ascontiguousarray(datalocfft.conj().transpose((1, 0, 2))))
+        else:
+            cs += numpy.matmul(numpy.ascontiguousarray(datalocfft[:, :, :, rows].transpose((1, 2, 3, 0))),
+                               numpy.ascontiguousarray(datalocfft.conj().transpose((1, 2, 0, 3))))
+        av += datalocfft.sum(axis=0)
+        power += (datalocfft.real ** 2 + datalocfft.imag ** 2).sum(axis=0)
+        del datalocfft
+
+    nave = float(nepochs * nseg if average_segments else nepochs)
+    cs /= nave
+    av /= nave
+    power /= nave
+
+    # Subtract average
+    if subtract_epoch_average:
+        cs -= av[..., rows, numpy.newaxis] * av[..., numpy.newaxis, :].conj()
+        power -= av.real ** 2 + av.imag ** 2
+
+    # Compute Complex Coherence, the diagonal of cs being the (real) power of each node
+    coh = cs / numpy.sqrt(power[..., rows, numpy.newaxis] * power[..., numpy.newaxis, :])
+
+    # back to (row, column, frequency[, segment])
+    axes = (1, 2, 0) if average_segments else (2, 3, 1, 0)
+    cs = cs.transpose(axes)
+    coh = coh.transpose(axes)
+
+    log.debug("result")
+    log.debug(narray_describe(cs))
+    spectra = spectral.ComplexCoherenceSpectrum(source=time_series,
+                                                array_data=coh,
+                                                cross_spectrum=cs,
+                                                epoch_length=epoch_length,
+                                                segment_length=segment_length,
+                                                windowing_function=window_function)
+    return spectra
+
+
+def calculate_segment_spectra(time_series, epoch_length, segment_length, segment_shift, window_function, zeropad,
+                              detrend_ts, max_freq, dtype=None, out=None):
+    """
+    # type: (TimeSeries, float, float, float, str, int, bool, float, numpy.dtype, numpy.ndarray)  -> numpy.ndarray
+    Compute the FFT of every (windowed) segment of every epoch of time_series, as needed by
+    `calculate_complex_cross_coherence`, see there for the parameters.
+
+    out : numpy.ndarray
+    Array of the shape and type given by `segment_spectra_layout` (e.g. a memory map) in which to write the spectra.
+
+    Returns the spectra as an (epoch, segment, frequency, node) array.
+    """
+    layout = _segment_layout(time_series.data.shape[0], time_series.sample_period, epoch_length, segment_length,
+                             segment_shift, zeropad, max_freq)
+    time_series_data, dtype = _time_series_data(time_series, dtype)
+    if out is None:
+        out = numpy.empty((layout.nepochs, layout.nseg, layout.nfreq, time_series_data.shape[1]), dtype=dtype)
+    first = 0
+    for datalocfft in _iter_segment_spectra(time_series_data, layout, window_function, detrend_ts, dtype):
+        out[first:first + datalocfft.shape[0]] = datalocfft
+        first += datalocfft.shape[0]
+    return out
+
+
+def segment_spectra_layout(input_shape, input_dtype, sample_period, epoch_length, segment_length, segment_shift,
+                           zeropad, max_freq):
+    """
+    Returns the shape and the complex type of the segment spectra of a time series
+    """
+    nchan = input_shape[2] if len(input_shape) > 2 else input_shape[1]
+    layout = _segment_layout(input_shape[0], sample_period, epoch_length, segment_length, segment_shift, zeropad,
+                             max_freq)
+    return (layout.nepochs, layout.nseg, layout.nfreq, nchan), _complex_dtype(input_dtype)
+
+
+SegmentLayout = namedtuple('SegmentLayout', ['epoch_length', 'segment_length', 'nepochs', 'epoch_tpts',
+                                             'nseg', 'seg_tpts', 'seg_shift_tpts', 'nfreq'])
+
+
+def _segment_layout(tpts, sample_period, epoch_length, segment_length, segment_shift, zeropad, max_freq):
+    time_series_length = tpts * sample_period
 
     # Divide time-series into epochs, no overlapping
     if epoch_length > 0.0:
         nepochs = int(numpy.floor(time_series_length / epoch_length))
-        epoch_tpts = int(epoch_length / time_series.sample_period)
+        epoch_tpts = int(epoch_length / sample_period)
         time_series_length = epoch_length
         tpts = epoch_tpts
     else:
         epoch_length = time_series_length
-        nepochs = int(numpy.ceil(time_series_length / epoch_length))
+        nepochs = 1
+        epoch_tpts = tpts
 
     # Segment time-series, overlapping if necessary
     nseg = int(numpy.floor(time_series_length / segment_length))
     if nseg > 1:
-        seg_tpts = int(segment_length / time_series.sample_period)
-        seg_shift_tpts = int(segment_shift / time_series.sample_period)
+        seg_tpts = int(segment_length / sample_period)
+        seg_shift_tpts = int(segment_shift / sample_period)
         nseg = int(numpy.floor((tpts - seg_tpts) / seg_shift_tpts) + 1)
     else:
         segment_length = time_series_length
-        seg_tpts = time_series_data.shape[0]
+        seg_tpts = tpts
+        seg_shift_tpts = seg_tpts
+        nseg = 1
 
     # Frequency
     nfreq = int(numpy.min([max_freq, numpy.floor((seg_tpts + zeropad) / 2.0) + 1]))
+    return SegmentLayout(epoch_length, segment_length, nepochs, epoch_tpts, nseg, seg_tpts, seg_shift_tpts, nfreq)
 
-    resulted_shape, av_result_shape = complex_coherence_result_shape(time_series.data.shape, max_freq, epoch_length,
-                                                                     segment_length, segment_shift,
-                                                                     time_series.sample_period, zeropad,
-                                                                     average_segments)
-    cs = numpy.zeros(resulted_shape, dtype=numpy.complex128)
-    av = numpy.zeros(av_result_shape, dtype=numpy.complex128)
-    coh = numpy.zeros(resulted_shape, dtype=numpy.complex128)
 
-    # Apply windowing function
-    if window_function is not None:
-        if window_function not in SUPPORTED_WINDOWING_FUNCTIONS:
-            log.error("Windowing function is: %s" % window_function)
-            log.error("Must be in: %s" % str(SUPPORTED_WINDOWING_FUNCTIONS))
+def _complex_dtype(data_dtype):
+    return numpy.complex64 if data_dtype == numpy.float32 else numpy.complex128
 
-        window_func = eval("".join(("numpy.", window_function)))
-        win = window_func(seg_tpts)
-        window_mask = (numpy.kron(numpy.ones((time_series_data.shape[1], 1)), win)).T
 
-    nave = 0
+def _time_series_data(time_series, dtype):
+    if len(time_series.data.shape) > 2:
+        time_series_data = time_series.data.mean(axis=-1).mean(axis=1)
+    else:
+        time_series_data = time_series.data
 
-    for j in numpy.arange(nepochs):
-        data = time_series_data[j * epoch_tpts:(j + 1) * epoch_tpts, :]
+    if dtype is None:
+        dtype = _complex_dtype(time_series_data.dtype)
+    real_dtype = numpy.float32 if numpy.dtype(dtype) == numpy.complex64 else numpy.float64
+    return time_series_data.astype(real_dtype, copy=False), dtype
 
-        for i in numpy.arange(nseg):  # average over all segments;
-            ts = data[i * seg_shift_tpts: i * seg_shift_tpts + seg_tpts, :]
 
-            if detrend_ts:
-                ts = sp_signal.detrend(ts, axis=0)
+def _epochs_per_block(layout, nchan, dtype):
+    # Batch epochs together, so that the products over segments run over many segments at once
+    return int(max(1, min(layout.nepochs, COHERENCE_EPOCH_BLOCK_SIZE //
+                          (layout.nseg * layout.seg_tpts * nchan * numpy.dtype(dtype).itemsize))))
 
-            datalocfft = numpy.fft.fft(ts * window_mask, axis=0)
-            datalocfft = numpy.matrix(datalocfft)
 
-            for f in numpy.arange(nfreq):  # for all frequencies
-                if npat == 1:
-                    if not average_segments:
-                        cs[:, :, f, i] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                        av[:, f, i] += numpy.conjugate(datalocfft[f, :].conj().T)
-                    else:
-                        cs[:, :, f] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                        av[:, f] += numpy.conjugate(datalocfft[f, :].conj().T)
-                else:
-                    if not average_segments:
-                        cs[:, :, f, j, i] = numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                        av[:, f, j, i] = numpy.conjugate(datalocfft[f, :].conj().T)
-                    else:
-                        cs[:, :, f, j] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                        av[:, f, j] += numpy.conjugate(datalocfft[f, :].conj().T)
-            del datalocfft
+def _iter_segment_spectra(time_series_data, layout, window_function, detrend_ts, dtype):
+    """
+    Yield the spectra of the segments of batches of epochs, as (epoch, segment, frequency, node) arrays
+    """
+    real_dtype = time_series_data.dtype
+    seg_tpts = layout.seg_tpts
 
-        nave += 1.0
+    # Apply windowing function
+    win = numpy.ones(seg_tpts, dtype=real_dtype)
+    if window_function is not None:
+        if window_function not in SUPPORTED_WINDOWING_FUNCTIONS:
+            log.error("Windowing function is: %s" % window_function)
+            log.error("Must be in: %s" % str(SUPPORTED_WINDOWING_FUNCTIONS))
 
-    # End of FORs
-    if not average_segments:
-        cs = cs / nave
-        av = av / nave
-    else:
-        nave = nave * nseg
-        cs = cs / nave
-        av = av / nave
+        window_func = getattr(numpy, window_function)
+        win = window_func(seg_tpts).astype(real_dtype)
 
-    # Subtract average
-    for f in numpy.arange(nfreq):
-        if subtract_epoch_average:
-            if npat == 1:
-                if not average_segments:
-                    for i in numpy.arange(nseg):
-                        cs[:, :, f, i] = cs[:, :, f, i] - av[:, f, i] * av[:, f, i].conj().T
-                else:
-                    cs[:, :, f] = cs[:, :, f] - av[:, f] * av[:, f].conj().T
-            else:
-                if not average_segments:
-                    for i in numpy.arange(nseg):
-                        for j in numpy.arange(nepochs):
-                            cs[:, :, f, j, i] = cs[:, :, f, j, i] - av[:, f, j, i] * av[:, f, j, i].conj().T
-
-                else:
-                    for j in numpy.arange(nepochs):
-                        cs[:, :, f, j] = cs[:, :, f, j] - av[:, f, j] * av[:, f, j].conj().T
-
-    # Compute Complex Coherence
-    ndim = len(cs.shape)
-    if ndim == 3:
-        for i in numpy.arange(cs.shape[2]):
-            temp = numpy.array(cs[:, :, i])
-            coh[:, :, i] = cs[:, :, i] / numpy.sqrt(temp.diagonal().conj().T * temp.diagonal())
-
-    elif ndim == 4:
-        for i in numpy.arange(cs.shape[2]):
-            for j in numpy.arange(cs.shape[3]):
-                temp = numpy.array(numpy.squeeze(cs[:, :, i, j]))
-                coh[:, :, i, j] = temp / numpy.sqrt(temp.diagonal().conj().T * temp.diagonal().T)
+    epochs_per_block = _epochs_per_block(layout, time_series_data.shape[1], dtype)
+    segment_index = (numpy.arange(layout.nseg) * layout.seg_shift_tpts)[:, numpy.newaxis] + numpy.arange(seg_tpts)
+    for first in range(0, layout.nepochs, epochs_per_block):
+        epoch_starts = numpy.arange(first, min(first + epochs_per_block, layout.nepochs)) * layout.epoch_tpts
+        segments = time_series_data[epoch_starts[:, numpy.newaxis, numpy.newaxis] + segment_index]
 
-    log.debug("result")
-    log.debug(narray_describe(cs))
-    spectra = spectral.ComplexCoherenceSpectrum(source=time_series,
-                                                array_data=coh,
-                                                cross_spectrum=cs,
-                                                epoch_length=epoch_length,
-                                                segment_length=segment_length,
-                                                windowing_function=window_function)
-    return spectra
+        if detrend_ts:
+            segments = sp_signal.detrend(segments, axis=2)
+
+        segments *= win[:, numpy.newaxis]
+        if layout.nfreq <= seg_tpts // 2 + 1:
+            datalocfft = fft.rfft(segments, axis=2)[:, :, :layout.nfreq]
+        else:
+            datalocfft = fft.fft(segments, axis=2)[:, :, :layout.nfreq]
+        yield datalocfft.astype(dtype, copy=False)
 
 
 def complex_coherence_result_shape(input_shape, max_freq, epoch_length, segment_length, segment_shift, sample_period,
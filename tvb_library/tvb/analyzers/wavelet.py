@@ -35,8 +35,11 @@ WaveletSpectrum datatype.
 
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy
-import scipy.signal as signal
+from scipy import fft
 import tvb.datatypes.spectral as spectral
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.neotraits.api import HasTraits, Attr, Range, Float, narray_describe
@@ -44,6 +47,9 @@ from tvb.simulator.backend.ref import ReferenceBackend
 
 SUPPORTED_WAVELET_FUNCTIONS = ("morlet",)
 
+# Upper bound (in bytes) of the complex spectra held in memory by one frequency block of the transform
+WAVELET_BLOCK_SIZE = 128 * 2 ** 20
+
 log = get_logger(__name__)
 
 """
@@ -62,9 +68,10 @@ References:
 """
 
 
-def compute_continuous_wavelet_transform(time_series, frequencies, sample_period, q_ratio, normalisation, mother):
+def compute_continuous_wavelet_transform(time_series, frequencies, sample_period, q_ratio, normalisation, mother,
+                                         workers=None):
     """
-    # type: (TimeSeries, Range, float, float, str, str)  -> WaveletCoefficients
+    # type: (TimeSeries, Range, float, float, str, str, int)  -> WaveletCoefficients
     Calculate the continuous wavelet transform of time_series.
 
     Parameters
@@ -88,6 +95,9 @@ def compute_continuous_wavelet_transform(time_series, frequencies, sample_period
 
     mother : str
     The mother wavelet function used in the transform.
+
+    workers : int
+    Number of threads sharing the frequency blocks of the transform. Defaults to the number of CPUs.
     """
     ts_shape = time_series.data.shape
 
@@ -142,30 +152,15 @@ def compute_continuous_wavelet_transform(time_series, frequencies, sample_period
 
     coef_shape = (nf, nt, ts_shape[1], ts_shape[2], ts_shape[3])
 
-    coef = numpy.zeros(coef_shape, dtype=numpy.complex128)
+    coef = numpy.empty(coef_shape, dtype=numpy.complex128)
     log.debug("coef")
     log.debug(narray_describe(coef))
 
-    scales = numpy.arange(0, nf, 1)
-    for i in scales:
-        f0 = freqs[i]
-        SDt = sigma_t[(0, i)]
-        A = Amp[(0, i)]
-        x = numpy.arange(0, 4.0 * SDt * sample_rate, 1) / sample_rate
-        wvlt = A * numpy.exp(-x ** 2 / (2.0 * SDt ** 2)) * numpy.exp(2j * numpy.pi * f0 * x)
-        wvlt = numpy.hstack((numpy.conjugate(wvlt[-1:0:-1]), wvlt))
-        # util.self.log_debug_array(self.log, wvlt, "wvlt")
-
-        for var in range(ts_shape[1]):
-            for node in range(ts_shape[2]):
-                for mode in range(ts_shape[3]):
-                    data = time_series.data[:, var, node, mode]
-                    wt = signal.convolve(data, wvlt, 'same')
-                    # util.self.log_debug_array(self.log, wt, "wt")
-                    res = wt[0::temporal_step]
-                    # NOTE: this is a horrible horrible quick hack (alas, a solution) to avoid broadcasting errors
-                    # when using dt and sample periods which are not powers of 2.
-                    coef[i, :, var, node, mode] = res if len(res) == nt else res[:coef.shape[1]]
+    # Every (var, node, mode) channel is transformed at once, one frequency block after the other
+    data = time_series.data.reshape((ts_shape[0], -1))
+    kernels = [_morlet_kernel(freqs[i], sigma_t[(0, i)], Amp[(0, i)], sample_rate) for i in range(nf)]
+    for scales, block in _wavelet_transform_blocks(data, kernels, temporal_step, workers):
+        coef[scales] = block.reshape((block.shape[0], nt) + ts_shape[1:])
 
     log.debug("coef")
     log.debug(narray_describe(coef))
@@ -180,3 +175,67 @@ def compute_continuous_wavelet_transform(time_series, frequencies, sample_period
         array_data=coef)
 
     return spectra
+
+
+def _morlet_kernel(f0, SDt, A, sample_rate):
+    """
+    Causal half of the Morlet wavelet for the center frequency f0. The full,
+    symmetric kernel is [conj(wvlt[:0:-1]), wvlt].
+    """
+    x = numpy.arange(0, 4.0 * SDt * sample_rate, 1) / sample_rate
+    return A * numpy.exp(-x ** 2 / (2.0 * SDt ** 2)) * numpy.exp(2j * numpy.pi * f0 * x)
+
+
+def _wavelet_transform_blocks(data, kernels, temporal_step, workers=None):
+    """
+    Convolve every column of data (time, channels) with every Morlet kernel,
+    as signal.convolve(column, kernel, 'same')[::temporal_step] would.
+
+    The data is Fourier transformed once, with a length which is a multiple of
+    temporal_step. The spectrum products are then folded onto nfft/temporal_step
+    bins, which amounts to decimating before the (so much shorter) inverse transform.
+    Kernels are processed in frequency blocks, spread over a pool of threads.
+
+    Yields (scales slice, block of shape (block scales, nt, channels)) in order of scales.
+    """
+    nr_samples, nr_channels = data.shape
+    nt = int(numpy.ceil(nr_samples / temporal_step))
+    half_length = max(len(wvlt) for wvlt in kernels)
+    folded_length = fft.next_fast_len(int(numpy.ceil((nr_samples + 2 * half_length - 2) / temporal_step)))
+    nfft = folded_length * temporal_step
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    block_bytes = max(1, WAVELET_BLOCK_SIZE // workers)
+    # the kernel spectra and the folded products of one block are the largest arrays alive
+    scale_bytes = 16 * (nfft + 2 * folded_length * nr_channels)
+    scales_per_block = int(max(1, min(len(kernels), block_bytes // scale_bytes)))
+    blocks = [slice(start, min(start + scales_per_block, len(kernels)))
+              for start in range(0, len(kernels), scales_per_block)]
+
+    data_spectrum = fft.fft(data, n=nfft, axis=0)
+
+    def transform(scales):
+        # kernels are stored circularly shifted, so that the center of the 'same' output lands at index 0
+        kernel_spectra = numpy.zeros((scales.stop - scales.start, nfft), dtype=numpy.complex128)
+        for row, wvlt in enumerate(kernels[scales]):
+            kernel_spectra[row, :len(wvlt)] = wvlt
+            kernel_spectra[row, nfft - len(wvlt) + 1:] = numpy.conjugate(wvlt[:0:-1])
+        kernel_spectra = fft.fft(kernel_spectra, axis=1)
+
+        folded = numpy.zeros((scales.stop - scales.start, folded_length, nr_channels), dtype=numpy.complex128)
+        for start in range(0, nfft, folded_length):
+            band = slice(start, start + folded_length)
+            folded += kernel_spectra[:, band, numpy.newaxis] * data_spectrum[numpy.newaxis, band]
+        return fft.ifft(folded, axis=1, overwrite_x=True)[:, :nt] / temporal_step
+
+    if workers == 1 or len(blocks) == 1:
+        for scales in blocks:
+            yield scales, transform(scales)
+    else:
+        # at most `workers` blocks are in flight, to keep within the memory budget
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for first in range(0, len(blocks), workers):
+                batch = blocks[first:first + workers]
+                for scales, block in zip(batch, executor.map(transform, batch)):
+                    yield scales, block
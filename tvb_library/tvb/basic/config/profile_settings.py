@@ -74,6 +74,9 @@ class BaseSettingsProfile(object):
         self.db = DBSettings(self.manager, self.DEFAULT_STORAGE, self.TVB_STORAGE)
         self.version = VersionSettings(self.manager, self.BIN_FOLDER)
         self.file_storage = self.manager.get_attribute(stored.KEY_FILE_STORAGE, 'h5', str)
+        # Compress the data sets which allow it (e.g. TimeSeries data) with gzip level 1 and shuffle.
+        # Smaller files, for a slower write and a slower read of each chunk.
+        self.COMPRESS_H5_DATA = self.manager.get_attribute(stored.KEY_COMPRESS_H5_DATA, False, eval)
 
         # Maximum number of vertices acceptable o be part of a surface at import time.
         self.MAX_SURFACE_VERTICES_NUMBER = self.manager.get_attribute(stored.KEY_MAX_NR_SURFACE_VERTEX, 300000, int)
@@ -74,6 +74,13 @@ class VersionSettings(object):
         # The version up until we done the upgrade properly for the file data storage.
         self.CODE_CHECKED_TO_VERSION = manager.get_attribute(stored.KEY_LAST_CHECKED_CODE_VERSION, -1, int)
 
+        # Number of processes used for upgrading the H5 files. 0 means one per available CPU.
+        self.FILE_UPGRADE_PROCESSES = manager.get_attribute(stored.KEY_FILE_UPGRADE_PROCESSES, 0, int)
+
+        # When True, the application starts without waiting for the H5 files upgrade. Files are upgraded
+        # in the background, and any file opened before its turn is upgraded on the spot.
+        self.LAZY_FILE_UPGRADE = manager.get_attribute(stored.KEY_LAZY_FILE_UPGRADE, False, stored.parse_bool)
+
     @property
     def REVISION_NUMBER(self):
         try:
@@ -67,10 +67,13 @@ KEY_MAX_NR_SURFACE_VERTEX = 'MAXIMUM_NR_OF_VERTICES_ON_SURFACE'
 KEY_LAST_CHECKED_FILE_VERSION = 'LAST_CHECKED_FILE_VERSION'
 KEY_LAST_CHECKED_CODE_VERSION = 'LAST_CHECKED_CODE_VERSION'
 KEY_FILE_STORAGE_UPDATE_STATUS = 'FILE_STORAGE_UPDATE_STATUS'
+KEY_FILE_UPGRADE_PROCESSES = 'FILE_UPGRADE_PROCESSES'
+KEY_LAZY_FILE_UPGRADE = 'LAZY_FILE_UPGRADE'
 KEY_TRACE_USER_ACTIONS = "TRACE_USER_ACTIONS"
 KEY_ENCRYPT_STORAGE = "ENCRYPT_STORAGE"
 KEY_DECRYPT_PATH = "DECRYPT_PATH"
 KEY_FILE_STORAGE = "FILE_STORAGE"
+KEY_COMPRESS_H5_DATA = "COMPRESS_H5_DATA"
 KEY_OPENSHIFT_DEPLOY = "OPENSHIFT_DEPLOY"
 KEY_OPENSHIFT_NAMESPACE = "OPENSHIFT_NAMESPACE"
 KEY_OPENSHIFT_APPLICATION = "OPENSHIFT_APPLICATION"
@@ -87,6 +90,18 @@ KEY_ELASTICSEARCH_BUFFER_THRESHOLD = "ELASTICSEARCH_BUFFER_THRESHOLD"
 UTF8 = "utf-8"
 
 
+def parse_bool(value):
+    """
+    Read a boolean setting, as written in the settings file (True/False), without evaluating it.
+    """
+    value = str(value).strip().lower()
+    if value in ('true', '1', 'yes', 'on'):
+        return True
+    if value in ('false', '0', 'no', 'off', ''):
+        return False
+    raise ValueError("Invalid boolean setting %s" % value)
+
+
 class SettingsManager(object):
     def __init__(self, config_file_location):
         self.config_file_location = config_file_location
@@ -145,7 +145,7 @@ class Cortex(HasTraits):
         loc_con_cutoff = self.local_connectivity.cutoff
         self.local_connectivity.surface.compute_geodesic_distance_matrix(max_dist=loc_con_cutoff)
 
-        self.local_connectivity.matrix_gdist = self.local_connectivity.surface.geodesic_distance_matrix.copy()
+        self.local_connectivity.matrix_gdist = self.local_connectivity.surface.geodesic_distance_matrix
         self.local_connectivity.compute()  # Evaluate equation based distance
 
         # HACK FOR DEBUGGING CAUSE TRAITS REPORTS self.local_connectivity.trait["matrix"] AS BEING EMPTY...
@@ -61,23 +61,18 @@ class LocalConnectivity(HasTraits):
         """
         self.log.info("Mapping geodesic distance through the LocalConnectivity.")
 
-        # Start with data being geodesic_distance_matrix, then map it through equation
-        # Then replace original data with result...
-        self.matrix_gdist.data = self.equation.evaluate(self.matrix_gdist.data)
+        # Start with data being geodesic_distance_matrix, then map it through equation.
+        # The index arrays are shared with matrix_gdist, which itself is left untouched.
+        gdist = scipy.sparse.csc_matrix(self.matrix_gdist)
+        data = self.equation.evaluate(gdist.data)
+        rows = gdist.indices
 
         # Homogenise spatial discretisation effects across the surface
-        nv = self.matrix_gdist.shape[0]
-        ind = numpy.arange(nv, dtype=int)
-        pos_mask = self.matrix_gdist.data > 0.0
-        neg_mask = self.matrix_gdist.data < 0.0
-        pos_con = self.matrix_gdist.copy()
-        neg_con = self.matrix_gdist.copy()
-        pos_con.data[neg_mask] = 0.0
-        neg_con.data[pos_mask] = 0.0
-        pos_contrib = pos_con.sum(axis=1)
-        pos_contrib = numpy.array(pos_contrib).squeeze()
-        neg_contrib = neg_con.sum(axis=1)
-        neg_contrib = numpy.array(neg_contrib).squeeze()
+        nv = gdist.shape[0]
+        pos_mask = data > 0.0
+        neg_mask = data < 0.0
+        pos_contrib = numpy.bincount(rows, weights=numpy.where(pos_mask, data, 0.0), minlength=nv)
+        neg_contrib = numpy.bincount(rows, weights=numpy.where(neg_mask, data, 0.0), minlength=nv)
         pos_mean = pos_contrib.mean()
         neg_mean = neg_contrib.mean()
         if ((pos_mean != 0.0 and any(pos_contrib == 0.0)) or
@@ -94,9 +89,11 @@ class LocalConnectivity(HasTraits):
         pos_hf[pos_contrib != 0] = pos_mean / pos_contrib[pos_contrib != 0]
         neg_hf = numpy.zeros(shape=neg_contrib.shape)
         neg_hf[neg_contrib != 0] = neg_mean / neg_contrib[neg_contrib != 0]
-        pos_hf_diag = scipy.sparse.csc_matrix((pos_hf, (ind, ind)), shape=(nv, nv))
-        neg_hf_diag = scipy.sparse.csc_matrix((neg_hf, (ind, ind)), shape=(nv, nv))
-        homogenious_conn = (pos_hf_diag * pos_con) + (neg_hf_diag * neg_con)
+        # Scale each row by its homogenisation factor, the sparse equivalent of diag(hf) * con
+        data = data * numpy.where(pos_mask, pos_hf[rows], 0.0) + data * numpy.where(neg_mask, neg_hf[rows], 0.0)
+        homogenious_conn = scipy.sparse.csc_matrix((data, gdist.indices.copy(), gdist.indptr.copy()),
+                                                   shape=gdist.shape)
+        homogenious_conn.eliminate_zeros()
 
         # Then replace unhomogenised result with the spatially homogeneous one...
         if not homogenious_conn.has_sorted_indices:
@@ -123,20 +120,21 @@ class LocalConnectivity(HasTraits):
         _, _, v = scipy.sparse.find(self.matrix)
         return narray_summary_info(v, ar_name='matrix-nonzero')
 
-    def compute_sparse_matrix(self):
+    def compute_sparse_matrix(self, workers=None, cache_dir=None):
         """
         NOTE: Before calling this method, the surface field
         should already be set on the local connectivity.
 
         Computes the sparse matrix for this local connectivity.
+
+        ``workers`` and ``cache_dir`` are passed on to `surfaces.cached_local_gdist_matrix`.
         """
         if self.surface is None:
             raise AttributeError('Require surface to compute local connectivity.')
 
-        self.matrix_gdist = surfaces.gdist.local_gdist_matrix(
-            self.surface.vertices.astype(numpy.float64),
-            self.surface.triangles.astype(numpy.int32),
-            max_distance=self.cutoff)
+        self.matrix_gdist = surfaces.cached_local_gdist_matrix(
+            self.surface.gid, self.surface.vertices, self.surface.triangles,
+            self.cutoff, workers=workers, cache_dir=cache_dir)
 
         self.compute()
         # Avoid having a large data-set in memory.
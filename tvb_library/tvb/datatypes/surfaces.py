@@ -32,9 +32,13 @@ Surface relates DataTypes.
 .. moduleauthor:: Marmaduke Woodman <marmaduke.woodman@univ-amu.fr>
 
 """
+import os
 import warnings
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 import numpy
 import scipy.sparse
+import scipy.spatial
 from io import BytesIO
 
 from tvb.basic import exceptions
@@ -60,6 +64,198 @@ except Exception:
     warnings.warn(msg)
 
 
+# Number of source vertices handed to a worker process in one task.
+GDIST_SOURCES_PER_TASK = 512
+
+# Surfaces with fewer vertices are computed in the calling process, unless workers are asked for.
+GDIST_PARALLEL_MIN_VERTICES = 32768
+
+# Directory where geodesic distance matrices are cached, keyed by surface gid and cutoff.
+# Caching is disabled when this is not set and no cache_dir is given explicitly.
+GDIST_CACHE_DIR = os.environ.get('TVB_GDIST_CACHE_DIR')
+
+# Size in bytes the cache directory is kept under, by removing the least recently used matrices.
+GDIST_CACHE_MAX_SIZE = int(os.environ.get('TVB_GDIST_CACHE_MAX_SIZE', 2 * 1024 ** 3))
+
+
+def _gdist_source_block(vertices, triangles, vertex_triangles, sources, max_distance, radius):
+    """
+    Geodesic distances from each of ``sources`` to the vertices within
+    ``max_distance`` of it, as the (counts, indices, data) of CSC columns.
+
+    A geodesic path no longer than ``max_distance`` stays inside the Euclidean
+    ball of that radius around its source, so each ``compute_gdist`` call only
+    sees the triangles within ``radius``, i.e. the ball widened by the longest edge.
+    """
+    indptr, incident = vertex_triangles
+    balls = scipy.spatial.cKDTree(vertices).query_ball_point(vertices[sources], radius)
+
+    near = numpy.zeros(vertices.shape[0], dtype=bool)
+    remap = numpy.full(vertices.shape[0], -1, dtype=numpy.int32)
+    counts = numpy.zeros(len(sources), dtype=numpy.int64)
+    indices, data = [numpy.zeros(0, dtype=numpy.int32)], [numpy.zeros(0)]
+    for k, (source, ball) in enumerate(zip(sources, balls)):
+        ball = numpy.array(ball, dtype=numpy.int64)
+        near[ball] = True
+        local_triangles = triangles[numpy.unique(_csr_gather(indptr, incident, ball))]
+        local_triangles = local_triangles[numpy.all(near[local_triangles], axis=1)]
+        near[ball] = False
+        local_vertices = numpy.unique(local_triangles)
+        if source not in local_vertices:
+            continue
+        remap[local_vertices] = numpy.arange(local_vertices.shape[0], dtype=numpy.int32)
+        dist = gdist.compute_gdist(vertices[local_vertices],
+                                   remap[local_triangles],
+                                   source_indices=remap[[source]],
+                                   max_distance=max_distance)
+        remap[local_vertices] = -1
+        found = (dist <= max_distance) & (local_vertices != source)
+        counts[k] = found.sum()
+        indices.append(local_vertices[found])
+        data.append(dist[found])
+
+    return counts, numpy.concatenate(indices), numpy.concatenate(data)
+
+
+def local_gdist_matrix(vertices, triangles, max_distance, workers=None):
+    """
+    Sparse (CSC) matrix of the geodesic distance from every vertex to all the
+    vertices within ``max_distance`` of it, like ``gdist.local_gdist_matrix``,
+    but with the source vertices split across ``workers`` processes.
+
+    ``workers``: number of processes; with 1 the whole matrix comes from
+        ``gdist.local_gdist_matrix`` in the calling process, which is faster
+        than the per-source patches when they are not shared out. By default,
+        surfaces of at least GDIST_PARALLEL_MIN_VERTICES vertices use all CPUs
+        and smaller ones run in the calling process.
+    """
+    vertices = numpy.ascontiguousarray(vertices, dtype=numpy.float64)
+    triangles = numpy.ascontiguousarray(triangles, dtype=numpy.int32)
+    n_vertices = vertices.shape[0]
+    if workers is None:
+        workers = (os.cpu_count() or 1) if n_vertices >= GDIST_PARALLEL_MIN_VERTICES else 1
+    if workers == 1 or n_vertices <= GDIST_SOURCES_PER_TASK:
+        return gdist.local_gdist_matrix(vertices, triangles, max_distance=max_distance).tocsc()
+
+    edges = vertices[triangles] - vertices[numpy.roll(triangles, 1, axis=1)]
+    radius = max_distance + numpy.sqrt(numpy.max(numpy.sum(edges ** 2, axis=2), initial=0.0))
+    vertex_triangles = _csr_from_pairs(triangles.ravel(), numpy.repeat(numpy.arange(triangles.shape[0]), 3),
+                                       n_vertices, triangles.shape[0])
+    blocks = [numpy.arange(start, min(start + GDIST_SOURCES_PER_TASK, n_vertices))
+              for start in range(0, n_vertices, GDIST_SOURCES_PER_TASK)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_gdist_source_block, vertices, triangles, vertex_triangles,
+                                   sources, max_distance, radius)
+                   for sources in blocks]
+        results = [future.result() for future in futures]
+
+    # columns of the blocks are already in order, so the CSC arrays are plain concatenations
+    indptr = numpy.zeros(n_vertices + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.concatenate([counts for counts, _, _ in results]), out=indptr[1:])
+    indices = numpy.concatenate([idx for _, idx, _ in results])
+    data = numpy.concatenate([dat for _, _, dat in results])
+    return scipy.sparse.csc_matrix((data, indices, indptr), shape=(n_vertices, n_vertices))
+
+
+def _truncate_gdist_matrix(matrix, max_distance):
+    """Drop the entries of a CSC distance matrix further than ``max_distance``."""
+    keep = matrix.data <= max_distance
+    columns = numpy.repeat(numpy.arange(matrix.shape[1]), numpy.diff(matrix.indptr))
+    indptr = numpy.zeros(matrix.shape[1] + 1, dtype=matrix.indptr.dtype)
+    numpy.cumsum(numpy.bincount(columns[keep], minlength=matrix.shape[1]), out=indptr[1:])
+    return scipy.sparse.csc_matrix((matrix.data[keep], matrix.indices[keep], indptr), shape=matrix.shape)
+
+
+def _load_cached_gdist_matrix(cache_dir, gid, max_distance, n_vertices):
+    """
+    Return the cached matrix for ``gid`` computed with the smallest cutoff not
+    below ``max_distance``, truncated to ``max_distance``, or None.
+    """
+    if not os.path.isdir(cache_dir):
+        return None
+    prefix = "%s_" % gid.hex
+    cutoffs = []
+    for file_name in os.listdir(cache_dir):
+        if file_name.startswith(prefix) and file_name.endswith(".npz"):
+            try:
+                cutoffs.append((float(file_name[len(prefix):-len(".npz")]), file_name))
+            except ValueError:
+                continue
+    cutoffs = sorted(c for c in cutoffs if c[0] >= max_distance)
+    if not cutoffs:
+        return None
+    cutoff, file_name = cutoffs[0]
+    file_path = os.path.join(cache_dir, file_name)
+    try:
+        matrix = scipy.sparse.load_npz(file_path)
+        # the modification time orders the cache for eviction, see _evict_cached_gdist_matrices
+        os.utime(file_path)
+    except OSError:
+        # evicted meanwhile by another process
+        return None
+    if matrix.shape != (n_vertices, n_vertices):
+        return None
+    matrix = scipy.sparse.csc_matrix(matrix)
+    if cutoff > max_distance:
+        matrix = _truncate_gdist_matrix(matrix, max_distance)
+    return matrix
+
+
+def _store_cached_gdist_matrix(cache_dir, gid, max_distance, matrix):
+    os.makedirs(cache_dir, exist_ok=True)
+    file_path = os.path.join(cache_dir, "%s_%r.npz" % (gid.hex, float(max_distance)))
+    # write aside and rename, so concurrent readers never see a partial file
+    temp_path = "%s.%d.tmp.npz" % (file_path[:-len(".npz")], os.getpid())
+    scipy.sparse.save_npz(temp_path, matrix)
+    os.replace(temp_path, file_path)
+    _evict_cached_gdist_matrices(cache_dir, GDIST_CACHE_MAX_SIZE)
+
+
+def _evict_cached_gdist_matrices(cache_dir, max_size):
+    """Remove the least recently used matrices until the cache is not larger than ``max_size`` bytes."""
+    cached = []
+    for file_name in os.listdir(cache_dir):
+        if not file_name.endswith(".npz") or ".tmp." in file_name:
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_dir, file_name))
+        except OSError:
+            continue
+        cached.append((stat.st_mtime, stat.st_size, file_name))
+    total_size = sum(size for _, size, _ in cached)
+    for _, size, file_name in sorted(cached):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, file_name))
+        except OSError:
+            pass
+        total_size -= size
+
+
+def cached_local_gdist_matrix(gid, vertices, triangles, max_distance, workers=None, cache_dir=None):
+    """
+    ``local_gdist_matrix`` backed by an on disk cache keyed by the surface
+    ``gid`` and ``max_distance``. A matrix cached for a larger cutoff is
+    truncated instead of recomputing.
+
+    ``cache_dir``: defaults to GDIST_CACHE_DIR, caching is off when neither is set.
+        The directory is kept under GDIST_CACHE_MAX_SIZE bytes, by removing the
+        least recently used matrices.
+    """
+    cache_dir = cache_dir or GDIST_CACHE_DIR
+    if cache_dir:
+        dist = _load_cached_gdist_matrix(cache_dir, gid, max_distance, vertices.shape[0])
+        if dist is not None:
+            return dist
+
+    dist = local_gdist_matrix(vertices, triangles, max_distance, workers=workers)
+    if cache_dir:
+        _store_cached_gdist_matrix(cache_dir, gid, max_distance, dist)
+    return dist
+
+
 class ValidationResult(object):
     """
     Used by surface validate methods to report non-fatal failed validations
@@ -84,6 +280,46 @@ class ValidationResult(object):
         return '  |  '.join(message for message, _ in self.warnings)
 
 
+def _csr_from_pairs(rows, cols, n_rows, n_cols):
+    """
+    Build the (indptr, indices) arrays of a boolean CSR matrix from (row, col)
+    pairs. Duplicate pairs are dropped and columns are sorted within each row.
+    """
+    keys = numpy.unique(rows.astype(numpy.int64) * n_cols + cols)
+    indices = keys % n_cols
+    indptr = numpy.zeros(n_rows + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys // n_cols, minlength=n_rows), out=indptr[1:])
+    return indptr, indices
+
+
+def _csr_gather(indptr, indices, rows):
+    """Concatenate the column indices stored for each of ``rows``."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + numpy.arange(lengths.sum())]
+
+
+class _FrozensetView(Sequence):
+    """
+    Read only list of frozensets over a CSR (indptr, indices) pair, built lazily
+    on item access. Kept for callers of the former list of frozensets API.
+    """
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return self.indptr.shape[0] - 1
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        k = range(len(self))[k]
+        return frozenset(self.indices[self.indptr[k]:self.indptr[k + 1]].tolist())
+
+
 class SurfaceTypesEnum(TVBEnum):
     CORTICAL_SURFACE = "Cortical Surface"
     BRAIN_SKULL_SURFACE = "Brain Skull"
@@ -207,7 +443,9 @@ class Surface(HasTraits):
 
     # from scientific surfaces
     _vertex_neighbours = None
+    _vertex_neighbours_csr = None
     _vertex_triangles = None
+    _vertex_triangles_csr = None
     _triangle_centres = None
     _triangle_angles = None
     _triangle_areas = None
@@ -215,6 +453,7 @@ class Surface(HasTraits):
     _number_of_edges = None
     _edge_lengths = None
     _edge_triangles = None
+    _edge_triangles_csr = None
 
     def summary_info(self):
         """
@@ -275,46 +514,61 @@ class Surface(HasTraits):
         return dist
 
     # TODO why two methods for this?
-    def compute_geodesic_distance_matrix(self, max_dist):
+    def compute_geodesic_distance_matrix(self, max_dist, workers=None, cache_dir=None):
         """
         Calculate a sparse matrix of the geodesic distance from each vertex to
         all vertices within max_dist of them on the surface,
 
         ``max_dist``: find the distance to vertices out as far as max_dist.
+        ``workers``: number of processes sharing the source vertices, see
+            `local_gdist_matrix` for the default.
+        ``cache_dir``: directory of cached matrices, see `cached_local_gdist_matrix`.
 
         NOTE: Compute time increases rapidly with max_dist and the memory
         efficiency of the sparse matrices decreases, so, don't use too large a
         value for max_dist...
 
         """
-        dist = gdist.local_gdist_matrix(self.vertices.astype(numpy.float64),
-                                        self.triangles.astype(numpy.int32),
-                                        max_distance=max_dist)
+        dist = cached_local_gdist_matrix(self.gid, self.vertices, self.triangles, max_dist,
+                                         workers=workers, cache_dir=cache_dir)
 
         self.geodesic_distance_matrix = dist
 
+    @property
+    def vertex_neighbours_csr(self):
+        """
+        The vertex adjacency of the mesh as a CSR (indptr, indices) pair: the
+        neighbours of vertex k are indices[indptr[k]:indptr[k + 1]], sorted.
+        """
+        if self._vertex_neighbours_csr is None:
+            self._vertex_neighbours_csr = self._find_vertex_neighbours()
+        return self._vertex_neighbours_csr
+
     @property
     def vertex_neighbours(self):
         """
         List of the set of neighbours for each vertex.
         """
         if self._vertex_neighbours is None:
-            self._vertex_neighbours = self._find_vertex_neighbours()
+            self._vertex_neighbours = _FrozensetView(*self.vertex_neighbours_csr)
         return self._vertex_neighbours
 
     def _find_vertex_neighbours(self):
-        neighbours = [[] for _ in range(self.number_of_vertices)]
-        for k in range(self.number_of_triangles):
-            neighbours[self.triangles[k, 0]].append(self.triangles[k, 1])
-            neighbours[self.triangles[k, 0]].append(self.triangles[k, 2])
-            neighbours[self.triangles[k, 1]].append(self.triangles[k, 0])
-            neighbours[self.triangles[k, 1]].append(self.triangles[k, 2])
-            neighbours[self.triangles[k, 2]].append(self.triangles[k, 0])
-            neighbours[self.triangles[k, 2]].append(self.triangles[k, 1])
-
-        neighbours = list(map(frozenset, neighbours))
+        # every triangle (a, b, c) contributes the directed edges a-b, a-c, b-a, b-c, c-a, c-b
+        triangles = self.triangles
+        rows = numpy.repeat(triangles, 2, axis=1).ravel()
+        cols = triangles[:, [1, 2, 0, 2, 0, 1]].ravel()
+        return _csr_from_pairs(rows, cols, self.number_of_vertices, self.number_of_vertices)
 
-        return neighbours
+    @property
+    def vertex_triangles_csr(self):
+        """
+        The vertex to triangle incidence of the mesh as a CSR (indptr, indices)
+        pair: the triangles around vertex k are indices[indptr[k]:indptr[k + 1]].
+        """
+        if self._vertex_triangles_csr is None:
+            self._vertex_triangles_csr = self._find_vertex_triangles()
+        return self._vertex_triangles_csr
 
     @property
     def vertex_triangles(self):
@@ -322,22 +576,14 @@ class Surface(HasTraits):
         List of the set of triangles surrounding each vertex.
         """
         if self._vertex_triangles is None:
-            self._vertex_triangles = self._find_vertex_triangles()
+            self._vertex_triangles = _FrozensetView(*self.vertex_triangles_csr)
         return self._vertex_triangles
 
     def _find_vertex_triangles(self):
-        # self.attr calls __get__@type_mapped which is performance sensitive here
         triangles = self.triangles
-
-        vertex_triangles = [[] for _ in range(self.number_of_vertices)]
-        for k in range(self.number_of_triangles):
-            vertex_triangles[triangles[k, 0]].append(k)
-            vertex_triangles[triangles[k, 1]].append(k)
-            vertex_triangles[triangles[k, 2]].append(k)
-
-        vertex_triangles = list(map(frozenset, vertex_triangles))
-
-        return vertex_triangles
+        rows = triangles.ravel()
+        cols = numpy.repeat(numpy.arange(triangles.shape[0]), 3)
+        return _csr_from_pairs(rows, cols, self.number_of_vertices, triangles.shape[0])
 
     def nth_ring(self, vertex, neighbourhood=2, contains=False):
         """
@@ -347,19 +593,20 @@ class Surface(HasTraits):
         surf_obj.vertex_neighbours[vertex] setting contains=True returns all
         vertices from rings 1 to n inclusive.
         """
-        ring = {vertex}
-        local_vertices = {vertex}
+        indptr, indices = self.vertex_neighbours_csr
+        visited = numpy.zeros(self.number_of_vertices, dtype=bool)
+        visited[vertex] = True
+        ring = numpy.array([vertex], dtype=numpy.int64)
 
         for _ in range(neighbourhood):
-            neighbours = [self.vertex_neighbours[indx] for indx in ring]
-            neighbours = set(vert for subset in neighbours for vert in subset)
-            ring = neighbours.difference(local_vertices)
-            local_vertices.update(ring)
+            neighbours = numpy.unique(_csr_gather(indptr, indices, ring))
+            ring = neighbours[~visited[neighbours]]
+            visited[ring] = True
 
         if contains:
-            local_vertices.discard(vertex)
-            return frozenset(local_vertices)
-        return frozenset(ring)
+            visited[vertex] = False
+            return frozenset(numpy.nonzero(visited)[0].tolist())
+        return frozenset(ring.tolist())
 
     def compute_triangle_normals(self):
         """Calculates triangle normals."""
@@ -382,26 +629,30 @@ class Surface(HasTraits):
         Estimates vertex normals, based on triangle normals weighted by the
         angle they subtend at each vertex...
         """
-        vert_norms = numpy.zeros((self.number_of_vertices, 3))
-        bad_normal_count = 0
-        for k in range(self.number_of_vertices):
-            try:
-                tri_list = list(self.vertex_triangles[k])
-                angle_mask = self.triangles[tri_list, :] == k
-                angles = self.triangle_angles[tri_list, :]
-                angles = angles[angle_mask][:, numpy.newaxis]
-                angle_scaling = angles / numpy.sum(angles, axis=0)
-                vert_norms[k, :] = numpy.mean(angle_scaling * self.triangle_normals[tri_list, :], axis=0)
-                # Scale by angle subtended.
-                vert_norms[k, :] = vert_norms[k, :] / numpy.sqrt(numpy.sum(vert_norms[k, :] ** 2, axis=0))
-                # Normalise to unit vectors.
-            except (ValueError, FloatingPointError):
-                # If normals are bad, default to position vector
-                # A nicer solution would be to detect degenerate triangles and ignore their
-                # contribution to the vertex normal
-                vert_norms[k, :] = self.vertices[k] / numpy.sqrt(self.vertices[k].dot(self.vertices[k]))
-                bad_normal_count += 1
+        n_vertices = self.number_of_vertices
+        corners = self.triangles.ravel()
+        angles = self.triangle_angles.ravel()
+        weighted = numpy.repeat(self.triangle_normals, 3, axis=0) * angles[:, numpy.newaxis]
+
+        # Scatter-add the angle weighted normals of each triangle corner onto its vertex.
+        angle_sums = numpy.bincount(corners, weights=angles, minlength=n_vertices)
+        vert_norms = numpy.column_stack([numpy.bincount(corners, weights=weighted[:, i], minlength=n_vertices)
+                                         for i in range(3)])
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            # Scale by angle subtended.
+            vert_norms /= angle_sums[:, numpy.newaxis]
+            # Normalise to unit vectors.
+            vert_norms /= numpy.sqrt(numpy.sum(vert_norms ** 2, axis=1))[:, numpy.newaxis]
+
+        bad = ~numpy.all(numpy.isfinite(vert_norms), axis=1)
+        bad_normal_count = int(bad.sum())
         if bad_normal_count:
+            # If normals are bad, default to position vector
+            # A nicer solution would be to detect degenerate triangles and ignore their
+            # contribution to the vertex normal
+            positions = self.vertices[bad]
+            vert_norms[bad] = positions / numpy.sqrt(numpy.sum(positions ** 2, axis=1))[:, numpy.newaxis]
             self.log.warning(" %d vertices have bad normals" % bad_normal_count)
         self.vertex_normals = vert_norms
         self.log.debug("vertex_normals")
@@ -499,17 +750,12 @@ class Surface(HasTraits):
         Find all the edges of the mesh surface, return them sorted as a list of
         two element tuple, where the elements are vertex indices.
         """
-        v0 = numpy.vstack((self.triangles[:, 0][:, numpy.newaxis],
-                           self.triangles[:, 0][:, numpy.newaxis],
-                           self.triangles[:, 1][:, numpy.newaxis]))
-        v1 = numpy.vstack((self.triangles[:, 1][:, numpy.newaxis],
-                           self.triangles[:, 2][:, numpy.newaxis],
-                           self.triangles[:, 2][:, numpy.newaxis]))
-        edges = numpy.hstack((v0, v1))
-        edges.sort(axis=1)
-        edges = set(tuple(edges[k]) for k in range(edges.shape[0]))
-        edges = sorted(edges)
-        return edges
+        # the upper triangle of the (row sorted) adjacency holds each edge once, in order
+        indptr, indices = self.vertex_neighbours_csr
+        rows = numpy.repeat(numpy.arange(self.number_of_vertices), numpy.diff(indptr))
+        upper = indices >= rows
+        edges = numpy.column_stack((rows[upper], indices[upper]))
+        return list(map(tuple, edges.tolist()))
 
     @property
     def number_of_edges(self):
@@ -542,21 +788,35 @@ class Surface(HasTraits):
             self._edge_lengths = elem
         return self._edge_lengths
 
+    @property
+    def edge_triangles_csr(self):
+        """
+        The edge to triangle incidence as a CSR (indptr, indices) pair, with
+        rows in the order of the ``edges`` attribute.
+        """
+        if self._edge_triangles_csr is None:
+            self._edge_triangles_csr = self._find_edge_triangles()
+        return self._edge_triangles_csr
+
     @property
     def edge_triangles(self):
         """
         List of the pairs of triangles sharing an edge.
         """
         if self._edge_triangles is None:
-            self._edge_triangles = self._find_edge_triangles()
+            self._edge_triangles = _FrozensetView(*self.edge_triangles_csr)
         return self._edge_triangles
 
     def _find_edge_triangles(self):
-        triangles = [None] * self.number_of_edges
-        for k in range(self.number_of_edges):
-            triangles[k] = (frozenset(self.vertex_triangles[self.edges[k][0]]) &
-                            frozenset(self.vertex_triangles[self.edges[k][1]]))
-        return triangles
+        n_vertices = self.number_of_vertices
+        edge_keys = numpy.array(self.edges, dtype=numpy.int64).reshape((-1, 2))
+        edge_keys = edge_keys[:, 0] * n_vertices + edge_keys[:, 1]
+        # the three edges of every triangle, with sorted endpoints
+        sides = numpy.sort(self.triangles[:, [0, 1, 0, 2, 1, 2]].reshape((-1, 3, 2)), axis=2)
+        side_keys = sides[..., 0].astype(numpy.int64) * n_vertices + sides[..., 1]
+        rows = numpy.searchsorted(edge_keys, side_keys.ravel())
+        cols = numpy.repeat(numpy.arange(self.number_of_triangles), 3)
+        return _csr_from_pairs(rows, cols, edge_keys.shape[0], self.number_of_triangles)
 
     def compute_topological_constants(self):
         """
@@ -568,9 +828,9 @@ class Surface(HasTraits):
         We call isolated vertices those who do not belong to at least 3 triangles.
         """
         euler = self.number_of_vertices + self.number_of_triangles - self.number_of_edges
-        triangles_per_vertex = numpy.array(list(map(len, self.vertex_triangles)))
+        triangles_per_vertex = numpy.diff(self.vertex_triangles_csr[0])
         isolated = numpy.nonzero(triangles_per_vertex < 3)
-        triangles_per_edge = numpy.array(list(map(len, self.edge_triangles)))
+        triangles_per_edge = numpy.diff(self.edge_triangles_csr[0])
         pinched_off = numpy.nonzero(triangles_per_edge > 2)
         holes = numpy.nonzero(triangles_per_edge < 2)
         return euler, isolated[0], pinched_off[0], holes[0]
@@ -626,24 +886,26 @@ class Surface(HasTraits):
 
         """
 
-        from math import exp, pi
-
         assert fv.shape[0] == self.vertices.shape[0]
         assert hasattr(self, 'geodesic_distance_matrix')
 
-        lbo = numpy.zeros_like(fv)
-        gd = self.geodesic_distance_matrix
-        for w in range(len(self.vertices)):
-            mesh_sum = 0.0
-            for t in range(len(self.triangles)):
-                face_sum = 0.0
-                for p in self.triangles[t]:
-                    face_sum += exp(-gd[w, p] ** 2 / (4 * h)) * (fv[p] - fv[w])
-                face_sum *= self.triangle_areas[t] / 3.0
-                mesh_sum += face_sum
-            lbo[w] = mesh_sum / (4.0 * pi * h ** 2)
-
-        return lbo
+        # Each vertex p collects area(t) / 3 from every face t in its triangle fan.
+        indptr, indices = self.vertex_triangles_csr
+        face_areas = self.triangle_areas[:, 0] / 3.0
+        vertex_areas = numpy.bincount(numpy.repeat(numpy.arange(self.number_of_vertices), numpy.diff(indptr)),
+                                      weights=face_areas[indices], minlength=self.number_of_vertices)
+
+        # Entries missing from the sparse distance matrix count as a zero distance, i.e. a unit
+        # kernel. Split the kernel into that dense unit part and a sparse correction on stored entries.
+        gd = scipy.sparse.coo_matrix(self.geodesic_distance_matrix)
+        correction = (numpy.exp(-gd.data ** 2 / (4 * h)) - 1.0) * vertex_areas[gd.col]
+        kernel = scipy.sparse.csr_matrix((correction, (gd.row, gd.col)), shape=gd.shape)
+
+        weight_sums = vertex_areas.sum() + numpy.asarray(kernel.sum(axis=1)).ravel()
+        weight_sums = weight_sums.reshape((-1,) + (1,) * (fv.ndim - 1))
+        lbo = vertex_areas.dot(fv) + kernel.dot(fv) - weight_sums * fv
+
+        return (lbo / (4.0 * numpy.pi * h ** 2)).astype(fv.dtype, copy=False)
 
     def validate(self):
         self.number_of_vertices = self.vertices.shape[0]
@@ -27,13 +27,238 @@
 """
 A Numba backend based on the NumPy backend.
 
+Region-level simulations are run with a single generated kernel which fuses,
+for a chunk of time steps, the delayed coupling read from the history ring
+buffer, the model dfuns, the integration scheme, the history update and the
+sampling of the monitors. The kernel is generated from the declarative
+equations of the model (``state_variable_dfuns``) and coupling (``pre_expr``
+and ``post_expr``), and compiled kernels are cached in a private per-user
+directory (``~/.cache/tvb/nb-kernels`` or ``TVB_NB_CACHE_DIR``), keyed by a hash
+of the rendered source, i.e. of the template and all parameter values.
+
 ... moduleauthor:: Marmaduke Woodman <marmaduke.woodman@univ-amu.fr>
 
 """
 
+import os
+import sys
+import hashlib
+import importlib.util
+import numpy as np
+import autopep8
 
 from .np import NpBackend
 
+from tvb.simulator.lab import *
+
 
 class NbBackend(NpBackend):
-    pass
+
+    supported_monitors = (
+        monitors.Raw,
+        monitors.SubSample,
+        monitors.GlobalAverage,
+        monitors.TemporalAverage,
+        monitors.Bold,
+    )
+
+    unsupported_monitors = (
+        monitors.AfferentCoupling,
+        monitors.SpatialAverage,
+        monitors.BoldRegionROI,
+    )
+
+    supported_integrators = (
+        integrators.HeunStochastic,
+        integrators.HeunDeterministic,
+        integrators.EulerStochastic,
+        integrators.EulerDeterministic,
+        integrators.Identity,
+        integrators.IdentityStochastic,
+        integrators.RungeKutta4thOrderDeterministic,
+    )
+
+    def __init__(self, cache_dir=None):
+        super(NbBackend, self).__init__()
+        if cache_dir is None:
+            cache_dir = os.environ.get('TVB_NB_CACHE_DIR',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'tvb', 'nb-kernels'))
+        self.cache_dir = cache_dir
+
+    def _ensure_private_cache_dir(self):
+        "Create the kernel cache directory, readable and writable only by the current user."
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        stat = os.stat(self.cache_dir)
+        if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+            raise PermissionError("Kernel cache directory %s is not owned by the current user." % self.cache_dir)
+        if stat.st_mode & 0o077:
+            os.chmod(self.cache_dir, 0o700)
+
+    def check_compatibility(self, sim):
+        # monitors
+        for monitor in sim.monitors:
+            self._check_choices(monitor, self.supported_monitors)
+            if isinstance(monitor, self.unsupported_monitors):
+                raise NotImplementedError("Monitor %s is not supported." % type(monitor).__name__)
+        # integrators
+        self._check_choices(sim.integrator, self.supported_integrators)
+        if isinstance(sim.integrator, integrators.IntegratorStochastic):
+            self._check_choices(sim.integrator.noise, noise.Additive)
+            if sim.integrator.noise.ntau > 0.0:
+                raise NotImplementedError("Only white noise is supported.")
+        # models
+        for attr in ('state_variable_dfuns', 'coupling_terms', 'parameter_names'):
+            if not hasattr(sim.model, attr):
+                raise NotImplementedError("Model %s does not provide declarative %s."
+                                          % (type(sim.model).__name__, attr))
+        if sim.model.has_nonint_vars:
+            raise NotImplementedError("Models with non-integrated state variables are not supported.")
+        # coupling
+        if not hasattr(sim.coupling, 'pre_expr'):
+            raise NotImplementedError("Coupling %s does not provide pre/post expressions."
+                                      % type(sim.coupling).__name__)
+        # surface
+        if sim.surface is not None:
+            raise NotImplementedError("Surface simulation not supported.")
+
+    def build_cached_py_func(self, template_source, content, name='kernel', print_source=False):
+        """
+        Build and retrieve one or more Python functions from template, as
+        build_py_func, but write the source to a module in the cache directory
+        named after the hash of the source, so that Numba can cache the
+        compiled functions declared with ``cache=True`` across processes.
+
+        """
+        source = self.render_template(template_source, content)
+        modname = 'tvb_nb_' + hashlib.sha256(source.encode('utf-8')).hexdigest()[:24]
+        mod = sys.modules.get(modname)
+        if mod is None:
+            source = autopep8.fix_code(source)
+            self._ensure_private_cache_dir()
+            fullfname = os.path.join(self.cache_dir, modname + '.py')
+            # only reuse a cached module holding exactly the source rendered now
+            if not os.path.exists(fullfname) or self._read_source(fullfname) != source:
+                # write then rename, in case another process builds the same kernel
+                tmpfname = '%s.%d.tmp' % (fullfname, os.getpid())
+                with open(tmpfname, 'w') as fd:
+                    fd.write(source)
+                os.replace(tmpfname, fullfname)
+            spec = importlib.util.spec_from_file_location(modname, fullfname)
+            mod = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(mod)
+            sys.modules[modname] = mod
+        if print_source:
+            with open(mod.__file__, 'r') as fd:
+                print(self.insert_line_numbers(fd.read()))
+        fns = [getattr(mod, n) for n in name.split(',')]
+        return fns[0] if len(fns) == 1 else fns
+
+    @staticmethod
+    def _read_source(fname):
+        with open(fname, 'r') as fd:
+            return fd.read()
+
+    def build_step(self, sim, print_source=False):
+        "Build the fused step kernel for a configured simulator."
+        template = '<%include file="nb-fused-step.py.mako"/>'
+        content = dict(sim=sim, np=np, debug_nojit=False)
+        return self.build_cached_py_func(template, content, name='step', print_source=print_source)
+
+    def _sparse_connectivity(self, sim):
+        "Row compressed non-zero weights and delays, in the order used by SparseHistory."
+        weights = sim.connectivity.weights
+        nnz_mask = weights != 0.0
+        indptr = np.r_[0, np.cumsum(nnz_mask.sum(axis=1))]
+        _, indices = np.nonzero(nnz_mask)
+        idelays = sim.connectivity.idelays[nnz_mask].astype(np.int64)
+        return indptr, indices, weights[nnz_mask], idelays
+
+    def _spatial_parameters(self, sim):
+        n_node = sim.connectivity.number_of_regions
+        names = sim.model.spatial_parameter_names
+        parmat = np.zeros((n_node, len(names)))
+        for j, name in enumerate(names):
+            parmat[:, j] = getattr(sim.model, name).reshape((-1,))
+        return parmat
+
+    def _noise_chunk(self, sim, nstep):
+        "Draw noise for a chunk of steps, in the same order as the stochastic integrators."
+        noise = sim.integrator.noise.generate((nstep,) + sim.current_state.shape)
+        noise *= sim.integrator.noise.gfun(None)
+        return noise
+
+    def _monitor_buffers(self, monitor, nstep, n_node, n_mode):
+        "Output and state buffers passed to the kernel for one monitor."
+        n_voi = len(monitor.voi)
+        if isinstance(monitor, monitors.Raw):
+            return np.zeros((nstep, n_voi, n_node, n_mode)),
+        n_out = nstep // monitor.istep + 1
+        if isinstance(monitor, monitors.GlobalAverage):
+            return np.zeros((n_out, n_voi, 1, n_mode)),
+        out = np.zeros((n_out, n_voi, n_node, n_mode))
+        if isinstance(monitor, monitors.TemporalAverage):
+            return out, monitor._stock
+        if isinstance(monitor, monitors.Bold):
+            return out, monitor._interim_stock, monitor._stock, monitor.hemodynamic_response_function[0].copy()
+        return out,
+
+    def _monitor_times(self, monitor, steps):
+        "Sample times of a monitor for the given steps."
+        if isinstance(monitor, monitors.Raw):
+            return steps * monitor.dt
+        steps = steps[steps % monitor.istep == 0]
+        if isinstance(monitor, monitors.TemporalAverage):
+            return (steps - monitor.istep / 2.0) * monitor.dt
+        return steps * monitor.dt
+
+    def run_sim(self, sim, nstep=None, simulation_length=None, chunksize=4096, print_source=False):
+        """
+        Run a configured simulator with the fused kernel, continuing from and
+        updating its current state, step, history and monitor buffers. Returns
+        monitor outputs as Simulator.run does.
+
+        """
+        assert nstep is not None or simulation_length is not None or sim.simulation_length is not None
+
+        self.check_compatibility(sim)
+
+        if nstep is None:
+            if simulation_length is None:
+                simulation_length = sim.simulation_length
+            nstep = int(np.ceil(simulation_length / sim.integrator.dt))
+
+        step = self.build_step(sim, print_source=print_source)
+        dt = sim.integrator.dt
+        indptr, indices, weights, idelays = self._sparse_connectivity(sim)
+        parmat = self._spatial_parameters(sim)
+        state = np.ascontiguousarray(sim.current_state, dtype=np.float64)
+        _, n_node, n_mode = state.shape
+        hist = sim.history.buffer
+        stochastic = isinstance(sim.integrator, integrators.IntegratorStochastic)
+        if sim.stimulus is not None:
+            sim.stimulus.configure_time(np.arange(nstep).reshape((1, -1)) * dt)
+
+        start_step = sim.current_step + 1
+        ts, ys = [[] for _ in sim.monitors], [[] for _ in sim.monitors]
+        for step0 in range(start_step, start_step + nstep, chunksize):
+            n = min(chunksize, start_step + nstep - step0)
+            args = [step0, n, state, hist, indptr, indices, weights, idelays, parmat]
+            if stochastic:
+                args.append(self._noise_chunk(sim, n))
+            if sim.stimulus is not None:
+                stim_steps = np.r_[step0 - start_step:step0 - start_step + n]
+                args.append(np.ascontiguousarray(sim.stimulus(stim_steps).T))
+            outs = []
+            for monitor in sim.monitors:
+                buffers = self._monitor_buffers(monitor, n, n_node, n_mode)
+                outs.append(buffers[0])
+                args.extend(buffers)
+            counts = step(*args)
+            steps = np.r_[step0:step0 + n]
+            for monitor, out, count, t, y in zip(sim.monitors, outs, counts, ts, ys):
+                t.append(self._monitor_times(monitor, steps))
+                y.append(out[:count])
+
+        sim.current_state = state
+        sim.current_step = sim.current_step + nstep
+        return [(np.concatenate(t), np.concatenate(y)) for t, y in zip(ts, ys)]
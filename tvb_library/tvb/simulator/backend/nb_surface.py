@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Parallel Numba kernels for surface simulations.
+
+The per-step operators of a surface simulation which scale with the number
+of vertices, i.e. the local coupling product with the sparse local
+connectivity, the scatter of region coupling onto vertices and the average
+of vertex state within regions, are evaluated over blocks of rows in
+parallel with Numba's prange, using a given number of threads.
+
+Model dfuns and integrator schemes are left to their vectorized NumPy
+implementations, evaluated over all nodes at once. They are not split
+into blocks of vertices, because:
+
+- each model multiplies the local coupling with state variables of its
+  own choosing inside its dfun, so a block would need the state of every
+  neighbouring vertex, also at the intermediate stages of e.g. Heun;
+- stochastic schemes draw the noise for all nodes from one random
+  stream, which blocks would reorder, changing results for a given seed.
+
+"""
+
+import numba
+import numpy as np
+import scipy.sparse
+
+
+def _n_threads(threads):
+    "Clamp a requested number of threads to those available to Numba."
+    return max(1, min(int(threads), numba.config.NUMBA_NUM_THREADS))
+
+
+@numba.njit(parallel=True, cache=True)
+def _csr_matmul(indptr, indices, data, x, out):
+    for i in numba.prange(out.shape[0]):
+        for j in range(out.shape[1]):
+            acc = 0.0
+            for k in range(indptr[i], indptr[i + 1]):
+                acc += data[k] * x[indices[k], j]
+            out[i, j] = acc
+
+
+@numba.njit(parallel=True, cache=True)
+def _gather_nodes(src, index, out):
+    for i in numba.prange(index.shape[0]):
+        for c in range(src.shape[0]):
+            for m in range(src.shape[2]):
+                out[c, i, m] = src[c, index[i], m]
+
+
+@numba.njit(parallel=True, cache=True)
+def _mean_over_regions(state, indptr, vertices, out):
+    for r in numba.prange(out.shape[1]):
+        for c in range(state.shape[0]):
+            for m in range(state.shape[2]):
+                acc = 0.0
+                for k in range(indptr[r], indptr[r + 1]):
+                    acc += state[c, vertices[k], m]
+                out[c, r, m] = acc / (indptr[r + 1] - indptr[r])
+
+
+class ParallelLocalCoupling:
+    """
+    Sparse local coupling operator, used in place of the SciPy sparse matrix
+    passed to model dfuns: products with state arrays of shape (n_node, ...)
+    are evaluated in parallel over rows.
+
+    As with SciPy sparse matrices, ``*`` is the matrix product on either
+    side, and NumPy arrays defer to this class for it.
+
+    """
+
+    # above ndarray, so that ndarray * self calls __rmul__, as for SciPy sparse matrices
+    __array_priority__ = 10.1
+
+    def __init__(self, matrix, threads):
+        csr = scipy.sparse.csr_matrix(matrix)
+        csr.sort_indices()
+        self.matrix = csr
+        self.shape = csr.shape
+        self.dtype = csr.dtype
+        self.threads = _n_threads(threads)
+        self._transposed = None
+
+    @property
+    def T(self):
+        if self._transposed is None:
+            self._transposed = ParallelLocalCoupling(self.matrix.T, self.threads)
+        return self._transposed
+
+    def __mul__(self, other):
+        if np.isscalar(other):
+            return ParallelLocalCoupling(self.matrix * other, self.threads)
+        if scipy.sparse.issparse(other):
+            return self.matrix * other
+        other = np.asarray(other)
+        x = np.ascontiguousarray(other.reshape((other.shape[0], -1)), dtype=np.float64)
+        out = np.empty((self.shape[0], x.shape[1]))
+        numba.set_num_threads(self.threads)
+        _csr_matmul(self.matrix.indptr, self.matrix.indices, self.matrix.data, x, out)
+        return out.reshape((self.shape[0],) + other.shape[1:])
+
+    def __rmul__(self, other):
+        if np.isscalar(other):
+            return self * other
+        if scipy.sparse.issparse(other):
+            return other * self.matrix
+        # other @ matrix, computed as the transposed product over the last axis of other
+        other = np.asarray(other)
+        return np.moveaxis(self.T * np.moveaxis(other, -1, 0), 0, -1)
+
+    dot = __matmul__ = __mul__
+    __rmatmul__ = __rmul__
+
+
+class SurfaceEngine:
+    "Parallel region/vertex mappings and local coupling for a surface simulation."
+
+    def __init__(self, region_mapping, n_region, threads):
+        self.threads = _n_threads(threads)
+        self.region_mapping = np.asarray(region_mapping, dtype=np.int64)
+        counts = np.bincount(self.region_mapping, minlength=n_region)
+        self.region_indptr = np.r_[0, np.cumsum(counts)].astype(np.int64)
+        # vertices sorted by region, in the order they are summed by the reference backend
+        self.region_vertices = np.argsort(self.region_mapping, kind='stable').astype(np.int64)
+        self.n_region = n_region
+
+    def local_coupling(self, matrix):
+        "Wrap a sparse local coupling matrix for parallel products."
+        return ParallelLocalCoupling(matrix, self.threads)
+
+    def region_to_vertex(self, coupling):
+        "Map region coupling (n_cvar, n_region, n_mode) onto nodes."
+        out = np.empty((coupling.shape[0], self.region_mapping.size, coupling.shape[2]))
+        numba.set_num_threads(self.threads)
+        _gather_nodes(np.ascontiguousarray(coupling), self.region_mapping, out)
+        return out
+
+    def vertex_to_region(self, state):
+        "Average node state (n_svar, n_node, n_mode) within regions."
+        out = np.empty((state.shape[0], self.n_region, state.shape[2]))
+        numba.set_num_threads(self.threads)
+        _mean_over_regions(np.ascontiguousarray(state), self.region_indptr, self.region_vertices, out)
+        return out
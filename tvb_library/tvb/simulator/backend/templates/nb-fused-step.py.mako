@@ -0,0 +1,300 @@
+## -*- coding: utf-8 -*-
+##
+##
+## TheVirtualBrain-Scientific Package. This package holds all simulators, and
+## analysers necessary to run brain-simulations. You can use it stand alone or
+## in conjunction with TheVirtualBrain-Framework Package. See content of the
+## documentation-folder for more details. See also http://www.thevirtualbrain.org
+##
+## (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+##
+## This program is free software: you can redistribute it and/or modify it under the
+## terms of the GNU General Public License as published by the Free Software Foundation,
+## either version 3 of the License, or (at your option) any later version.
+## This program is distributed in the hope that it will be useful, but WITHOUT ANY
+## WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+## PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+## You should have received a copy of the GNU General Public License along with this
+## program.  If not, see <http://www.gnu.org/licenses/>.
+##
+##
+##   CITATION:
+## When using The Virtual Brain for scientific publications, please cite it as explained here:
+## https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+##
+##
+
+## Fused region-level step kernel: delayed coupling from the history ring
+## buffer, dfuns, integration scheme, history update and monitor sampling
+## for a chunk of time steps in a single compiled call.
+
+import math
+import numpy as np
+import numba as nb
+
+sin, cos, exp, tanh, sqrt, log = math.sin, math.cos, math.exp, math.tanh, math.sqrt, math.log
+
+<%include file="nb-dfuns.py.mako" />
+
+<%
+    from tvb.simulator.integrators import (IntegratorStochastic,
+        EulerDeterministic, EulerStochastic,
+        HeunDeterministic, HeunStochastic,
+        Identity, IdentityStochastic, RungeKutta4thOrderDeterministic)
+    from tvb.simulator.monitors import (Raw, SubSample, GlobalAverage,
+        TemporalAverage, Bold)
+    from tvb.datatypes.equations import FirstOrderVolterra
+
+    integrator = sim.integrator
+    svars = sim.model.state_variables
+    cterms = sim.model.coupling_terms
+    cvars = list(sim.model.cvar)
+    stochastic = isinstance(integrator, IntegratorStochastic)
+    stimulus = sim.stimulus is not None
+    stvar = list(sim.model.stvar) if stimulus else []
+    vois = list(sim.model.variables_of_interest)
+    used_vois = sorted(set(int(voi) for monitor in sim.monitors for voi in monitor.voi))
+
+    bounds = {}
+    if integrator._integration_state_variable_boundaries is not None:
+        for isvar, (lo, hi) in zip(integrator._bounded_integration_state_variable_indices,
+                                   integrator._integration_state_variable_boundaries):
+            bounds[svars[isvar]] = lo, hi
+    clamps = {}
+    if integrator._clamped_integration_state_variable_values is not None:
+        for isvar, value in zip(integrator._clamped_integration_state_variable_indices,
+                                integrator._clamped_integration_state_variable_values):
+            clamps[svars[isvar]] = value
+
+    def stim(svar):
+        return ' + stim[k, i]' if svars.index(svar) in stvar else ''
+
+    def dt_stim(svar):
+        return ' + dt * stim[k, i]' if svars.index(svar) in stvar else ''
+
+    def monitor_args(mi, monitor):
+        args = f'out_{mi}'
+        if isinstance(monitor, TemporalAverage):
+            args += f', stock_{mi}'
+        if isinstance(monitor, Bold):
+            args += f', interim_{mi}, stock_{mi}, hrf_{mi}'
+        return args
+%>
+
+<%def name="call_dfuns(dx, x)">
+% for svar in svars:
+                ${dx}${svar} = dx_${svar}(${', '.join(x + svar_ for svar_ in svars)}, ${', '.join(cterms)}, parmat[i])
+% endfor
+</%def>
+
+<%def name="bound_and_clamp(x)">
+% for svar in svars:
+% if svar in bounds:
+                ${x}${svar} = ${bounds[svar][0]} if ${x}${svar} < ${bounds[svar][0]} else ${x}${svar}
+                ${x}${svar} = ${bounds[svar][1]} if ${x}${svar} > ${bounds[svar][1]} else ${x}${svar}
+% endif
+% if svar in clamps:
+                ${x}${svar} = ${clamps[svar]}
+% endif
+% endfor
+</%def>
+
+% for cterm in cterms:
+${'' if debug_nojit else '@nb.njit(inline="always")'}
+def cx_${cterm}(t, i, m, horizon, hist, indptr, indices, weights, idelays):
+% for par in sim.coupling.parameter_names:
+    ${par} = ${getattr(sim.coupling, par)[0]}
+% endfor
+    n_cvar = ${len(cvars)}
+% for ci in range(len(cvars)):
+    x_i_${ci} = hist[(t - 1) % horizon, ${ci}, i, m]
+% endfor
+    x_i = x_i_${loop.index}
+    gx = 0.0
+    for kk in range(indptr[i], indptr[i + 1]):
+        tj = (t - 1 - idelays[kk] + horizon) % horizon
+% for ci in range(len(cvars)):
+        x_j_${ci} = hist[tj, ${ci}, indices[kk], m]
+% endfor
+        x_j = x_j_${loop.index}
+        gx += weights[kk] * (${sim.coupling.pre_expr})
+    return ${sim.coupling.post_expr}
+
+% endfor
+
+${'' if debug_nojit else '@nb.njit(cache=True)'}
+def step(step0, nstep, state, hist, indptr, indices, weights, idelays, parmat
+         ${', noise' if stochastic else ''}
+         ${', stim' if stimulus else ''}
+% for monitor in sim.monitors:
+         , ${monitor_args(loop.index, monitor)}
+% endfor
+         ):
+    dt = ${integrator.dt}
+    horizon = hist.shape[0]
+    n_node = state.shape[1]
+    n_mode = state.shape[2]
+% for monitor in sim.monitors:
+    n_out_${loop.index} = 0
+% endfor
+    for k in range(nstep):
+        t = step0 + k
+        for i in range(n_node):
+            for m in range(n_mode):
+% for cterm in cterms:
+                ${cterm} = cx_${cterm}(t, i, m, horizon, hist, indptr, indices, weights, idelays)
+% endfor
+% for svar in svars:
+                ${svar} = state[${loop.index}, i, m]
+% endfor
+% if stochastic:
+% for svar in svars:
+                z${svar} = noise[k, ${loop.index}, i, m]
+% endfor
+% endif
+${call_dfuns('d0', '')}
+
+% if isinstance(integrator, EulerDeterministic):
+% for svar in svars:
+                n${svar} = ${svar} + dt * (d0${svar}${stim(svar)})
+% endfor
+% elif isinstance(integrator, EulerStochastic):
+% for svar in svars:
+                n${svar} = ${svar} + dt * d0${svar} + z${svar}${dt_stim(svar)}
+% endfor
+% elif isinstance(integrator, HeunDeterministic):
+% for svar in svars:
+                i1${svar} = ${svar} + dt * (d0${svar}${stim(svar)})
+% endfor
+${bound_and_clamp('i1')}
+${call_dfuns('d1', 'i1')}
+% for svar in svars:
+                n${svar} = ${svar} + (d0${svar} + d1${svar}) * dt / 2.0${dt_stim(svar)}
+% endfor
+% elif isinstance(integrator, HeunStochastic):
+% for svar in svars:
+                i1${svar} = ${svar} + dt * d0${svar} + z${svar}${dt_stim(svar)}
+% endfor
+${bound_and_clamp('i1')}
+${call_dfuns('d1', 'i1')}
+% for svar in svars:
+                n${svar} = ${svar} + (d0${svar} + d1${svar}) * dt / 2.0 + z${svar}${dt_stim(svar)}
+% endfor
+% elif isinstance(integrator, RungeKutta4thOrderDeterministic):
+% for svar in svars:
+                i1${svar} = ${svar} + dt / 2.0 * d0${svar}
+% endfor
+${bound_and_clamp('i1')}
+${call_dfuns('d1', 'i1')}
+% for svar in svars:
+                i2${svar} = ${svar} + dt / 2.0 * d1${svar}
+% endfor
+${bound_and_clamp('i2')}
+${call_dfuns('d2', 'i2')}
+% for svar in svars:
+                i3${svar} = ${svar} + dt * d2${svar}
+% endfor
+${bound_and_clamp('i3')}
+${call_dfuns('d3', 'i3')}
+% for svar in svars:
+                n${svar} = ${svar} + dt / 6.0 * (d0${svar} + 2.0 * d1${svar} + 2.0 * d2${svar} + d3${svar})${dt_stim(svar)}
+% endfor
+% elif isinstance(integrator, IdentityStochastic):
+% for svar in svars:
+                n${svar} = d0${svar} + z${svar}${stim(svar)}
+% endfor
+% elif isinstance(integrator, Identity):
+% for svar in svars:
+                n${svar} = d0${svar}${stim(svar)}
+% endfor
+% endif
+${bound_and_clamp('n')}
+% for svar in svars:
+                state[${loop.index}, i, m] = n${svar}
+% endfor
+
+        # update history once all nodes have been stepped
+% for cvar in cvars:
+        hist[t % horizon, ${loop.index}] = state[${cvar}]
+% endfor
+
+        # sample monitors from the observed variables
+        for i in range(n_node):
+            for m in range(n_mode):
+% for svar in svars:
+                ${svar} = state[${loop.index}, i, m]
+% endfor
+% for voi in used_vois:
+                obs_${voi} = ${vois[voi]}
+% endfor
+% for monitor in sim.monitors:
+<% mi = loop.index %>
+% for voi in monitor.voi:
+% if isinstance(monitor, Raw):
+                out_${mi}[n_out_${mi}, ${loop.index}, i, m] = obs_${voi}
+% elif isinstance(monitor, TemporalAverage):
+                stock_${mi}[${loop.index}, i, m] += obs_${voi}
+% elif isinstance(monitor, SubSample):
+                if t % ${monitor.istep} == 0:
+                    out_${mi}[n_out_${mi}, ${loop.index}, i, m] = obs_${voi}
+% elif isinstance(monitor, GlobalAverage):
+                if t % ${monitor.istep} == 0:
+                    out_${mi}[n_out_${mi}, ${loop.index}, 0, m] += obs_${voi}
+% elif isinstance(monitor, Bold):
+                interim_${mi}[t % ${monitor._interim_istep} - 1, ${loop.index}, i, m] = obs_${voi}
+% endif
+% endfor
+% endfor
+
+% for monitor in sim.monitors:
+<% mi = loop.index %>
+% if isinstance(monitor, Raw):
+        n_out_${mi} += 1
+% elif isinstance(monitor, TemporalAverage):
+        if t % ${monitor.istep} == 0:
+            for j in range(${len(monitor.voi)}):
+                for i in range(n_node):
+                    for m in range(n_mode):
+                        out_${mi}[n_out_${mi}, j, i, m] = stock_${mi}[j, i, m] / ${monitor.istep}
+                        stock_${mi}[j, i, m] = 0.0
+            n_out_${mi} += 1
+% elif isinstance(monitor, SubSample):
+        if t % ${monitor.istep} == 0:
+            n_out_${mi} += 1
+% elif isinstance(monitor, GlobalAverage):
+        if t % ${monitor.istep} == 0:
+            for j in range(${len(monitor.voi)}):
+                for m in range(n_mode):
+                    out_${mi}[n_out_${mi}, j, 0, m] /= n_node
+            n_out_${mi} += 1
+% elif isinstance(monitor, Bold):
+<%
+    n_interim = monitor._interim_istep
+    n_stock = monitor._stock_steps
+%>
+        if t % ${n_interim} == 0:
+            pos = (t // ${n_interim} % ${n_stock}) - 1
+            for j in range(${len(monitor.voi)}):
+                for i in range(n_node):
+                    for m in range(n_mode):
+                        acc = 0.0
+                        for s in range(${n_interim}):
+                            acc += interim_${mi}[s, j, i, m]
+                        stock_${mi}[pos, j, i, m] = acc / ${n_interim}
+        if t % ${monitor.istep} == 0:
+            shift = (t // ${n_interim} % ${n_stock}) - 1
+            for j in range(${len(monitor.voi)}):
+                for i in range(n_node):
+                    for m in range(n_mode):
+                        acc = 0.0
+                        for s in range(${n_stock}):
+                            acc += hrf_${mi}[(s - shift) % ${n_stock}] * stock_${mi}[s, j, i, m]
+% if isinstance(monitor.hrf_kernel, FirstOrderVolterra):
+                        acc = (acc - 1.0) * ${monitor.hrf_kernel.parameters["k_1"] * monitor.hrf_kernel.parameters["V_0"]}
+% endif
+                        out_${mi}[n_out_${mi}, j, i, m] = acc
+            n_out_${mi} += 1
+% endif
+% endfor
+
+    return (${''.join(f'n_out_{i}, ' for i in range(len(sim.monitors)))})
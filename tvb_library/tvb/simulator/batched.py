@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+"""
+A Simulator variant which integrates many parameter sets of the same network
+in a single time stepping loop.
+
+The instances are folded into the node axis of the state, so that models,
+integrators, noise and element-wise monitors see a network of
+``n_instances * number_of_regions`` uncoupled copies, and into the mode axis
+of the history buffer, so that delayed coupling is evaluated for all
+instances at once with the regular sparse history and coupling functions.
+Monitor outputs are returned with a leading instance axis.
+
+.. moduleauthor:: Marmaduke Woodman <marmaduke.woodman@univ-amu.fr>
+
+"""
+
+import numpy
+
+from tvb.basic.neotraits.api import Attr
+from tvb.simulator import monitors
+from .history import SparseHistory
+from .simulator import Simulator
+
+
+class BatchedSimulator(Simulator):
+    """
+    Simulates a batch of parameter sets for the same structural network.
+
+    The parameter sets are given as a dict mapping ``'model.<name>'`` or
+    ``'coupling.<name>'`` to arrays with one value per instance, e.g.::
+
+        sim = BatchedSimulator(
+            connectivity=conn,
+            parameter_sets={'coupling.a': numpy.r_[0.001:0.01:32j]},
+            monitors=[monitors.TemporalAverage()])
+        (t, y), = sim.configure().run()   # y.shape == (n_time, 32, n_voi, n_node, n_mode)
+
+    Model parameters may also be given per instance and per node, with shape
+    ``(n_instances, number_of_regions)``.
+
+    """
+
+    parameter_sets = Attr(
+        field_type=dict,
+        label="Parameter sets",
+        default=None,
+        required=False,
+        doc="""Mapping of 'model.<parameter>' or 'coupling.<parameter>' to
+        arrays of values, one per simulated instance.""")
+
+    supported_monitors = (monitors.Raw, monitors.SubSample, monitors.TemporalAverage,
+                          monitors.AfferentCoupling, monitors.Bold)
+    unsupported_monitors = (monitors.BoldRegionROI, )
+
+    n_instances = 1
+
+    @property
+    def good_history_shape(self):
+        """Returns expected history shape, with instances folded into nodes."""
+        n_node = self.number_of_nodes or self.connectivity.number_of_regions * self.n_instances
+        return self.connectivity.horizon, len(self.model.state_variables), n_node, self.model.number_of_modes
+
+    def check_compatibility(self):
+        "Raise NotImplementedError for components which are not instance-wise."
+        if self.surface is not None:
+            raise NotImplementedError("Surface simulations are not supported in batched mode.")
+        if not isinstance(self.monitors, (list, tuple)):
+            self.monitors = [self.monitors]
+        for monitor in self.monitors:
+            if not isinstance(monitor, self.supported_monitors) \
+                    or isinstance(monitor, self.unsupported_monitors):
+                raise NotImplementedError("Monitor %s is not supported in batched mode." % type(monitor).__name__)
+
+    def _parameter_sets_items(self):
+        for key, values in (self.parameter_sets or {}).items():
+            component, _, name = key.partition('.')
+            if component not in ('model', 'coupling') or not name:
+                raise ValueError("Invalid parameter set key %r, expected 'model.<name>' "
+                                 "or 'coupling.<name>'." % key)
+            yield component, name, numpy.asarray(values, dtype=numpy.float64)
+
+    def _configure_parameter_sets(self):
+        "Set per-instance values of model and coupling parameters."
+        sizes = set(values.shape[0] for _, _, values in self._parameter_sets_items())
+        if len(sizes) > 1:
+            raise ValueError("All parameter sets must have the same number of instances, got %s." % sorted(sizes))
+        self.n_instances = sizes.pop() if sizes else 1
+        n_inst, n_node = self.n_instances, self.connectivity.weights.shape[0]
+        n_mode = self.model.number_of_modes
+        batched = set()
+        for component, name, values in self._parameter_sets_items():
+            if values.shape == (n_inst, ):
+                values = values.reshape((n_inst, 1))
+            if component == 'model':
+                if values.shape not in ((n_inst, 1), (n_inst, n_node)):
+                    raise ValueError("Bad shape %s for parameter set %s.%s, expected (%d, ) or (%d, %d)."
+                                     % (values.shape, component, name, n_inst, n_inst, n_node))
+                values = numpy.broadcast_to(values, (n_inst, n_node)).ravel()
+                setattr(self.model, name, values)
+            else:
+                if values.shape != (n_inst, 1):
+                    raise ValueError("Bad shape %s for parameter set %s.%s, expected (%d, )."
+                                     % (values.shape, component, name, n_inst))
+                setattr(self.coupling, name, numpy.repeat(values.ravel(), n_mode))
+            batched.add(name)
+        # node-wise model parameters are shared by all instances
+        for name in type(self.model).declarative_attrs:
+            values = getattr(self.model, name)
+            if name not in batched and isinstance(values, numpy.ndarray) and values.size == n_node and n_inst > 1:
+                setattr(self.model, name, numpy.tile(values.ravel(), n_inst))
+
+    def _set_number_of_nodes(self):
+        self.number_of_nodes = self.connectivity.number_of_regions * self.n_instances
+        self.log.info('Batched region simulation with %d instances of %d ROI nodes',
+                      self.n_instances, self.connectivity.number_of_regions)
+
+    def configure(self, full_configure=True):
+        """Configure the batch of simulations; cf. Simulator.configure."""
+        self.check_compatibility()
+        self.connectivity.configure()
+        self._configure_parameter_sets()
+        return super(BatchedSimulator, self).configure(full_configure=full_configure)
+
+    def _to_history_layout(self, array):
+        "Move instances from the node axis to the mode axis, i.e. (.., inst * node, mode) to (.., node, inst * mode)."
+        lead, n_mode = array.shape[:-2], array.shape[-1]
+        array = array.reshape(lead + (self.n_instances, -1, n_mode)).swapaxes(-3, -2)
+        return array.reshape(lead + (array.shape[-3], -1))
+
+    def _from_history_layout(self, array):
+        "Move instances from the mode axis to the node axis, i.e. (.., node, inst * mode) to (.., inst * node, mode)."
+        lead, n_mode = array.shape[:-2], array.shape[-1] // self.n_instances
+        array = array.reshape(lead + (array.shape[-2], self.n_instances, n_mode)).swapaxes(-3, -2)
+        return array.reshape(lead + (-1, n_mode))
+
+    def _to_instance_layout(self, array):
+        "Split the node axis of a monitor output into a leading instance axis."
+        n_var, _, n_mode = array.shape
+        return array.reshape((n_var, self.n_instances, -1, n_mode)).swapaxes(0, 1)
+
+    def _configure_history(self, initial_conditions=None):
+        """
+        Initialize history; initial conditions may be shaped as for a single
+        instance, in which case they are shared by all instances, or carry an
+        instance axis after the time axis.
+
+        """
+        horizon = self.connectivity.horizon
+        shape = self.good_history_shape
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        if initial_conditions is None:
+            history = self.model.initial_for_simulator(self.integrator, shape)
+        else:
+            if initial_conditions.ndim == 5:
+                n_time, n_inst, n_svar, n_node, n_mode = initial_conditions.shape
+                initial_conditions = initial_conditions.transpose((0, 2, 1, 3, 4)).reshape(
+                    (n_time, n_svar, n_inst * n_node, n_mode))
+            else:
+                initial_conditions = numpy.tile(initial_conditions, (1, 1, self.n_instances, 1))
+            if initial_conditions.shape[1:] != shape[1:]:
+                raise ValueError("Incorrect history sample shape %s, expected %s"
+                                 % (initial_conditions.shape[1:], shape[1:]))
+            if initial_conditions.shape[0] >= horizon:
+                history = initial_conditions[-horizon:].copy()
+            else:
+                history = self.model.initial_for_simulator(self.integrator, shape)
+                shift = self.current_step % horizon
+                history = numpy.roll(history, -shift, axis=0)
+                history[:initial_conditions.shape[0]] = initial_conditions
+                history = numpy.roll(history, shift, axis=0)
+            self.current_step += initial_conditions.shape[0] - 1
+        for it in range(history.shape[0]):
+            self.integrator.bound_and_clamp(history[it])
+        self.current_state = history[self.current_step % horizon].copy()
+        self.history = SparseHistory(self.connectivity.weights, self.connectivity.idelays,
+                                     self.model.cvar, self.model.number_of_modes * self.n_instances)
+        self.history.initialize(self._to_history_layout(history))
+
+    def _loop_compute_node_coupling(self, step):
+        """Compute delayed node coupling values for all instances."""
+        return self._from_history_layout(self.coupling(step, self.history))
+
+    def _loop_update_stimulus(self, step, stimulus):
+        """Update stimulus values for current time step, identical for all instances."""
+        if self.stimulus is not None:
+            stim_step = step - (self.current_step + 1)
+            region_stimulus = self.stimulus(stim_step).reshape((-1, ))
+            stimulus[self.model.stvar, :, :] = numpy.tile(region_stimulus, self.n_instances).reshape((1, -1, 1))
+
+    def _loop_update_history(self, step, state):
+        """Update history."""
+        self.history.update(step, self._to_history_layout(state))
+
+    def _loop_monitor_output(self, step, state, node_coupling):
+        output = super(BatchedSimulator, self)._loop_monitor_output(step, state, node_coupling)
+        if output is not None:
+            return [None if out is None else [out[0], self._to_instance_layout(out[1])] for out in output]
@@ -217,6 +217,10 @@ class Scaling(SparseCoupling):
             "the ratio between different values."
     )
 
+    parameter_names = 'a'.split()
+    pre_expr = 'x_j'
+    post_expr = 'a * gx'
+
     def post(self, gx):
         return self.a * gx
 
@@ -260,6 +264,10 @@ class HyperbolicTangent(SparseCoupling):
         domain=Range(lo=0.01, hi=1000.0, step=10.0),
         doc="Standard deviation of the coupling")
 
+    parameter_names = 'a b midpoint sigma'.split()
+    pre_expr = 'a * (1 + tanh((b * x_j - midpoint) / sigma))'
+    post_expr = 'gx'
+
     def pre(self, x_i, x_j):
         return self.a * (1 +  numpy.tanh((self.b * x_j - self.midpoint) / self.sigma))
 
@@ -364,6 +372,11 @@ class SigmoidalJansenRit(Coupling):
         domain=Range(lo=0.01, hi=1000.0, step=10.0),
         doc="Scaling of the coupling term",)
 
+    # x_j_0 and x_j_1 are the first and second coupling variables
+    parameter_names = 'cmin cmax midpoint r a'.split()
+    pre_expr = 'cmin + (cmax - cmin) / (1.0 + exp(r * (midpoint - (x_j_0 - x_j_1))))'
+    post_expr = 'a * gx'
+
     def __str__(self):
         return simple_gen_astr(self, 'cmin cmax midpoint a r')
 
@@ -476,6 +489,10 @@ class Difference(SparseCoupling):
         domain=Range(lo=0.0, hi=10., step=0.1),
         doc="Rescales the connection strength.",)
 
+    parameter_names = 'a'.split()
+    pre_expr = 'x_j - x_i'
+    post_expr = 'a * gx'
+
     def __str__(self):
         return simple_gen_astr(self, 'a')
 
@@ -500,6 +517,10 @@ class Kuramoto(SparseCoupling):
         domain=Range(lo=0.0, hi=1.0, step=0.01),
         doc="Rescales the connection strength.",)
 
+    parameter_names = 'a'.split()
+    pre_expr = 'sin(x_j - x_i)'
+    post_expr = 'a / n_cvar * gx'
+
     def __str__(self):
         return simple_gen_astr(self, 'a')
 
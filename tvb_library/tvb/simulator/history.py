@@ -67,6 +67,9 @@ class BaseHistory(StaticAttr):
     def update(self, step, new_state):
         raise NotImplemented
 
+    def update_block(self, steps, new_states):
+        raise NotImplemented
+
     def query(self, step, out=None):
         raise NotImplemented
 
@@ -203,6 +206,10 @@ class DenseHistory(BaseHistory):
     def update(self, step, new_state):
         self.buffer[step % self.n_time] = new_state[self.cvars]
 
+    def update_block(self, steps, new_states):
+        "Update for several steps at once; steps must not span more than n_time."
+        self.buffer[numpy.asarray(steps) % self.n_time] = new_states[:, self.cvars]
+
 
 class SparseHistory(DenseHistory):
     "History implementation which stores data only for non-zero weights."
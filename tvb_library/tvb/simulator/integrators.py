@@ -273,12 +273,27 @@ class IntegratorStochastic(Integrator):
         doc="""The stochastic integrator's noise source. It incorporates its
         own instance of Numpy's RandomState.""")
 
+    # Scheme buffers, reused while the state keeps its shape
+    _inter = None
+    _stimulus_dt = None
+
     def set_random_state(self, random_state):
         if random_state is not None:
             self.noise.random_stream.set_state(random_state)
             msg = "random_state supplied with seed %s"
             self.log.info(msg, self.noise.random_stream.get_state()[1][0])
 
+    def _scheme_buffers(self, X, stimulus):
+        """
+        Buffers for an intermediate state and for the stimulus scaled by dt,
+        allocated on the first step only.
+        """
+        if self._inter is None or self._inter.shape != X.shape or self._inter.dtype != X.dtype:
+            self._inter = numpy.empty_like(X)
+            self._stimulus_dt = numpy.empty_like(X)
+        numpy.multiply(stimulus, self.dt, out=self._stimulus_dt)
+        return self._inter, self._stimulus_dt
+
     def __str__(self):
         return simple_gen_astr(self, 'dt noise')
 
@@ -351,12 +366,21 @@ class HeunStochastic(IntegratorStochastic):
 
         noise *= noise_gfun
 
-        inter = X + self.dt * m_dx_tn + noise + self.dt * stimulus
+        # inter = X + dt * m_dx_tn + noise + dt * stimulus, without temporaries
+        inter, stimulus_dt = self._scheme_buffers(X, stimulus)
+        numpy.multiply(m_dx_tn, self.dt, out=inter)
+        inter += X
+        inter += noise
+        inter += stimulus_dt
         self.integration_bound_and_clamp(inter)
 
-        dX = (m_dx_tn + dfun(inter, coupling, local_coupling)) * self.dt / 2.0
-
-        X_next = X + dX + noise + self.dt * stimulus
+        # X_next = X + (m_dx_tn + dfun(inter)) * dt / 2 + noise + dt * stimulus, in a single new array
+        X_next = numpy.add(m_dx_tn, dfun(inter, coupling, local_coupling))
+        X_next *= self.dt
+        X_next /= 2.0
+        X_next += X
+        X_next += noise
+        X_next += stimulus_dt
         self.integration_bound_and_clamp(X_next)
 
         return X_next
@@ -418,9 +442,14 @@ class EulerStochastic(IntegratorStochastic):
         """
 
         noise = self.noise.generate(X.shape)
-        dX = dfun(X, coupling, local_coupling) * self.dt 
-        noise_gfun = self.noise.gfun(X)
-        X_next = X + dX + noise_gfun * noise + self.dt * stimulus
+        noise *= self.noise.gfun(X)
+        _, stimulus_dt = self._scheme_buffers(X, stimulus)
+
+        # X_next = X + dfun(X) * dt + gfun(X) * noise + dt * stimulus, in a single new array
+        X_next = numpy.multiply(dfun(X, coupling, local_coupling), self.dt)
+        X_next += X
+        X_next += noise
+        X_next += stimulus_dt
         self.integration_bound_and_clamp(X_next)
 
         return X_next
@@ -273,6 +273,20 @@ class Epileptor(ModelNumbaDfun):
     cvar = numpy.array([0, 3], dtype=numpy.int32)  # should these not be constant Attr's?
     cvar.setflags(write=False)  # todo review this
 
+    # declarative form of the dfuns, used by the code generating backends
+    coupling_terms = ['c_pop1', 'c_pop2']
+    parameter_names = 'x0 Iext Iext2 a b slope tt Kvf c d r Ks Kf aa bb tau modification'.split()
+    state_variable_dfuns = {
+        'x1': 'tt * (y1 - z + Iext + Kvf * c_pop1'
+              ' + ((- a * x1 ** 2 + b * x1) if x1 < 0.0 else (slope - x2 + 0.6 * (z - 4.0) ** 2)) * x1)',
+        'y1': 'tt * (c - d * x1 ** 2 - y1)',
+        'z': 'tt * (r * (((x0 + 3 / (1 + exp(-(x1 + 0.5) / 0.1))) if modification'
+             ' else (4 * (x1 - x0) + (- 0.1 * z ** 7 if z < 0.0 else 0.0))) - z + Ks * c_pop1))',
+        'x2': 'tt * (-y2 + x2 - x2 ** 3 + Iext2 + bb * g - 0.3 * (z - 3.5) + Kf * c_pop2)',
+        'y2': 'tt * ((-y2 + (0.0 if x2 < -0.25 else aa * (x2 + 0.25))) / tau)',
+        'g': 'tt * (-0.01 * (g - 0.1 * x1))',
+    }
+
     def _numpy_dfun(self, state_variables, coupling, local_coupling=0.0,
                     array=numpy.array, where=numpy.where, concat=numpy.concatenate):
 
@@ -201,6 +201,20 @@ class JansenRit(ModelNumbaDfun):
     _nvar = 6
     cvar = numpy.array([1, 2], dtype=numpy.int32)
 
+    # declarative form of the dfuns, used by the code generating backends
+    coupling_terms = ['c_0']
+    parameter_names = 'nu_max r v0 a a_1 a_2 a_3 a_4 A b B J mu'.split()
+    state_variable_dfuns = {
+        'y0': 'y3',
+        'y1': 'y4',
+        'y2': 'y5',
+        'y3': 'A * a * (2.0 * nu_max / (1.0 + exp(r * (v0 - (y1 - y2))))) - 2.0 * a * y3 - a ** 2 * y0',
+        'y4': 'A * a * (mu + a_2 * J * (2.0 * nu_max / (1.0 + exp(r * (v0 - (a_1 * J * y0))))) + c_0)'
+              ' - 2.0 * a * y4 - a ** 2 * y1',
+        'y5': 'B * b * (a_4 * J * (2.0 * nu_max / (1.0 + exp(r * (v0 - (a_3 * J * y0))))))'
+              ' - 2.0 * b * y5 - b ** 2 * y2',
+    }
+
     def _numpy_dfun(self, state_variables, coupling, local_coupling=0.0):
         y0, y1, y2, y3, y4, y5 = state_variables
 
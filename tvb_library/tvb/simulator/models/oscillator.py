@@ -326,6 +326,14 @@ class Generic2dOscillator(ModelNumbaDfun):
     _nvar = 2
     cvar = numpy.array([0], dtype=numpy.int32)
 
+    # declarative form of the dfuns, used by the code generating backends
+    coupling_terms = ['c_0']
+    parameter_names = 'tau I a b c d e f g beta alpha gamma'.split()
+    state_variable_dfuns = {
+        'V': 'd * tau * (alpha * W - f * V**3 + e * V**2 + g * V + gamma * I + gamma * c_0)',
+        'W': 'd * (a + b * V + c * V**2 - beta * W) / tau',
+    }
+
     def _numpy_dfun(self, state_variables, coupling, local_coupling=0.0):
         V = state_variables[0, :]
         W = state_variables[1, :]
@@ -455,6 +463,11 @@ class Kuramoto(Model):
     _nvar = 1
     cvar = numpy.array([0], dtype=numpy.int32)
 
+    # declarative form of the dfuns, used by the code generating backends
+    coupling_terms = ['c_0']
+    parameter_names = ['omega']
+    state_variable_dfuns = {'theta': 'omega + c_0'}
+
     def dfun(self, state_variables, coupling, local_coupling=0.0,
              ev=RefBase.evaluate, sin=numpy.sin, pi2=numpy.pi * 2):
         r"""
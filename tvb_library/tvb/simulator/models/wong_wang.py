@@ -143,6 +143,14 @@ class ReducedWongWang(ModelNumbaDfun):
     _nvar = 1
     cvar = numpy.array([0], dtype=numpy.int32)
 
+    # declarative form of the dfuns, used by the code generating backends
+    coupling_terms = ['c_0']
+    parameter_names = 'a b d gamma tau_s w J_N I_o'.split()
+    state_variable_dfuns = {
+        'S': '- (S / tau_s) + (1.0 - S) * gamma * (a * (w * J_N * S + I_o + J_N * c_0) - b)'
+             ' / (1 - exp(-d * (a * (w * J_N * S + I_o + J_N * c_0) - b)))',
+    }
+
     def configure(self):
         """  """
         super(ReducedWongWang, self).configure()
@@ -52,6 +52,7 @@ Conversion of power of 2 sample-rates(Hz) to Monitor periods(ms)
 
 import abc
 import numpy
+import scipy.sparse
 
 from tvb.datatypes.time_series import (TimeSeries, TimeSeriesRegion, TimeSeriesEEG, TimeSeriesMEG, TimeSeriesSEEG,
                                        TimeSeriesSurface)
@@ -90,6 +91,9 @@ class Monitor(HasTraits):
     dt = None
     voi = None
     _stock = numpy.empty([])
+    # slice equivalent to voi, when the variables of interest are contiguous
+    _voi_slice = None
+    _voi_buffer = None
 
     def __str__(self):
         clsname = self.__class__.__name__
@@ -117,6 +121,21 @@ class Monitor(HasTraits):
         """
         self._config_vois(simulator)
         self._config_time(simulator)
+        self._voi_slice = None
+        if self.voi.size > 0 and numpy.all(numpy.diff(self.voi) == 1):
+            self._voi_slice = slice(self.voi[0], self.voi[-1] + 1)
+
+    def _state_of_interest(self, state):
+        """
+        Select the variables of interest from state, as a view when they are
+        contiguous, or else into a buffer reused across steps.
+        """
+        if self._voi_slice is not None:
+            return state[self._voi_slice]
+        shape = (len(self.voi),) + state.shape[1:]
+        if self._voi_buffer is None or self._voi_buffer.shape != shape or self._voi_buffer.dtype != state.dtype:
+            self._voi_buffer = numpy.empty(shape, dtype=state.dtype)
+        return numpy.take(state, self.voi, axis=0, out=self._voi_buffer)
 
     def record(self, step, observed):
         """Record a sample of the observed state at given step.
@@ -309,21 +328,37 @@ class SpatialAverage(Monitor):
 
         self.log.debug("spatial_mask")
         self.log.debug(narray_describe(self.spatial_mask))
-        spatial_sum = numpy.zeros((number_of_nodes, number_of_areas))
-        spatial_sum[numpy.arange(number_of_nodes), self.spatial_mask] = 1
-        spatial_sum = spatial_sum.T
-        self.log.debug("spatial_sum")
-        self.log.debug(narray_describe(spatial_sum))
-        nodes_per_area = numpy.sum(spatial_sum, axis=1)[:, numpy.newaxis]
-        self.spatial_mean = spatial_sum / nodes_per_area
-        self.log.debug("spatial_mean")
-        self.log.debug(narray_describe(self.spatial_mean))
+        # Nodes are grouped by area, so that each area is summed by a single numpy.add.reduceat
+        self._node_order = None
+        if numpy.any(numpy.diff(self.spatial_mask) < 0):
+            self._node_order = numpy.argsort(self.spatial_mask, kind='stable')
+        nodes_per_area = numpy.bincount(self.spatial_mask, minlength=number_of_areas)
+        self._area_starts = numpy.r_[0, numpy.cumsum(nodes_per_area)[:-1]]
+        self._nodes_per_area = nodes_per_area[:, numpy.newaxis].astype(numpy.float64)
+        self._sorted_buffer = None
+        self.log.debug("nodes_per_area")
+        self.log.debug(narray_describe(nodes_per_area))
+
+    @property
+    def spatial_mean(self):
+        """Sparse (areas x nodes) matrix averaging the nodes of each area."""
+        number_of_nodes = self.spatial_mask.size
+        return scipy.sparse.csr_matrix(
+            (1.0 / self._nodes_per_area[self.spatial_mask, 0], (self.spatial_mask, numpy.arange(number_of_nodes))),
+            shape=(self._nodes_per_area.shape[0], number_of_nodes))
 
     def sample(self, step, state):
         if step % self.istep == 0:
             time = step * self.dt
-            monitored_state = numpy.dot(self.spatial_mean, state[self.voi, :])
-            return [time, monitored_state.transpose((1, 0, 2))]
+            state_of_interest = self._state_of_interest(state)
+            if self._node_order is not None:
+                if self._sorted_buffer is None or self._sorted_buffer.shape != state_of_interest.shape \
+                        or self._sorted_buffer.dtype != state_of_interest.dtype:
+                    self._sorted_buffer = numpy.empty_like(state_of_interest)
+                state_of_interest = numpy.take(state_of_interest, self._node_order, axis=1, out=self._sorted_buffer)
+            monitored_state = numpy.add.reduceat(state_of_interest, self._area_starts, axis=1)
+            monitored_state /= self._nodes_per_area
+            return [time, monitored_state]
 
     def create_time_series(self, connectivity=None, surface=None,
                            region_map=None, region_volume_map=None):
@@ -364,14 +399,14 @@ class TemporalAverage(Monitor):
     """
     Monitors the averaged value for the model's variable/s of interest over all
     the nodes at each sampling period. Time steps that are not modulo ``istep``
-    are stored temporarily in the ``_stock`` attribute and then that temporary
-    store is averaged and returned when time step is modulo ``istep``.
+    are added to the running sum kept in the ``_stock`` attribute, which is
+    averaged and returned when time step is modulo ``istep``.
 
     """
 
     def _config_time(self, simulator):
         super(TemporalAverage, self)._config_time(simulator)
-        stock_size = (self.istep, self.voi.shape[0],
+        stock_size = (self.voi.shape[0],
                       simulator.number_of_nodes,
                       simulator.model.number_of_modes)
         self.log.debug("Temporal average stock_size is %s" % (str(stock_size),))
@@ -381,12 +416,13 @@ class TemporalAverage(Monitor):
         """
         Records if integration step corresponds to sampling period, Otherwise
         just update the monitor's stock. When the step corresponds to the sample
-        period, the ``_stock`` is averaged over time for return. 
+        period, the ``_stock`` is averaged over time for return, and reset.
 
         """
-        self._stock[((step % self.istep) - 1), :] = state[self.voi]
+        numpy.add(self._stock, self._state_of_interest(state), out=self._stock)
         if step % self.istep == 0:
-            avg_stock = numpy.mean(self._stock, axis=0)
+            avg_stock = self._stock / self.istep
+            self._stock.fill(0.0)
             time = (step - self.istep / 2.0) * self.dt
             return [time, avg_stock]
 
@@ -416,8 +452,8 @@ class AfferentCouplingTemporalAverage(AfferentCoupling, TemporalAverage):
     """
     Monitors the averaged value for the model's coupling variable/s of interest over all
     the nodes at each sampling period. Time steps that are not modulo ``istep``
-    are stored temporarily in the ``_stock`` attribute and then that temporary
-    store is averaged and returned when time step is modulo ``istep``.
+    are added to the running sum kept in the ``_stock`` attribute, which is
+    averaged and returned when time step is modulo ``istep``.
 
     """
 
@@ -431,6 +467,12 @@ class AfferentCouplingTemporalAverage(AfferentCoupling, TemporalAverage):
         return TemporalAverage.sample(self, step, node_coupling)
 
 
+class GainApproximations(TVBEnum):
+    DENSE = "dense"
+    SPARSE = "sparse"
+    LOW_RANK = "low_rank"
+
+
 # mhtodo: this is not a proper superclass but a mixin, it refers to fields that don't exist
 
 class Projection(Monitor):
@@ -452,6 +494,21 @@ class Projection(Monitor):
         doc="""The monitor's noise source. It incorporates its
         own instance of Numpy's RandomState.""")
 
+    gain_approximation = EnumAttr(
+        default=GainApproximations.DENSE,
+        label="Gain approximation",
+        required=False,
+        doc="""Representation of the gain matrix applied to each sample: the dense matrix, a sparse
+        matrix without its smallest coefficients, or a truncated SVD (low rank) of the matrix. The
+        approximations keep the error below `gain_tolerance`.""")
+
+    gain_tolerance = Float(
+        default=1e-3,
+        label="Gain approximation tolerance",
+        required=False,
+        doc="""Accuracy target of the gain approximation, as the Frobenius norm of the discarded part
+        of the gain, relative to the Frobenius norm of the full gain. Ignored for a dense gain.""")
+
     @staticmethod
     def oriented_gain(gain, orient):
         "Apply orientations to gain matrix."
@@ -588,23 +645,57 @@ class Projection(Monitor):
         self.gain[~nan_mask] = 0.0
         self.log.debug('Zeroed %d NaN gain coefficients', nan_mask.sum())
 
-        # attrs used for recording
-        self._state = numpy.zeros((self.gain.shape[0], len(self.voi)))
+        # attrs used for recording: projection being linear, the sources are summed over
+        # a period and the gain applied once per sample
+        self._state = numpy.zeros((len(self.voi), self.gain.shape[1]))
         self._period_in_steps = int(self.period / self.dt)
+        self._configure_gain_approximation()
         self._gain_configuration_done = True
         self.log.debug('State shape %s, period in steps %s', self._state.shape, self._period_in_steps)
 
         self.log.info('Projection configured gain shape %s', self.gain.shape)
 
+    def _configure_gain_approximation(self):
+        "Prepare the (possibly approximated) gain factors applied by _project."
+        gain_norm = numpy.linalg.norm(self.gain)
+        tolerance = (self.gain_tolerance or 0.0) * gain_norm
+        if self.gain_approximation == GainApproximations.SPARSE:
+            # drop the smallest coefficients, as long as their norm stays within tolerance
+            magnitudes = numpy.sort(numpy.abs(self.gain), axis=None)
+            dropped = numpy.searchsorted(numpy.sqrt(numpy.cumsum(magnitudes ** 2)), tolerance, side='right')
+            if dropped < magnitudes.size:
+                # coefficients tied with the first kept one are kept as well
+                dropped = numpy.searchsorted(magnitudes, magnitudes[dropped])
+            threshold = magnitudes[dropped - 1] if dropped > 0 else -1.0
+            sparse_gain = scipy.sparse.csr_matrix(numpy.where(numpy.abs(self.gain) > threshold, self.gain, 0.0))
+            self._gain_factors = (sparse_gain,)
+            self.log.debug('Sparse gain keeps %d of %d coefficients', sparse_gain.nnz, self.gain.size)
+        elif self.gain_approximation == GainApproximations.LOW_RANK:
+            # smallest rank whose discarded singular values stay within tolerance
+            u, singular_values, vt = numpy.linalg.svd(self.gain, full_matrices=False)
+            residuals = numpy.sqrt(numpy.cumsum(singular_values[::-1] ** 2))[::-1]
+            rank = max(1, int(numpy.sum(residuals > tolerance)))
+            self._gain_factors = (u[:, :rank] * singular_values[:rank], vt[:rank].copy())
+            self.log.debug('Low rank gain keeps rank %d of %d', rank, singular_values.size)
+        else:
+            self._gain_factors = (self.gain,)
+
+    def _project(self, sources):
+        "Apply the gain to sources of shape (voi, nodes), returning (sensors, voi)."
+        projected = sources.T
+        for factor in reversed(self._gain_factors):
+            projected = factor.dot(projected)
+        return numpy.asarray(projected)
+
     def configure(self, *args, **kwargs):
         self.sensors.configure()
 
     def sample(self, step, state):
         "Record state, returning sample at sampling frequency / period."
-        self._state += self.gain.dot(state[self.voi].sum(axis=-1).T)
+        self._state += state[self.voi].sum(axis=-1)
         if step % self._period_in_steps == 0:
             time = (step - self._period_in_steps / 2.0) * self.dt
-            sample = self._state.copy() / self._period_in_steps
+            sample = self._project(self._state) / self._period_in_steps
 
             # add observation noise if available
             if self.obsnoise is not None:
@@ -917,7 +1008,7 @@ class Bold(Monitor):
         # Compute the HRF kernel
         G = self.hrf_kernel.evaluate(self._stock_time)
         # Reverse it, need it into the past for matrix-multiply of stock
-        G = G[::-1]
+        G = numpy.ascontiguousarray(G[::-1])
         self.hemodynamic_response_function = G[numpy.newaxis, :]
         # Interim stock configuration
         self._interim_period = 1.0 / self._stock_sample_rate  # period in ms
@@ -938,29 +1029,41 @@ class Bold(Monitor):
 
     def config_for_sim(self, simulator):
         super(Bold, self).config_for_sim(simulator)
+        if numpy.any(self.voi < 0) or numpy.any(self.voi >= simulator.model.nvar):
+            raise ValueError("Bold variables_of_interest %s out of range for the %d state variables of %s" % (
+                self.voi.tolist(), simulator.model.nvar, type(simulator.model).__name__))
 
     def sample(self, step, state):
         # Update the interim-stock at every step
-        self._interim_stock[((step % self._interim_istep) - 1), :] = state[self.voi, :]
+        numpy.take(state, self.voi, axis=0, out=self._interim_stock[(step % self._interim_istep) - 1])
         # At stock's period update it with the temporal average of interim-stock
         if step % self._interim_istep == 0:
-            avg_interim_stock = numpy.mean(self._interim_stock, axis=0)
-            self._stock[((step // self._interim_istep % self._stock_steps) - 1), :] = avg_interim_stock
+            numpy.mean(self._interim_stock, axis=0,
+                       out=self._stock[(step // self._interim_istep % self._stock_steps) - 1])
         # At the monitor's period, apply the heamodynamic response function to
         # the stock and return the resulting BOLD signal.
         if step % self.istep == 0:
             time = step * self.dt
-            hrf = numpy.roll(self.hemodynamic_response_function,
-                             ((step // self._interim_istep % self._stock_steps) - 1),
-                             axis=1)
+            bold = self._convolve_stock((step // self._interim_istep % self._stock_steps) - 1)
             if isinstance(self.hrf_kernel, equations.FirstOrderVolterra):
-                k1_V0 = self.hrf_kernel.parameters["k_1"] * self.hrf_kernel.parameters["V_0"]
-                bold = (numpy.dot(hrf, self._stock.transpose((1, 2, 0, 3))) - 1.0) * k1_V0
-            else:
-                bold = numpy.dot(hrf, self._stock.transpose((1, 2, 0, 3)))
-            bold = bold.reshape(self._stock.shape[1:])
+                bold -= 1.0
+                bold *= self.hrf_kernel.parameters["k_1"] * self.hrf_kernel.parameters["V_0"]
             return [time, bold]
 
+    def _convolve_stock(self, latest):
+        """
+        Weight the stock with the HRF. The stock is a ring buffer, with the latest sample at index `latest`,
+        so this is the HRF rolled by `latest` applied to the stock, computed on the two contiguous parts
+        of the ring instead, without copying either the HRF or the stock.
+        """
+        hrf = self.hemodynamic_response_function[0]
+        stock = self._stock.reshape((self._stock_steps, -1))
+        split = latest % self._stock_steps
+        bold = numpy.dot(hrf[:self._stock_steps - split], stock[split:])
+        if split > 0:
+            bold += numpy.dot(hrf[self._stock_steps - split:], stock[:split])
+        return bold.reshape(self._stock.shape[1:])
+
 
 class BoldRegionROI(Bold):
     """
@@ -978,16 +1081,22 @@ class BoldRegionROI(Bold):
         super(BoldRegionROI, self).config_for_sim(simulator)
         self.region_mapping = simulator.surface.region_mapping
         self.no_regions = simulator.surface.region_mapping_data.connectivity.number_of_regions
+        # vertices ordered by region, such that each region is reduced as one contiguous segment
+        self._vertex_order = numpy.argsort(self.region_mapping, kind='stable')
+        self._vertices_per_region = numpy.bincount(self.region_mapping, minlength=self.no_regions)
+        self._mapped_regions, = numpy.nonzero(self._vertices_per_region)
+        self._region_starts = numpy.searchsorted(self.region_mapping[self._vertex_order], self._mapped_regions)
 
     def sample(self, step, state):
         result = super(BoldRegionROI, self).sample(step, state)
         if result:
             t, data = result
-            # TODO use reduceat
-            data = data[self.voi, :]
-            data = numpy.array([data[:, self.region_mapping == i, :].mean(axis=1)
-                                for i in range(self.no_regions)])
-            data = numpy.swapaxes(data, 0, 1)
+            region_sum = numpy.zeros((data.shape[0], self.no_regions, data.shape[2]))
+            region_sum[:, self._mapped_regions] = numpy.add.reduceat(data[:, self._vertex_order],
+                                                                     self._region_starts, axis=1)
+            # regions without vertices are NaN, as the mean of no vertices
+            with numpy.errstate(invalid='ignore'):
+                data = region_sum / self._vertices_per_region[:, numpy.newaxis]
             return [t, data]
         else:
             return None
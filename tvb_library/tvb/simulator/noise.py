@@ -37,11 +37,88 @@ Specific noises inherit from the abstract class Noise
 import abc
 import numpy
 
-from tvb.basic.neotraits.api import HasTraits, Attr, NArray, Range, Int, Float
+from tvb.basic.neotraits.api import HasTraits, TVBEnum, Attr, EnumAttr, NArray, Range, Int, Float
 from tvb.datatypes import equations
 
 from .common import simple_gen_astr
 
+# Bytes of Gaussian variates pregenerated at once by a BlockNoiseStream
+NOISE_BLOCK_SIZE = 16 * 2 ** 20
+
+
+class BlockNoiseStream(object):
+    """
+    Source of standard normal variates built on numpy.random.Generator, which
+    pregenerates the noise for many integration steps at once into a reusable
+    buffer.
+
+    The steps are split in blocks of fixed length, and each block is drawn from
+    its own generator, seeded from (seed, block index, shape). The noise of a
+    given step thus only depends on the seed and on the step counter, so a
+    simulation split in chunks, or over several processes (see :meth:`seek`),
+    sees exactly the same noise as an uninterrupted one.
+
+    The arrays returned by :meth:`standard_normal` are views into the buffer,
+    valid only until the next call.
+    """
+
+    BIT_GENERATORS = {
+        'PCG64': numpy.random.PCG64,
+        'SFC64': numpy.random.SFC64,
+        'Philox': numpy.random.Philox,
+    }
+
+    def __init__(self, seed, bit_generator='PCG64', dtype=numpy.float64, block_size=NOISE_BLOCK_SIZE):
+        if bit_generator not in self.BIT_GENERATORS:
+            raise ValueError("Unknown bit generator %s, expected one of %s" % (
+                bit_generator, sorted(self.BIT_GENERATORS)))
+        self.seed = seed
+        self.bit_generator = bit_generator
+        self.dtype = numpy.dtype(dtype)
+        if self.dtype not in (numpy.dtype(numpy.float32), numpy.dtype(numpy.float64)):
+            raise ValueError("Noise can only be generated as float32 or float64, not %s" % self.dtype)
+        self.block_size = block_size
+        self.step = 0
+        self._shape = None
+        self._block_steps = None
+        self._block_index = None
+        self._buffer = None
+
+    def seek(self, step):
+        """Position the stream so that the next draw returns the noise of the given step."""
+        self.step = int(step)
+
+    def _configure_shape(self, shape):
+        self._shape = shape
+        step_size = max(int(numpy.prod(shape)) * self.dtype.itemsize, 1)
+        self._block_steps = max(self.block_size // step_size, 1)
+        self._buffer = numpy.empty((self._block_steps,) + shape, dtype=self.dtype)
+        self._block_index = None
+
+    def _generate_block(self, block_index):
+        seed_sequence = numpy.random.SeedSequence(self.seed, spawn_key=(block_index,) + self._shape)
+        rng = numpy.random.Generator(self.BIT_GENERATORS[self.bit_generator](seed_sequence))
+        rng.standard_normal(dtype=self.dtype, out=self._buffer)
+        self._block_index = block_index
+
+    def standard_normal(self, shape):
+        "Return the standard normal variates for the current step, and advance the stream."
+        shape = tuple(int(dim) for dim in shape)
+        if shape != self._shape:
+            self._configure_shape(shape)
+        block_index, offset = divmod(self.step, self._block_steps)
+        if block_index != self._block_index:
+            self._generate_block(block_index)
+        self.step += 1
+        return self._buffer[offset]
+
+
+class NoiseStreams(TVBEnum):
+    RANDOM_STATE = "RandomState"
+    PCG64 = "PCG64"
+    SFC64 = "SFC64"
+    PHILOX = "Philox"
+
 
 class Noise(HasTraits):
     """
@@ -99,11 +176,31 @@ class Noise(HasTraits):
             "specific Noise object. Used when you need to resume a simulation from a state saved to disk"
     )
 
+    noise_stream = EnumAttr(
+        default=NoiseStreams.RANDOM_STATE,
+        label="Noise Stream",
+        required=False,
+        doc="""Source of the Gaussian variates. RandomState is the legacy random_stream. The other choices
+        draw the noise from a BlockNoiseStream with that bit generator, seeded with noise_seed, which is
+        considerably faster for large (e.g. surface) simulations, but gives a different realization.""")
+
+    noise_float32 = Attr(
+        field_type=bool,
+        default=False,
+        required=False,
+        label="Single precision noise",
+        doc="Draw the noise of a block noise stream as float32 instead of float64.")
+
     def __init__(self, **kwargs):
         super(Noise, self).__init__(**kwargs)
         if self.random_stream is None:
             self.random_stream = numpy.random.RandomState(self.noise_seed)
 
+        # BlockNoiseStream replacing random_stream, built on first draw when noise_stream asks for it
+        self.block_stream = None
+        self._block_size = NOISE_BLOCK_SIZE
+        # Buffer white noise drawn from the block stream is scaled into
+        self._white = None
         self.dt = None
         # For use if coloured
         self._E = None
@@ -123,6 +220,52 @@ class Noise(HasTraits):
 
     def reset_random_stream(self):
         self.random_stream = numpy.random.RandomState(self.noise_seed)
+        self.block_stream = None
+
+    def use_block_stream(self, bit_generator='PCG64', dtype=numpy.float64, block_size=NOISE_BLOCK_SIZE):
+        """
+        Set noise_stream and noise_float32, so that the noise is drawn from a
+        :class:`BlockNoiseStream` seeded with noise_seed, instead of the legacy
+        random_stream.
+        """
+        self.block_stream = BlockNoiseStream(self.noise_seed, bit_generator, dtype, block_size)
+        self.noise_stream = NoiseStreams(bit_generator)
+        self.noise_float32 = self.block_stream.dtype == numpy.float32
+        self._block_size = block_size
+        return self
+
+    def _get_block_stream(self):
+        "The BlockNoiseStream matching the noise_stream traits, or None for the RandomState stream."
+        if self.noise_stream is None or self.noise_stream == NoiseStreams.RANDOM_STATE:
+            self.block_stream = None
+            return None
+        dtype = numpy.float32 if self.noise_float32 else numpy.float64
+        if self.block_stream is None or (self.block_stream.seed, self.block_stream.bit_generator,
+                                         self.block_stream.dtype) != (self.noise_seed, self.noise_stream.value, dtype):
+            self.block_stream = BlockNoiseStream(self.noise_seed, self.noise_stream.value, dtype, self._block_size)
+        return self.block_stream
+
+    @property
+    def block_stream_step(self):
+        "Step the block noise stream is at, or None for the RandomState stream."
+        block_stream = self._get_block_stream()
+        return None if block_stream is None else block_stream.step
+
+    def seek(self, step):
+        """
+        Position the block noise stream so that its next draw is the noise of
+        the given step, e.g. when a simulation continues from a stored history.
+        """
+        block_stream = self._get_block_stream()
+        if block_stream is None:
+            raise ValueError("Only a block noise stream can seek, the RandomState one is restored with set_state")
+        block_stream.seek(step)
+
+    def _standard_normal(self, shape):
+        block_stream = self._get_block_stream()
+        if block_stream is None:
+            return self.random_stream.normal(size=shape)
+        return block_stream.standard_normal(shape)
 
     def __str__(self):
         return simple_gen_astr(self, 'dt ntau')
@@ -170,7 +313,7 @@ class Noise(HasTraits):
         self.dt = dt
         self._E = numpy.exp(-self.dt / self.ntau)
         self._sqrt_1_E2 = numpy.sqrt((1.0 - self._E ** 2))
-        self._eta = self.random_stream.normal(size=shape)
+        self._eta = numpy.array(self._standard_normal(shape))
         self._dt_sqrt_lambda = self.dt * numpy.sqrt(1.0 / self.ntau)
         self.log.info(
             'Colored noise configured with dt={} E={} sqrt_1_E2={} eta={} & dt_sqrt_lambda={}'.format(self.dt, self._E,
@@ -188,14 +331,21 @@ class Noise(HasTraits):
 
     def coloured(self, shape):
         "Generate colored noise. [FoxVemuri_1988]_"
-        self._h = self._sqrt_1_E2 * self.random_stream.normal(size=shape)
+        self._h = self._sqrt_1_E2 * self._standard_normal(shape)
         self._eta = self._eta * self._E + self._h
         return self._dt_sqrt_lambda * self._eta
 
     def white(self, shape):
         "Generate white noise."
-        noise = numpy.sqrt(self.dt) * self.random_stream.normal(size=shape)
-        return noise
+        noise = self._standard_normal(shape)
+        sqrt_dt = noise.dtype.type(numpy.sqrt(self.dt))
+        if self.block_stream is None:
+            noise *= sqrt_dt
+            return noise
+        # the block stream returns a view of its buffer, which must not be scaled in place
+        if self._white is None or self._white.shape != noise.shape or self._white.dtype != noise.dtype:
+            self._white = numpy.empty_like(noise)
+        return numpy.multiply(noise, sqrt_dt, out=self._white)
 
     @abc.abstractmethod
     def gfun(self, state_variables):
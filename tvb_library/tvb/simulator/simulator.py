@@ -39,7 +39,7 @@ import math
 import time
 import numpy
 
-from tvb.basic.neotraits.api import HasTraits, Attr, NArray, List, Float
+from tvb.basic.neotraits.api import HasTraits, Attr, NArray, List, Float, Int
 from tvb.basic.profile import TvbProfile
 from tvb.datatypes import cortex, connectivity, patterns
 from tvb.simulator import models, integrators, monitors, coupling
@@ -158,6 +158,16 @@ class Simulator(HasTraits):
         required=True,
         doc="""The length of a simulation (default in milliseconds).""")
 
+    threads = Int(
+        label="Number of threads",
+        default=1,
+        required=False,
+        doc="""Number of threads used to evaluate, in parallel over blocks of
+        vertices, the local coupling and the mappings between regions and
+        vertices of surface simulations. Model dfuns and integrator schemes
+        stay vectorized over all nodes, see tvb.simulator.backend.nb_surface.
+        Region simulations are not affected.""")
+
     backend = ReferenceBackend()
 
     history = None  # type: SparseHistory
@@ -178,6 +188,7 @@ class Simulator(HasTraits):
     _runtime = None
 
     integrate_next_step = None
+    _surface_engine = None
 
     # methods consist of
     # 1) generic configure
@@ -275,15 +286,28 @@ class Simulator(HasTraits):
         # Allow user to chain configure to another call or assignment.
         return self
 
+    def _prepare_surface_engine(self):
+        "Set up the parallel surface engine if more than one thread is requested."
+        self._surface_engine = None
+        if self.surface is not None and self.threads is not None and self.threads > 1:
+            from .backend.nb_surface import SurfaceEngine
+            self._surface_engine = SurfaceEngine(
+                self.surface.region_mapping, self.connectivity.number_of_regions, self.threads)
+
     def _prepare_local_coupling(self):
         if self.surface is None:
             return 0.0
-        return self.surface.prepare_local_coupling(self.number_of_nodes)
+        local_coupling = self.surface.prepare_local_coupling(self.number_of_nodes)
+        if self._surface_engine is not None:
+            local_coupling = self._surface_engine.local_coupling(local_coupling)
+        return local_coupling
 
     def _loop_compute_node_coupling(self, step):
         """Compute delayed node coupling values."""
         coupling = self.coupling(step, self.history)
-        if self.surface is not None:
+        if self._surface_engine is not None:
+            coupling = self._surface_engine.region_to_vertex(coupling)
+        elif self.surface is not None:
             coupling = coupling[:, self.surface.region_mapping]
         return coupling
 
@@ -308,9 +332,20 @@ class Simulator(HasTraits):
     def _loop_update_history(self, step, state):
         """Update history."""
         if self.surface is not None and state.shape[1] > self.connectivity.number_of_regions:
-            state = self.backend.surface_state_to_rois(self.surface.region_mapping, self.connectivity.number_of_regions, state)
+            if self._surface_engine is not None:
+                state = self._surface_engine.vertex_to_region(state)
+            else:
+                state = self.backend.surface_state_to_rois(self.surface.region_mapping, self.connectivity.number_of_regions, state)
         self.history.update(step, state)
 
+    def _loop_update_history_block(self, steps, states):
+        """Update history for several steps at once, e.g. with states received from another simulator."""
+        if self.surface is not None and states.shape[2] > self.connectivity.number_of_regions:
+            for step, state in zip(steps, states):
+                self._loop_update_history(step, state)
+        else:
+            self.history.update_block(steps, states)
+
     def _loop_monitor_output(self, step, state, node_coupling):
         observed = self.model.observe(state)
         output = [monitor.record(step,
@@ -340,6 +375,7 @@ class Simulator(HasTraits):
         self._calculate_storage_requirement()
         # TODO a provided random_state should be used for history init
         self.integrator.set_random_state(random_state)
+        self._prepare_surface_engine()
         local_coupling = self._prepare_local_coupling()
         stimulus = self._prepare_stimulus()
         state = self.current_state
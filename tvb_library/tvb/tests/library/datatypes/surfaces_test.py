@@ -27,14 +27,18 @@
 """
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
+import os
 import sys
+import uuid
 import numpy
+import scipy.sparse
 import pytest
 from tvb.tests.library.base_testcase import BaseTestCase
 from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.surfaces import CorticalSurface, SurfaceTypesEnum
 from tvb.datatypes.cortex import Cortex
 from tvb.datatypes.local_connectivity import LocalConnectivity
+from tvb.datatypes import equations
 from tvb.datatypes.region_mapping import RegionMapping
 from tvb.datatypes import surfaces
 from tvb.tests.library.simulator.simulator_test import Simulator
@@ -152,6 +156,139 @@ class TestSurfaces(BaseTestCase):
         assert 0 == pinched_off.size
         assert 3 == holes.size
 
+    def test_topology_csr_against_loops(self):
+        dt = surfaces.SkinAir.from_file()
+        dt.configure()
+        neighbours = [set() for _ in range(dt.number_of_vertices)]
+        vertex_triangles = [set() for _ in range(dt.number_of_vertices)]
+        for k, (a, b, c) in enumerate(dt.triangles):
+            neighbours[a].update((b, c))
+            neighbours[b].update((a, c))
+            neighbours[c].update((a, b))
+            for v in (a, b, c):
+                vertex_triangles[v].add(k)
+        edges = sorted(set((min(a, b), max(a, b)) for a in range(dt.number_of_vertices) for b in neighbours[a]))
+
+        assert list(dt.vertex_neighbours) == neighbours
+        assert list(dt.vertex_triangles) == vertex_triangles
+        assert dt.edges == edges
+        assert list(dt.edge_triangles) == [vertex_triangles[a] & vertex_triangles[b] for a, b in edges]
+        ring = neighbours[0] | set(v for u in neighbours[0] for v in neighbours[u])
+        assert dt.nth_ring(0, contains=True) == ring - {0}
+        assert dt.nth_ring(0) == ring - neighbours[0] - {0}
+
+        normals = numpy.zeros((dt.number_of_vertices, 3))
+        for k in range(dt.number_of_vertices):
+            tri_list = list(vertex_triangles[k])
+            angles = dt.triangle_angles[tri_list][dt.triangles[tri_list] == k]
+            normals[k] = numpy.sum(angles[:, numpy.newaxis] * dt.triangle_normals[tri_list], axis=0)
+        normals /= numpy.sqrt(numpy.sum(normals ** 2, axis=1))[:, numpy.newaxis]
+        dt.compute_vertex_normals()
+        numpy.testing.assert_allclose(dt.vertex_normals, normals, atol=1e-12)
+
+    def test_laplace_beltrami_against_loops(self):
+        dt = surfaces.Surface()
+        dt.vertices = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 1]]).astype(numpy.float64)
+        dt.triangles = numpy.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 4], [2, 3, 4], [1, 4, 3]])
+        dt.configure()
+        distances = numpy.sqrt(numpy.sum((dt.vertices[:, numpy.newaxis] - dt.vertices) ** 2, axis=2))
+        # distances beyond the sparse matrix cutoff are not stored
+        distances[distances > 1.5] = 0.0
+        dt.geodesic_distance_matrix = scipy.sparse.csc_matrix(distances)
+        fv = numpy.random.RandomState(42).rand(dt.number_of_vertices)
+        h = 0.5
+
+        expected = numpy.zeros_like(fv)
+        for w in range(dt.number_of_vertices):
+            for t in range(dt.number_of_triangles):
+                for p in dt.triangles[t]:
+                    expected[w] += (dt.triangle_areas[t, 0] / 3.0 * numpy.exp(-distances[w, p] ** 2 / (4 * h))
+                                    * (fv[p] - fv[w]))
+        expected /= 4.0 * numpy.pi * h ** 2
+
+        numpy.testing.assert_allclose(dt.laplace_beltrami(fv, h), expected)
+
+    def test_local_gdist_matrix_blocks(self, monkeypatch):
+        dt = surfaces.SkinAir.from_file()
+        monkeypatch.setattr(surfaces, "GDIST_SOURCES_PER_TASK", 1000)
+        expected = surfaces.gdist.local_gdist_matrix(dt.vertices.astype(numpy.float64),
+                                                     dt.triangles.astype(numpy.int32), max_distance=6.0)
+
+        dist = surfaces.local_gdist_matrix(dt.vertices, dt.triangles, 6.0, workers=2)
+
+        assert dist.format == 'csc'
+        assert dist.nnz == expected.nnz
+        assert abs(dist - expected).max() < 1e-9
+
+    def test_geodesic_distance_matrix_cache(self, tmpdir, monkeypatch):
+        dt = surfaces.EEGCap.from_file()
+        cache_dir = str(tmpdir)
+        expected = surfaces.gdist.local_gdist_matrix(dt.vertices.astype(numpy.float64),
+                                                     dt.triangles.astype(numpy.int32), max_distance=15.0)
+
+        dt.compute_geodesic_distance_matrix(max_dist=30.0, workers=1, cache_dir=cache_dir)
+        assert len(tmpdir.listdir()) == 1
+
+        def fail(*args, **kwargs):
+            raise AssertionError("A cached cutoff should not be recomputed.")
+
+        monkeypatch.setattr(surfaces, "local_gdist_matrix", fail)
+        dt.compute_geodesic_distance_matrix(max_dist=15.0, cache_dir=cache_dir)
+        assert dt.geodesic_distance_matrix.nnz == expected.nnz
+        assert abs(dt.geodesic_distance_matrix - expected).max() < 1e-9
+        with pytest.raises(AssertionError):
+            dt.compute_geodesic_distance_matrix(max_dist=40.0, cache_dir=cache_dir)
+
+    def test_local_gdist_matrix_serial_by_default(self, monkeypatch):
+        dt = surfaces.EEGCap.from_file()
+        monkeypatch.setattr(surfaces, "GDIST_SOURCES_PER_TASK", 100)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("Small surfaces should use the serial gdist matrix.")
+
+        monkeypatch.setattr(surfaces, "ProcessPoolExecutor", fail)
+        monkeypatch.setattr(surfaces, "_gdist_source_block", fail)
+        dist = surfaces.local_gdist_matrix(dt.vertices, dt.triangles, 6.0)
+        assert dist.format == 'csc'
+        assert dist.shape == (dt.vertices.shape[0], dt.vertices.shape[0])
+
+    def test_gdist_cache_eviction(self, tmpdir):
+        cache_dir = str(tmpdir)
+        gids = [uuid.uuid4() for _ in range(3)]
+        for age, gid in enumerate(gids):
+            surfaces._store_cached_gdist_matrix(cache_dir, gid, 5.0, scipy.sparse.identity(20, format='csc'))
+            file_path = os.path.join(cache_dir, "%s_%r.npz" % (gid.hex, 5.0))
+            os.utime(file_path, (1000 + age, 1000 + age))
+        # reading a matrix makes it the most recently used one
+        assert surfaces._load_cached_gdist_matrix(cache_dir, gids[0], 5.0, 20) is not None
+
+        surfaces._evict_cached_gdist_matrices(cache_dir, 2 * os.path.getsize(file_path))
+
+        assert sorted(file_name.basename for file_name in tmpdir.listdir()) == sorted(
+            "%s_%r.npz" % (gid.hex, 5.0) for gid in (gids[0], gids[2]))
+
+    def test_localconnectivity_homogenisation(self):
+        rng = numpy.random.RandomState(42)
+        gdist = scipy.sparse.random(50, 50, density=0.2, format='csc', random_state=rng) * 10.0
+        gdist = (gdist + gdist.T).tocsc()
+        dt = LocalConnectivity(equation=equations.DoubleGaussian())
+        dt.matrix_gdist = gdist
+        data = gdist.data.copy()
+        dt.compute()
+
+        # diag(pos_mean / pos_rowsum) * pos + diag(neg_mean / neg_rowsum) * neg
+        weights = gdist.copy()
+        weights.data = dt.equation.evaluate(weights.data)
+        pos, neg = weights.maximum(0.0), weights.minimum(0.0)
+        pos_sum, neg_sum = numpy.asarray(pos.sum(axis=1)).ravel(), numpy.asarray(neg.sum(axis=1)).ravel()
+        pos_hf = numpy.divide(pos_sum.mean(), pos_sum, out=numpy.zeros(50), where=pos_sum != 0)
+        neg_hf = numpy.divide(neg_sum.mean(), neg_sum, out=numpy.zeros(50), where=neg_sum != 0)
+        expected = scipy.sparse.diags(pos_hf) * pos + scipy.sparse.diags(neg_hf) * neg
+
+        numpy.testing.assert_array_equal(dt.matrix_gdist.data, data)
+        assert abs(dt.matrix - expected).max() < 1e-12
+        assert dt.matrix.nnz == expected.nnz
+
     def test_skinair(self):
         dt = surfaces.SkinAir.from_file()
         assert isinstance(dt, surfaces.SkinAir)
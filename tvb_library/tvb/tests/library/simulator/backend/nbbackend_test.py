@@ -31,18 +31,33 @@ Tests for the Numba backend.
 
 """
 
+import os
+import sys
+import hashlib
 import unittest
+import tempfile
+import functools
 import numpy as np
+import scipy.sparse
 
-from tvb.simulator.coupling import Sigmoidal, Linear
+from tvb.simulator.coupling import (Sigmoidal, Linear, Difference, Kuramoto,
+    SigmoidalJansenRit)
 from tvb.simulator.noise import Additive, Multiplicative
 from tvb.datatypes.connectivity import Connectivity
 from tvb.simulator.models.infinite_theta import MontbrioPazoRoxin
+from tvb.simulator.models.oscillator import Generic2dOscillator, Kuramoto as KuramotoModel
+from tvb.simulator.models.jansen_rit import JansenRit
+from tvb.simulator.models.epileptor import Epileptor
+from tvb.simulator.models.wong_wang import ReducedWongWang
+from tvb.simulator.models.linear import Linear as LinearModel
+from tvb.simulator.monitors import Raw, SubSample, GlobalAverage, TemporalAverage, Bold
+from tvb.simulator.simulator import Simulator
 from tvb.simulator.integrators import (EulerDeterministic, EulerStochastic,
     HeunDeterministic, HeunStochastic, IntegratorStochastic, 
     RungeKutta4thOrderDeterministic, Identity, IdentityStochastic,
     VODEStochastic)
 from tvb.simulator.backend.nb import NbBackend
+from tvb.simulator.backend.nb_surface import ParallelLocalCoupling
 
 from .backendtestbase import (BaseTestCoupling, BaseTestDfun,
     BaseTestIntegrate, BaseTestSim)
@@ -284,3 +299,147 @@ class TestNbSim(BaseTestSim):
 
     def test_drk4(self): self._test_integrator(RungeKutta4thOrderDeterministic,
                                                delays=True)
+
+
+class TestNbFusedStep(unittest.TestCase):
+    "Tests of the fused region step kernel against Simulator.run."
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache_dir.cleanup()
+
+    def _create_sims(self, model, coupling, integrator, delays=True,
+                     monitors=(Raw, functools.partial(TemporalAverage, period=1.0)),
+                     simulation_length=20.0):
+        sims = []
+        for _ in range(2):
+            conn = Connectivity.from_file()
+            conn.speed = np.r_[3.0 if delays else np.inf]
+            sim = Simulator(connectivity=conn, model=model, coupling=coupling,
+                integrator=integrator, simulation_length=simulation_length,
+                monitors=[Monitor() for Monitor in monitors]).configure()
+            sims.append(sim)
+        ref, sim = sims
+        sim.history.buffer[:] = ref.history.buffer
+        sim.current_state[:] = ref.current_state
+        return ref, sim
+
+    def _test_fused(self, *args, tol=(1e-5, 1e-6), **kwargs):
+        ref, sim = self._create_sims(*args, **kwargs)
+        stochastic = isinstance(sim.integrator, IntegratorStochastic)
+        # the integrator is shared, so both runs must draw the same noise
+        if stochastic:
+            sim.integrator.noise.reset_random_stream()
+        expected = ref.run()
+        if stochastic:
+            sim.integrator.noise.reset_random_stream()
+        actual = NbBackend(cache_dir=self.cache_dir.name).run_sim(sim, chunksize=64)
+        for (et, ey), (at, ay) in zip(expected, actual):
+            np.testing.assert_allclose(at, et)
+            np.testing.assert_allclose(ay, ey, *tol)
+        self.assertEqual(sim.current_step, ref.current_step)
+        np.testing.assert_allclose(sim.current_state, ref.current_state, *tol)
+
+    def test_g2d_heun(self):
+        self._test_fused(Generic2dOscillator(), Linear(a=np.r_[0.01]),
+                         HeunDeterministic(dt=0.1))
+
+    def test_g2d_heuns_difference(self):
+        self._test_fused(Generic2dOscillator(), Difference(),
+                         HeunStochastic(dt=0.1, noise=Additive(nsig=np.r_[1e-3])))
+
+    def test_kuramoto_rk4(self):
+        self._test_fused(KuramotoModel(), Kuramoto(a=np.r_[0.5]),
+                         RungeKutta4thOrderDeterministic(dt=0.1), delays=False,
+                         # reference evaluates sin on the float32 history
+                         tol=(1e-4, 1e-3))
+
+    def test_mpr_eulers(self):
+        self._test_fused(MontbrioPazoRoxin(), Linear(a=np.r_[0.1]),
+                         EulerStochastic(dt=0.01, noise=Additive(nsig=np.r_[1e-3, 1e-3])),
+                         tol=(1e-4, 1e-4))
+
+    def test_unsupported(self):
+        ref, sim = self._create_sims(Generic2dOscillator(), Linear(),
+                                     HeunStochastic(dt=0.1, noise=Multiplicative()))
+        with self.assertRaises(NotImplementedError):
+            NbBackend(cache_dir=self.cache_dir.name).run_sim(sim)
+
+    def test_jansen_rit_sigmoidal(self):
+        self._test_fused(JansenRit(), SigmoidalJansenRit(), HeunDeterministic(dt=0.1),
+                         monitors=(Raw, functools.partial(SubSample, period=1.0),
+                                   functools.partial(GlobalAverage, period=2.0)))
+
+    def test_epileptor(self):
+        self._test_fused(Epileptor(), Difference(a=np.r_[1e-3]), HeunDeterministic(dt=0.05))
+
+    def test_epileptor_modification(self):
+        self._test_fused(Epileptor(modification=np.r_[True]), Difference(a=np.r_[1e-3]),
+                         RungeKutta4thOrderDeterministic(dt=0.05))
+
+    def test_rww_bounded(self):
+        self._test_fused(ReducedWongWang(), Linear(a=np.r_[0.5]),
+                         HeunStochastic(dt=0.1, noise=Additive(nsig=np.r_[1e-4])))
+
+    def test_multi_mode(self):
+        class LinearModes(LinearModel):
+            number_of_modes = 3
+        self._test_fused(LinearModes(gamma=np.r_[-0.5]), Linear(a=np.r_[0.01]),
+                         EulerStochastic(dt=0.1, noise=Additive(nsig=np.r_[1e-3])),
+                         monitors=(Raw, functools.partial(GlobalAverage, period=1.0)))
+
+    def test_bold(self):
+        self._test_fused(Generic2dOscillator(), Linear(a=np.r_[0.01]), HeunDeterministic(dt=0.5),
+                         monitors=(functools.partial(Bold, period=500.0),
+                                   functools.partial(TemporalAverage, period=5.0)),
+                         simulation_length=2000.0)
+
+    def test_kernel_cache(self):
+        ref, sim = self._create_sims(ReducedWongWang(), Linear(), HeunDeterministic(dt=0.1))
+        backend = NbBackend(cache_dir=self.cache_dir.name)
+        step = backend.build_step(sim)
+        # same template & parameters reuse the cached module
+        self.assertIs(step, backend.build_step(ref))
+        self.assertTrue(os.path.exists(step.py_func.__code__.co_filename))
+        # a parameter change generates a new kernel
+        sim.model.a = np.r_[0.3]
+        self.assertIsNot(step, backend.build_step(sim))
+
+    def test_kernel_cache_rejects_foreign_module(self):
+        ref, sim = self._create_sims(ReducedWongWang(), Linear(a=np.r_[0.2]), HeunDeterministic(dt=0.1))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_dir = os.path.join(tmpdir, 'kernels')
+            backend = NbBackend(cache_dir=cache_dir)
+            source = backend.render_template('<%include file="nb-fused-step.py.mako"/>',
+                                             dict(sim=sim, np=np, debug_nojit=False))
+            modname = 'tvb_nb_' + hashlib.sha256(source.encode('utf-8')).hexdigest()[:24]
+            os.makedirs(cache_dir, mode=0o777)
+            with open(os.path.join(cache_dir, modname + '.py'), 'w') as fd:
+                fd.write('raise RuntimeError("planted module executed")\n')
+            sys.modules.pop(modname, None)
+            step = backend.build_step(sim)
+            self.assertTrue(callable(step))
+            self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+
+
+class TestNbSurface(unittest.TestCase):
+
+    def test_parallel_local_coupling_sparse_api(self):
+        matrix = scipy.sparse.random(40, 40, density=0.1, format='csc', random_state=42)
+        lc = ParallelLocalCoupling(matrix, 2)
+        state = np.random.RandomState(42).rand(40, 3)
+        rows = np.random.RandomState(43).rand(2, 40)
+        self.assertEqual(lc.shape, matrix.shape)
+        self.assertEqual(lc.dtype, matrix.dtype)
+        np.testing.assert_allclose(lc * state, matrix * state)
+        np.testing.assert_allclose(lc.dot(state[:, 0]), matrix.dot(state[:, 0]))
+        np.testing.assert_allclose(lc.T * state, matrix.T * state)
+        # ndarray on the left defers to the operator instead of an element-wise object array product
+        self.assertIsInstance(rows * lc, np.ndarray)
+        np.testing.assert_allclose(rows * lc, rows * matrix)
+        np.testing.assert_allclose(rows @ lc, rows @ matrix)
+        np.testing.assert_allclose((2.0 * lc) * state, 2.0 * (matrix * state))
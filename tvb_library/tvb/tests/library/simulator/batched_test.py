@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+"""
+Tests for the batched multi-parameter simulator.
+
+.. moduleauthor:: Marmaduke Woodman <marmaduke.woodman@univ-amu.fr>
+
+"""
+
+import numpy
+import pytest
+
+from tvb.datatypes.connectivity import Connectivity
+from tvb.simulator import coupling, integrators, models, monitors
+from tvb.simulator.batched import BatchedSimulator
+from tvb.simulator.simulator import Simulator
+from tvb.tests.library.base_testcase import BaseTestCase
+
+
+class TestBatchedSimulator(BaseTestCase):
+
+    def _sim(self, sim_class, model, **kwargs):
+        conn = Connectivity.from_file()
+        initial_conditions = numpy.random.RandomState(42).rand(1000, 2, conn.weights.shape[0], 1) * 0.1
+        sim = sim_class(connectivity=conn,
+                        model=model,
+                        integrator=integrators.HeunDeterministic(dt=0.1),
+                        monitors=[monitors.Raw(), monitors.TemporalAverage(period=1.0)],
+                        initial_conditions=initial_conditions,
+                        simulation_length=10.0,
+                        **kwargs)
+        return sim.configure()
+
+    def test_matches_individual_simulations(self):
+        a = numpy.r_[0.001, 0.005, 0.02]
+        tau = numpy.r_[1.0, 1.5, 2.0]
+        batch = self._sim(BatchedSimulator, models.Generic2dOscillator(),
+                          parameter_sets={'coupling.a': a, 'model.tau': tau})
+        assert batch.n_instances == 3
+        (t, raw), (t_avg, avg) = batch.run()
+        assert raw.shape == (100, 3, 1, 76, 1)
+        assert avg.shape == (10, 3, 1, 76, 1)
+        for i in range(3):
+            sim = self._sim(Simulator, models.Generic2dOscillator(tau=tau[i:i + 1]),
+                            coupling=coupling.Linear(a=a[i:i + 1]))
+            (t_i, raw_i), (t_avg_i, avg_i) = sim.run()
+            numpy.testing.assert_allclose(t, t_i)
+            numpy.testing.assert_allclose(raw[:, i], raw_i)
+            numpy.testing.assert_allclose(avg[:, i], avg_i)
+
+    def test_node_wise_parameter_sets(self):
+        I = numpy.random.RandomState(42).rand(2, 76)
+        batch = self._sim(BatchedSimulator, models.Generic2dOscillator(),
+                          parameter_sets={'model.I': I})
+        (_, raw), _ = batch.run()
+        sim = self._sim(Simulator, models.Generic2dOscillator(I=I[1]))
+        (_, raw_1), _ = sim.run()
+        numpy.testing.assert_allclose(raw[:, 1], raw_1)
+
+    def test_bad_parameter_sets(self):
+        with pytest.raises(ValueError):
+            self._sim(BatchedSimulator, models.Generic2dOscillator(),
+                      parameter_sets={'coupling.a': numpy.r_[0.1, 0.2], 'model.I': numpy.r_[0.1, 0.2, 0.3]})
+        with pytest.raises(ValueError):
+            self._sim(BatchedSimulator, models.Generic2dOscillator(),
+                      parameter_sets={'integrator.dt': numpy.r_[0.1, 0.2]})
+
+    def test_unsupported_monitor(self):
+        sim = BatchedSimulator(connectivity=Connectivity.from_file(),
+                               monitors=[monitors.GlobalAverage()],
+                               parameter_sets={'coupling.a': numpy.r_[0.1, 0.2]})
+        with pytest.raises(NotImplementedError):
+            sim.configure()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Benchmarks of the Bold monitors on the 16k vertices cortical surface,
+e.g. ``pytest boldperf_test.py --benchmark-only``.
+
+"""
+
+import numpy as np
+import pytest
+
+from tvb.datatypes import connectivity, cortex
+from tvb.simulator import simulator, models, coupling, integrators, monitors
+
+
+def make_sim(monitor):
+    conn = connectivity.Connectivity.from_file()
+    ctx = cortex.Cortex.from_file()
+    ctx.region_mapping_data.connectivity = conn
+    sim = simulator.Simulator(
+        connectivity=conn,
+        surface=ctx,
+        model=models.Generic2dOscillator(),
+        coupling=coupling.Linear(),
+        integrator=integrators.HeunDeterministic(dt=0.5),
+        monitors=[monitor])
+    sim.configure()
+    return sim
+
+
+@pytest.mark.parametrize('monitor_class', [monitors.Bold, monitors.BoldRegionROI])
+def test_bold_period_16k(benchmark, monitor_class):
+    sim = make_sim(monitor_class())
+    monitor = sim.monitors[0]
+    state = np.random.randn(*sim.current_state.shape)
+    # touch the whole stock, as a running simulation would have
+    monitor._stock[:] = state[monitor.voi]
+    # a step which closes both an interim period and a monitor period
+    step = monitor.istep * 7
+    benchmark(lambda: monitor.sample(step, state))
+
+
+def test_bold_interim_step_16k(benchmark):
+    sim = make_sim(monitors.Bold())
+    monitor = sim.monitors[0]
+    state = np.random.randn(*sim.current_state.shape)
+    benchmark(lambda: monitor.sample(1, state))
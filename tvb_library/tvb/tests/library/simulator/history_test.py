@@ -110,3 +110,16 @@ class TestsExactPropagation(BaseTestCase):
                            [38., 13., 10., 1.],
                            [48., 17., 11., 1.]])
         assert numpy.allclose(xs, xs_)
+
+    def test_update_block(self):
+        self.build_simulator(n=4)
+        history = self.sim.history
+        initial_buffer = history.buffer.copy()
+        steps = numpy.r_[5:9]
+        states = numpy.random.rand(len(steps), 1, 4, 1)
+        for step, state in zip(steps, states):
+            history.update(step, state)
+        step_by_step_buffer = history.buffer.copy()
+        history.buffer[:] = initial_buffer
+        history.update_block(steps, states)
+        numpy.testing.assert_array_equal(history.buffer, step_by_step_buffer)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Benchmarks of the per-sample cost of the averaging monitors, by number of
+nodes, e.g. ``pytest monitorperf_test.py --benchmark-only``. The case of 262144
+nodes runs only when the TVB_LARGE_BENCHMARKS environment variable is set.
+
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from tvb.simulator import monitors
+
+# the case of 262144 nodes only runs on request, as it needs the memory of a workstation
+large_benchmark = pytest.mark.skipif(not os.environ.get('TVB_LARGE_BENCHMARKS'),
+                                     reason='set TVB_LARGE_BENCHMARKS to run the largest benchmarks')
+
+
+def make_monitor(monitor_class, n_node, n_area=384, period=1.0, dt=0.1):
+    "Configure a monitor for a stand-in simulator of two state variables, and n_node nodes."
+    sim = SimpleNamespace(
+        integrator=SimpleNamespace(dt=dt),
+        model=SimpleNamespace(variables_of_interest=('x', 'y'), cvar=np.r_[0, 1], number_of_modes=1),
+        number_of_nodes=n_node,
+        surface=None)
+    monitor = monitor_class(period=period)
+    if monitor_class is monitors.SpatialAverage:
+        monitor.spatial_mask = np.random.permutation(np.arange(n_node) % n_area)
+    monitor.config_for_sim(sim)
+    return monitor
+
+
+@pytest.mark.parametrize('n_node', [1024, 16384, pytest.param(262144, marks=large_benchmark)])
+@pytest.mark.parametrize('monitor_class', [monitors.TemporalAverage, monitors.SpatialAverage,
+                                           monitors.AfferentCouplingTemporalAverage])
+def test_monitor_step(benchmark, monitor_class, n_node):
+    monitor = make_monitor(monitor_class, n_node)
+    state = np.random.rand(2, n_node, 1)
+
+    def one_period():
+        for step in range(1, monitor.istep + 1):
+            monitor.record(step, state)
+
+    benchmark(one_period)
@@ -34,6 +34,7 @@ handling of projection matrices, etc.
 """
 
 import numpy
+import pytest
 from tvb.datatypes.surfaces import CorticalSurface
 from tvb.tests.library.base_testcase import BaseTestCase
 from tvb.datatypes import sensors
@@ -120,6 +121,53 @@ class TestMonitorsConfiguration(BaseTestCase):
         monitor = monitors.Bold()
         assert monitor.period == 2000.0
 
+    def test_monitor_bold_ring_buffer(self):
+        monitor = monitors.Bold(hrf_length=2000.0)
+        monitor.dt = 0.5
+        monitor.compute_hrf()
+        monitor._stock = numpy.random.rand(monitor._stock_steps, 2, 10, 1)
+        for latest in [-1, 0, 3, monitor._stock_steps - 2]:
+            # the HRF rolled to the latest stock sample, as for a stock in chronological order
+            hrf = numpy.roll(monitor.hemodynamic_response_function, latest, axis=1)
+            expected = numpy.dot(hrf, monitor._stock.transpose((1, 2, 0, 3))).reshape((2, 10, 1))
+            numpy.testing.assert_allclose(monitor._convolve_stock(latest), expected)
+
+    def _configured_simulator(self, monitor):
+        conn = connectivity.Connectivity.from_file()
+        sim = simulator.Simulator(connectivity=conn, model=models.Generic2dOscillator(), monitors=[monitor],
+                                  integrator=integrators.HeunDeterministic(dt=0.1))
+        sim.configure()
+        return sim
+
+    def test_monitor_bold_voi_out_of_range(self):
+        monitor = monitors.Bold(variables_of_interest=numpy.array([0, 2]))
+        with pytest.raises(ValueError):
+            self._configured_simulator(monitor)
+
+    def test_monitor_tavg_running_sum(self):
+        monitor = monitors.TemporalAverage(period=0.5, variables_of_interest=numpy.array([1, 0]))
+        sim = self._configured_simulator(monitor)
+        assert monitor._stock.shape == (2, sim.number_of_nodes, 1)
+        states = numpy.random.rand(11, 2, sim.number_of_nodes, 1)
+        samples = [monitor.sample(step, state) for step, state in enumerate(states, start=1)]
+        assert [sample is None for sample in samples] == [False if step % 5 == 0 else True for step in range(1, 12)]
+        for step in (5, 10):
+            time, data = samples[step - 1]
+            assert time == (step - 2.5) * 0.1
+            numpy.testing.assert_allclose(data, states[step - 5:step][:, [1, 0]].mean(axis=0))
+
+    def test_monitor_savg_reduction(self):
+        n_nodes = connectivity.Connectivity.from_file().weights.shape[0]
+        mask = numpy.random.permutation(numpy.arange(n_nodes) % 7)
+        monitor = monitors.SpatialAverage(period=0.1, spatial_mask=mask)
+        self._configured_simulator(monitor)
+        state = numpy.random.rand(2, n_nodes, 1)
+        _, data = monitor.sample(1, state)
+        expected = numpy.array([state[:1, mask == area].mean(axis=1) for area in range(7)]).transpose((1, 0, 2))
+        assert data.shape == (1, 7, 1)
+        numpy.testing.assert_allclose(data, expected)
+        numpy.testing.assert_allclose(monitor.spatial_mean.dot(state[0]), expected[0])
+
 
 class TestProjectionMonitorsWithSubcorticalRegions(BaseTestCase):
     """
@@ -277,6 +325,38 @@ class TestAllAnalyticWithSubcortical(BaseTestCase):
         assert (row == col).all()
 
 
+class TestProjectionGain(BaseTestCase):
+    "Test the projection applied once per sample, with the available gain representations."
+
+    def test_sample_against_projected_steps(self):
+        for approximation in monitors.GainApproximations:
+            seeg_monitor = monitors.iEEG(
+                sensors=SensorsInternal.from_file(),
+                region_mapping=RegionMapping.from_file('regionMapping_16k_192.txt'),
+                gain_approximation=approximation,
+                gain_tolerance=1e-2,
+                obsnoise=None)
+            sim = simulator.Simulator(
+                connectivity=connectivity.Connectivity.from_file('connectivity_192.zip'),
+                monitors=[seeg_monitor]).configure()
+
+            states = numpy.random.randn(seeg_monitor._period_in_steps, *sim.current_state.shape)
+            sources = [state[seeg_monitor.voi].sum(axis=-1) for state in states]
+            expected = sum(seeg_monitor.gain.dot(source.T) for source in sources) / len(states)
+            for step, state in enumerate(states, 1):
+                result = seeg_monitor.sample(step, state)
+            _, sample = result
+            assert sample.shape == (seeg_monitor.voi.size, seeg_monitor.gain.shape[0], 1)
+
+            error = numpy.linalg.norm(sample[..., 0].T - expected)
+            if approximation == monitors.GainApproximations.DENSE:
+                numpy.testing.assert_allclose(sample[..., 0].T, expected)
+            else:
+                # the discarded gain is within tolerance of the full gain, in Frobenius norm
+                bound = seeg_monitor.gain_tolerance * numpy.linalg.norm(seeg_monitor.gain)
+                assert error <= bound * numpy.linalg.norm(sum(sources) / len(states))
+
+
 class TestSVEEG(BaseTestCase):
     "Test use of multiple state variables in monitors."
 
@@ -30,6 +30,8 @@ Test for tvb.simulator.noise module
 .. moduleauthor:: Paula Sanz Leon <paula@tvb.invalid>
 
 """
+import numpy
+import pytest
 from tvb.tests.library.base_testcase import BaseTestCase
 from tvb.simulator import noise
 from tvb.datatypes import equations
@@ -44,3 +46,74 @@ class TestNoise(BaseTestCase):
         noise_multiplicative = noise.Multiplicative()
         assert noise_multiplicative.ntau == 0.0
         assert isinstance(noise_multiplicative.b, equations.Linear)
+
+    def test_block_stream_chunked(self):
+        shape = (2, 5, 1)
+        # a small block, so that the steps below span several blocks
+        block_size = 3 * 2 * 5 * 8
+        stream = noise.BlockNoiseStream(42, block_size=block_size)
+        full = numpy.array([stream.standard_normal(shape).copy() for _ in range(10)])
+
+        chunked = noise.BlockNoiseStream(42, block_size=block_size)
+        chunked.seek(4)
+        numpy.testing.assert_array_equal(full[4:], [chunked.standard_normal(shape).copy() for _ in range(6)])
+        chunked.seek(0)
+        numpy.testing.assert_array_equal(full[:4], [chunked.standard_normal(shape).copy() for _ in range(4)])
+
+        other_seed = noise.BlockNoiseStream(43, block_size=block_size)
+        assert not numpy.allclose(full[0], other_seed.standard_normal(shape))
+        with pytest.raises(ValueError):
+            noise.BlockNoiseStream(42, bit_generator='MT1')
+
+    def test_white_block_stream(self):
+        noise_additive = noise.Additive(noise_seed=42).use_block_stream('SFC64', numpy.float32)
+        noise_additive.configure_white(dt=0.01)
+        samples = numpy.array([noise_additive.generate((2, 1000, 1)).copy() for _ in range(20)])
+        assert samples.dtype == numpy.float32
+        assert abs(samples.mean()) < 0.01 * 0.1
+        assert abs(samples.std() - 0.1) < 0.01 * 0.1
+
+        noise_additive.reset_random_stream()
+        numpy.testing.assert_array_equal(noise_additive.generate((2, 1000, 1)), samples[0])
+
+    def test_white_block_stream_seek(self):
+        noise_additive = noise.Additive(noise_seed=42).use_block_stream()
+        noise_additive.configure_white(dt=0.01)
+        samples = [noise_additive.generate((2, 10, 1)).copy() for _ in range(3)]
+        # seeking back inside the current block replays the same, once scaled, samples
+        noise_additive.block_stream.seek(1)
+        numpy.testing.assert_array_equal(noise_additive.generate((2, 10, 1)), samples[1])
+        noise_additive.block_stream.seek(0)
+        numpy.testing.assert_array_equal(noise_additive.generate((2, 10, 1)), samples[0])
+
+    def test_noise_stream_traits(self):
+        noise_additive = noise.Additive(noise_seed=42, noise_stream=noise.NoiseStreams.SFC64, noise_float32=True)
+        noise_additive.configure_white(dt=0.01)
+        assert noise_additive.block_stream_step == 0
+        samples = [noise_additive.generate((2, 10, 1)).copy() for _ in range(3)]
+        assert samples[0].dtype == numpy.float32
+        assert noise_additive.block_stream_step == 3
+
+        expected = noise.Additive(noise_seed=42).use_block_stream('SFC64', numpy.float32)
+        expected.configure_white(dt=0.01)
+        numpy.testing.assert_array_equal(expected.generate((2, 10, 1)), samples[0])
+
+        # white noise of the block stream is scaled into the same array at each step
+        assert noise_additive.generate((2, 10, 1)) is noise_additive.generate((2, 10, 1))
+
+        noise_additive.seek(2)
+        numpy.testing.assert_array_equal(noise_additive.generate((2, 10, 1)), samples[2])
+
+        legacy = noise.Additive(noise_seed=42)
+        assert legacy.block_stream_step is None
+        with pytest.raises(ValueError):
+            legacy.seek(2)
+
+    def test_coloured_block_stream(self):
+        noise_additive = noise.Additive(noise_seed=42, ntau=1.0).use_block_stream()
+        noise_additive.configure_coloured(dt=0.1, shape=(2, 10, 1))
+        first = noise_additive.generate((2, 10, 1))
+        second = noise_additive.generate((2, 10, 1))
+        assert first.shape == second.shape == (2, 10, 1)
+        # exponentially correlated successive samples
+        assert numpy.corrcoef(first.ravel(), second.ravel())[0, 1] > 0.5
@@ -26,6 +26,7 @@
 
 import numpy as np
 import pytest
+from tvb.simulator import noise
 
 BitGens = [
     np.random.PCG64,
@@ -52,3 +53,17 @@ def test_normal(benchmark, BitGen):
     rng = np.random.Generator(bg)
     benchmark(lambda: rng.normal(0.0, 1.0, 1024))
 
+
+# state shape of a 16k vertices surface simulation, with 2 state variables
+SURFACE_STATE_SHAPE = (2, 16384, 1)
+
+
+@pytest.mark.parametrize('engine', ['RandomState', 'PCG64', 'SFC64', 'SFC64-float32'])
+def test_white_noise_stream(benchmark, engine):
+    additive = noise.Additive(noise_seed=42)
+    if engine != 'RandomState':
+        bit_generator, _, dtype = engine.partition('-')
+        additive.use_block_stream(bit_generator, dtype or np.float64)
+    additive.configure_white(dt=0.1)
+    # many steps per round, so that the pregeneration of blocks is accounted for
+    benchmark(lambda: [additive.generate(SURFACE_STATE_SHAPE) for _ in range(256)])
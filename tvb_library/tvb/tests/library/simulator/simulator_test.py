@@ -315,6 +315,29 @@ class TestSimulator(BaseTestCase):
         assert numpy.all(test_simulator.integrator._clamped_integration_state_variable_indices == numpy.array([0]))
         assert numpy.all(test_simulator.integrator._clamped_integration_state_variable_values == numpy.array([0.0]))
 
+    @pytest.mark.slow
+    def test_simulator_surface_threads(self):
+        """
+        Surface simulations using the parallel surface engine reproduce the serial ones.
+        """
+        results = []
+        for threads in (1, 2):
+            test_simulator = Simulator()
+            with numpy.errstate(all='ignore'):
+                test_simulator.configure(surface_sim=True)
+                if results:
+                    test_simulator.sim.history.buffer[:] = history
+                    test_simulator.sim.current_state[:] = state
+                else:
+                    history = test_simulator.sim.history.buffer.copy()
+                    state = test_simulator.sim.current_state.copy()
+                test_simulator.sim.threads = threads
+                results.append(test_simulator.run_simulation(simulation_length=1))
+        for serial, parallel in zip(*results):
+            for (t1, y1), (t2, y2) in zip(serial, parallel):
+                assert t1 == t2
+                numpy.testing.assert_allclose(y1, y2, rtol=1e-10, atol=1e-12)
+
     @pytest.mark.parametrize('default_connectivity', [True, False])
     def test_simulator_regional_stimulus(self, default_connectivity):
         test_simulator = Simulator()
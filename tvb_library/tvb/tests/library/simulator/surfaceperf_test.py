@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2023, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as explained here:
+# https://www.thevirtualbrain.org/tvb/zwei/neuroscience-publications
+#
+#
+
+"""
+Benchmarks of surface simulations with the serial loop and the parallel
+surface engine, e.g. ``pytest surfaceperf_test.py --benchmark-only``. They run
+only when the TVB_LARGE_BENCHMARKS environment variable is set.
+
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from tvb.datatypes import connectivity, cortex, local_connectivity
+from tvb.simulator import simulator, models, coupling, integrators, monitors, noise
+
+# a 16k vertices cortex on up to 8 threads is only simulated on request, as it needs the cores of a workstation
+large_benchmark = pytest.mark.skipif(not os.environ.get('TVB_LARGE_BENCHMARKS'),
+                                     reason='set TVB_LARGE_BENCHMARKS to run the largest benchmarks')
+
+
+def make_sim(threads, sim_len=10.0):
+    conn = connectivity.Connectivity.from_file()
+    conn.speed = np.r_[4.0]
+    ctx = cortex.Cortex.from_file()
+    ctx.region_mapping_data.connectivity = conn
+    ctx.local_connectivity = local_connectivity.LocalConnectivity.from_file()
+    ctx.coupling_strength = np.r_[2 ** -10]
+    sim = simulator.Simulator(
+        connectivity=conn,
+        surface=ctx,
+        model=models.Generic2dOscillator(),
+        coupling=coupling.Linear(a=np.r_[0.00042]),
+        integrator=integrators.HeunStochastic(
+            dt=0.1,
+            noise=noise.Additive(nsig=np.r_[2 ** -11])),
+        monitors=[monitors.TemporalAverage(period=1.0)],
+        threads=threads,
+        simulation_length=sim_len)
+    sim.configure()
+    # first call compiles the parallel kernels
+    sim.run(simulation_length=0.1)
+    return sim
+
+
+@large_benchmark
+@pytest.mark.parametrize('threads', [1, 2, 4, 8])
+def test_surface_16k_10ms(benchmark, threads):
+    sim = make_sim(threads)
+    benchmark(lambda: sim.run())
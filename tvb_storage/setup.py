@@ -50,7 +50,8 @@ setuptools.setup(name='tvb-storage',
                  install_requires=STORAGE_REQUIRED_PACKAGES,
                  extras_require={
                      'test': ["pytest", "decorator"],
-                     'encrypt': ["syncrypto"]},
+                     'encrypt': ["syncrypto"],
+                     'compress': ["hdf5plugin"]},
                  description='A package which handles the storage of TVB data',
                  long_description=DESCRIPTION,
                  license="GPL-3.0-or-later",
@@ -31,7 +31,6 @@ Persistence of data in HDF5 format.
 .. moduleauthor:: Calin Pavel <calin.pavel@codemart.ro>
 """
 
-import copy
 import os
 import threading
 from datetime import datetime
@@ -46,11 +45,20 @@ from tvb.storage.h5.file.exceptions import MissingDataSetException, Incompatible
     FileStructureException, MissingDataFileException
 from tvb.storage.h5.file.files_helper import FilesHelper
 
+try:
+    # Registers the Blosc filter with HDF5, for writing and reading
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
 # Create logger for this module
 LOG = get_logger(__name__)
 
 LOCK_OPEN_FILE = threading.Lock()
-BUFFER_SIZE = 300
+# Bytes buffered per dataset by append_data before they are written into the H5 file
+BUFFER_SIZE = 4 * 1024 * 1024
+# Bytes copied at once when a data set is rewritten into another layout
+REWRITE_BLOCK_SIZE = 64 * 1024 * 1024
 
 
 class HDF5StorageManager(object):
@@ -91,13 +99,15 @@ class HDF5StorageManager(object):
         except RuntimeError:
             return False
 
-    def store_data(self, data_list, dataset_name='', where=ROOT_NODE_PATH):
+    def store_data(self, data_list, dataset_name='', where=ROOT_NODE_PATH, layout=None):
         """
         This method stores provided data list into a data set in the H5 file.
 
         :param dataset_name: Name of the data set where to store data
         :param data_list: Data to be stored
         :param where: represents the path where to store our dataset (e.g. /data/info)
+        :param layout: dictionary with the chunks, compression, compression_opts and shuffle options of the
+            data set (see h5py create_dataset). It is only used when the data set gets created.
         """
         data_to_store = self._check_data(data_list)
 
@@ -108,7 +118,9 @@ class HDF5StorageManager(object):
 
             full_dataset_name = where + dataset_name
             if full_dataset_name not in hdf5_file:
-                hdf5_file.create_dataset(full_dataset_name, data=data_to_store)
+                if isinstance(data_to_store, hdf5.Empty):
+                    layout = None
+                hdf5_file.create_dataset(full_dataset_name, data=data_to_store, **self._creation_options(layout))
 
             elif hdf5_file[full_dataset_name].shape == data_to_store.shape:
                 hdf5_file[full_dataset_name][...] = data_to_store[...]
@@ -123,7 +135,8 @@ class HDF5StorageManager(object):
             self.data_encryption_handler.push_folder_to_sync(FilesHelper.get_project_folder_from_h5(
                 self.__storage_full_name))
 
-    def append_data(self, data_list, dataset_name='', grow_dimension=-1, close_file=True, where=ROOT_NODE_PATH):
+    def append_data(self, data_list, dataset_name='', grow_dimension=-1, close_file=True, where=ROOT_NODE_PATH,
+                    layout=None):
         """
         This method appends data to an existing data set. If the data set does not exists, create it first.
 
@@ -133,6 +146,8 @@ class HDF5StorageManager(object):
         :param close_file: Specify if the file should be closed automatically after write operation. If not,
             you have to close file by calling method close_file()
         :param where: represents the path where to store our dataset (e.g. /data/info)
+        :param layout: dictionary with the chunks, compression, compression_opts and shuffle options of the
+            data set (see h5py create_dataset). It is only used when the data set gets created.
 
         """
         data_to_store = self._check_data(data_list)
@@ -151,7 +166,8 @@ class HDF5StorageManager(object):
                 data_shape_list[grow_dimension] = None
                 data_shape = tuple(data_shape_list)
                 dataset = hdf5_file.create_dataset(where + dataset_name, data=data_to_store, shape=data_to_store.shape,
-                                                   dtype=data_to_store.dtype, maxshape=data_shape)
+                                                   dtype=data_to_store.dtype, maxshape=data_shape,
+                                                   **self._creation_options(layout))
                 self.data_buffers[datapath] = HDF5StorageManager.H5pyStorageBuffer(dataset,
                                                                                    buffered_data=None,
                                                                                    grow_dimension=grow_dimension)
@@ -163,6 +179,51 @@ class HDF5StorageManager(object):
         self.data_encryption_handler.push_folder_to_sync(
             FilesHelper.get_project_folder_from_h5(self.__storage_full_name))
 
+    def rewrite_data_layout(self, layouts):
+        """
+        Rewrite the whole H5 file, creating again the root data sets named in :param layouts: with the given layout.
+        All other nodes and all the attributes are copied unchanged. Data is copied in blocks, and the new file
+        replaces the current one only once it is complete.
+
+        :param layouts: dictionary from data set name to its layout, as described for store_data
+        """
+        LOG.debug("Rewriting file %s with new data set layouts" % self.__storage_full_name)
+        self.close_file()
+        temp_file_path = self.__storage_full_name + '.tmp'
+        try:
+            self.__aquire_lock()
+            with hdf5.File(self.__storage_full_name, 'r') as source, \
+                    hdf5.File(temp_file_path, 'w', libver='latest') as target:
+                target['/'].attrs.update(source['/'].attrs)
+                for node_name in source:
+                    node = source[node_name]
+                    layout = layouts.get(node_name, None)
+                    if layout is None or not isinstance(node, hdf5.Dataset) or not node.shape or not node.size:
+                        source.copy(node, target, name=node_name)
+                        continue
+                    if layout.get('chunks', None) is not None:
+                        # data sets which are not expandable can not have chunks larger than themselves
+                        layout = dict(layout, chunks=tuple(chunk if max_size is None else min(chunk, max_size)
+                                                           for chunk, max_size in zip(layout['chunks'],
+                                                                                      node.maxshape)))
+                    new_dataset = target.create_dataset(node_name, shape=node.shape, dtype=node.dtype,
+                                                        maxshape=node.maxshape, **self._creation_options(layout))
+                    new_dataset.attrs.update(node.attrs)
+                    block = max(REWRITE_BLOCK_SIZE * node.shape[0] // max(node.nbytes, 1), 1)
+                    for start in range(0, node.shape[0], block):
+                        new_dataset[start:start + block] = node[start:start + block]
+            os.replace(temp_file_path, self.__storage_full_name)
+            os.chmod(self.__storage_full_name, TvbProfile.current.ACCESS_MODE_TVB_FILES)
+        except (IOError, OSError) as err:
+            LOG.exception("Could not rewrite storage file.")
+            raise FileStructureException("Could not rewrite storage file. %s" % err)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            self.__release_lock()
+            self.data_encryption_handler.push_folder_to_sync(
+                FilesHelper.get_project_folder_from_h5(self.__storage_full_name))
+
     def remove_data(self, dataset_name='', where=ROOT_NODE_PATH):
         """
         Deleting a data set from H5 file.
@@ -204,6 +265,7 @@ class HDF5StorageManager(object):
             # Open file to read data
             hdf5_file = self._open_h5_file('r')
             if data_path in hdf5_file:
+                self.__flush_data_buffer(data_path)
                 data_array = hdf5_file[data_path]
                 # Now read data
                 if data_slice is None:
@@ -237,6 +299,7 @@ class HDF5StorageManager(object):
             # Open file to read data
             hdf5_file = self._open_h5_file('r')
             data_array = hdf5_file[where + dataset_name]
+            self.__flush_data_buffer(where + dataset_name)
             return data_array.shape
         except KeyError:
             LOG.debug("Trying to read data from a missing data set: %s" % dataset_name)
@@ -490,6 +553,14 @@ class HDF5StorageManager(object):
                 self.__hfd5_file = None
 
     # -------------- Private methods  --------------
+    def __flush_data_buffer(self, data_path):
+        """
+        Write into the file what append_data still holds in memory for the given data set, so that it can be read.
+        """
+        data_buffer = self.data_buffers.get(data_path, None)
+        if data_buffer is not None:
+            data_buffer.flush_buffered_data()
+
     def __open_h5_file(self, mode='a'):
         """
         Open file for reading, writing or append.
@@ -524,6 +595,22 @@ class HDF5StorageManager(object):
 
         return self.__hfd5_file
 
+    @staticmethod
+    def _creation_options(layout):
+        """
+        Translate a data set layout into arguments for h5py create_dataset.
+        'blosc' compression is provided by the optional hdf5plugin package.
+        """
+        if not layout:
+            return {}
+        options = dict(layout)
+        if options.get('compression') == 'blosc':
+            if hdf5plugin is None:
+                raise FileStructureException("Blosc compression requires the hdf5plugin package to be installed")
+            blosc_shuffle = hdf5plugin.Blosc.SHUFFLE if options.pop('shuffle', False) else hdf5plugin.Blosc.NOSHUFFLE
+            options.update(hdf5plugin.Blosc(clevel=options.pop('compression_opts', None) or 5, shuffle=blosc_shuffle))
+        return options
+
     @staticmethod
     def _check_data(data_list):
         """
@@ -546,16 +633,23 @@ class HDF5StorageManager(object):
         """
         Helper class in order to buffer data for append operations, to limit the number of actual
         HDD I/O operations.
+
+        Appended slices are copied in place into a preallocated array, which is only reallocated
+        (doubling its capacity along the grow dimension) when a slice does not fit. A flush issues
+        a single resize and write on the H5 dataset and the array is then reused for the next slices.
         """
 
         def __init__(self, h5py_dataset, buffered_data=None, grow_dimension=-1):
-            self.buffered_data = buffered_data
+            self.buffered_data = None
+            self.buffered_length = 0
             self.buffer_size = BUFFER_SIZE
             if h5py_dataset is None:
                 raise MissingDataSetException("A H5pyStorageBuffer instance must have a h5py dataset for which the"
                                               "buffering is done. Please supply one to the 'h5py_dataset' parameter.")
             self.h5py_dataset = h5py_dataset
             self.grow_dimension = grow_dimension
+            if buffered_data is not None:
+                self.buffer_data(buffered_data)
 
         def buffer_data(self, data_list):
             """
@@ -563,39 +657,51 @@ class HDF5StorageManager(object):
             :returns: True if buffer is still fine, \
                       False if a flush is necessary since the buffer is full
             """
+            grow_axis = self.grow_dimension % data_list.ndim
+            new_length = self.buffered_length + data_list.shape[grow_axis]
+            if self.buffered_data is None or new_length > self.buffered_data.shape[grow_axis]:
+                self.__grow_buffer(data_list, grow_axis, new_length)
+            self.buffered_data[self.__buffer_slice(self.buffered_length, new_length)] = data_list
+            self.buffered_length = new_length
+            slice_nbytes = self.buffered_data.nbytes // self.buffered_data.shape[grow_axis]
+            return slice_nbytes * self.buffered_length <= self.buffer_size
+
+        def __grow_buffer(self, data_list, grow_axis, min_length):
+            """
+            Reallocate the buffer so that it holds at least min_length slices, keeping the ones buffered so far.
+            The first allocation is sized to what fits in buffer_size, later ones double the capacity.
+            """
             if self.buffered_data is None:
-                self.buffered_data = data_list
-            else:
-                self.buffered_data = self.__custom_numpy_append(self.buffered_data, data_list)
-            if self.buffered_data.nbytes > self.buffer_size:
-                return False
+                slice_nbytes = max(data_list.nbytes // max(data_list.shape[grow_axis], 1), 1)
+                capacity = max(min_length, self.buffer_size // slice_nbytes + 1)
+                dtype = data_list.dtype
             else:
-                return True
-
-        def __custom_numpy_append(self, array1, array2):
-            array_1_shape = numpy.array(array1.shape)
-            array_2_shape = numpy.array(array2.shape)
-            result_shape = copy.deepcopy(array_1_shape)
-            result_shape[self.grow_dimension] += array_2_shape[self.grow_dimension]
-            result_array = numpy.empty(shape=tuple(result_shape), dtype=array1.dtype)
-            full_slice = slice(None, None, None)
-            full_index = [full_slice for _ in array_1_shape]
-            full_index[self.grow_dimension] = slice(0, array_1_shape[self.grow_dimension], None)
-            result_array[tuple(full_index)] = array1
-            full_index[self.grow_dimension] = slice(array_1_shape[self.grow_dimension],
-                                                    result_shape[self.grow_dimension], None)
-            result_array[tuple(full_index)] = array2
-            return result_array
+                capacity = max(min_length, 2 * self.buffered_data.shape[grow_axis])
+                dtype = self.buffered_data.dtype
+            shape = list(data_list.shape)
+            shape[grow_axis] = capacity
+            new_buffer = numpy.empty(tuple(shape), dtype=dtype)
+            if self.buffered_length:
+                new_buffer[self.__buffer_slice(0, self.buffered_length)] = self.__buffered_view()
+            self.buffered_data = new_buffer
+
+        def __buffer_slice(self, start, stop):
+            full_index = [slice(None, None, None)] * self.buffered_data.ndim
+            full_index[self.grow_dimension] = slice(start, stop, None)
+            return tuple(full_index)
+
+        def __buffered_view(self):
+            return self.buffered_data[self.__buffer_slice(0, self.buffered_length)]
 
         def flush_buffered_data(self):
             """
             Append the data buffered so far to the input dataset using :param grow_dimension: as the dimension that
             will be expanded.
             """
-            if self.buffered_data is not None:
+            if self.buffered_length:
                 current_shape = self.h5py_dataset.shape
                 new_shape = list(current_shape)
-                new_shape[self.grow_dimension] += self.buffered_data.shape[self.grow_dimension]
+                new_shape[self.grow_dimension] += self.buffered_length
                 # Create the required slice to which the new data will be added.
                 # For example if the 3nd dimension of a 4D datashape (74, 1, 100, 1)
                 # we want to get the slice (:, :, 100:200, :) in order to add 100 new entries
@@ -605,5 +711,5 @@ class HDF5StorageManager(object):
                 append2address[self.grow_dimension] = slice_to_add
                 # Do the data reshape and copy the new data
                 self.h5py_dataset.resize(tuple(new_shape))
-                self.h5py_dataset[tuple(append2address)] = self.buffered_data
-                self.buffered_data = None
+                self.h5py_dataset[tuple(append2address)] = self.__buffered_view()
+                self.buffered_length = 0
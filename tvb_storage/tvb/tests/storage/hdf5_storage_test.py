@@ -30,6 +30,7 @@
 """
 
 import os
+import h5py
 import numpy
 import shutil
 import pytest
@@ -37,6 +38,7 @@ import pytest
 from tvb.basic.profile import TvbProfile
 from tvb.storage.h5.file.exceptions import MissingDataSetException, IncompatibleFileManagerException, \
     FileStructureException
+from tvb.storage.h5.file import hdf5_storage_manager
 from tvb.storage.h5.file.hdf5_storage_manager import HDF5StorageManager
 from tvb.storage.storage_interface import StorageInterface
 
@@ -236,6 +238,82 @@ class TestHDF5Storage(object):
         read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, True)
         self._assert_arrays_are_equal(self.test_3D_array, read_data)
 
+    def test_append_read_before_closing_file(self):
+        """
+        Test that data still buffered by append operations is visible to reads on the open file.
+        """
+        for index in range(self.test_2D_array.shape[0]):
+            self.storage.append_data(self.test_2D_array[index:index + 1], DATASET_NAME_1, 0, False,
+                                     StorageInterface.ROOT_NODE_PATH)
+            data_shape = self.storage.get_data_shape(DATASET_NAME_1, StorageInterface.ROOT_NODE_PATH)
+            assert (index + 1, self.test_2D_array.shape[1]) == data_shape
+
+        read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, False)
+        self._assert_arrays_are_equal(self.test_2D_array, read_data)
+        self.storage.close_file()
+
+    def test_append_over_buffer_size(self, monkeypatch):
+        """
+        Test appending slices of various lengths, which grow and overflow the append buffer.
+        """
+        monkeypatch.setattr(hdf5_storage_manager, "BUFFER_SIZE", 200)
+        data = numpy.random.random((60, 3))
+        start = 0
+        for length in [1, 2, 5, 1, 17, 3, 3, 12, 1, 15]:
+            self.storage.append_data(data[start:start + length], DATASET_NAME_1, 0, False,
+                                     StorageInterface.ROOT_NODE_PATH)
+            start += length
+
+        self.storage.close_file()
+        read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, True)
+        self._assert_arrays_are_equal(data, read_data)
+
+    def test_store_data_with_layout(self):
+        """
+        Test that a data set gets created with the chunks and compression of the given layout.
+        """
+        layout = {'chunks': (5, 10), 'compression': 'gzip', 'compression_opts': 1, 'shuffle': True}
+        self.storage.store_data(self.test_2D_array, DATASET_NAME_1, StorageInterface.ROOT_NODE_PATH, layout)
+
+        with h5py.File(os.path.join(self.storage_folder, STORAGE_FILE_NAME), 'r') as h5_file:
+            assert (5, 10) == h5_file[DATASET_NAME_1].chunks
+            assert 'gzip' == h5_file[DATASET_NAME_1].compression
+        read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, True)
+        self._assert_arrays_are_equal(self.test_2D_array, read_data)
+
+    def test_store_data_blosc_layout(self):
+        """
+        Test Blosc compression, available when hdf5plugin is installed.
+        """
+        pytest.importorskip("hdf5plugin")
+        layout = {'chunks': (5, 10), 'compression': 'blosc', 'shuffle': True}
+        self.storage.store_data(self.test_2D_array, DATASET_NAME_1, StorageInterface.ROOT_NODE_PATH, layout)
+        read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, True)
+        self._assert_arrays_are_equal(self.test_2D_array, read_data)
+
+    def test_rewrite_data_layout(self):
+        """
+        Test that rewriting a file changes the layout of the given data sets, and keeps all data and metadata.
+        """
+        self.storage.append_data(self.test_2D_array, DATASET_NAME_1, 0, True, StorageInterface.ROOT_NODE_PATH)
+        self.storage.store_data(self.test_3D_array, DATASET_NAME_2, STORE_PATH)
+        self.storage.set_metadata(META_DICT, DATASET_NAME_1)
+        self.storage.set_metadata(META_DICT)
+
+        layout = {'chunks': (4, 20), 'compression': 'gzip', 'compression_opts': 1, 'shuffle': False}
+        self.storage.rewrite_data_layout({DATASET_NAME_1: layout})
+
+        with h5py.File(os.path.join(self.storage_folder, STORAGE_FILE_NAME), 'r') as h5_file:
+            assert (4, 10) == h5_file[DATASET_NAME_1].chunks
+            assert (None, 10) == h5_file[DATASET_NAME_1].maxshape
+            assert 'gzip' == h5_file[DATASET_NAME_1].compression
+        read_data = self.storage.get_data(DATASET_NAME_1, None, StorageInterface.ROOT_NODE_PATH, False, True)
+        self._assert_arrays_are_equal(self.test_2D_array, read_data)
+        read_data = self.storage.get_data(DATASET_NAME_2, None, STORE_PATH, False, True)
+        self._assert_arrays_are_equal(self.test_3D_array, read_data)
+        assert META_VALUE == self.storage.get_metadata(DATASET_NAME_1)[META_KEY]
+        assert META_VALUE == self.storage.get_metadata()[META_KEY]
+
     def test_close_file_multiple_time(self):
         """
         Test closing H5 file multiple times.